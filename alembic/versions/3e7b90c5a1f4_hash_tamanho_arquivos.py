@@ -0,0 +1,32 @@
+"""hash e tamanho dos arquivos de conciliacao
+
+Revision ID: 3e7b90c5a1f4
+Revises: 8c1f4a2d9e37
+Create Date: 2026-10-18 16:31:47.902154
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3e7b90c5a1f4'
+down_revision: Union[str, Sequence[str], None] = '8c1f4a2d9e37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('arquivos_conciliacao', sa.Column('hash_sha256', sa.String(length=64), nullable=True), schema='concilia')
+    op.add_column('arquivos_conciliacao', sa.Column('tamanho_bytes', sa.BigInteger(), nullable=True), schema='concilia')
+    op.create_index(op.f('ix_concilia_arquivos_conciliacao_hash_sha256'), 'arquivos_conciliacao', ['hash_sha256'], unique=False, schema='concilia')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_concilia_arquivos_conciliacao_hash_sha256'), table_name='arquivos_conciliacao', schema='concilia')
+    op.drop_column('arquivos_conciliacao', 'tamanho_bytes', schema='concilia')
+    op.drop_column('arquivos_conciliacao', 'hash_sha256', schema='concilia')
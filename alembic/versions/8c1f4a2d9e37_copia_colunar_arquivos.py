@@ -0,0 +1,30 @@
+"""copia colunar dos arquivos de conciliacao
+
+Revision ID: 8c1f4a2d9e37
+Revises: 5bfb489bd4b2
+Create Date: 2026-10-18 16:05:12.481203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c1f4a2d9e37'
+down_revision: Union[str, Sequence[str], None] = '5bfb489bd4b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('arquivos_conciliacao', sa.Column('caminho_colunar', sa.String(length=300), nullable=True), schema='concilia')
+    op.add_column('arquivos_conciliacao', sa.Column('status_colunar', sa.String(length=20), server_default=sa.text("'pendente'"), nullable=False), schema='concilia')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('arquivos_conciliacao', 'status_colunar', schema='concilia')
+    op.drop_column('arquivos_conciliacao', 'caminho_colunar', schema='concilia')
@@ -0,0 +1,30 @@
+"""status das conciliacoes (fechamento mensal)
+
+Revision ID: b71d3e0c42a8
+Revises: 3e7b90c5a1f4
+Create Date: 2026-10-18 17:12:08.315407
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b71d3e0c42a8'
+down_revision: Union[str, Sequence[str], None] = '3e7b90c5a1f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('conciliacoes', sa.Column('status', sa.String(length=20), server_default=sa.text("'pendente'"), nullable=False), schema='concilia')
+    op.create_index(op.f('ix_concilia_conciliacoes_status'), 'conciliacoes', ['status'], unique=False, schema='concilia')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_concilia_conciliacoes_status'), table_name='conciliacoes', schema='concilia')
+    op.drop_column('conciliacoes', 'status', schema='concilia')
@@ -0,0 +1,48 @@
+"""diferencas por cliente das conciliacoes
+
+Revision ID: d4a9c6e13f57
+Revises: b71d3e0c42a8
+Create Date: 2026-10-18 17:48:31.604219
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a9c6e13f57'
+down_revision: Union[str, Sequence[str], None] = 'b71d3e0c42a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('diferencas_conciliacao',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('conciliacao_id', sa.Integer(), nullable=False),
+    sa.Column('codigo', sa.String(length=50), nullable=True),
+    sa.Column('cliente', sa.String(length=255), nullable=True),
+    sa.Column('valor_financeiro', sa.DECIMAL(precision=18, scale=2), nullable=False),
+    sa.Column('valor_contabilidade', sa.DECIMAL(precision=18, scale=2), nullable=False),
+    sa.Column('diferenca', sa.DECIMAL(precision=18, scale=2), nullable=False),
+    sa.Column('diferenca_abs', sa.DECIMAL(precision=18, scale=2), nullable=False),
+    sa.Column('origem', sa.String(length=20), nullable=False),
+    sa.Column('tipo_diferenca', sa.String(length=30), nullable=False),
+    sa.ForeignKeyConstraint(['conciliacao_id'], ['concilia.conciliacoes.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    schema='concilia'
+    )
+    op.create_index('ix_diferencas_conciliacao_tipo_abs', 'diferencas_conciliacao', ['conciliacao_id', 'tipo_diferenca', 'diferenca_abs', 'id'], unique=False, schema='concilia')
+    op.create_index('ix_diferencas_conciliacao_abs', 'diferencas_conciliacao', ['conciliacao_id', 'diferenca_abs', 'id'], unique=False, schema='concilia')
+    op.create_index('ix_diferencas_conciliacao_codigo', 'diferencas_conciliacao', ['conciliacao_id', 'codigo'], unique=False, schema='concilia')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_diferencas_conciliacao_codigo', table_name='diferencas_conciliacao', schema='concilia')
+    op.drop_index('ix_diferencas_conciliacao_abs', table_name='diferencas_conciliacao', schema='concilia')
+    op.drop_index('ix_diferencas_conciliacao_tipo_abs', table_name='diferencas_conciliacao', schema='concilia')
+    op.drop_table('diferencas_conciliacao', schema='concilia')
@@ -0,0 +1,162 @@
+"""
+Benchmark do motor de calcular_diferencas.
+
+Compara o motor vetorizado atual com a implementação anterior (várias
+máscaras .loc + um len(df[mask]) por métrica), conferindo que ambos
+produzem o mesmo df_completo/resumo.
+
+Uso:
+    python -m benchmarks.bench_calc_diferencas --linhas 2000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from tools.calc_diferencas import calcular_diferencas
+
+
+def calcular_diferencas_referencia(df_financeiro: pd.DataFrame, df_contabilidade: pd.DataFrame) -> dict:
+    """Implementação anterior, mantida apenas como referência de comparação."""
+    df_fin = df_financeiro.copy()
+    df_cont = df_contabilidade.copy()
+
+    df_merge = pd.merge(
+        df_fin[['codigo', 'cliente', 'valor']],
+        df_cont[['codigo', 'cliente', 'valor']],
+        on='codigo',
+        how='outer',
+        suffixes=('_fin', '_cont')
+    )
+
+    df_merge['valor_fin'] = df_merge['valor_fin'].fillna(0)
+    df_merge['valor_cont'] = df_merge['valor_cont'].fillna(0)
+    df_merge['cliente'] = df_merge['cliente_fin'].fillna(df_merge['cliente_cont'])
+    df_merge['diferenca'] = df_merge['valor_cont'] - df_merge['valor_fin']
+    df_merge['diferenca_abs'] = df_merge['diferenca'].abs()
+
+    df_merge['diferenca_perc'] = 0.0
+    mask = df_merge['valor_fin'] != 0
+    df_merge.loc[mask, 'diferenca_perc'] = (
+        (df_merge.loc[mask, 'diferenca'] / df_merge.loc[mask, 'valor_fin']) * 100
+    )
+
+    df_merge['origem'] = 'Ambos'
+    df_merge.loc[df_merge['valor_fin'] == 0, 'origem'] = 'Só Contabilidade'
+    df_merge.loc[df_merge['valor_cont'] == 0, 'origem'] = 'Só Financeiro'
+
+    df_merge['tipo_diferenca'] = 'Sem diferença'
+    df_merge.loc[df_merge['diferenca'] > 0, 'tipo_diferenca'] = 'Contabilidade > Financeiro'
+    df_merge.loc[df_merge['diferenca'] < 0, 'tipo_diferenca'] = 'Financeiro > Contabilidade'
+    df_merge.loc[df_merge['origem'] != 'Ambos', 'tipo_diferenca'] = 'Exclusivo'
+
+    df_resultado = df_merge[[
+        'codigo', 'cliente', 'valor_fin', 'valor_cont', 'diferenca',
+        'diferenca_abs', 'diferenca_perc', 'origem', 'tipo_diferenca'
+    ]].copy()
+    df_resultado.columns = [
+        'Código', 'Cliente', 'Valor Financeiro', 'Valor Contabilidade', 'Diferença',
+        'Diferença Absoluta', 'Diferença %', 'Origem', 'Tipo Diferença'
+    ]
+    df_resultado = df_resultado.sort_values('Diferença Absoluta', ascending=False)
+
+    resumo = {
+        'total_registros': len(df_resultado),
+        'registros_ambos': len(df_resultado[df_resultado['Origem'] == 'Ambos']),
+        'registros_so_financeiro': len(df_resultado[df_resultado['Origem'] == 'Só Financeiro']),
+        'registros_so_contabilidade': len(df_resultado[df_resultado['Origem'] == 'Só Contabilidade']),
+        'registros_com_diferenca': len(df_resultado[df_resultado['Diferença Absoluta'] > 0.01]),
+        'registros_sem_diferenca': len(df_resultado[df_resultado['Diferença Absoluta'] <= 0.01]),
+        'diferenca_total': df_resultado['Diferença'].sum(),
+        'diferenca_absoluta_total': df_resultado['Diferença Absoluta'].sum(),
+        'maior_diferenca': df_resultado['Diferença Absoluta'].max(),
+        'valor_total_financeiro': df_resultado['Valor Financeiro'].sum(),
+        'valor_total_contabilidade': df_resultado['Valor Contabilidade'].sum()
+    }
+
+    return {'df_completo': df_resultado, 'resumo': resumo}
+
+
+def gerar_bases(linhas: int, semente: int = 42) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Gera bases normalizadas (codigo, cliente, valor) com ~80% de interseção."""
+    rng = np.random.default_rng(semente)
+
+    codigos = np.char.add("C", np.char.zfill(np.arange(linhas).astype(str), 8))
+    valores = np.round(rng.uniform(-5_000, 50_000, linhas), 2)
+
+    df_fin = pd.DataFrame({
+        'codigo': codigos,
+        'cliente': np.char.add("CLIENTE ", np.arange(linhas).astype(str)),
+        'valor': valores,
+    })
+
+    # Contabilidade: 10% dos códigos só no financeiro, 10% só na contabilidade,
+    # metade dos restantes com ajuste de valor
+    inicio = linhas // 10
+    df_cont = df_fin.iloc[inicio:].copy()
+    ajuste = np.where(rng.random(len(df_cont)) < 0.5, np.round(rng.normal(0, 100, len(df_cont)), 2), 0.0)
+    df_cont['valor'] = df_cont['valor'].to_numpy() + ajuste
+    extras = pd.DataFrame({
+        'codigo': np.char.add("X", np.char.zfill(np.arange(inicio).astype(str), 8)),
+        'cliente': "SO CONTABIL",
+        'valor': np.round(rng.uniform(1, 10_000, inicio), 2),
+    })
+    df_cont = pd.concat([df_cont, extras], ignore_index=True)
+
+    return df_fin, df_cont
+
+
+def _cronometrar(funcao, repeticoes: int):
+    melhor = float('inf')
+    resultado = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+def conferir_equivalencia(atual: dict, referencia: dict):
+    """Falha com AssertionError se os dois motores divergirem."""
+    df_a = atual['df_completo'].astype({'Origem': object, 'Tipo Diferença': object})
+    df_r = referencia['df_completo']
+
+    df_a = df_a.sort_values('Código').reset_index(drop=True)
+    df_r = df_r.sort_values('Código').reset_index(drop=True)
+    pd.testing.assert_frame_equal(df_a, df_r, check_dtype=False)
+
+    for chave, valor_ref in referencia['resumo'].items():
+        valor_atual = atual['resumo'][chave]
+        if isinstance(valor_ref, (int, np.integer)):
+            assert valor_atual == valor_ref, f"{chave}: {valor_atual} != {valor_ref}"
+        else:
+            assert np.isclose(valor_atual, valor_ref, rtol=1e-9, equal_nan=True), \
+                f"{chave}: {valor_atual} != {valor_ref}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, default=500_000)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    df_fin, df_cont = gerar_bases(args.linhas)
+    print(f"📊 Bases geradas: {len(df_fin)} financeiro, {len(df_cont)} contabilidade")
+
+    tempo_ref, resultado_ref = _cronometrar(
+        lambda: calcular_diferencas_referencia(df_fin, df_cont), args.repeticoes
+    )
+    tempo_atual, resultado_atual = _cronometrar(
+        lambda: calcular_diferencas(df_fin, df_cont, salvar_arquivo=False), args.repeticoes
+    )
+
+    conferir_equivalencia(resultado_atual, resultado_ref)
+
+    print(f"   ✓ Referência: {tempo_ref:.3f}s")
+    print(f"   ✓ Vetorizado: {tempo_atual:.3f}s")
+    print(f"   ✓ Speedup:    {tempo_ref / tempo_atual:.2f}x (resultados equivalentes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark da leitura projetada de .xlsx (tools.leitura).
+
+Compara o leitor atual (XML da aba percorrido em blocos, só as células das
+colunas escolhidas são interpretadas) com a alternativa direta sobre o
+openpyxl: load_workbook(read_only=True) + iter_rows(values_only=True) com
+projeção por índice de coluna e a mesma conversão de tipos. Confere que as
+duas produzem o mesmo DataFrame.
+
+A planilha simula a exportação do ERP: muitas colunas, das quais o
+normalizador usa poucas.
+
+Uso:
+    python -m benchmarks.bench_leitura --linhas 50000 --colunas 103
+"""
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+
+from tools.leitura import _converter_coluna, _validar_tipos, ler_planilha
+
+COLUNAS_ESCOLHIDAS = {"cliente": "texto", "valor": "numero", "vencimento": "data"}
+
+
+def gerar_planilha(caminho: Path, linhas: int, colunas: int, semente: int = 42):
+    """Exportação larga: cliente/valor/vencimento no meio de colunas que ninguém lê."""
+    rng = np.random.default_rng(semente)
+    extras = [f"campo_{i}" for i in range(colunas - len(COLUNAS_ESCOLHIDAS))]
+    meio = len(extras) // 2
+    cabecalho = extras[:meio] + list(COLUNAS_ESCOLHIDAS) + extras[meio:]
+
+    valores = np.round(rng.uniform(1, 50_000, linhas), 2).tolist()
+    vencimentos = (pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 365, linhas), unit="D"))
+    preenchimento = ["texto qualquer", 123.45, 7, None]
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Exportação")
+    ws.append(cabecalho)
+    for i in range(linhas):
+        escolhidas = [f"{i:06d}-01-CLIENTE {i}", valores[i], vencimentos[i].to_pydatetime()]
+        linha = [preenchimento[(i + j) % 4] for j in range(len(extras))]
+        ws.append(linha[:meio] + escolhidas + linha[meio:])
+    wb.save(caminho)
+
+
+def ler_openpyxl_projetado(caminho: Path, colunas) -> pd.DataFrame:
+    """Alternativa: iter_rows(values_only=True) do openpyxl com projeção por índice."""
+    wb = load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        linhas = wb.worksheets[0].iter_rows(values_only=True)
+        cabecalho = [
+            str(nome) if nome is not None else f"Unnamed: {idx}"
+            for idx, nome in enumerate(next(linhas))
+        ]
+        tipos = _validar_tipos(colunas(cabecalho))
+        indices = [cabecalho.index(nome) for nome in tipos]
+
+        buffer = []
+        vazias = 0
+        for linha in linhas:
+            if all(valor is None for valor in linha):
+                vazias += 1
+                continue
+            buffer.extend([(None,) * len(indices)] * vazias)
+            vazias = 0
+            buffer.append(tuple(linha[i] if i < len(linha) else None for i in indices))
+    finally:
+        wb.close()
+
+    valores = list(zip(*buffer)) if buffer else [()] * len(indices)
+    return pd.DataFrame({
+        nome: _converter_coluna(list(coluna), tipo, False)
+        for (nome, tipo), coluna in zip(tipos.items(), valores)
+    })
+
+
+def _medir(funcao, repeticoes: int):
+    """(melhor tempo, pico de memória Python em MB, resultado)."""
+    melhor = float("inf")
+    resultado = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return melhor, pico / 1024 ** 2, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, default=50_000)
+    parser.add_argument("--colunas", type=int, default=103)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    def seletor(cabecalho):
+        return COLUNAS_ESCOLHIDAS
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = Path(pasta) / "exportacao.xlsx"
+        gerar_planilha(caminho, args.linhas, args.colunas)
+        print(f"📊 Planilha gerada: {args.linhas} linhas x {args.colunas} colunas "
+              f"({caminho.stat().st_size / 1024 ** 2:.1f} MB)")
+
+        tempo_openpyxl, memoria_openpyxl, df_openpyxl = _medir(
+            lambda: ler_openpyxl_projetado(caminho, seletor), args.repeticoes
+        )
+        tempo_atual, memoria_atual, df_atual = _medir(
+            lambda: ler_planilha(caminho, colunas=seletor), args.repeticoes
+        )
+
+    pd.testing.assert_frame_equal(df_atual, df_openpyxl, check_dtype=False)
+
+    print(f"   ✓ openpyxl read_only: {tempo_openpyxl:.3f}s, pico {memoria_openpyxl:.1f} MB")
+    print(f"   ✓ XML projetado:      {tempo_atual:.3f}s, pico {memoria_atual:.1f} MB")
+    print(f"   ✓ Speedup:            {tempo_openpyxl / tempo_atual:.2f}x (resultados equivalentes)")
+
+
+if __name__ == "__main__":
+    main()
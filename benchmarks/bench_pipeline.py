@@ -0,0 +1,200 @@
+"""
+Benchmark por etapa do pipeline de conciliação.
+
+Para cada tamanho, gera um conjunto sintético (benchmarks.gerador) e mede
+tempo e pico de memória de:
+    normalizar_financeiro, normalizar_contabilidade, calcular_diferencas,
+    mapear_diferencas, serializar_json
+
+O resultado é gravado em JSON para comparar versões.
+
+Uso:
+    python -m benchmarks.bench_pipeline --tamanhos 10000 100000 1000000 --saida bench.json
+"""
+import argparse
+import json
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.gerador import ConfiguracaoGerador, gerar_conjunto
+from services.conciliacao_service import ConciliacaoService
+from tools.calc_diferencas import calcular_diferencas
+from tools.contabilidade import normalizar_planilha_contabilidade
+from tools.financeiro import normalizar_planilha_financeira
+from tools.mappers import montar_diferencas
+
+
+def _pico_rss_mb() -> float:
+    """Maior RSS do processo até agora (ru_maxrss é KB no Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _medir(etapa: str, funcao, medir_memoria: bool, linhas_entrada: int):
+    """Executa a etapa e devolve (resultado, métricas)."""
+    if medir_memoria:
+        tracemalloc.start()
+
+    inicio = time.perf_counter()
+    resultado = funcao()
+    segundos = time.perf_counter() - inicio
+
+    metricas = {
+        "etapa": etapa,
+        "segundos": round(segundos, 4),
+        "linhas_entrada": linhas_entrada,
+        "linhas_saida": len(resultado) if hasattr(resultado, "__len__") else None,
+        "pico_rss_mb": round(_pico_rss_mb(), 1),
+    }
+
+    if medir_memoria:
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        metricas["pico_alocado_mb"] = round(pico / 1024 ** 2, 1)
+
+    return resultado, metricas
+
+
+def executar_pipeline(df_financeiro: pd.DataFrame, df_balancete: pd.DataFrame,
+                      data_base: datetime, medir_memoria: bool) -> list:
+    """Roda as etapas em sequência, medindo cada uma."""
+    etapas = []
+
+    financeiro_norm, m = _medir(
+        "normalizar_financeiro",
+        lambda: normalizar_planilha_financeira(df_financeiro, data_base=data_base),
+        medir_memoria, len(df_financeiro)
+    )
+    etapas.append(m)
+
+    contabil_norm, m = _medir(
+        "normalizar_contabilidade",
+        lambda: normalizar_planilha_contabilidade(df_balancete),
+        medir_memoria, len(df_balancete)
+    )
+    etapas.append(m)
+
+    resultado, m = _medir(
+        "calcular_diferencas",
+        lambda: calcular_diferencas(financeiro_norm, contabil_norm, salvar_arquivo=False),
+        medir_memoria, len(financeiro_norm) + len(contabil_norm)
+    )
+    m["linhas_saida"] = len(resultado["df_completo"])
+    etapas.append(m)
+
+    df_completo = resultado["df_completo"]
+    tipo = df_completo["Tipo Diferença"]
+    mapeamento, m = _medir(
+        "mapear_diferencas",
+        lambda: montar_diferencas(
+            df_completo[tipo == "Financeiro > Contabilidade"],
+            df_completo[tipo == "Contabilidade > Financeiro"],
+            "1.01.02.001"
+        ),
+        medir_memoria, len(df_completo)
+    )
+    m["linhas_saida"] = (
+        len(mapeamento["diferencas_origem_maior"]) + len(mapeamento["diferencas_contabilidade_maior"])
+    )
+    etapas.append(m)
+
+    retorno = ConciliacaoService().montar_retorno(
+        resultado["resumo"],
+        mapeamento["diferencas_origem_maior"],
+        mapeamento["diferencas_contabilidade_maior"],
+        mapeamento["erros"]
+    )
+    corpo, m = _medir(
+        "serializar_json",
+        lambda: json.dumps(retorno, ensure_ascii=False).encode("utf-8"),
+        medir_memoria, m["linhas_saida"]
+    )
+    m["linhas_saida"] = None
+    m["bytes_saida"] = len(corpo)
+    etapas.append(m)
+
+    return etapas
+
+
+def _versao_codigo() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "describe", "--always", "--dirty"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconhecida"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[10_000, 100_000],
+                        help="quantidade de títulos do financeiro (10k a 10M)")
+    parser.add_argument("--titulos-por-cliente", type=float, default=10.0)
+    parser.add_argument("--divergencia", type=float, default=0.10)
+    parser.add_argument("--so-financeiro", type=float, default=0.05)
+    parser.add_argument("--so-contabil", type=float, default=0.05)
+    parser.add_argument("--duplicados", type=float, default=0.02)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--sem-memoria", action="store_true",
+                        help="não usar tracemalloc (tempos mais fiéis, sem pico alocado)")
+    parser.add_argument("--saida", default="bench_pipeline.json")
+    args = parser.parse_args()
+
+    relatorio = {
+        "versao_codigo": _versao_codigo(),
+        "executado_em": datetime.now(timezone.utc).isoformat(),
+        "ambiente": {
+            "python": sys.version.split()[0],
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "plataforma": platform.platform(),
+        },
+        "resultados": [],
+    }
+
+    for tamanho in args.tamanhos:
+        config = ConfiguracaoGerador(
+            titulos=tamanho,
+            clientes=max(1, int(tamanho / args.titulos_por_cliente)),
+            proporcao_divergencia=args.divergencia,
+            proporcao_so_financeiro=args.so_financeiro,
+            proporcao_so_contabil=args.so_contabil,
+            proporcao_duplicados=args.duplicados,
+            semente=args.semente,
+        )
+
+        print(f"📊 Gerando {tamanho} títulos / {config.clientes} clientes...")
+        df_financeiro, df_balancete = gerar_conjunto(config)
+
+        etapas = executar_pipeline(
+            df_financeiro, df_balancete,
+            datetime.fromisoformat(config.data_base),
+            medir_memoria=not args.sem_memoria
+        )
+
+        for etapa in etapas:
+            print(f"   ✓ {etapa['etapa']:<26} {etapa['segundos']:>9.3f}s")
+
+        relatorio["resultados"].append({
+            "configuracao": asdict(config),
+            "linhas_balancete": len(df_balancete),
+            "etapas": etapas,
+            "total_segundos": round(sum(e["segundos"] for e in etapas), 4),
+        })
+
+    with open(args.saida, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+
+    print(f"\n💾 Resultados gravados em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Gerador determinístico de planilhas sintéticas no layout do Protheus.
+
+- Financeiro (títulos a receber): "Codigo-Lj-Nome do Cliente" no formato
+  000672-01-NOME, "Tit Vencidos Valor corrigido" em formato BR
+  (1.234,56) e "Vencto Real".
+- Balancete: "Codigo" (C + código + loja), "Descricao" e "Saldo atual"
+  com sufixo D/C.
+
+Tudo é gerado com operações vetorizadas para chegar a 10M de linhas.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+NOMES = np.array([
+    "A A DANTAS RIBEIRO", "COMERCIAL SILVA", "DISTRIBUIDORA NORTE", "MERCADO BOA VISTA",
+    "SUPERMERCADO CENTRAL", "FARMACIA POPULAR", "AGRO PECUARIA SUL", "CONSTRUTORA ALFA",
+    "PADARIA SAO JOSE", "ATACADO NOVA ERA", "AUTO PECAS BRASIL", "LOJAS OLIVEIRA",
+])
+
+
+@dataclass
+class ConfiguracaoGerador:
+    """Parâmetros do conjunto gerado."""
+    titulos: int = 100_000
+    clientes: int = 10_000
+    proporcao_divergencia: float = 0.10      # clientes em ambos com saldo diferente
+    proporcao_so_financeiro: float = 0.05    # clientes ausentes do balancete
+    proporcao_so_contabil: float = 0.05      # contas do balancete sem títulos
+    proporcao_duplicados: float = 0.02       # linhas do balancete repetindo um código
+    data_base: str = "2025-12-31"
+    semente: int = 42
+
+
+def formatar_valor_br(centavos: np.ndarray) -> pd.Series:
+    """Formata centavos inteiros como texto BR (1.234,56 / -1.234,56)."""
+    absolutos = np.abs(centavos)
+    reais = pd.Series(absolutos // 100).astype(str).str.replace(r"\B(?=(\d{3})+$)", ".", regex=True)
+    fracao = pd.Series(absolutos % 100).astype(str).str.zfill(2)
+    sinal = pd.Series(np.where(centavos < 0, "-", ""))
+    return sinal + reais + "," + fracao
+
+
+def _chaves_clientes(config: ConfiguracaoGerador, rng: np.random.Generator) -> pd.DataFrame:
+    """Código/loja/nome de cada cliente, no formato usado pelo normalizador."""
+    codigos = np.arange(1, config.clientes + 1)
+    lojas = rng.integers(1, 4, config.clientes)
+    nomes = NOMES[rng.integers(0, len(NOMES), config.clientes)]
+
+    codigo_txt = pd.Series(codigos).astype(str).str.zfill(6)
+    loja_txt = pd.Series(lojas).astype(str).str.zfill(2)
+    nome_txt = pd.Series(nomes) + " " + pd.Series(codigos).astype(str)
+
+    return pd.DataFrame({
+        "chave": codigo_txt + "-" + loja_txt + "-" + nome_txt,
+        "codigo": "C" + codigo_txt + loja_txt,
+        "nome": nome_txt,
+    })
+
+
+def gerar_financeiro(config: ConfiguracaoGerador) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Gera a planilha financeira.
+
+    Retorna (df_financeiro, df_clientes), onde df_clientes traz codigo, nome
+    e o total em centavos de cada cliente (usado para montar o balancete).
+    """
+    rng = np.random.default_rng(config.semente)
+    clientes = _chaves_clientes(config, rng)
+
+    # Todo cliente recebe ao menos um título; o restante segue uma cauda
+    # longa (poucos clientes com muitos títulos)
+    base = np.arange(min(config.titulos, config.clientes))
+    pesos = rng.pareto(1.5, config.clientes) + 1
+    cauda = rng.choice(config.clientes, config.titulos - len(base), p=pesos / pesos.sum())
+    cliente_idx = rng.permutation(np.concatenate([base, cauda]))
+
+    centavos = rng.integers(1_000, 5_000_000, config.titulos)
+    estornos = rng.random(config.titulos) < 0.02
+    centavos[estornos] *= -1
+
+    data_base = np.datetime64(config.data_base)
+    vencimentos = data_base - rng.integers(-60, 900, config.titulos).astype("timedelta64[D]")
+
+    df_financeiro = pd.DataFrame({
+        "Codigo-Lj-Nome do Cliente": clientes["chave"].to_numpy()[cliente_idx],
+        "Tit Vencidos Valor corrigido": formatar_valor_br(centavos).to_numpy(),
+        "Vencto Real": vencimentos,
+    })
+
+    totais = np.bincount(cliente_idx, weights=centavos, minlength=config.clientes).astype(np.int64)
+    possui_titulos = np.bincount(cliente_idx, minlength=config.clientes) > 0
+
+    df_clientes = clientes.loc[possui_titulos, ["codigo", "nome"]].copy()
+    df_clientes["centavos"] = totais[possui_titulos]
+
+    return df_financeiro, df_clientes.reset_index(drop=True)
+
+
+def gerar_balancete(config: ConfiguracaoGerador, df_clientes: pd.DataFrame) -> pd.DataFrame:
+    """
+    Gera o balancete correspondente aos clientes do financeiro, aplicando as
+    proporções de divergência, exclusivos e códigos duplicados.
+    """
+    rng = np.random.default_rng(config.semente + 1)
+    n = len(df_clientes)
+
+    sorteio = rng.random(n)
+    so_financeiro = sorteio < config.proporcao_so_financeiro
+    divergente = (~so_financeiro) & (sorteio < config.proporcao_so_financeiro + config.proporcao_divergencia)
+
+    centavos = df_clientes["centavos"].to_numpy().copy()
+    centavos[divergente] += rng.integers(-50_000, 50_000, int(divergente.sum()))
+
+    presentes = ~so_financeiro
+    balancete = pd.DataFrame({
+        "Codigo": df_clientes["codigo"].to_numpy()[presentes],
+        "Descricao": df_clientes["nome"].to_numpy()[presentes],
+        "centavos": centavos[presentes],
+    })
+
+    # Contas só na contabilidade
+    extras = int(n * config.proporcao_so_contabil)
+    if extras:
+        codigos_extras = "X" + pd.Series(np.arange(extras)).astype(str).str.zfill(8)
+        balancete = pd.concat([balancete, pd.DataFrame({
+            "Codigo": codigos_extras,
+            "Descricao": "CONTA SEM TITULOS " + codigos_extras,
+            "centavos": rng.integers(100, 1_000_000, extras),
+        })], ignore_index=True)
+
+    # Códigos repetidos (mesmo cliente em mais de uma linha): saldo dividido
+    duplicados = int(len(balancete) * config.proporcao_duplicados)
+    if duplicados:
+        idx = rng.choice(len(balancete), duplicados, replace=False)
+        parte = balancete.loc[idx, "centavos"].to_numpy() // 2
+        balancete.loc[idx, "centavos"] -= parte
+        copia = balancete.loc[idx].copy()
+        copia["centavos"] = parte
+        balancete = pd.concat([balancete, copia], ignore_index=True)
+
+    balancete = balancete.sample(frac=1, random_state=config.semente).reset_index(drop=True)
+
+    centavos = balancete.pop("centavos").to_numpy()
+    indicador = np.where(centavos < 0, "C", "D")
+    balancete["Saldo atual"] = formatar_valor_br(np.abs(centavos)).to_numpy() + indicador
+
+    return balancete
+
+
+def gerar_conjunto(config: ConfiguracaoGerador) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Gera (df_financeiro, df_balancete) para a configuração."""
+    df_financeiro, df_clientes = gerar_financeiro(config)
+    return df_financeiro, gerar_balancete(config, df_clientes)
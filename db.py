@@ -1,4 +1,6 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy import MetaData
 from sqlalchemy.orm import sessionmaker
@@ -44,18 +46,90 @@ print("✅ DATABASE_URL carregada com sucesso!")
 # CONFIGURAÇÃO DO SQLAlchemy
 # ============================================================
 
+# Pools de conexões. Cada processo tem dois: o do engine síncrono (rotas
+# def, serviços) e o do assíncrono (rotas async def, hoje só o upload).
+# O máximo de conexões por processo é a soma dos dois:
+#   DB_POOL_SIZE + DB_MAX_OVERFLOW + DB_ASYNC_POOL_SIZE + DB_ASYNC_MAX_OVERFLOW
+# (multiplicado pelo número de workers do uvicorn). O assíncrono é pequeno
+# por padrão e só é criado no primeiro uso; ao portar mais rotas, mova
+# conexões de um pool para o outro.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))              # Pool de conexões
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))        # Conexões extras quando necessário
+DB_ASYNC_POOL_SIZE = int(os.getenv("DB_ASYNC_POOL_SIZE", "2"))          # Pool do engine assíncrono
+DB_ASYNC_MAX_OVERFLOW = int(os.getenv("DB_ASYNC_MAX_OVERFLOW", "3"))    # Extras do engine assíncrono
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))        # Espera por uma conexão livre (s)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))      # Renova conexões mais velhas que isso (s)
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() in ("1", "true", "sim")  # Mostra as queries SQL
+
 # Cria o engine do banco
 engine = create_engine(
     DATABASE_URL,
     pool_pre_ping=True,  # Verifica conexão antes de usar
-    pool_size=10,        # Pool de conexões
-    max_overflow=20,     # Conexões extras quando necessário
-    echo=False           # Mude para True para ver queries SQL
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    echo=DB_ECHO
 )
 
 # Cria a sessão
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def url_assincrona(url: str):
+    """
+    Mesma DATABASE_URL com o driver asyncpg. O asyncpg não conhece o
+    parâmetro sslmode da URL: ele vira o argumento ssl da conexão.
+    SQLite (desenvolvimento) usa o aiosqlite.
+    """
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite"), {}
+    if url.get_backend_name() != "postgresql":
+        return url, {}
+
+    query = dict(url.query)
+    sslmode = query.pop("sslmode", None)
+    url = url.set(drivername="postgresql+asyncpg", query=query)
+    return url, ({"ssl": sslmode} if sslmode else {})
+
+
+# Engine/sessão assíncronos (asyncpg) para as rotas async def. Criados no
+# primeiro uso: processos que não atendem rotas async (CLI do fechamento,
+# workers do pool) não abrem o segundo pool nem precisam do driver async.
+_async_engine = None
+_AsyncSessionLocal = None
+
+
+def obter_async_engine():
+    """Engine assíncrono, criado na primeira chamada."""
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is None:
+        url, connect_args = url_assincrona(DATABASE_URL)
+        _async_engine = create_async_engine(
+            url,
+            connect_args=connect_args,
+            pool_pre_ping=True,
+            pool_size=DB_ASYNC_POOL_SIZE,
+            max_overflow=DB_ASYNC_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            echo=DB_ECHO
+        )
+        # expire_on_commit=False: o objeto continua legível após o commit sem nova ida ao banco
+        _AsyncSessionLocal = async_sessionmaker(
+            _async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+        )
+    return _async_engine
+
+
+async def encerrar_async_engine():
+    """Fecha o pool assíncrono, se ele chegou a ser criado."""
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = _AsyncSessionLocal = None
+
 # Base para os modelos
 Base = declarative_base()
 
@@ -74,6 +148,16 @@ def get_db():
     finally:
         db.close()
 
+
+async def get_async_db():
+    """
+    Versão assíncrona de get_db (AsyncSession sobre asyncpg), para rotas
+    async def: as idas ao banco não bloqueiam o event loop.
+    """
+    obter_async_engine()
+    async with _AsyncSessionLocal() as db:
+        yield db
+
 # ============================================================
 # FUNÇÃO AUXILIAR PARA TESTAR CONEXÃO
 # ============================================================
@@ -1,6 +1,14 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from routers.empresa_router import router as empresa_router
+from routers.planodecontas_router import router as planodecontas_router
+from routers.arquivo_router import router as arquivo_router
+from routers.conciliacao_router import router as conciliacao_router
+from routers.metricas_router import router as metricas_router
+from routers.admin_router import router as admin_router
+from services.conciliacao_jobs import encerrar_executor
+from services.fechamento_mensal import pool_fechamento
+from db import encerrar_async_engine
 
 app = FastAPI(
     title="Conciliação API",
@@ -24,6 +32,27 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lidos pelo frontend nas listagens paginadas por cursor e nos tempos
+    # por etapa da conciliação
+    expose_headers=["X-Proximo-Cursor", "X-Total-Estimado", "ETag", "Server-Timing"],
 )
 
 app.include_router(empresa_router, prefix="/api")
+app.include_router(planodecontas_router, prefix="/api")
+app.include_router(arquivo_router, prefix="/api")
+app.include_router(conciliacao_router, prefix="/api")
+app.include_router(admin_router, prefix="/api")
+
+# Fora de /api: caminho padrão esperado pelo scraper do Prometheus
+app.include_router(metricas_router)
+
+
+@app.on_event("shutdown")
+def encerrar_pool_conciliacao():
+    encerrar_executor()
+    pool_fechamento.encerrar()
+
+
+@app.on_event("shutdown")
+async def encerrar_banco_assincrono():
+    await encerrar_async_engine()
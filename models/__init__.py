@@ -6,7 +6,7 @@ ORDEM IMPORTANTE:
 1. Base (do db.py)
 2. Modelos independentes (Empresa)
 3. Modelos que dependem dos anteriores (PlanoDeContas, Conciliacao)
-4. Modelos que dependem de múltiplos anteriores (ArquivoConciliacao)
+4. Modelos que dependem de múltiplos anteriores (ArquivoConciliacao, DiferencaConciliacao)
 """
 
 # Importa Base do db.py
@@ -23,6 +23,7 @@ from .conciliacao import Conciliacao
 
 # 4. Modelos que dependem dos anteriores
 from .arquivoconciliacao import ArquivoConciliacao
+from .diferencaconciliacao import DiferencaConciliacao
 
 # Lista todos os modelos exportados
 __all__ = [
@@ -31,4 +32,5 @@ __all__ = [
     "PlanoDeContas",
     "Conciliacao",
     "ArquivoConciliacao",
+    "DiferencaConciliacao",
 ]
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, text
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from db import Base
@@ -16,6 +16,14 @@ class ArquivoConciliacao(Base):
     caminho_arquivo = Column(String(300), nullable=False)
     data_conciliacao = Column(DateTime, nullable=False)
 
+    # Calculados no upload
+    hash_sha256 = Column(String(64), nullable=True, index=True)
+    tamanho_bytes = Column(BigInteger, nullable=True)
+
+    # Cópia colunar (.arrow) gerada em segundo plano após o upload
+    caminho_colunar = Column(String(300), nullable=True)
+    status_colunar = Column(String(20), nullable=False, default="pendente", server_default=text("'pendente'"))
+
     # Timestamps - padrão snake_case
     created_at = Column(DateTime(timezone=True), server_default=text("NOW()"), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
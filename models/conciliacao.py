@@ -17,6 +17,9 @@ class Conciliacao(Base):
     periodo = Column(String(20), nullable=False, index=True)  # Ex: "2025-01" ou "01/2025"
     saldo = Column(DECIMAL(18, 2), nullable=False, default=0)
 
+    # Fechamento mensal: pendente → concluido | erro (permite retomar após falha)
+    status = Column(String(20), nullable=False, default="pendente", server_default=text("'pendente'"), index=True)
+
     # Timestamps - padrão snake_case
     created_at = Column(DateTime(timezone=True), server_default=text("NOW()"), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
@@ -45,5 +48,14 @@ class Conciliacao(Base):
         cascade="all, delete-orphan"
     )
 
+    # 1 conciliação → N diferenças (gravadas em lote, ver services.diferencas_conciliacao)
+    diferencas = relationship(
+        "DiferencaConciliacao",
+        back_populates="conciliacao",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        lazy="dynamic"
+    )
+
     def __repr__(self):
         return f"<Conciliacao(id={self.id}, empresa_id={self.empresa_id}, periodo='{self.periodo}')>"
\ No newline at end of file
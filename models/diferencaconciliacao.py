@@ -0,0 +1,63 @@
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, DECIMAL, Index
+from sqlalchemy.orm import relationship
+from db import Base
+
+
+class DiferencaConciliacao(Base):
+    """Diferença por cliente de uma conciliação (saída de calcular_diferencas)"""
+    __tablename__ = "diferencas_conciliacao"
+    __table_args__ = (
+        # Filtro por tipo e paginação por diferença absoluta (id desempata o cursor);
+        # a listagem (abs desc, id desc) percorre os índices de trás para frente
+        Index(
+            "ix_diferencas_conciliacao_tipo_abs",
+            "conciliacao_id",
+            "tipo_diferenca",
+            "diferenca_abs",
+            "id"
+        ),
+        Index(
+            "ix_diferencas_conciliacao_abs",
+            "conciliacao_id",
+            "diferenca_abs",
+            "id"
+        ),
+        Index(
+            "ix_diferencas_conciliacao_codigo",
+            "conciliacao_id",
+            "codigo"
+        ),
+        {"schema": "concilia"}
+    )
+
+    # Colunas
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    conciliacao_id = Column(
+        Integer,
+        ForeignKey("concilia.conciliacoes.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    codigo = Column(String(50), nullable=True)
+    cliente = Column(String(255), nullable=True)
+    valor_financeiro = Column(DECIMAL(18, 2), nullable=False, default=0)
+    valor_contabilidade = Column(DECIMAL(18, 2), nullable=False, default=0)
+    diferenca = Column(DECIMAL(18, 2), nullable=False, default=0)
+    diferenca_abs = Column(DECIMAL(18, 2), nullable=False, default=0)
+    origem = Column(String(20), nullable=False)            # Ambos | Só Financeiro | Só Contabilidade
+    tipo_diferenca = Column(String(30), nullable=False)    # ver tools.calc_diferencas.TIPOS_DIFERENCA
+
+    # ============================================================
+    # RELACIONAMENTOS
+    # ============================================================
+
+    # N diferenças → 1 conciliação
+    conciliacao = relationship(
+        "Conciliacao",
+        back_populates="diferencas"
+    )
+
+    def __repr__(self):
+        return (
+            f"<DiferencaConciliacao(id={self.id}, conciliacao_id={self.conciliacao_id}, "
+            f"codigo='{self.codigo}', diferenca={self.diferenca})>"
+        )
@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from db import get_db
+from services.fechamento_mensal import iniciar_fechamento, situacao_fechamento
+
+router = APIRouter(prefix="/admin", tags=["Administração"])
+
+
+@router.post("/fechamento/{periodo:path}", status_code=status.HTTP_202_ACCEPTED)
+def disparar_fechamento(periodo: str, reprocessar: bool = False, db: Session = Depends(get_db)):
+    """
+    Dispara o fechamento mensal do período (todas as contas conciliáveis das
+    empresas ativas) em segundo plano; acompanhar por GET /admin/fechamento/{periodo}.
+
+    Contas já concluídas no período são puladas, salvo com reprocessar=true
+    """
+    try:
+        iniciado = iniciar_fechamento(periodo, reprocessar)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if not iniciado:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Fechamento do período {periodo} já está em andamento"
+        )
+    return situacao_fechamento(db, periodo)
+
+
+@router.get("/fechamento/{periodo:path}")
+def consultar_fechamento(periodo: str, db: Session = Depends(get_db)):
+    """
+    Contas por status no período e resumo do último fechamento disparado
+    (inclui a vazão em contas por minuto)
+    """
+    return situacao_fechamento(db, periodo)
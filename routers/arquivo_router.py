@@ -1,14 +1,24 @@
 # routers/arquivo_router.py
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from datetime import datetime
 from typing import List, Optional
-from db import get_db
+from db import get_async_db, get_db
 from models.arquivoconciliacao import ArquivoConciliacao  # ← Modelo SQLAlchemy
+from models.conciliacao import Conciliacao
 from schemas.arquivo_conciliacao_schema import (  # ← Schemas Pydantic
     ArquivoConciliacaoCreate,
     ArquivoConciliacaoUpdate,
     ArquivoConciliacaoResponse
 )
+from services.arquivo_colunar import gerar_copia_colunar, remover_copia_colunar
+from services.arquivo_upload import salvar_upload
+from services.paginacao import (
+    aplicar_cabecalhos, paginar, estimar_total as estimar_total_linhas, LIMITE_PADRAO, LIMITE_MAXIMO
+)
+from tools.colunar import ler_previa
+import asyncio
 import os
 from pathlib import Path
 
@@ -21,23 +31,38 @@ UPLOAD_DIR.mkdir(exist_ok=True)
 
 @router.get("/", response_model=List[ArquivoConciliacaoResponse])
 def listar_arquivos(
+    response: Response,
     empresa_id: Optional[int] = None,
-    tipo_arquivo: Optional[str] = None,
-    skip: int = 0,
-    limit: int = 100,
+    conciliacao_id: Optional[int] = None,
+    skip: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    cursor: Optional[str] = None,
+    estimar_total: bool = False,
     db: Session = Depends(get_db)
 ):
-    """Lista todos os arquivos com filtros opcionais"""
+    """
+    Lista os arquivos por id com filtros opcionais, paginados por cursor
+    (cabeçalhos X-Proximo-Cursor e, com estimar_total=true, X-Total-Estimado).
+    skip (OFFSET) fica por compatibilidade
+    """
     
     query = db.query(ArquivoConciliacao)
     
+    # A empresa do arquivo é a da conciliação a que ele pertence
     if empresa_id:
-        query = query.filter(ArquivoConciliacao.empresa_id == empresa_id)
+        query = query.join(Conciliacao, ArquivoConciliacao.conciliacao_id == Conciliacao.id).filter(
+            Conciliacao.empresa_id == empresa_id
+        )
     
-    if tipo_arquivo:
-        query = query.filter(ArquivoConciliacao.tipo_arquivo == tipo_arquivo)
+    if conciliacao_id:
+        query = query.filter(ArquivoConciliacao.conciliacao_id == conciliacao_id)
     
-    return query.offset(skip).limit(limit).all()
+    try:
+        pagina = paginar(query, (ArquivoConciliacao.id,), cursor, limit, skip)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return aplicar_cabecalhos(response, pagina, estimar_total_linhas(query) if estimar_total else None)
 
 
 @router.get("/{id}", response_model=ArquivoConciliacaoResponse)
@@ -71,37 +96,74 @@ def criar_arquivo(
 
 @router.post("/upload", response_model=ArquivoConciliacaoResponse, status_code=201)
 async def upload_arquivo(
-    empresa_id: int,
-    tipo_arquivo: str,
+    conciliacao_id: int,
+    data_conciliacao: datetime,
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Faz upload de um arquivo e cria registro no banco"""
+    """
+    Faz upload de um arquivo e cria registro no banco (sessão assíncrona:
+    o commit não bloqueia o event loop).
+
+    O arquivo é copiado em blocos fora do event loop, com SHA-256 e tamanho
+    calculados no caminho (413 acima de CONCILIACAO_UPLOAD_MAX_BYTES).
+
+    Depois da resposta, o arquivo é convertido uma vez para a cópia colunar
+    (status_colunar: pendente → processando → concluido), usada pelas
+    leituras seguintes no lugar do Excel.
+    """
     
-    # Gera caminho para o arquivo
-    file_path = UPLOAD_DIR / f"{empresa_id}_{tipo_arquivo}_{file.filename}"
+    # Gera caminho para o arquivo (só o nome, sem diretórios vindos do cliente)
+    file_path = UPLOAD_DIR / f"{conciliacao_id}_{Path(file.filename).name}"
     
     # Salva o arquivo
-    with open(file_path, "wb") as f:
-        content = await file.read()
-        f.write(content)
+    try:
+        hash_sha256, tamanho_bytes = await asyncio.get_running_loop().run_in_executor(
+            None, salvar_upload, file.file, file_path
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    finally:
+        await file.close()
     
     # Cria registro no banco
     db_arquivo = ArquivoConciliacao(
-        empresa_id=empresa_id,
-        tipo_arquivo=tipo_arquivo,
-        nome_arquivo=file.filename,
+        conciliacao_id=conciliacao_id,
         caminho_arquivo=str(file_path),
-        status="pendente"
+        data_conciliacao=data_conciliacao,
+        hash_sha256=hash_sha256,
+        tamanho_bytes=tamanho_bytes
     )
     
     db.add(db_arquivo)
-    db.commit()
-    db.refresh(db_arquivo)
+    await db.commit()
+    await db.refresh(db_arquivo)
+
+    background_tasks.add_task(gerar_copia_colunar, db_arquivo.id)
     
     return db_arquivo
 
 
+@router.get("/{id}/previa")
+def previa_arquivo(
+    id: int,
+    linhas: int = Query(20, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """Primeiras linhas do arquivo (da cópia colunar, quando já gerada)"""
+    
+    arquivo = db.query(ArquivoConciliacao).filter(ArquivoConciliacao.id == id).first()
+    
+    if not arquivo:
+        raise HTTPException(status_code=404, detail="Arquivo não encontrado")
+    
+    if not os.path.exists(arquivo.caminho_arquivo):
+        raise HTTPException(status_code=404, detail="Arquivo físico não encontrado")
+    
+    return ler_previa(arquivo.caminho_arquivo, linhas)
+
+
 @router.put("/{id}", response_model=ArquivoConciliacaoResponse)
 def atualizar_arquivo(
     id: int,
@@ -137,6 +199,7 @@ def deletar_arquivo(id: int, db: Session = Depends(get_db)):
     # Remove arquivo físico se existir
     if os.path.exists(db_arquivo.caminho_arquivo):
         os.remove(db_arquivo.caminho_arquivo)
+    remover_copia_colunar(db_arquivo.caminho_arquivo)
     
     db.delete(db_arquivo)
     db.commit()
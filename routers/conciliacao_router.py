@@ -1,18 +1,44 @@
-from fastapi import APIRouter, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import FileResponse, JSONResponse
+from sqlalchemy.orm import Session
+from typing import Optional
+from functools import partial
+import asyncio
 import logging
 
-from schemas.conciliacao_schema import RequestConciliacao
+from db import get_db
+
+from schemas.conciliacao_schema import (
+    RequestConciliacao,
+    RequestConciliacaoIncremental,
+    RequestConciliacaoLote,
+    RequestDeltaConciliacao
+)
+from schemas.diferenca_conciliacao_schema import PaginaDiferencas
 from services.conciliacao_service import ConciliacaoService
+from services.conciliacao_jobs import (
+    job_store, submeter_no_pool, executar_conciliacao, rotulos_metricas, FilaDeJobsCheia, CONCLUIDO, ERRO
+)
+from services.metricas import formatar_server_timing, metricas_conciliacao
+from services.relatorio_conciliacao import gerar_relatorio_conciliacao, ETAPAS_RELATORIO
+from services.cache_conciliacao import cache_conciliacao, chave_conciliacao, guardar_no_cache
+from services.conciliacao_lote import executar_lote, validar_lote
+from services.diferencas_conciliacao import listar_diferencas, resumir_diferencas
+from services.paginacao import LIMITE_PADRAO, LIMITE_MAXIMO
+from services.conciliacao_incremental import (
+    iniciar_conciliacao_incremental, aplicar_delta_conciliacao
+)
 
 router = APIRouter(prefix="/conciliacoes", tags=["Conciliações"])
 logger = logging.getLogger(__name__)
 
 
 @router.post("/contabil")
-async def processar_conciliacao(request: RequestConciliacao):
+async def processar_conciliacao(request: RequestConciliacao, response: Response):
     """
     Processa uma conciliação contábil comparando origem vs contabilidade
+
+    O cabeçalho Server-Timing traz a duração de cada etapa
     """
     try:
         logger.info("📥 Recebendo requisição de conciliação")
@@ -31,8 +57,28 @@ async def processar_conciliacao(request: RequestConciliacao):
                 detail=mensagem
             )
         
-        # Executar
-        resultado = service.executar(request)
+        loop = asyncio.get_running_loop()
+
+        # Mesma entrada → mesmo resultado: consultar o cache antes de processar
+        # (em thread: o backend em disco lê e decodifica um JSON)
+        chave = None
+        if cache_conciliacao is not None:
+            chave = await loop.run_in_executor(None, chave_conciliacao, request)
+            em_cache = await loop.run_in_executor(None, cache_conciliacao.obter, chave)
+            if em_cache is not None:
+                logger.info(f"♻️ Conciliação atendida pelo cache ({chave[:12]})")
+                _server_timing(response, formatar_server_timing([], ['cache;desc="hit"']))
+                return em_cache
+
+        # Executar no pool de processos para não travar o event loop
+        resultado, etapas = await asyncio.wrap_future(submeter_no_pool(executar_conciliacao, request))
+
+        metricas_conciliacao.registrar(etapas, *rotulos_metricas(request))
+        _server_timing(response, formatar_server_timing(etapas))
+
+        if chave is not None:
+            # Falha ao gravar no cache vira aviso: a conciliação já está pronta
+            await loop.run_in_executor(None, guardar_no_cache, chave, resultado)
         
         logger.info("✅ Conciliação processada com sucesso")
         logger.info(f"📊 Resultado: {resultado.get('resumo', {})}")
@@ -48,4 +94,253 @@ async def processar_conciliacao(request: RequestConciliacao):
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erro ao processar conciliação: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+@router.post("/contabil/lote")
+async def processar_conciliacao_lote(request: RequestConciliacaoLote):
+    """
+    Concilia várias contas contábeis contra as mesmas bases de origem e geral,
+    que são lidas e normalizadas uma única vez; as contas rodam em paralelo
+    no pool de processos
+    """
+    logger.info(f"📥 Recebendo lote de conciliação: {len(request.contas)} contas")
+
+    valido, mensagem = validar_lote(request)
+    if not valido:
+        logger.error(f"❌ Validação falhou: {mensagem}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=mensagem
+        )
+
+    try:
+        # A preparação das bases roda em thread; cada conta vai para o pool de processos
+        return await asyncio.get_running_loop().run_in_executor(None, executar_lote, request)
+    except Exception as e:
+        logger.error(f"❌ Erro ao processar lote de conciliação: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro ao processar lote de conciliação: {str(e)}"
+        )
+
+
+def _server_timing(response: Response, valor: str):
+    # Sem Timing-Allow-Origin o navegador esconde o Server-Timing do frontend,
+    # que é servido de outra origem (o CORS do main.py libera todas)
+    response.headers["Server-Timing"] = valor
+    response.headers["Timing-Allow-Origin"] = "*"
+
+
+def _fila_cheia(erro: FilaDeJobsCheia) -> HTTPException:
+    logger.warning(f"⚠️ Job recusado: {erro}")
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(erro),
+        headers={"Retry-After": "30"}
+    )
+
+
+@router.post("/contabil/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def criar_job_conciliacao(request: RequestConciliacao):
+    """
+    Agenda uma conciliação contábil e devolve o id do job imediatamente
+    """
+    valido, mensagem = ConciliacaoService().validar_dados(request)
+    if not valido:
+        logger.error(f"❌ Validação falhou: {mensagem}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=mensagem
+        )
+
+    loop = asyncio.get_running_loop()
+    chave = None
+    if cache_conciliacao is not None:
+        chave = await loop.run_in_executor(None, chave_conciliacao, request)
+
+    # submeter consulta o cache (disco) e, no primeiro job, sobe o Manager: em thread
+    try:
+        job_id = await loop.run_in_executor(None, partial(job_store.submeter, request, chave_cache=chave))
+    except FilaDeJobsCheia as e:
+        raise _fila_cheia(e)
+    return {"job_id": job_id, "status": job_store.obter(job_id)["status"]}
+
+
+@router.get("/contabil/jobs/{job_id}")
+def status_job_conciliacao(job_id: str):
+    """
+    Status e progresso por etapa de um job de conciliação
+    """
+    job = job_store.obter(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job não encontrado ou expirado")
+    return job
+
+
+@router.get("/contabil/jobs/{job_id}/resultado")
+def resultado_job_conciliacao(job_id: str, response: Response):
+    """
+    Resultado final de um job de conciliação (mesmo formato de POST /contabil)
+    """
+    job = job_store.obter_resultado(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job não encontrado ou expirado")
+
+    if job["status"] == ERRO:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro ao processar conciliação: {job['erro']}"
+        )
+
+    if job["status"] != CONCLUIDO:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Conciliação ainda em processamento"
+        )
+
+    if job["metricas"]:
+        _server_timing(response, formatar_server_timing(job["metricas"]))
+    return job["resultado"]
+
+
+@router.post("/contabil/relatorios", status_code=status.HTTP_202_ACCEPTED)
+def criar_relatorio_conciliacao(request: RequestConciliacao):
+    """
+    Agenda a geração do relatório de diferenças em Excel (.xlsx) e devolve o
+    id do job; acompanhar por GET /contabil/jobs/{job_id}
+    """
+    valido, mensagem = ConciliacaoService().validar_dados(request)
+    if not valido:
+        logger.error(f"❌ Validação falhou: {mensagem}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=mensagem
+        )
+
+    try:
+        job_id = job_store.submeter(request, tarefa=gerar_relatorio_conciliacao, etapas=ETAPAS_RELATORIO)
+    except FilaDeJobsCheia as e:
+        raise _fila_cheia(e)
+    return {"job_id": job_id, "status": job_store.obter(job_id)["status"]}
+
+
+@router.get("/contabil/relatorios/{job_id}/download")
+def baixar_relatorio_conciliacao(job_id: str):
+    """
+    Download do relatório de diferenças gerado pelo job
+    """
+    job = job_store.obter_resultado(job_id)
+    if not job or job["etapas_previstas"] != ETAPAS_RELATORIO:
+        raise HTTPException(status_code=404, detail="Relatório não encontrado ou expirado")
+
+    if job["status"] == ERRO:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro ao gerar relatório: {job['erro']}"
+        )
+
+    if job["status"] != CONCLUIDO:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Relatório ainda em processamento"
+        )
+
+    return FileResponse(
+        job["resultado"]["caminho_arquivo"],
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        filename=f"diferencas_{job_id}.xlsx"
+    )
+
+
+@router.post("/contabil/incremental")
+async def iniciar_incremental(request: RequestConciliacaoIncremental):
+    """
+    Processa a conciliação completa e guarda o estado (empresa, conta, período)
+    para receber correções via PATCH
+    """
+    valido, mensagem = ConciliacaoService().validar_dados(request.conciliacao)
+    if not valido:
+        logger.error(f"❌ Validação falhou: {mensagem}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=mensagem
+        )
+
+    try:
+        # O estado fica neste processo, então roda em thread (não no pool de processos)
+        return await asyncio.get_running_loop().run_in_executor(
+            None, iniciar_conciliacao_incremental,
+            request.empresa_id, request.periodo, request.conciliacao
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.patch("/contabil/incremental")
+async def aplicar_delta_incremental(delta: RequestDeltaConciliacao):
+    """
+    Aplica registros adicionados/alterados/removidos a uma conciliação
+    incremental e recalcula apenas os códigos afetados
+    """
+    try:
+        resultado = await asyncio.get_running_loop().run_in_executor(
+            None, aplicar_delta_conciliacao, delta
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if resultado is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Conciliação incremental não encontrada ou expirada para esta empresa/conta/período"
+        )
+    return resultado
+
+
+@router.get("/{conciliacao_id}/diferencas", response_model=PaginaDiferencas)
+def listar_diferencas_conciliacao(
+    conciliacao_id: int,
+    tipo_diferenca: Optional[str] = None,
+    origem: Optional[str] = None,
+    codigo: Optional[str] = None,
+    diferenca_minima: Optional[float] = None,
+    cursor: Optional[str] = None,
+    limite: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    db: Session = Depends(get_db)
+):
+    """
+    Diferenças por cliente gravadas da conciliação, da maior para a menor
+    diferença absoluta, sem reprocessar. Para a próxima página, repetir a
+    consulta com cursor=proximo_cursor
+    """
+    try:
+        return listar_diferencas(
+            db, conciliacao_id,
+            tipo_diferenca=tipo_diferenca,
+            origem=origem,
+            codigo=codigo,
+            diferenca_minima=diferenca_minima,
+            cursor=cursor,
+            limite=limite
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get("/{conciliacao_id}/diferencas/resumo")
+def resumo_diferencas_conciliacao(conciliacao_id: int, db: Session = Depends(get_db)):
+    """
+    Quantidade e soma das diferenças gravadas da conciliação, por tipo
+    """
+    return resumir_diferencas(db, conciliacao_id)
+
+
+@router.get("/cache")
+def estatisticas_cache():
+    """
+    Estatísticas do cache de resultados (hits, misses, itens)
+    """
+    if cache_conciliacao is None:
+        return {"backend": "desligado"}
+    return cache_conciliacao.estatisticas()
@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
+from typing import Optional
 from db import get_db
 from schemas.empresa_schema import EmpresaCreate, EmpresaOut, EmpresaUpdate
 from services.empresa_services import (
     criar_empresa, listar_empresas, obter_empresa,
     atualizar_empresa, deletar_empresa
 )
+from services.paginacao import aplicar_cabecalhos, LIMITE_PADRAO, LIMITE_MAXIMO
 
 router = APIRouter(prefix="/empresas", tags=["Empresa"])
 
@@ -17,8 +19,23 @@ def criar(emp: EmpresaCreate, db: Session = Depends(get_db)):
 
 
 @router.get("/", response_model=list[EmpresaOut])
-def listar(db: Session = Depends(get_db)):
-    return listar_empresas(db)
+def listar(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    estimar_total: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Empresas em ordem de id, paginadas por cursor: a próxima página vem no
+    cabeçalho X-Proximo-Cursor (ausente na última) e, com estimar_total=true,
+    o total aproximado em X-Total-Estimado
+    """
+    try:
+        pagina = listar_empresas(db, cursor, limit, estimar_total)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return aplicar_cabecalhos(response, pagina, pagina["total_estimado"])
 
 
 @router.get("/{empresa_id}", response_model=EmpresaOut)
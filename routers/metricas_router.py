@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from services.metricas import metricas_conciliacao
+
+router = APIRouter(tags=["Métricas"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metricas():
+    """
+    Histogramas das etapas da conciliação no formato texto do Prometheus
+    """
+    return PlainTextResponse(
+        metricas_conciliacao.exportar(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -1,28 +1,95 @@
 # routers/planodecontas_router.py
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Header, Query, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from db import get_db
-import pandas as pd
-import io
 
 from services.planodecontas_services import (
-    listar_planos_de_contas,
+    obter_pagina_plano,
+    etag_confere,
     buscar_conta,
     criar_conta,
     atualizar_conta,
     deletar_conta,
-    preparar_dados_importacao,
-    importar_plano_contas
+    colunas_arquivo_importacao,
+    importar_plano_contas_em_massa
+)
+from services.hierarquia_plano import obter_indice
+from services.paginacao import CABECALHO_CURSOR, CABECALHO_TOTAL, LIMITE_MAXIMO
+from tools.consolidacao import consolidar_saldos
+from tools.leitura import ler_planilha
+from schemas.planodecontas_schema import (
+    PlanoDeContasResponse,
+    PlanoDeContasCreate,
+    PlanoDeContasUpdate,
+    ContaHierarquiaResponse
 )
-from schemas.planodecontas_schema import PlanoDeContasResponse, PlanoDeContasCreate, PlanoDeContasUpdate
 
 router = APIRouter(prefix="/plano-contas", tags=["Plano de Contas"])
 
 
 @router.get("/", response_model=List[PlanoDeContasResponse])
-def route_listar_planos(empresa_id: int, skip: int = 0, limit: int = 1000, db: Session = Depends(get_db)):
-    return listar_planos_de_contas(db, empresa_id, skip, limit)
+def route_listar_planos(
+    empresa_id: int,
+    skip: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(1000, ge=1, le=LIMITE_MAXIMO),
+    cursor: Optional[str] = None,
+    estimar_total: bool = False,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Contas da empresa por conta_contabil, paginadas por cursor: a próxima
+    página vem no cabeçalho X-Proximo-Cursor e, com estimar_total=true, o
+    total aproximado em X-Total-Estimado. skip (OFFSET) fica por compatibilidade.
+    A página sai do cache com ETag; If-None-Match com o mesmo ETag recebe 304
+    """
+    try:
+        pagina = obter_pagina_plano(db, empresa_id, skip, limit, cursor, estimar_total)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    cabecalhos = {"ETag": pagina["etag"], "Cache-Control": "private, no-cache"}
+    if pagina["proximo_cursor"]:
+        cabecalhos[CABECALHO_CURSOR] = pagina["proximo_cursor"]
+    if pagina["total_estimado"] is not None:
+        cabecalhos[CABECALHO_TOTAL] = str(pagina["total_estimado"])
+
+    if etag_confere(if_none_match, pagina["etag"]):
+        return Response(status_code=304, headers=cabecalhos)
+    # Corpo já serializado no cache: sem passar pelo response_model de novo
+    return Response(content=pagina["conteudo"], media_type="application/json", headers=cabecalhos)
+
+
+# ============================================================
+# HIERARQUIA (índice em memória por empresa)
+# ============================================================
+
+@router.get("/hierarquia/subarvore", response_model=List[ContaHierarquiaResponse])
+def route_subarvore(empresa_id: int, conta: str, db: Session = Depends(get_db)):
+    """A conta e todos os seus descendentes, em pré-ordem"""
+    try:
+        return obter_indice(db, empresa_id).subarvore(conta)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+
+@router.get("/hierarquia/ancestrais", response_model=List[ContaHierarquiaResponse])
+def route_ancestrais(empresa_id: int, conta: str, db: Session = Depends(get_db)):
+    """Caminho da raiz até a conta superior da conta"""
+    try:
+        return obter_indice(db, empresa_id).ancestrais(conta)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+
+@router.get("/hierarquia/conciliaveis", response_model=List[ContaHierarquiaResponse])
+def route_conciliaveis(empresa_id: int, conta: Optional[str] = None, db: Session = Depends(get_db)):
+    """Contas conciliáveis abaixo da conta (sem conta: do plano inteiro)"""
+    try:
+        return obter_indice(db, empresa_id).descendentes_conciliaveis(conta)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
 
 
 @router.get("/{id}", response_model=PlanoDeContasResponse)
@@ -57,10 +124,34 @@ def route_deletar_conta(id: int, db: Session = Depends(get_db)):
 @router.post("/importar", response_model=dict)
 def route_importar_plano(file: UploadFile = File(...), empresa_id: int = 1, db: Session = Depends(get_db)):
     try:
-        contents = file.file.read()
-        df = pd.read_excel(io.BytesIO(contents))
-        df_sinteticas, df_analiticas = preparar_dados_importacao(df)
-        resultado = importar_plano_contas(df_sinteticas, df_analiticas, empresa_id, db)
-        return resultado
+        # Lê direto do arquivo recebido, só com as colunas do plano de contas
+        df = ler_planilha(file.file, colunas=colunas_arquivo_importacao)
+        # Linhas inválidas voltam em resultado["erros"]; só a estrutura do arquivo gera 400
+        return importar_plano_contas_em_massa(df, empresa_id, db)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     finally:
-        file.file.close()
\ No newline at end of file
+        file.file.close()
+
+@router.post("/consolidacao", response_model=dict)
+def route_consolidar_saldos(file: UploadFile = File(...), empresa_id: int = 1, tolerancia: float = 0.0,
+                            somente_divergencias: bool = True, db: Session = Depends(get_db)):
+    """
+    Soma os saldos analíticos do balancete pela hierarquia do plano e compara
+    com o saldo informado de cada conta sintética
+    """
+    try:
+        resultado = consolidar_saldos(file.file, obter_indice(db, empresa_id), tolerancia)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        file.file.close()
+
+    saldos = resultado["divergencias"] if somente_divergencias else resultado["saldos"]
+    # NaN (sem saldo informado) não é JSON válido
+    saldos = saldos.astype(object).where(saldos.notna(), None)
+    return {
+        "resumo": resultado["resumo"],
+        "contas_fora_do_plano": resultado["contas_fora_do_plano"],
+        "saldos": saldos.to_dict(orient="records"),
+    }
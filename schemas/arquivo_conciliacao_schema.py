@@ -24,6 +24,10 @@ class ArquivoConciliacaoUpdate(BaseModel):
 class ArquivoConciliacaoResponse(ArquivoConciliacaoBase):
     """Schema para retornar dados do arquivo (inclui ID e timestamps)"""
     id: int
+    hash_sha256: Optional[str] = None
+    tamanho_bytes: Optional[int] = None
+    caminho_colunar: Optional[str] = None
+    status_colunar: Optional[str] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
     
@@ -21,6 +21,50 @@ class RequestConciliacao(BaseModel):
     base_contabil_geral: BaseContabilGeral
     parametros: Optional[Dict[str, Any]] = Field(default_factory=dict)
 
+# =======================
+# ENTRADA EM LOTE
+# =======================
+
+class ContaLote(BaseModel):
+    """Balancete de uma conta do lote; base_origem própria é opcional"""
+    conta_contabil: str
+    registros: List[Dict[str, Any]]
+    base_origem: Optional[BaseOrigem] = None
+
+class RequestConciliacaoLote(BaseModel):
+    """Várias contas de uma empresa contra as mesmas bases de origem e geral"""
+    base_origem: BaseOrigem
+    base_contabil_geral: BaseContabilGeral
+    contas: List[ContaLote]
+    parametros: Optional[Dict[str, Any]] = Field(default_factory=dict)
+
+# =======================
+# ENTRADA INCREMENTAL
+# =======================
+
+class RegistroAlterado(BaseModel):
+    anterior: Dict[str, Any]
+    atual: Dict[str, Any]
+
+class DeltaRegistros(BaseModel):
+    adicionados: List[Dict[str, Any]] = []
+    alterados: List[RegistroAlterado] = []
+    removidos: List[Dict[str, Any]] = []
+
+class RequestConciliacaoIncremental(BaseModel):
+    """Conciliação completa que passa a servir de base para deltas"""
+    empresa_id: int
+    periodo: str
+    conciliacao: RequestConciliacao
+
+class RequestDeltaConciliacao(BaseModel):
+    """Correções sobre uma conciliação incremental já processada"""
+    empresa_id: int
+    conta_contabil: str
+    periodo: str
+    base_origem: DeltaRegistros = Field(default_factory=DeltaRegistros)
+    base_contabil_filtrada: DeltaRegistros = Field(default_factory=DeltaRegistros)
+
 # =======================
 # SAÍDA
 # =======================
@@ -0,0 +1,24 @@
+from pydantic import BaseModel, ConfigDict
+from typing import List, Optional
+
+
+class DiferencaConciliacaoResponse(BaseModel):
+    """Diferença por cliente gravada de uma conciliação"""
+    id: int
+    conciliacao_id: int
+    codigo: Optional[str] = None
+    cliente: Optional[str] = None
+    valor_financeiro: float
+    valor_contabilidade: float
+    diferenca: float
+    diferenca_abs: float
+    origem: str
+    tipo_diferenca: str
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class PaginaDiferencas(BaseModel):
+    """Página de diferenças; proximo_cursor é None na última página"""
+    itens: List[DiferencaConciliacaoResponse]
+    proximo_cursor: Optional[str] = None
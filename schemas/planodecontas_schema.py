@@ -40,6 +40,17 @@ class PlanoDeContasResponse(PlanoDeContasBase):
 PlanoDeContasOut = PlanoDeContasResponse
 
 
+class ContaHierarquiaResponse(BaseModel):
+    """Conta devolvida pelas consultas de hierarquia (índice em memória)"""
+    id: int
+    conta_contabil: str
+    descricao: Optional[str] = None
+    tipo_conta: str
+    conciliavel: bool
+    conta_superior: Optional[str] = None
+    profundidade: int
+
+
 # ============================================================
 # SCHEMAS PARA IMPORTAÇÃO
 # ============================================================
@@ -0,0 +1,71 @@
+# services/arquivo_colunar.py
+"""
+Conversão dos uploads para a cópia colunar (tools.colunar).
+
+gerar_copia_colunar roda como BackgroundTask do upload: a conversão em si
+vai para o pool de processos da conciliação (parsing do XML segura o GIL)
+e o resultado é registrado em ArquivoConciliacao.caminho_colunar /
+status_colunar.
+
+Configuração via ambiente:
+    CONCILIACAO_COLUNAR_COMPRESSAO=lz4|zstd   (padrão lz4: descompressão mais rápida)
+"""
+import logging
+import os
+
+from db import SessionLocal
+from models.arquivoconciliacao import ArquivoConciliacao
+from services.conciliacao_jobs import CONCLUIDO, ERRO, PROCESSANDO, submeter_no_pool
+from tools.colunar import caminho_colunar, converter_para_colunar, suporta_colunar
+from tools.leitura import TAMANHO_LOTE_PADRAO
+
+logger = logging.getLogger(__name__)
+
+COLUNAR_COMPRESSAO = os.getenv("CONCILIACAO_COLUNAR_COMPRESSAO", "lz4")
+
+# Arquivo que não é .xlsx/.xlsm (ex.: .xls, .csv): segue sendo lido do original
+NAO_SUPORTADO = "nao_suportado"
+
+
+def gerar_copia_colunar(arquivo_id: int):
+    """Converte o arquivo enviado e registra a cópia colunar no banco."""
+    db = SessionLocal()
+    try:
+        arquivo = db.get(ArquivoConciliacao, arquivo_id)
+        if arquivo is None:
+            return
+
+        if not suporta_colunar(arquivo.caminho_arquivo):
+            arquivo.status_colunar = NAO_SUPORTADO
+            db.commit()
+            return
+
+        arquivo.status_colunar = PROCESSANDO
+        db.commit()
+
+        try:
+            info = submeter_no_pool(
+                converter_para_colunar, arquivo.caminho_arquivo, None,
+                TAMANHO_LOTE_PADRAO, COLUNAR_COMPRESSAO
+            ).result()
+        except Exception as e:
+            logger.error(f"❌ Erro ao gerar cópia colunar do arquivo {arquivo_id}: {e}")
+            arquivo.status_colunar = ERRO
+            db.commit()
+            return
+
+        arquivo.caminho_colunar = info["caminho"]
+        arquivo.status_colunar = CONCLUIDO
+        db.commit()
+
+        logger.info(
+            f"✅ Arquivo {arquivo_id}: cópia colunar com {info['linhas']} linhas "
+            f"em {info['segundos']:.1f}s"
+        )
+    finally:
+        db.close()
+
+
+def remover_copia_colunar(caminho_arquivo: str):
+    """Apaga a cópia colunar do arquivo, se existir."""
+    caminho_colunar(caminho_arquivo).unlink(missing_ok=True)
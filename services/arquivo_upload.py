@@ -0,0 +1,64 @@
+# services/arquivo_upload.py
+"""
+Gravação dos uploads em disco.
+
+O Starlette já recebe o multipart num SpooledTemporaryFile (vai para disco
+acima de 1 MB), então o arquivo nunca precisa estar inteiro em memória:
+salvar_upload copia esse arquivo em blocos de tamanho fixo para o destino,
+calculando o SHA-256 no caminho e abortando se passar do limite. É síncrona
+e roda fora do event loop (run_in_executor no router).
+
+Configuração via ambiente:
+    CONCILIACAO_UPLOAD_MAX_BYTES    tamanho máximo aceito (padrão 1 GiB)
+    CONCILIACAO_UPLOAD_BLOCO_BYTES  tamanho de cada bloco copiado (padrão 1 MiB)
+"""
+import hashlib
+import logging
+import os
+import uuid
+from pathlib import Path
+from typing import BinaryIO, Tuple
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_MAX_BYTES = int(os.getenv("CONCILIACAO_UPLOAD_MAX_BYTES", str(1024 ** 3)))
+UPLOAD_BLOCO_BYTES = int(os.getenv("CONCILIACAO_UPLOAD_BLOCO_BYTES", str(1024 ** 2)))
+
+
+def salvar_upload(origem: BinaryIO, destino: Path, max_bytes: int = UPLOAD_MAX_BYTES,
+                  bloco_bytes: int = UPLOAD_BLOCO_BYTES) -> Tuple[str, int]:
+    """
+    Copia `origem` para `destino` em blocos. Retorna (sha256 hex, bytes).
+
+    Grava num temporário e renomeia no fim: um upload abortado (ou acima de
+    max_bytes, que levanta ValueError) não deixa arquivo pela metade. O
+    temporário tem nome único (uuid): uploads simultâneos do mesmo destino
+    em threads do mesmo processo não escrevem no mesmo arquivo, e o último
+    a renomear vence, inteiro.
+    """
+    destino = Path(destino)
+    temporario = destino.with_name(f".{destino.name}.{uuid.uuid4().hex}.tmp")
+    sha256 = hashlib.sha256()
+    tamanho = 0
+
+    if hasattr(origem, "seek"):
+        origem.seek(0)
+
+    try:
+        with open(temporario, "wb") as saida:
+            while True:
+                bloco = origem.read(bloco_bytes)
+                if not bloco:
+                    break
+                tamanho += len(bloco)
+                if tamanho > max_bytes:
+                    raise ValueError(f"Arquivo maior que o limite de {max_bytes} bytes")
+                sha256.update(bloco)
+                saida.write(bloco)
+        os.replace(temporario, destino)
+    except BaseException:
+        temporario.unlink(missing_ok=True)
+        raise
+
+    logger.info(f"💾 Upload gravado: {destino} ({tamanho} bytes)")
+    return sha256.hexdigest(), tamanho
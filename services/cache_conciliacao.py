@@ -0,0 +1,228 @@
+# services/cache_conciliacao.py
+"""
+Cache de resultados de conciliação endereçado pelo conteúdo da requisição.
+
+A chave é o SHA-256 de uma serialização canônica de base_origem,
+base_contabil_filtrada (registros + conta_contabil), base_contabil_geral
+(usada na busca das diferenças em outras contas) e dos parâmetros que
+influenciam o resultado. Dois backends:
+
+- "memoria": LRU em processo (mais rápido, não compartilhado)
+- "disco":   um arquivo JSON por chave em um diretório, compartilhável
+             entre vários workers do uvicorn
+
+Configuração via ambiente:
+    CONCILIACAO_CACHE=memoria|disco|desligado
+    CONCILIACAO_CACHE_DIR, CONCILIACAO_CACHE_MAX, CONCILIACAO_CACHE_TTL_SEGUNDOS
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+from schemas.conciliacao_schema import RequestConciliacao
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# CONFIGURAÇÃO (via ambiente)
+# ============================================================
+
+CACHE_BACKEND = os.getenv("CONCILIACAO_CACHE", "memoria")
+CACHE_DIR = Path(os.getenv("CONCILIACAO_CACHE_DIR", "cache_conciliacao"))
+CACHE_MAX = int(os.getenv("CONCILIACAO_CACHE_MAX", "64"))
+CACHE_TTL_SEGUNDOS = int(os.getenv("CONCILIACAO_CACHE_TTL_SEGUNDOS", "3600"))
+
+# Parâmetros que alteram o resultado e, portanto, fazem parte da chave
+PARAMETROS_RELEVANTES = (
+    "data_base",
+    "pareamento_nomes", "limiar_similaridade",
+    "combinacao_valores", "tolerancia_combinacao", "max_itens_combinacao", "tempo_combinacao",
+)
+
+
+def chave_conciliacao(request: RequestConciliacao) -> str:
+    """SHA-256 da forma canônica das entradas que determinam o resultado."""
+    parametros = request.parametros or {}
+    conteudo = {
+        "base_origem": request.base_origem.registros,
+        "base_contabil_filtrada": {
+            "registros": request.base_contabil_filtrada.registros,
+            "conta_contabil": request.base_contabil_filtrada.conta_contabil,
+        },
+        "base_contabil_geral": request.base_contabil_geral.registros,
+        "parametros": {nome: parametros.get(nome) for nome in PARAMETROS_RELEVANTES},
+    }
+
+    hasher = hashlib.sha256()
+    # iterencode evita montar a string JSON inteira em memória
+    encoder = json.JSONEncoder(sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    for pedaco in encoder.iterencode(conteudo):
+        hasher.update(pedaco.encode("utf-8"))
+    return hasher.hexdigest()
+
+
+# ============================================================
+# BACKENDS
+# ============================================================
+
+class CacheMemoria:
+    """LRU em memória com TTL e limite de entradas."""
+
+    def __init__(self, max_itens: int = CACHE_MAX, ttl_segundos: int = CACHE_TTL_SEGUNDOS):
+        self.max_itens = max_itens
+        self.ttl_segundos = ttl_segundos
+        self.hits = 0
+        self.misses = 0
+        self._itens: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, chave: str) -> Optional[Dict]:
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None or time.monotonic() - item[0] > self.ttl_segundos:
+                self._itens.pop(chave, None)
+                self.misses += 1
+                return None
+
+            self._itens.move_to_end(chave)
+            self.hits += 1
+            return item[1]
+
+    def guardar(self, chave: str, resultado: Dict):
+        with self._lock:
+            self._itens[chave] = (time.monotonic(), resultado)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+    def estatisticas(self) -> Dict:
+        with self._lock:
+            return {
+                "backend": "memoria",
+                "itens": len(self._itens),
+                "max_itens": self.max_itens,
+                "ttl_segundos": self.ttl_segundos,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class CacheDisco:
+    """
+    Um arquivo <chave>.json por resultado em um diretório compartilhado.
+
+    O mtime do arquivo marca o último acesso: serve de TTL e de ordem LRU.
+    Hits/misses são contados por processo.
+    """
+
+    def __init__(self, diretorio: Path = CACHE_DIR, max_itens: int = CACHE_MAX,
+                 ttl_segundos: int = CACHE_TTL_SEGUNDOS):
+        self.diretorio = Path(diretorio)
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        self.max_itens = max_itens
+        self.ttl_segundos = ttl_segundos
+        self.hits = 0
+        self.misses = 0
+
+    def _caminho(self, chave: str) -> Path:
+        return self.diretorio / f"{chave}.json"
+
+    def obter(self, chave: str) -> Optional[Dict]:
+        caminho = self._caminho(chave)
+        try:
+            if time.time() - caminho.stat().st_mtime > self.ttl_segundos:
+                caminho.unlink(missing_ok=True)
+                self.misses += 1
+                return None
+
+            with open(caminho, "r", encoding="utf-8") as f:
+                resultado = json.load(f)
+            os.utime(caminho)  # marca acesso (LRU)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return resultado
+
+    def guardar(self, chave: str, resultado: Dict):
+        # Escrita atômica: outro worker nunca lê um arquivo pela metade. O
+        # temporário é único por escrita: duas threads guardando a mesma chave
+        # não escrevem nem renomeiam o mesmo arquivo
+        temporario = self.diretorio / f".{chave}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(temporario, "w", encoding="utf-8") as f:
+                json.dump(resultado, f, ensure_ascii=False, default=str)
+            os.replace(temporario, self._caminho(chave))
+        except BaseException:
+            temporario.unlink(missing_ok=True)
+            raise
+        self._despejar()
+
+    def _despejar(self):
+        """Remove as entradas menos usadas acima do limite."""
+        arquivos = []
+        for caminho in self.diretorio.glob("*.json"):
+            try:
+                arquivos.append((caminho.stat().st_mtime, caminho))
+            except FileNotFoundError:
+                continue
+
+        excedente = len(arquivos) - self.max_itens
+        if excedente > 0:
+            for _, caminho in sorted(arquivos)[:excedente]:
+                caminho.unlink(missing_ok=True)
+
+    def limpar(self):
+        for caminho in self.diretorio.glob("*.json"):
+            caminho.unlink(missing_ok=True)
+
+    def estatisticas(self) -> Dict:
+        return {
+            "backend": "disco",
+            "diretorio": str(self.diretorio),
+            "itens": sum(1 for _ in self.diretorio.glob("*.json")),
+            "max_itens": self.max_itens,
+            "ttl_segundos": self.ttl_segundos,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def criar_cache(backend: str = CACHE_BACKEND):
+    """Instancia o backend configurado (None se desligado)."""
+    if backend == "disco":
+        return CacheDisco()
+    if backend == "memoria":
+        return CacheMemoria()
+    logger.info("Cache de conciliação desligado")
+    return None
+
+
+cache_conciliacao = criar_cache()
+
+
+def guardar_no_cache(chave: str, resultado: Dict) -> bool:
+    """
+    cache_conciliacao.guardar sem derrubar quem chama: o resultado já foi
+    calculado, então falha ao gravar (disco cheio, permissão...) é só aviso.
+    """
+    if cache_conciliacao is None:
+        return False
+    try:
+        cache_conciliacao.guardar(chave, resultado)
+        return True
+    except Exception as e:
+        logger.warning(f"⚠️ Resultado não guardado no cache ({chave[:12]}): {e}")
+        return False
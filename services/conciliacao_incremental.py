@@ -0,0 +1,404 @@
+# services/conciliacao_incremental.py
+"""
+Reconciliação incremental a partir de deltas de registros.
+
+Uma conciliação completa gera um EstadoConciliacao (por empresa, conta e
+período) com:
+- os títulos normalizados do financeiro, agrupados por codigo
+- os saldos do balancete por (codigo, cliente), em centavos
+- as linhas classificadas e já mapeadas de cada codigo
+- os acumuladores do resumo
+
+Um delta (adicionados/alterados/removidos) só recalcula os códigos
+afetados e ajusta os acumuladores, então o custo acompanha o tamanho da
+correção e não o do razão. Montar as listas de diferenças da resposta
+continua custando O(quantidade de diferenças).
+"""
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from schemas.conciliacao_schema import (
+    RequestConciliacao,
+    RequestDeltaConciliacao,
+    DeltaRegistros,
+)
+from services.cache_conciliacao import CacheMemoria
+from services.conciliacao_service import ConciliacaoService
+from tools.calc_diferencas import classificar_diferencas, TOLERANCIA_DIFERENCA
+from tools.contabilidade import normalizar_lancamentos_contabilidade
+from tools.financeiro import normalizar_titulos_financeiro
+from tools.mappers import montar_diferencas
+from tools.razao_geral import IndiceRazaoGeral
+
+logger = logging.getLogger(__name__)
+
+ESTADOS_MAX = int(os.getenv("CONCILIACAO_INCREMENTAL_MAX", "32"))
+ESTADOS_TTL_SEGUNDOS = int(os.getenv("CONCILIACAO_INCREMENTAL_TTL_SEGUNDOS", str(8 * 3600)))
+
+estados_conciliacao = CacheMemoria(max_itens=ESTADOS_MAX, ttl_segundos=ESTADOS_TTL_SEGUNDOS)
+
+
+def chave_estado(empresa_id: int, conta_contabil: str, periodo: str) -> str:
+    return f"{empresa_id}:{conta_contabil}:{periodo}"
+
+
+def _nulo_para_none(valor):
+    return None if pd.isna(valor) else valor
+
+
+def _chave_lista(codigo) -> str:
+    """Código como aparece nas listas mapeadas (texto sem espaços)."""
+    return str(codigo).strip() if codigo else ""
+
+
+class EstadoConciliacao:
+    """Estado de uma conciliação que pode receber deltas."""
+
+    def __init__(self, conta_contabil: str, data_base: datetime):
+        self.conta_contabil = conta_contabil
+        self.data_base = data_base
+        self.lock = threading.Lock()
+
+        # Índice de base_contabil_geral, consultado a cada reclassificação
+        self.razao_geral: Optional[IndiceRazaoGeral] = None
+
+        # codigo -> [(cliente, centavos, dias_vencidos), ...] na ordem de leitura
+        self.titulos: Dict[str, List[tuple]] = {}
+        # codigo -> {cliente: [centavos, quantidade_de_linhas]}
+        self.saldos: Dict[str, Dict[Optional[str], list]] = {}
+
+        # codigo -> contribuições de cada linha classificada:
+        # (origem, com_diferenca, centavos_fin, centavos_cont, diferenca_abs)
+        self.linhas: Dict[str, List[tuple]] = {}
+        self.origem_maior: Dict[str, List[dict]] = {}
+        self.contabil_maior: Dict[str, List[dict]] = {}
+        self.erros: Dict[str, List[dict]] = {}
+
+        # Acumuladores do resumo
+        self.contagem = np.zeros((3, 2), dtype=np.int64)
+        self.centavos_fin = 0
+        self.centavos_cont = 0
+        self.soma_abs_centavos = 0
+        self.maior_por_codigo: Dict[str, float] = {}
+
+    # ==================================================
+    # CONSTRUÇÃO (CONCILIAÇÃO COMPLETA)
+    # ==================================================
+    @classmethod
+    def construir(cls, request: RequestConciliacao) -> "EstadoConciliacao":
+        data_base = ConciliacaoService.obter_data_base(request) or datetime.now()
+        estado = cls(request.base_contabil_filtrada.conta_contabil, data_base)
+
+        try:
+            estado.razao_geral = IndiceRazaoGeral.de_registros(
+                request.base_contabil_geral.registros, estado.conta_contabil
+            )
+        except ValueError as e:
+            logger.warning(f"⚠️ Razão geral ignorado: {e}")
+
+        titulos = normalizar_titulos_financeiro(pd.DataFrame(request.base_origem.registros), data_base)
+        titulos = titulos[titulos["codigo"].notna()]
+        for codigo, cliente, centavos, dias in estado._tuplas_titulos(titulos):
+            estado.titulos.setdefault(codigo, []).append((cliente, centavos, dias))
+
+        lancamentos = normalizar_lancamentos_contabilidade(pd.DataFrame(request.base_contabil_filtrada.registros))
+        for codigo, cliente, centavos in estado._tuplas_lancamentos(lancamentos):
+            estado._somar_saldo(codigo, cliente, centavos, 1)
+
+        estado._reclassificar(set(estado.titulos) | set(estado.saldos))
+        return estado
+
+    # ==================================================
+    # APLICAÇÃO DE DELTAS
+    # ==================================================
+    def aplicar_delta(self, delta: RequestDeltaConciliacao) -> Dict:
+        """Aplica as correções e recalcula só os códigos afetados."""
+        afetados = set()
+        nao_encontrados = []
+
+        afetados |= self._aplicar_delta_financeiro(delta.base_origem, nao_encontrados)
+        afetados |= self._aplicar_delta_contabil(delta.base_contabil_filtrada, nao_encontrados)
+
+        self._reclassificar(afetados)
+
+        return {"codigos_afetados": len(afetados), "registros_nao_encontrados": nao_encontrados}
+
+    def _aplicar_delta_financeiro(self, delta: DeltaRegistros, nao_encontrados: list) -> set:
+        afetados = set()
+
+        for codigo, *titulo in self._normalizar_titulos(delta.removidos):
+            if not self._remover_titulo(codigo, tuple(titulo)):
+                nao_encontrados.append({"base": "origem", "codigo": codigo, "registro": titulo})
+            afetados.add(codigo)
+
+        if delta.alterados:
+            anteriores = dict(self._normalizar_titulos([a.anterior for a in delta.alterados], com_posicao=True))
+            atuais = dict(self._normalizar_titulos([a.atual for a in delta.alterados], com_posicao=True))
+
+            for posicao in range(len(delta.alterados)):
+                anterior, atual = anteriores.get(posicao), atuais.get(posicao)
+
+                # Mesmo código: substitui no lugar para preservar o "primeiro cliente"
+                if anterior and atual and anterior[0] == atual[0]:
+                    lista = self.titulos.get(anterior[0], [])
+                    try:
+                        lista[lista.index(anterior[1:])] = atual[1:]
+                    except ValueError:
+                        nao_encontrados.append({"base": "origem", "codigo": anterior[0], "registro": list(anterior[1:])})
+                        lista.append(atual[1:])
+                        self.titulos[atual[0]] = lista
+                    afetados.add(atual[0])
+                    continue
+
+                if anterior:
+                    if not self._remover_titulo(anterior[0], anterior[1:]):
+                        nao_encontrados.append({"base": "origem", "codigo": anterior[0], "registro": list(anterior[1:])})
+                    afetados.add(anterior[0])
+                if atual:
+                    self.titulos.setdefault(atual[0], []).append(atual[1:])
+                    afetados.add(atual[0])
+
+        for codigo, *titulo in self._normalizar_titulos(delta.adicionados):
+            self.titulos.setdefault(codigo, []).append(tuple(titulo))
+            afetados.add(codigo)
+
+        return afetados
+
+    def _aplicar_delta_contabil(self, delta: DeltaRegistros, nao_encontrados: list) -> set:
+        afetados = set()
+
+        removidos = list(delta.removidos) + [a.anterior for a in delta.alterados]
+        adicionados = list(delta.adicionados) + [a.atual for a in delta.alterados]
+
+        for codigo, cliente, centavos in self._normalizar_lancamentos(removidos):
+            if not self._somar_saldo(codigo, cliente, -centavos, -1):
+                nao_encontrados.append({"base": "contabil", "codigo": codigo, "registro": [cliente, centavos]})
+            afetados.add(codigo)
+
+        for codigo, cliente, centavos in self._normalizar_lancamentos(adicionados):
+            self._somar_saldo(codigo, cliente, centavos, 1)
+            afetados.add(codigo)
+
+        return afetados
+
+    # ==================================================
+    # NORMALIZAÇÃO DE REGISTROS
+    # ==================================================
+    def _normalizar_titulos(self, registros: list, com_posicao: bool = False):
+        if not registros:
+            return []
+        titulos = normalizar_titulos_financeiro(pd.DataFrame(registros), self.data_base)
+        titulos = titulos[titulos["codigo"].notna()]
+        tuplas = self._tuplas_titulos(titulos)
+        if com_posicao:
+            return [(posicao, tupla) for posicao, tupla in zip(titulos.index.tolist(), tuplas)]
+        return tuplas
+
+    def _normalizar_lancamentos(self, registros: list):
+        if not registros:
+            return []
+        return self._tuplas_lancamentos(normalizar_lancamentos_contabilidade(pd.DataFrame(registros)))
+
+    @staticmethod
+    def _tuplas_titulos(titulos: pd.DataFrame) -> List[tuple]:
+        return [
+            (codigo, _nulo_para_none(cliente), centavos, _nulo_para_none(dias))
+            for codigo, cliente, centavos, dias in zip(
+                titulos["codigo"].tolist(),
+                titulos["cliente"].tolist(),
+                titulos["centavos"].tolist(),
+                titulos["dias_vencidos"].tolist(),
+            )
+        ]
+
+    @staticmethod
+    def _tuplas_lancamentos(lancamentos: pd.DataFrame) -> List[tuple]:
+        return [
+            (codigo, _nulo_para_none(cliente), centavos)
+            for codigo, cliente, centavos in zip(
+                lancamentos["codigo"].tolist(),
+                lancamentos["cliente"].tolist(),
+                lancamentos["centavos"].tolist(),
+            )
+        ]
+
+    def _remover_titulo(self, codigo: str, titulo: tuple) -> bool:
+        lista = self.titulos.get(codigo)
+        if not lista or titulo not in lista:
+            return False
+        lista.remove(titulo)
+        if not lista:
+            del self.titulos[codigo]
+        return True
+
+    def _somar_saldo(self, codigo: str, cliente, centavos: int, quantidade: int) -> bool:
+        clientes = self.saldos.setdefault(codigo, {})
+        if quantidade < 0 and cliente not in clientes:
+            if not clientes:
+                del self.saldos[codigo]
+            return False
+
+        saldo = clientes.setdefault(cliente, [0, 0])
+        saldo[0] += centavos
+        saldo[1] += quantidade
+
+        if saldo[1] <= 0:
+            del clientes[cliente]
+        if not clientes:
+            del self.saldos[codigo]
+        return True
+
+    # ==================================================
+    # RECLASSIFICAÇÃO DOS CÓDIGOS AFETADOS
+    # ==================================================
+    def _agregados(self, codigos: set) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Monta os DataFrames normalizados (codigo, cliente, valor) só dos códigos afetados."""
+        fin = {"codigo": [], "cliente": [], "valor": []}
+        for codigo in codigos:
+            titulos = self.titulos.get(codigo)
+            if not titulos:
+                continue
+            fin["codigo"].append(codigo)
+            fin["cliente"].append(next((t[0] for t in titulos if t[0] is not None), None))
+            fin["valor"].append(sum(t[1] for t in titulos) / 100)
+
+        cont = {"codigo": [], "cliente": [], "valor": []}
+        for codigo in codigos:
+            for cliente, (centavos, _) in self.saldos.get(codigo, {}).items():
+                cont["codigo"].append(codigo)
+                cont["cliente"].append(cliente)
+                cont["valor"].append(centavos / 100)
+
+        colunas = {"codigo": object, "cliente": object, "valor": np.float64}
+        return pd.DataFrame(fin).astype(colunas), pd.DataFrame(cont).astype(colunas)
+
+    def _reclassificar(self, codigos: set):
+        """Substitui linhas, listas e contribuições ao resumo dos códigos informados."""
+        for codigo in codigos:
+            self._descontar(codigo)
+
+        df_fin, df_cont = self._agregados(codigos)
+        if df_fin.empty and df_cont.empty:
+            return
+
+        df_classificado = classificar_diferencas(df_fin, df_cont)
+
+        # Contribuições de cada linha ao resumo
+        origem = df_classificado["Origem"].cat.codes.to_numpy()
+        diferenca_abs = df_classificado["Diferença Absoluta"].to_numpy()
+        centavos_fin = np.round(df_classificado["Valor Financeiro"].to_numpy() * 100).astype(np.int64)
+        centavos_cont = np.round(df_classificado["Valor Contabilidade"].to_numpy() * 100).astype(np.int64)
+
+        for codigo, o, d_abs, c_fin, c_cont in zip(
+            df_classificado["Código"].tolist(), origem.tolist(), diferenca_abs.tolist(),
+            centavos_fin.tolist(), centavos_cont.tolist()
+        ):
+            com_diferenca = int(d_abs > TOLERANCIA_DIFERENCA)
+            self.linhas.setdefault(codigo, []).append((o, com_diferenca, c_fin, c_cont, d_abs))
+            self.contagem[o, com_diferenca] += 1
+            self.centavos_fin += c_fin
+            self.centavos_cont += c_cont
+            self.soma_abs_centavos += abs(c_cont - c_fin)
+            self.maior_por_codigo[codigo] = max(self.maior_por_codigo.get(codigo, 0.0), d_abs)
+
+        # Listas mapeadas, agrupadas por código
+        tipo = df_classificado["Tipo Diferença"]
+        mapeamento = montar_diferencas(
+            df_classificado[tipo == "Financeiro > Contabilidade"],
+            df_classificado[tipo == "Contabilidade > Financeiro"],
+            self.conta_contabil
+        )
+        if self.razao_geral is not None:
+            self.razao_geral.preencher_diferencas(mapeamento["diferencas_origem_maior"])
+        for item in mapeamento["diferencas_origem_maior"]:
+            self.origem_maior.setdefault(_chave_lista(item["cnpj"]), []).append(item)
+        for item in mapeamento["diferencas_contabilidade_maior"]:
+            self.contabil_maior.setdefault(_chave_lista(item["identificador"]), []).append(item)
+        for erro in mapeamento["erros"]:
+            self.erros.setdefault(_chave_lista(erro["identificador"]), []).append(erro)
+
+    def _descontar(self, codigo: str):
+        """Retira do resumo e das listas tudo o que o código contribuía."""
+        for o, com_diferenca, c_fin, c_cont, _ in self.linhas.pop(codigo, []):
+            self.contagem[o, com_diferenca] -= 1
+            self.centavos_fin -= c_fin
+            self.centavos_cont -= c_cont
+            self.soma_abs_centavos -= abs(c_cont - c_fin)
+
+        self.maior_por_codigo.pop(codigo, None)
+        self.origem_maior.pop(_chave_lista(codigo), None)
+        self.contabil_maior.pop(_chave_lista(codigo), None)
+        self.erros.pop(_chave_lista(codigo), None)
+
+    # ==================================================
+    # RESULTADO
+    # ==================================================
+    def resumo(self) -> Dict:
+        """Mesmo formato de calcular_resumo, a partir dos acumuladores."""
+        contagem = self.contagem
+        return {
+            'total_registros': int(contagem.sum()),
+            'registros_ambos': int(contagem[0].sum()),
+            'registros_so_financeiro': int(contagem[1].sum()),
+            'registros_so_contabilidade': int(contagem[2].sum()),
+            'registros_com_diferenca': int(contagem[:, 1].sum()),
+            'registros_sem_diferenca': int(contagem[:, 0].sum()),
+            'diferenca_total': (self.centavos_cont - self.centavos_fin) / 100,
+            'diferenca_absoluta_total': self.soma_abs_centavos / 100,
+            'maior_diferenca': max(self.maior_por_codigo.values(), default=float('nan')),
+            'valor_total_financeiro': self.centavos_fin / 100,
+            'valor_total_contabilidade': self.centavos_cont / 100
+        }
+
+    def montar_retorno(self) -> Dict:
+        """Retorno no mesmo formato de ConciliacaoService.executar."""
+        origem_maior = [item for itens in self.origem_maior.values() for item in itens]
+        origem_maior.sort(key=lambda item: (-abs(item["diferenca"]), item["cnpj"] or ""))
+
+        contabil_maior = [item for itens in self.contabil_maior.values() for item in itens]
+        contabil_maior.sort(key=lambda item: (-abs(item["valor"]), item["identificador"] or ""))
+
+        erros = [erro for itens in self.erros.values() for erro in itens]
+
+        return ConciliacaoService().montar_retorno(self.resumo(), origem_maior, contabil_maior, erros)
+
+
+# ==================================================
+# API DO MÓDULO
+# ==================================================
+
+def iniciar_conciliacao_incremental(empresa_id: int, periodo: str, request: RequestConciliacao) -> Dict:
+    """Processa a conciliação completa e guarda o estado para deltas futuros."""
+    estado = EstadoConciliacao.construir(request)
+    chave = chave_estado(empresa_id, request.base_contabil_filtrada.conta_contabil, periodo)
+    estados_conciliacao.guardar(chave, estado)
+
+    logger.info(f"📌 Estado incremental {chave} criado com {len(estado.linhas)} códigos")
+    return estado.montar_retorno()
+
+
+def aplicar_delta_conciliacao(delta: RequestDeltaConciliacao) -> Optional[Dict]:
+    """Aplica um delta ao estado guardado. Retorna None se não houver estado."""
+    chave = chave_estado(delta.empresa_id, delta.conta_contabil, delta.periodo)
+    estado: Optional[EstadoConciliacao] = estados_conciliacao.obter(chave)
+    if estado is None:
+        return None
+
+    with estado.lock:
+        info = estado.aplicar_delta(delta)
+        retorno = estado.montar_retorno()
+
+    logger.info(f"🔁 Delta aplicado em {chave}: {info['codigos_afetados']} códigos recalculados")
+
+    if info["registros_nao_encontrados"]:
+        retorno["alertas"].append(
+            f"⚠️ {len(info['registros_nao_encontrados'])} registros removidos/alterados não encontrados na base"
+        )
+    retorno["incremental"] = info
+    return retorno
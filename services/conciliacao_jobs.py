@@ -0,0 +1,364 @@
+# services/conciliacao_jobs.py
+"""
+Execução de conciliações fora do event loop.
+
+- Um ProcessPoolExecutor compartilhado roda ConciliacaoService.executar
+  (pandas é CPU-bound e segura o GIL, então thread não resolve); se um
+  worker morrer, o pool é recriado (PoolProcessos).
+- JobStore guarda status/progresso/resultado dos jobs assíncronos com
+  limite de tamanho e TTL. A tarefa executada é plugável (conciliação,
+  relatório em Excel, ...), desde que devolva (resultado, medições).
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from schemas.conciliacao_schema import RequestConciliacao
+from services.cache_conciliacao import cache_conciliacao, guardar_no_cache
+from services.conciliacao_service import ConciliacaoService, ETAPAS
+from services.metricas import MedidorEtapas, metricas_conciliacao
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# CONFIGURAÇÃO (via ambiente)
+# ============================================================
+
+CONCILIACAO_WORKERS = int(os.getenv("CONCILIACAO_WORKERS", os.cpu_count() or 1))
+JOBS_MAX = int(os.getenv("CONCILIACAO_JOBS_MAX", "100"))
+JOBS_TTL_SEGUNDOS = int(os.getenv("CONCILIACAO_JOBS_TTL_SEGUNDOS", "3600"))
+
+# Status possíveis de um job
+PENDENTE = "pendente"
+PROCESSANDO = "processando"
+CONCLUIDO = "concluido"
+ERRO = "erro"
+
+
+# ============================================================
+# POOL DE PROCESSOS
+# ============================================================
+
+class PoolProcessos:
+    """
+    ProcessPoolExecutor criado no primeiro uso e recriado se quebrar.
+
+    Se um worker morre (ex.: OOM killer num job pandas grande), o executor
+    fica BrokenProcessPool para sempre. submeter detecta isso: um submit
+    recusado vai para um executor novo, e um future que termina com
+    BrokenProcessPool descarta o executor quebrado. Só os jobs que estavam
+    no pool quebrado falham; os seguintes usam o novo.
+    """
+
+    def __init__(self, nome: str, max_workers: int):
+        self.nome = nome
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def executor(self) -> ProcessPoolExecutor:
+        """O executor atual (criado na primeira chamada)."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                logger.info(f"⚙️ Pool de {self.nome} iniciado com {self.max_workers} processos")
+            return self._executor
+
+    def submeter(self, funcao: Callable, *args) -> Future:
+        """executor().submit, trocando o executor se ele estiver quebrado."""
+        executor = self.executor()
+        try:
+            future = executor.submit(funcao, *args)
+        except BrokenProcessPool:
+            # A tarefa não chegou a rodar: vai para um executor novo
+            self._descartar(executor)
+            executor = self.executor()
+            future = executor.submit(funcao, *args)
+
+        future.add_done_callback(lambda f: self._conferir(executor, f))
+        return future
+
+    def encerrar(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _conferir(self, executor: ProcessPoolExecutor, future: Future):
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            self._descartar(executor)
+
+    def _descartar(self, quebrado: ProcessPoolExecutor):
+        """Troca o executor quebrado (se ainda for o atual) por um novo no próximo uso."""
+        with self._lock:
+            if self._executor is not quebrado:
+                return
+            self._executor = None
+        logger.warning(f"⚠️ Pool de {self.nome} quebrado (worker encerrado); será recriado")
+        quebrado.shutdown(wait=False, cancel_futures=True)
+
+
+pool_conciliacao = PoolProcessos("conciliação", CONCILIACAO_WORKERS)
+_manager = None
+_lock_executor = threading.Lock()
+
+
+def submeter_no_pool(funcao: Callable, *args) -> Future:
+    """Agenda funcao(*args) no pool compartilhado, recriando-o se estiver quebrado."""
+    return pool_conciliacao.submeter(funcao, *args)
+
+
+def _obter_manager():
+    """Manager usado para os workers publicarem o progresso das etapas."""
+    global _manager
+    with _lock_executor:
+        if _manager is None:
+            _manager = multiprocessing.Manager()
+        return _manager
+
+
+def encerrar_executor():
+    """Encerra o pool e o manager (chamado no shutdown da aplicação)."""
+    global _manager
+    pool_conciliacao.encerrar()
+    with _lock_executor:
+        if _manager is not None:
+            _manager.shutdown()
+            _manager = None
+
+
+def executar_conciliacao(request: RequestConciliacao, progresso=None,
+                         job_id: str = None) -> Tuple[dict, List[Dict]]:
+    """
+    Ponto de entrada executado dentro do processo worker.
+
+    progresso: dict compartilhado (Manager) onde cada etapa concluída é anotada
+
+    Retorna (resultado, medições por etapa); as medições voltam para o
+    processo da API, que é quem expõe /metrics.
+    """
+    medidor = MedidorEtapas()
+    resultado = ConciliacaoService().executar(
+        request, progresso=notificador_progresso(progresso, job_id), medidor=medidor
+    )
+    return resultado, medidor.etapas
+
+
+def notificador_progresso(progresso, job_id: Optional[str]) -> Callable[[str], None]:
+    """Callback que anota cada etapa concluída no dict compartilhado do job."""
+    def notificar(etapa: str):
+        if progresso is not None and job_id is not None:
+            progresso[job_id] = progresso.get(job_id, []) + [etapa]
+    return notificar
+
+
+def rotulos_metricas(request: RequestConciliacao) -> Tuple[Optional[str], int]:
+    """(empresa, linhas de entrada) usados como rótulos dos histogramas."""
+    empresa = (request.parametros or {}).get("empresa_id")
+    linhas = len(request.base_origem.registros) + len(request.base_contabil_filtrada.registros)
+    return empresa, linhas
+
+
+# ============================================================
+# STORE DE JOBS
+# ============================================================
+
+class FilaDeJobsCheia(RuntimeError):
+    """Já há max_jobs jobs pendentes/em processamento; o pedido deve ser refeito depois."""
+
+
+class JobStore:
+    """
+    Guarda os jobs em memória, do mais antigo para o mais recente.
+
+    Ao exceder `max_jobs`, os jobs finalizados mais antigos são descartados;
+    jobs com mais de `ttl_segundos` desde a última atualização expiram.
+    Jobs ainda não finalizados não são descartados: com `max_jobs` deles no
+    store, submeter recusa novos (FilaDeJobsCheia).
+    """
+
+    def __init__(self, max_jobs: int = JOBS_MAX, ttl_segundos: int = JOBS_TTL_SEGUNDOS):
+        self.max_jobs = max_jobs
+        self.ttl_segundos = ttl_segundos
+        self._jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._progresso = None
+
+    def submeter(self, request: RequestConciliacao, chave_cache: Optional[str] = None,
+                 tarefa: Callable = executar_conciliacao, etapas: Sequence[str] = ETAPAS) -> str:
+        """
+        Agenda a conciliação no pool e devolve o id do job.
+
+        Com `chave_cache`, um resultado já em cache conclui o job na hora e
+        um resultado novo é guardado no cache ao terminar.
+
+        tarefa: função executada no worker como tarefa(request, progresso, job_id),
+        devolvendo (resultado, medições); `etapas` são as etapas que ela anota
+
+        Levanta FilaDeJobsCheia se já há max_jobs jobs não finalizados.
+        """
+        if self._progresso is None:
+            self._progresso = _obter_manager().dict()
+
+        job_id = uuid.uuid4().hex
+        agora = time.monotonic()
+
+        em_cache = None
+        if chave_cache and cache_conciliacao is not None:
+            em_cache = cache_conciliacao.obter(chave_cache)
+
+        with self._lock:
+            self._expirar(agora)
+            # Resultado em cache não ocupa o pool: conclui na hora mesmo com a fila cheia
+            if em_cache is None:
+                em_andamento = sum(1 for job in self._jobs.values() if job["status"] == PENDENTE)
+                if em_andamento >= self.max_jobs:
+                    raise FilaDeJobsCheia(
+                        f"{em_andamento} jobs em andamento (limite {self.max_jobs}); tente novamente mais tarde"
+                    )
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "status": PENDENTE,
+                "resultado": None,
+                "erro": None,
+                "criado_em": datetime.now(timezone.utc).isoformat(),
+                "finalizado_em": None,
+                "etapas_previstas": list(etapas),
+                "etapas_concluidas": None,
+                "metricas": None,
+                "rotulos_metricas": rotulos_metricas(request),
+                "chave_cache": chave_cache,
+                "_atualizado": agora,
+            }
+
+            if em_cache is not None:
+                self._jobs[job_id].update({
+                    "status": CONCLUIDO,
+                    "resultado": em_cache,
+                    "finalizado_em": self._jobs[job_id]["criado_em"],
+                    "etapas_concluidas": list(etapas),
+                })
+
+            self._limitar_tamanho()
+
+        if em_cache is not None:
+            logger.info(f"♻️ Job de conciliação {job_id} atendido pelo cache")
+            return job_id
+
+        future = submeter_no_pool(tarefa, request, self._progresso, job_id)
+        future.add_done_callback(lambda f: self._finalizar(job_id, f))
+
+        logger.info(f"📥 Job de conciliação {job_id} agendado")
+        return job_id
+
+    def obter(self, job_id: str) -> Optional[Dict]:
+        """Status e progresso do job (sem o resultado), ou None se não existir."""
+        with self._lock:
+            self._expirar(time.monotonic())
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+
+            if job["etapas_concluidas"] is not None:
+                etapas_concluidas = job["etapas_concluidas"]
+            else:
+                etapas_concluidas = list(self._progresso.get(job_id, []))
+            status = job["status"]
+            if status == PENDENTE and etapas_concluidas:
+                status = PROCESSANDO
+
+            segundos = {m["etapa"]: round(m["segundos"], 4) for m in job["metricas"] or []}
+
+            return {
+                "job_id": job_id,
+                "status": status,
+                "etapas": [
+                    {"etapa": etapa, "concluida": etapa in etapas_concluidas, "segundos": segundos.get(etapa)}
+                    for etapa in job["etapas_previstas"]
+                ],
+                "progresso_percentual": round(
+                    len(etapas_concluidas) / len(job["etapas_previstas"]) * 100, 1
+                ),
+                "erro": job["erro"],
+                "criado_em": job["criado_em"],
+                "finalizado_em": job["finalizado_em"],
+            }
+
+    def obter_resultado(self, job_id: str) -> Optional[Dict]:
+        """Registro completo do job (incluindo resultado), ou None se não existir."""
+        with self._lock:
+            self._expirar(time.monotonic())
+            return self._jobs.get(job_id)
+
+    def _finalizar(self, job_id: str, future: Future):
+        """Callback do future: grava resultado ou erro."""
+        para_cache = None
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                self._progresso.pop(job_id, None)
+                return
+
+            try:
+                job["resultado"], job["metricas"] = future.result()
+                job["status"] = CONCLUIDO
+                metricas_conciliacao.registrar(job["metricas"], *job["rotulos_metricas"])
+                logger.info(f"✅ Job de conciliação {job_id} concluído")
+                if job["chave_cache"]:
+                    para_cache = (job["chave_cache"], job["resultado"])
+            except Exception as e:
+                job["erro"] = str(e)
+                job["status"] = ERRO
+                logger.error(f"❌ Job de conciliação {job_id} falhou: {e}")
+
+            # Congela o progresso: o registro compartilhado é liberado abaixo
+            if job["status"] == CONCLUIDO:
+                job["etapas_concluidas"] = list(job["etapas_previstas"])
+            else:
+                job["etapas_concluidas"] = list(self._progresso.get(job_id, []))
+
+            job["finalizado_em"] = datetime.now(timezone.utc).isoformat()
+            job["_atualizado"] = time.monotonic()
+
+        self._progresso.pop(job_id, None)
+
+        # Fora do lock (serializar e gravar no disco não trava obter/status) e
+        # fora do try: falha no cache não transforma o job concluído em erro
+        if para_cache is not None:
+            guardar_no_cache(*para_cache)
+
+    def _expirar(self, agora: float):
+        """Remove jobs finalizados cujo TTL venceu."""
+        vencidos = [
+            job_id for job_id, job in self._jobs.items()
+            if job["status"] in (CONCLUIDO, ERRO) and agora - job["_atualizado"] > self.ttl_segundos
+        ]
+        for job_id in vencidos:
+            self._descartar(job_id)
+
+    def _limitar_tamanho(self):
+        """Descarta os jobs finalizados mais antigos acima do limite."""
+        excedente = len(self._jobs) - self.max_jobs
+        if excedente <= 0:
+            return
+        for job_id in [j for j, job in self._jobs.items() if job["status"] in (CONCLUIDO, ERRO)][:excedente]:
+            self._descartar(job_id)
+
+    def _descartar(self, job_id: str):
+        """Remove o job e o arquivo gerado por ele, se houver."""
+        job = self._jobs.pop(job_id)
+        caminho = (job["resultado"] or {}).get("caminho_arquivo")
+        if caminho:
+            Path(caminho).unlink(missing_ok=True)
+
+
+job_store = JobStore()
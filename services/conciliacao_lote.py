@@ -0,0 +1,224 @@
+# services/conciliacao_lote.py
+"""
+Conciliação de várias contas contábeis de uma empresa numa só requisição.
+
+As bases compartilhadas são preparadas uma vez no processo da API:
+
+- base_origem: convertida e normalizada uma vez (as contas com base_origem
+  própria normalizam a sua no worker; se todas trazem a própria, a
+  compartilhada nem é preparada);
+- base_contabil_geral: indexada uma vez (IndiceRazaoGeral); a conta
+  conciliada é excluída na busca, então o mesmo índice atende todas.
+
+Cada conta roda ConciliacaoService.executar no pool de processos, recebendo o
+financeiro já normalizado e um razão geral vazio; ao voltar, as diferenças
+origem_maior são procuradas no índice compartilhado. Erro numa conta não
+derruba o lote: a conta volta com status "erro".
+"""
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from schemas.conciliacao_schema import (
+    BaseContabilFiltrada,
+    BaseContabilGeral,
+    BaseOrigem,
+    RequestConciliacao,
+    RequestConciliacaoLote
+)
+from services.conciliacao_jobs import submeter_no_pool, CONCLUIDO, ERRO
+from services.conciliacao_service import ConciliacaoService
+from services.metricas import MedidorEtapas, metricas_conciliacao
+from tools.contabilidade import colunas_planilha_contabilidade
+from tools.leitura import ler_planilha
+from tools.mappers import tabela_diferencas
+from tools.razao_geral import IndiceRazaoGeral
+
+logger = logging.getLogger(__name__)
+
+LOTE_MAX_CONTAS = int(os.getenv("CONCILIACAO_LOTE_MAX_CONTAS", "100"))
+
+
+def validar_lote(request: RequestConciliacaoLote) -> Tuple[bool, str]:
+    """Mesmas regras de ConciliacaoService.validar_dados, para cada conta do lote."""
+    if not request.contas:
+        return False, "Nenhuma conta informada"
+
+    if len(request.contas) > LOTE_MAX_CONTAS:
+        return False, f"Lote com {len(request.contas)} contas excede o limite de {LOTE_MAX_CONTAS}"
+
+    contas = [conta.conta_contabil.strip() for conta in request.contas]
+    repetidas = sorted({conta for conta in contas if contas.count(conta) > 1})
+    if repetidas:
+        return False, f"Contas repetidas no lote: {repetidas}"
+
+    sem_origem = [
+        conta.conta_contabil for conta in request.contas
+        if not (conta.base_origem or request.base_origem).registros
+    ]
+    if sem_origem:
+        return False, f"Base de origem vazia para as contas: {sem_origem}"
+
+    vazias = [conta.conta_contabil for conta in request.contas if not conta.registros]
+    if vazias:
+        return False, f"Base contábil filtrada vazia para as contas: {vazias}"
+
+    if not request.base_contabil_geral.registros:
+        return False, "Base geral da contabilidade vazia"
+
+    if not request.parametros or not request.parametros.get("data_base"):
+        return False, "Data-base não informada"
+
+    if ConciliacaoService.obter_data_base(request) is None:
+        return False, f"Data-base inválida: {request.parametros.get('data_base')}"
+
+    return True, ""
+
+
+def executar_conta(request: RequestConciliacao,
+                   financeiro: Optional[Tuple[pd.DataFrame, pd.DataFrame]]) -> Tuple[dict, List[Dict]]:
+    """Executado no worker: conciliação de uma conta com o financeiro já preparado."""
+    medidor = MedidorEtapas()
+    resultado = ConciliacaoService().executar(request, medidor=medidor, financeiro=financeiro)
+    return resultado, medidor.etapas
+
+
+def executar_conta_arquivo(caminho_balancete: str, conta_contabil: str, parametros: Dict,
+                           financeiro: Tuple[pd.DataFrame, pd.DataFrame]) -> Tuple[dict, List[Dict], pd.DataFrame]:
+    """
+    Executado no worker: como executar_conta, lendo o balancete da conta do
+    disco. Devolve também as diferenças por cliente (tools.mappers.tabela_diferencas).
+    """
+    balancete = ler_planilha(caminho_balancete, colunas=colunas_planilha_contabilidade)
+    request = RequestConciliacao(
+        base_origem=BaseOrigem(registros=[]),
+        base_contabil_filtrada=BaseContabilFiltrada(
+            registros=balancete.astype(object).where(balancete.notna(), None).to_dict(orient="records"),
+            conta_contabil=conta_contabil
+        ),
+        base_contabil_geral=BaseContabilGeral(registros=[]),
+        parametros=parametros
+    )
+    service = ConciliacaoService()
+    medidor = MedidorEtapas()
+    resultado = service.executar(request, medidor=medidor, financeiro=financeiro)
+    return resultado, medidor.etapas, tabela_diferencas(service.df_completo)
+
+
+def executar_lote(request: RequestConciliacaoLote) -> dict:
+    """
+    Concilia todas as contas do lote e devolve o resultado de cada uma
+    (mesmo formato de POST /contabil) e um resumo agregado.
+    """
+    parametros = request.parametros or {}
+    empresa = parametros.get("empresa_id")
+    logger.info(f"📦 Conciliação em lote: {len(request.contas)} contas")
+
+    # ==========================
+    # 1️⃣ BASES COMPARTILHADAS
+    # ==========================
+    # Só quando alguma conta usa a base compartilhada (com todas trazendo a
+    # própria, ela pode vir vazia)
+    financeiro = None
+    if any(not conta.base_origem for conta in request.contas):
+        financeiro = ConciliacaoService.preparar_financeiro(
+            request.base_origem.registros,
+            ConciliacaoService.obter_data_base(request)
+        )
+
+    try:
+        razao = IndiceRazaoGeral.de_registros(request.base_contabil_geral.registros)
+    except ValueError as e:
+        # Layout desconhecido no razão geral não impede a conciliação
+        logger.warning(f"⚠️ Razão geral ignorado: {e}")
+        razao = None
+
+    # ==========================
+    # 2️⃣ DISTRIBUIR AS CONTAS NO POOL
+    # ==========================
+    futures = []
+    for conta in request.contas:
+        requisicao = RequestConciliacao(
+            base_origem=conta.base_origem or BaseOrigem(registros=[]),
+            base_contabil_filtrada=BaseContabilFiltrada(
+                registros=conta.registros,
+                conta_contabil=conta.conta_contabil
+            ),
+            base_contabil_geral=BaseContabilGeral(registros=[]),
+            parametros=parametros
+        )
+        # Base de origem própria: o worker normaliza a dele
+        futures.append(submeter_no_pool(
+            executar_conta, requisicao, None if conta.base_origem else financeiro
+        ))
+
+    # ==========================
+    # 3️⃣ COLETAR E BUSCAR NO RAZÃO GERAL
+    # ==========================
+    resultados = []
+    for conta, future in zip(request.contas, futures):
+        try:
+            resultado, etapas = future.result()
+        except Exception as e:
+            logger.error(f"❌ Conta {conta.conta_contabil} falhou no lote: {e}")
+            resultados.append({
+                "conta_contabil": conta.conta_contabil,
+                "status": ERRO,
+                "erro": str(e),
+                "resultado": None,
+            })
+            continue
+
+        origem = (conta.base_origem or request.base_origem).registros
+        metricas_conciliacao.registrar(etapas, empresa, len(origem) + len(conta.registros))
+
+        encontrados = 0
+        if razao is not None:
+            encontrados = razao.preencher_diferencas(resultado["diferencas_origem_maior"], conta.conta_contabil)
+        resultado["observacoes"].append(
+            f"{encontrados} diferenças origem > contabilidade encontradas em outras contas do razão geral"
+        )
+
+        resultados.append({
+            "conta_contabil": conta.conta_contabil,
+            "status": CONCLUIDO,
+            "erro": None,
+            "resultado": resultado,
+            "encontradas_razao_geral": encontrados,
+        })
+
+    # ==========================
+    # 4️⃣ RESUMO DO LOTE
+    # ==========================
+    resumo = resumir_lote(resultados)
+    logger.info(f"✅ Lote concluído: {resumo}")
+
+    return {"resumo": resumo, "contas": resultados}
+
+
+def resumir_lote(resultados: List[Dict]) -> Dict:
+    """Totais do lote a partir dos resultados por conta."""
+    concluidas = [item for item in resultados if item["status"] == CONCLUIDO]
+    resumos = [item["resultado"]["resumo"] for item in concluidas]
+    divergentes = [
+        item["conta_contabil"] for item, resumo in zip(concluidas, resumos)
+        if resumo["situacao"] != "CONCILIADO"
+    ]
+
+    return {
+        "total_contas": len(resultados),
+        "contas_concluidas": len(concluidas),
+        "contas_com_erro": len(resultados) - len(concluidas),
+        "contas_conciliadas": len(concluidas) - len(divergentes),
+        "contas_divergentes": divergentes,
+        "diferenca_total": round(sum(resumo["diferenca"] for resumo in resumos), 2),
+        "diferencas_origem_maior": sum(
+            len(item["resultado"]["diferencas_origem_maior"]) for item in concluidas
+        ),
+        "diferencas_contabilidade_maior": sum(
+            len(item["resultado"]["diferencas_contabilidade_maior"]) for item in concluidas
+        ),
+        "encontradas_razao_geral": sum(item["encontradas_razao_geral"] for item in concluidas),
+    }
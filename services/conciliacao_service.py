@@ -1,15 +1,33 @@
 import logging
 import pandas as pd
 from datetime import datetime
+from typing import Callable, Optional, Tuple
 
 from schemas.conciliacao_schema import RequestConciliacao, RelatorioConsolidacao
-from tools.financeiro import normalizar_planilha_financeira
-from tools.contabilidade import normalizar_planilha_contabilidade
-from tools.calc_diferencas import calcular_diferencas
-from tools.mappers import map_origem_maior, map_contabilidade_maior
+from tools.financeiro import normalizar_planilha_financeira, normalizar_titulos_financeiro
+from tools.contabilidade import normalizar_planilha_contabilidade, normalizar_lancamentos_contabilidade
+from tools.calc_diferencas import calcular_diferencas, TOLERANCIA_DIFERENCA
+from tools.combinacao_valores import buscar_combinacoes, OrcamentoBusca, MAX_ITENS_COMBINACAO, TEMPO_MAXIMO_SEGUNDOS
+from tools.mappers import montar_diferencas
+from tools.razao_geral import IndiceRazaoGeral
+from tools.pareamento_nomes import propor_pares_por_nome, LIMIAR_SIMILARIDADE
+from services.metricas import MedidorEtapas
 
 logger = logging.getLogger(__name__)
 
+# Etapas de executar(), na ordem em que são concluídas
+ETAPAS = [
+    "normalizar_financeiro",
+    "normalizar_contabilidade",
+    "calcular_diferencas",
+    "filtrar_diferencas",
+    "mapear_diferencas",
+    "buscar_razao_geral",
+    "parear_nomes",
+    "combinar_valores",
+    "resumo",
+]
+
 
 class ConciliacaoService:
 
@@ -29,25 +47,64 @@ class ConciliacaoService:
         if not request.parametros or not request.parametros.get("data_base"):
             return False, "Data-base não informada"
 
+        if self.obter_data_base(request) is None:
+            return False, f"Data-base inválida: {request.parametros.get('data_base')}"
+
         return True, ""
 
+    @staticmethod
+    def obter_data_base(request) -> Optional[datetime]:
+        """
+        Converte parametros["data_base"] (ISO ou dd/mm/aaaa) em datetime.
+        Retorna None se ausente ou inválida.
+        """
+        valor = (request.parametros or {}).get("data_base")
+        if not valor:
+            return None
+
+        data = pd.to_datetime(valor, dayfirst="/" in str(valor), errors="coerce")
+        if pd.isna(data):
+            return None
+        return data.to_pydatetime().replace(tzinfo=None)
+
     # ==================================================
     # EXECUÇÃO PRINCIPAL
     # ==================================================
-    def executar(self, request: RequestConciliacao) -> dict:
+    def executar(self, request: RequestConciliacao,
+                 progresso: Optional[Callable[[str], None]] = None,
+                 medidor: Optional[MedidorEtapas] = None,
+                 financeiro: Optional[Tuple[pd.DataFrame, pd.DataFrame]] = None) -> dict:
         """
         Retorna dict ao invés de RelatorioConsolidacao para compatibilidade com frontend
+
+        progresso: callback opcional chamado com o nome de cada etapa (ver ETAPAS)
+        assim que ela termina
+        medidor: MedidorEtapas opcional; ao final, medidor.etapas traz duração,
+        linhas e pico de memória de cada etapa
+        financeiro: (df_financeiro_raw, financeiro_norm) já preparados por
+        preparar_financeiro; quando informado, request.base_origem é ignorada
+        (usado pelo lote, que normaliza o financeiro uma vez para várias contas)
+
+        Ao final, self.df_completo guarda a saída de calcular_diferencas
         """
+        medidor = medidor or MedidorEtapas()
+        medidor.iniciar()
+
+        def concluir(etapa: str, linhas_entrada: int, linhas_saida: int):
+            medidor.marcar(etapa, linhas_entrada, linhas_saida)
+            if progresso is not None:
+                progresso(etapa)
+
         logger.info("⚙️ Executando conciliação contábil")
 
         # ==========================
         # 1️⃣ NORMALIZAR FINANCEIRO
         # ==========================
-        df_financeiro_raw = pd.DataFrame(request.base_origem.registros)
-        logger.info(f"📊 Registros origem recebidos: {len(df_financeiro_raw)}")
-        
-        financeiro_norm = normalizar_planilha_financeira(df_financeiro_raw)
-        logger.info(f"✅ Financeiro normalizado: {len(financeiro_norm)} registros")
+        if financeiro is None:
+            financeiro = self.preparar_financeiro(request.base_origem.registros, self.obter_data_base(request))
+        df_financeiro_raw, financeiro_norm = financeiro
+
+        concluir("normalizar_financeiro", len(df_financeiro_raw), len(financeiro_norm))
 
         # ==========================
         # 2️⃣ NORMALIZAR CONTABILIDADE
@@ -58,6 +115,8 @@ class ConciliacaoService:
         contabil_norm = normalizar_planilha_contabilidade(df_contabil_raw)
         logger.info(f"✅ Contabilidade normalizada: {len(contabil_norm)} registros")
 
+        concluir("normalizar_contabilidade", len(df_contabil_raw), len(contabil_norm))
+
         # ==========================
         # 3️⃣ CALCULAR DIFERENÇAS
         # ==========================
@@ -69,6 +128,8 @@ class ConciliacaoService:
 
         resumo_calc = resultado["resumo"]
         df_completo = resultado["df_completo"]
+        # Fica disponível após executar() para quem precisa das linhas (ex.: gravar diferenças)
+        self.df_completo = df_completo
 
         logger.info(f"📈 Resumo calculado: {resumo_calc}")
         
@@ -76,6 +137,8 @@ class ConciliacaoService:
         logger.info(f"🔍 Colunas do df_completo: {df_completo.columns.tolist()}")
         logger.info(f"🔍 Primeiras linhas:\n{df_completo.head()}")
 
+        concluir("calcular_diferencas", len(financeiro_norm) + len(contabil_norm), len(df_completo))
+
         # ==========================
         # 4️⃣ FILTRAR DIFERENÇAS
         # ==========================
@@ -98,36 +161,185 @@ class ConciliacaoService:
         if len(df_contabil_maior) > 0:
             logger.info(f"🔍 Amostra contabil_maior:\n{df_contabil_maior[['Código', 'Cliente', 'Valor Financeiro', 'Valor Contabilidade', 'Diferença']].head()}")
 
+        concluir("filtrar_diferencas", len(df_completo), len(df_origem_maior) + len(df_contabil_maior))
+
         # ==========================
         # 5️⃣ MAPEAR DIFERENÇAS (SCHEMA)
         # ==========================
-        diferencas_origem_maior = []
-        for row_dict in df_origem_maior.to_dict("records"):
-            try:
-                # row_dict é um dicionário com as colunas do DataFrame
-                mapped = map_origem_maior(row_dict)
-                diferencas_origem_maior.append(mapped)
-            except Exception as e:
-                logger.error(f"❌ Erro ao mapear origem_maior: {e}")
-                logger.error(f"   Row problemático: {row_dict}")
-
-        diferencas_contabilidade_maior = []
-        for row_dict in df_contabil_maior.to_dict("records"):
-            try:
-                # row_dict é um dicionário, não um DataFrame
-                mapped = map_contabilidade_maior(
-                    row_dict,  # Passar o dict diretamente
-                    request.base_contabil_filtrada.conta_contabil
-                )
-                diferencas_contabilidade_maior.append(mapped)
-            except Exception as e:
-                logger.error(f"❌ Erro ao mapear contabil_maior: {e}")
-                logger.error(f"   Row problemático: {row_dict}")
+        mapeamento = montar_diferencas(
+            df_origem_maior,
+            df_contabil_maior,
+            request.base_contabil_filtrada.conta_contabil
+        )
+        diferencas_origem_maior = mapeamento["diferencas_origem_maior"]
+        diferencas_contabilidade_maior = mapeamento["diferencas_contabilidade_maior"]
+        erros_mapeamento = mapeamento["erros"]
+
+        if erros_mapeamento:
+            logger.warning(f"⚠️ {len(erros_mapeamento)} registros não mapeados. Exemplos: {erros_mapeamento[:5]}")
 
         logger.info(f"✅ Mapeados: {len(diferencas_origem_maior)} origem_maior, {len(diferencas_contabilidade_maior)} contabil_maior")
 
+        concluir(
+            "mapear_diferencas",
+            len(df_origem_maior) + len(df_contabil_maior),
+            len(diferencas_origem_maior) + len(diferencas_contabilidade_maior)
+        )
+
         # ==========================
-        # 6️⃣ RESUMO (FORMATO FRONTEND)
+        # 6️⃣ BUSCAR NO RAZÃO GERAL
+        # ==========================
+        # O valor que falta na conta conciliada pode ter sido lançado em outra conta
+        encontrados = self.buscar_razao_geral(request, diferencas_origem_maior)
+
+        concluir("buscar_razao_geral", len(request.base_contabil_geral.registros), encontrados)
+
+        # ==========================
+        # 7️⃣ PAREAR EXCLUSIVOS POR NOME (OPCIONAL)
+        # ==========================
+        # Só Financeiro x Só Contabilidade com nomes parecidos: código em outro formato
+        parametros = request.parametros or {}
+        pares_sugeridos = None
+        if parametros.get("pareamento_nomes"):
+            pares = propor_pares_por_nome(
+                df_completo,
+                limiar=float(parametros.get("limiar_similaridade") or LIMIAR_SIMILARIDADE)
+            )
+            pares_sugeridos = pares.to_dict(orient="records")
+
+        concluir("parear_nomes", len(df_completo), len(pares_sugeridos or []))
+
+        # ==========================
+        # 8️⃣ COMBINAÇÕES DE VALORES (OPCIONAL)
+        # ==========================
+        combinacoes = None
+        if parametros.get("combinacao_valores"):
+            combinacoes = self.combinar_valores(
+                request, df_financeiro_raw, df_contabil_raw, df_completo, pares_sugeridos
+            )
+
+        concluir("combinar_valores", len(df_completo), len(combinacoes["grupos"]) if combinacoes else 0)
+
+        retorno = self.montar_retorno(
+            resumo_calc,
+            diferencas_origem_maior,
+            diferencas_contabilidade_maior,
+            erros_mapeamento
+        )
+        if combinacoes is not None:
+            retorno["combinacoes"] = combinacoes
+            retorno["observacoes"].append(
+                f"{len(combinacoes['grupos'])} grupos de valores que somam um lançamento/título"
+            )
+            if combinacoes["esgotado"]:
+                retorno["alertas"].append(
+                    f"⚠️ Busca de combinações interrompida: {combinacoes['codigos_pendentes']} códigos não examinados"
+                )
+            if combinacoes["codigos_truncados"]:
+                retorno["alertas"].append(
+                    f"⚠️ Busca de combinações incompleta em {len(combinacoes['codigos_truncados'])} códigos: "
+                    f"muitos valores, só os mais próximos de cada alvo foram combinados"
+                )
+        if pares_sugeridos is not None:
+            retorno["pares_sugeridos"] = pares_sugeridos
+            retorno["observacoes"].append(
+                f"{len(pares_sugeridos)} pares de códigos sugeridos pelo nome do cliente"
+            )
+
+        concluir("resumo", len(df_completo), len(diferencas_origem_maior) + len(diferencas_contabilidade_maior))
+        medidor.finalizar()
+
+        logger.info("✅ Conciliação executada com sucesso")
+        logger.info(f"📦 Retorno final com {len(diferencas_origem_maior)} origem_maior e {len(diferencas_contabilidade_maior)} contabil_maior")
+        
+        return retorno
+
+    @staticmethod
+    def preparar_financeiro(registros: list, data_base: Optional[datetime]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """(df_financeiro_raw, financeiro_norm) a partir de base_origem.registros"""
+        df_financeiro_raw = pd.DataFrame(registros)
+        logger.info(f"📊 Registros origem recebidos: {len(df_financeiro_raw)}")
+
+        # Vencimentos são calculados contra a data-base, não contra "agora",
+        # para que a mesma requisição gere sempre o mesmo resultado
+        financeiro_norm = normalizar_planilha_financeira(df_financeiro_raw, data_base=data_base)
+        logger.info(f"✅ Financeiro normalizado: {len(financeiro_norm)} registros")
+        return df_financeiro_raw, financeiro_norm
+
+    @staticmethod
+    def buscar_razao_geral(request: RequestConciliacao, diferencas_origem_maior: list) -> int:
+        """
+        Preenche encontrado_lancamentos / conta_contabil_encontrada / criterio_match /
+        confianca_match das diferenças origem_maior a partir de base_contabil_geral.
+        Retorna quantas foram encontradas em outra conta.
+        """
+        if not diferencas_origem_maior:
+            return 0
+
+        try:
+            indice = IndiceRazaoGeral.de_registros(
+                request.base_contabil_geral.registros,
+                request.base_contabil_filtrada.conta_contabil
+            )
+        except ValueError as e:
+            # Layout desconhecido no razão geral não impede a conciliação
+            logger.warning(f"⚠️ Razão geral ignorado: {e}")
+            return 0
+        if indice is None:
+            return 0
+
+        encontrados = indice.preencher_diferencas(diferencas_origem_maior)
+        logger.info(f"🔎 Razão geral: {encontrados} de {len(diferencas_origem_maior)} diferenças encontradas em outras contas")
+        return encontrados
+
+    def combinar_valores(self, request: RequestConciliacao, df_financeiro_raw: pd.DataFrame,
+                         df_contabil_raw: pd.DataFrame, df_completo: pd.DataFrame,
+                         pares_sugeridos: Optional[list] = None) -> dict:
+        """
+        Busca grupos de títulos que somam um lançamento (e o contrário) nos
+        códigos com diferença. Pares sugeridos pelo nome juntam os dois códigos.
+        """
+        parametros = request.parametros or {}
+
+        titulos = normalizar_titulos_financeiro(df_financeiro_raw, self.obter_data_base(request))
+        lancamentos = normalizar_lancamentos_contabilidade(df_contabil_raw)
+
+        com_diferenca = (
+            (df_completo["Origem"] == "Ambos")
+            & (df_completo["Diferença Absoluta"] > TOLERANCIA_DIFERENCA)
+        )
+        codigos = df_completo.loc[com_diferenca, "Código"].tolist()
+
+        if pares_sugeridos:
+            de_para = {par["codigo_contabilidade"]: par["codigo_financeiro"] for par in pares_sugeridos}
+            lancamentos = lancamentos.assign(codigo=lancamentos["codigo"].replace(de_para))
+            codigos += list(de_para.values())
+
+        orcamento = OrcamentoBusca(segundos=float(parametros.get("tempo_combinacao") or TEMPO_MAXIMO_SEGUNDOS))
+        # Tolerância 0 é válida (só somas exatas): None é que cai no padrão
+        tolerancia = parametros.get("tolerancia_combinacao")
+        tolerancia = 0.01 if tolerancia is None else max(float(tolerancia), 0.0)
+        # max_itens acima de LIMITE_ITENS_COMBINACAO é limitado em buscar_combinacoes
+        return buscar_combinacoes(
+            titulos,
+            lancamentos,
+            codigos,
+            tolerancia_centavos=int(round(tolerancia * 100)),
+            max_itens=int(parametros.get("max_itens_combinacao") or MAX_ITENS_COMBINACAO),
+            orcamento=orcamento
+        )
+
+    # ==================================================
+    # RESUMO E RETORNO (FORMATO FRONTEND)
+    # ==================================================
+    def montar_retorno(self, resumo_calc: dict, diferencas_origem_maior: list,
+                       diferencas_contabilidade_maior: list, erros_mapeamento: list) -> dict:
+        """
+        Monta o dict final (resumo + listas + observações/alertas) a partir do
+        resumo de calcular_diferencas e das listas já mapeadas
+        """
+        # ==========================
+        # 9️⃣ RESUMO (FORMATO FRONTEND)
         # ==========================
         total_origem = float(resumo_calc.get("valor_total_financeiro", 0))
         total_destino = float(resumo_calc.get("valor_total_contabilidade", 0))
@@ -154,7 +366,7 @@ class ConciliacaoService:
         logger.info(f"✅ Resumo final: {resumo}")
 
         # ==========================
-        # 7️⃣ RETORNO FINAL (DICT)
+        # 🔟 RETORNO FINAL (DICT)
         # ==========================
         retorno = {
             "resumo": resumo,
@@ -170,7 +382,9 @@ class ConciliacaoService:
             ]
         }
 
-        logger.info("✅ Conciliação executada com sucesso")
-        logger.info(f"📦 Retorno final com {len(diferencas_origem_maior)} origem_maior e {len(diferencas_contabilidade_maior)} contabil_maior")
-        
-        return retorno
\ No newline at end of file
+        if erros_mapeamento:
+            retorno["alertas"].append(
+                f"⚠️ {len(erros_mapeamento)} registros ignorados por valor inválido"
+            )
+
+        return retorno
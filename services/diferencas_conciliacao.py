@@ -0,0 +1,120 @@
+# services/diferencas_conciliacao.py
+"""
+Diferenças por cliente gravadas no banco (concilia.diferencas_conciliacao).
+
+gravar_diferencas substitui as diferenças de uma conciliação pelas do
+último processamento, carregando em bloco (COPY quando o driver permite);
+listar_diferencas pagina por cursor na ordem (diferenca_abs desc, id desc):
+a ordem inversa dos índices (conciliacao_id, [tipo_diferenca,] diferenca_abs, id),
+percorridos de trás para frente a partir da posição do cursor (comparação
+de tupla, sem OR).
+"""
+import io
+import logging
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Optional
+
+import pandas as pd
+from sqlalchemy import func, text, tuple_
+from sqlalchemy.orm import Session
+
+from models.diferencaconciliacao import DiferencaConciliacao
+from services.paginacao import decodificar_cursor, montar_pagina, LIMITE_PADRAO
+from tools.mappers import COLUNAS_DIFERENCAS
+
+logger = logging.getLogger(__name__)
+
+TABELA = f"{DiferencaConciliacao.__table__.schema}.{DiferencaConciliacao.__tablename__}"
+
+
+def gravar_diferencas(db: Session, conciliacao_id: int, diferencas: pd.DataFrame) -> int:
+    """
+    Substitui as diferenças da conciliação pelas de `diferencas`
+    (tools.mappers.tabela_diferencas). Não faz commit: o chamador grava
+    junto com o status da conciliação.
+    """
+    db.execute(text(f"DELETE FROM {TABELA} WHERE conciliacao_id = :id"), {"id": conciliacao_id})
+    if diferencas.empty:
+        return 0
+
+    colunas = ["conciliacao_id"] + COLUNAS_DIFERENCAS
+    dados = diferencas[COLUNAS_DIFERENCAS].assign(conciliacao_id=conciliacao_id)[colunas]
+
+    cursor = db.connection().connection.cursor()
+    try:
+        if hasattr(cursor, "copy_expert"):
+            # psycopg2: COPY ... FROM STDIN em CSV (campo vazio sem aspas = NULL)
+            buffer = io.StringIO()
+            dados.to_csv(buffer, index=False, header=False)
+            buffer.seek(0)
+            cursor.copy_expert(f"COPY {TABELA} ({', '.join(colunas)}) FROM STDIN WITH (FORMAT csv)", buffer)
+            return len(dados)
+    finally:
+        cursor.close()
+
+    # Outros drivers: INSERT em lote
+    db.execute(
+        text(f"INSERT INTO {TABELA} ({', '.join(colunas)}) VALUES ({', '.join(':' + c for c in colunas)})"),
+        dados.astype(object).where(dados.notna(), None).to_dict(orient="records")
+    )
+    return len(dados)
+
+
+def listar_diferencas(db: Session, conciliacao_id: int, tipo_diferenca: Optional[str] = None,
+                      origem: Optional[str] = None, codigo: Optional[str] = None,
+                      diferenca_minima: Optional[float] = None, cursor: Optional[str] = None,
+                      limite: int = LIMITE_PADRAO) -> Dict:
+    """
+    Página de diferenças da conciliação, da maior diferença absoluta para a
+    menor. Devolve {"itens", "proximo_cursor"}; ValueError se o cursor é inválido.
+    """
+    query = db.query(DiferencaConciliacao).filter(DiferencaConciliacao.conciliacao_id == conciliacao_id)
+
+    if tipo_diferenca:
+        query = query.filter(DiferencaConciliacao.tipo_diferenca == tipo_diferenca)
+    if origem:
+        query = query.filter(DiferencaConciliacao.origem == origem)
+    if codigo:
+        query = query.filter(DiferencaConciliacao.codigo == codigo.strip())
+    if diferenca_minima is not None:
+        query = query.filter(DiferencaConciliacao.diferenca_abs >= diferenca_minima)
+
+    posicao = decodificar_cursor(cursor, 2)
+    if posicao is not None:
+        try:
+            ultimo_abs, ultimo_id = Decimal(posicao[0]), int(posicao[1])
+        except (InvalidOperation, TypeError, ValueError):
+            raise ValueError("Cursor inválido")
+        # As duas colunas na mesma direção: o índice vai direto à posição do cursor
+        query = query.filter(
+            tuple_(DiferencaConciliacao.diferenca_abs, DiferencaConciliacao.id) < tuple_(ultimo_abs, ultimo_id)
+        )
+
+    itens = (
+        query.order_by(DiferencaConciliacao.diferenca_abs.desc(), DiferencaConciliacao.id.desc())
+        .limit(limite + 1)
+        .all()
+    )
+    return montar_pagina(itens, limite, lambda item: [item.diferenca_abs, item.id])
+
+
+def resumir_diferencas(db: Session, conciliacao_id: int) -> Dict:
+    """Quantidade e soma das diferenças por tipo (pelo índice, sem carregar as linhas)."""
+    linhas = (
+        db.query(
+            DiferencaConciliacao.tipo_diferenca,
+            func.count(DiferencaConciliacao.id),
+            func.sum(DiferencaConciliacao.diferenca),
+        )
+        .filter(DiferencaConciliacao.conciliacao_id == conciliacao_id)
+        .group_by(DiferencaConciliacao.tipo_diferenca)
+        .all()
+    )
+    return {
+        "conciliacao_id": conciliacao_id,
+        "por_tipo": [
+            {"tipo_diferenca": tipo, "quantidade": quantidade, "diferenca_total": float(total or 0)}
+            for tipo, quantidade, total in linhas
+        ],
+        "total": sum(quantidade for _, quantidade, _ in linhas),
+    }
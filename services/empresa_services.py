@@ -3,7 +3,9 @@ from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException
 from models.empresa import Empresa
 from schemas.empresa_schema import EmpresaCreate, EmpresaUpdate
+from services.paginacao import paginar, estimar_total, LIMITE_PADRAO
 from datetime import datetime, timezone
+from typing import Optional
 
 
 
@@ -36,8 +38,13 @@ def criar_empresa(db: Session, emp: EmpresaCreate):
     return nova_empresa
 
 
-def listar_empresas(db: Session):
-    return db.query(Empresa).all()
+def listar_empresas(db: Session, cursor: Optional[str] = None, limit: int = LIMITE_PADRAO,
+                    estimar: bool = False) -> dict:
+    """Página de empresas por id (keyset); total_estimado só se `estimar`."""
+    query = db.query(Empresa)
+    pagina = paginar(query, (Empresa.id,), cursor, limit)
+    pagina["total_estimado"] = estimar_total(query) if estimar else None
+    return pagina
 
 
 def obter_empresa(db: Session, empresa_id: int):
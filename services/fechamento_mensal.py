@@ -0,0 +1,377 @@
+# services/fechamento_mensal.py
+"""
+Fechamento mensal: concilia, num período, todas as contas conciliáveis de
+todas as empresas ativas.
+
+Para cada empresa, os arquivos enviados no período (ArquivoConciliacao das
+conciliações do período) são identificados pelo cabeçalho:
+
+- balancete (Codigo | Descricao | Saldo atual): base contábil da conta
+  da conciliação a que o arquivo pertence;
+- planilha financeira (cliente | valor | vencimento): base de origem,
+  compartilhada por todas as contas da empresa.
+
+O financeiro é lido e normalizado uma vez por empresa; cada conta roda num
+pool de processos próprio do fechamento (FECHAMENTO_WORKERS, padrão: o mesmo
+de CONCILIACAO_WORKERS), lendo o próprio balancete, para que um fechamento
+não deixe POST /contabil e os jobs na fila. As contas de todas as empresas
+são enviadas ao pool antes de coletar qualquer resultado, então os processos
+não ficam ociosos esperando a última conta de cada empresa. O resultado de
+cada conta é gravado na hora (saldo, status da Conciliacao e as diferenças
+por cliente, em concilia.diferencas_conciliacao), então um fechamento
+interrompido é retomado a partir das contas ainda não concluídas.
+
+Uso pela linha de comando:
+    python -m services.fechamento_mensal --periodo 2025-01 [--reprocessar]
+"""
+import argparse
+import calendar
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import as_completed
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Dict, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from db import SessionLocal
+from models.arquivoconciliacao import ArquivoConciliacao
+from models.conciliacao import Conciliacao
+from models.empresa import Empresa
+from models.planodecontas import PlanoDeContas
+from services.conciliacao_jobs import (
+    CONCILIACAO_WORKERS, PoolProcessos, CONCLUIDO, ERRO, PENDENTE, PROCESSANDO
+)
+from services.conciliacao_lote import executar_conta_arquivo
+from services.diferencas_conciliacao import gravar_diferencas
+from services.metricas import metricas_conciliacao
+from tools.colunar import ler_previa
+from tools.contabilidade import mapear_colunas_contabilidade
+from tools.financeiro import colunas_planilha_financeira, normalizar_planilha_financeira
+from tools.leitura import ler_planilha
+
+logger = logging.getLogger(__name__)
+
+BALANCETE = "balancete"
+FINANCEIRO = "financeiro"
+
+FECHAMENTO_WORKERS = int(os.getenv("FECHAMENTO_WORKERS", CONCILIACAO_WORKERS))
+
+# Separado do pool da conciliação: as centenas de contas do fechamento não
+# entram na frente das requisições
+pool_fechamento = PoolProcessos("fechamento", FECHAMENTO_WORKERS)
+
+# Fechamentos em andamento/terminados neste processo (para o endpoint admin)
+_fechamentos: Dict[str, Dict] = {}
+_lock = threading.Lock()
+
+
+def data_base_do_periodo(periodo: str) -> datetime:
+    """Último dia do mês do período ("2025-01" ou "01/2025")."""
+    texto = str(periodo).strip()
+    try:
+        if "/" in texto:
+            mes, ano = texto.split("/")
+        else:
+            ano, mes = texto.split("-")
+        ano, mes = int(ano), int(mes)
+        return datetime(ano, mes, calendar.monthrange(ano, mes)[1])
+    except ValueError:
+        raise ValueError(f"Período inválido: {periodo} (use AAAA-MM ou MM/AAAA)")
+
+
+def classificar_arquivo(caminho: str) -> Optional[str]:
+    """BALANCETE, FINANCEIRO ou None, pelo cabeçalho da planilha."""
+    try:
+        colunas = ler_previa(caminho, linhas=1)["colunas"]
+    except Exception as e:
+        logger.warning(f"⚠️ Arquivo ilegível ignorado no fechamento: {caminho} ({e})")
+        return None
+
+    try:
+        mapear_colunas_contabilidade(colunas)
+        return BALANCETE
+    except ValueError:
+        pass
+
+    try:
+        colunas_planilha_financeira(colunas)
+        return FINANCEIRO
+    except ValueError:
+        return None
+
+
+def _arquivos_da_empresa(db: Session, empresa_id: int, periodo: str) -> Dict:
+    """
+    Financeiro (o mais recente) e balancete mais recente por conta_contabil_id,
+    entre os arquivos das conciliações da empresa no período.
+    """
+    arquivos = (
+        db.query(ArquivoConciliacao.caminho_arquivo, Conciliacao.conta_contabil_id)
+        .join(Conciliacao, ArquivoConciliacao.conciliacao_id == Conciliacao.id)
+        .filter(Conciliacao.empresa_id == empresa_id, Conciliacao.periodo == periodo)
+        .order_by(ArquivoConciliacao.id.desc())
+        .all()
+    )
+
+    financeiro = None
+    balancetes: Dict[int, str] = {}
+    for caminho, conta_id in arquivos:
+        tipo = classificar_arquivo(caminho)
+        if tipo == FINANCEIRO and financeiro is None:
+            financeiro = caminho
+        elif tipo == BALANCETE:
+            balancetes.setdefault(conta_id, caminho)
+
+    return {"financeiro": financeiro, "balancetes": balancetes}
+
+
+def _gravar(db: Session, conciliacao_id: int, status: str, saldo: Optional[float] = None):
+    """Grava status (e saldo) da conciliação e confirma na hora."""
+    if conciliacao_id is None:
+        return
+    conciliacao = db.get(Conciliacao, conciliacao_id)
+    conciliacao.status = status
+    if saldo is not None:
+        conciliacao.saldo = Decimal(str(round(saldo, 2)))
+    db.commit()
+
+
+def fechar_periodo(periodo: str, reprocessar: bool = False) -> Dict:
+    """
+    Concilia todas as contas conciliáveis das empresas ativas no período.
+
+    reprocessar: refaz também as contas já concluídas (padrão: retoma só as
+    pendentes e as que deram erro)
+
+    Retorna o resumo do fechamento, com a vazão em contas por minuto.
+    """
+    data_base = data_base_do_periodo(periodo)
+    inicio = time.monotonic()
+
+    resumo = {
+        "periodo": periodo,
+        "empresas": 0,
+        "contas_conciliaveis": 0,
+        "contas_processadas": 0,
+        "contas_ja_concluidas": 0,
+        "contas_sem_arquivo": 0,
+        "contas_com_erro": 0,
+        "sem_arquivo": [],
+        "erros": [],
+    }
+
+    db = SessionLocal()
+    try:
+        empresas = db.query(Empresa.id).filter(Empresa.status.is_(True)).order_by(Empresa.id).all()
+        resumo["empresas"] = len(empresas)
+        logger.info(f"🗓️ Fechamento {periodo}: {len(empresas)} empresas ativas")
+
+        # Todas as empresas no pool primeiro; a coleta é uma só
+        futures = {}
+        for (empresa_id,) in empresas:
+            _submeter_empresa(db, empresa_id, periodo, data_base, reprocessar, resumo, futures)
+        _coletar(db, futures, resumo)
+    finally:
+        db.close()
+
+    segundos = time.monotonic() - inicio
+    resumo["segundos"] = round(segundos, 2)
+    resumo["contas_por_minuto"] = round(resumo["contas_processadas"] / segundos * 60, 2) if segundos else 0.0
+
+    logger.info(
+        f"✅ Fechamento {periodo}: {resumo['contas_processadas']} contas em {resumo['segundos']}s "
+        f"({resumo['contas_por_minuto']} contas/min), {resumo['contas_ja_concluidas']} já concluídas, "
+        f"{resumo['contas_sem_arquivo']} sem arquivo, {resumo['contas_com_erro']} com erro"
+    )
+    return resumo
+
+
+def _submeter_empresa(db: Session, empresa_id: int, periodo: str, data_base: datetime,
+                      reprocessar: bool, resumo: Dict, futures: Dict):
+    """
+    Envia ao pool as contas pendentes de uma empresa, acumulando em `futures`
+    {future: (empresa_id, conta_contabil, conciliacao_id)}.
+    """
+    contas = (
+        db.query(PlanoDeContas.id, PlanoDeContas.conta_contabil, Conciliacao.id, Conciliacao.status)
+        .outerjoin(Conciliacao, (Conciliacao.conta_contabil_id == PlanoDeContas.id)
+                   & (Conciliacao.periodo == periodo))
+        .filter(PlanoDeContas.empresa_id == empresa_id, PlanoDeContas.conciliavel.is_(True))
+        .order_by(PlanoDeContas.conta_contabil, Conciliacao.id.desc())
+        .all()
+    )
+    # Uma conciliação por conta (a mais recente, se houver mais de uma no período)
+    por_conta = {}
+    for conta_id, conta_contabil, conciliacao_id, status in contas:
+        por_conta.setdefault(conta_id, (conta_contabil, conciliacao_id, status))
+    resumo["contas_conciliaveis"] += len(por_conta)
+
+    pendentes = []
+    for conta_id, (conta_contabil, conciliacao_id, status) in por_conta.items():
+        if status == CONCLUIDO and not reprocessar:
+            resumo["contas_ja_concluidas"] += 1
+        else:
+            pendentes.append((conta_id, conta_contabil, conciliacao_id))
+    if not pendentes:
+        return
+
+    arquivos = _arquivos_da_empresa(db, empresa_id, periodo)
+
+    def sem_arquivo(conta_contabil: str, motivo: str):
+        resumo["contas_sem_arquivo"] += 1
+        resumo["sem_arquivo"].append({"empresa_id": empresa_id, "conta_contabil": conta_contabil, "motivo": motivo})
+
+    if arquivos["financeiro"] is None:
+        for _, conta_contabil, _ in pendentes:
+            sem_arquivo(conta_contabil, "planilha financeira não enviada no período")
+        return
+
+    # ==========================
+    # 1️⃣ FINANCEIRO (UMA VEZ POR EMPRESA)
+    # ==========================
+    try:
+        df_financeiro_raw = ler_planilha(arquivos["financeiro"], colunas=colunas_planilha_financeira)
+        financeiro_norm = normalizar_planilha_financeira(df_financeiro_raw, data_base=data_base)
+    except Exception as e:
+        logger.error(f"❌ Empresa {empresa_id}: financeiro inválido ({e})")
+        for _, conta_contabil, conciliacao_id in pendentes:
+            _registrar_erro(db, resumo, empresa_id, conta_contabil, conciliacao_id, f"Financeiro inválido: {e}")
+        return
+    financeiro = (df_financeiro_raw, financeiro_norm)
+
+    # ==========================
+    # 2️⃣ CONTAS NO POOL
+    # ==========================
+    parametros = {"data_base": data_base.date().isoformat(), "empresa_id": empresa_id}
+    enviadas = 0
+    for conta_id, conta_contabil, conciliacao_id in pendentes:
+        caminho = arquivos["balancetes"].get(conta_id)
+        if caminho is None:
+            sem_arquivo(conta_contabil, "balancete não enviado no período")
+            continue
+        _gravar(db, conciliacao_id, PROCESSANDO)
+        future = pool_fechamento.submeter(
+            executar_conta_arquivo, caminho, conta_contabil, parametros, financeiro
+        )
+        futures[future] = (empresa_id, conta_contabil, conciliacao_id)
+        enviadas += 1
+
+    logger.info(f"🏢 Empresa {empresa_id}: {enviadas} contas enviadas ao pool no período {periodo}")
+
+
+def _coletar(db: Session, futures: Dict, resumo: Dict):
+    """Grava o resultado de cada conta à medida que termina, de qualquer empresa."""
+    for future in as_completed(futures):
+        empresa_id, conta_contabil, conciliacao_id = futures[future]
+        try:
+            resultado, etapas, diferencas = future.result()
+            # Diferenças e status no mesmo commit: concluída só com as diferenças gravadas
+            gravar_diferencas(db, conciliacao_id, diferencas)
+        except Exception as e:
+            db.rollback()
+            _registrar_erro(db, resumo, empresa_id, conta_contabil, conciliacao_id, str(e))
+            continue
+
+        # Linhas de entrada: financeiro + balancete (as duas primeiras etapas)
+        metricas_conciliacao.registrar(etapas, empresa_id, sum(m["linhas_entrada"] or 0 for m in etapas[:2]))
+        _gravar(db, conciliacao_id, CONCLUIDO, resultado["resumo"]["total_destino"])
+        resumo["contas_processadas"] += 1
+
+
+def _registrar_erro(db: Session, resumo: Dict, empresa_id: int, conta_contabil: str,
+                    conciliacao_id: int, erro: str):
+    logger.error(f"❌ Fechamento: empresa {empresa_id}, conta {conta_contabil}: {erro}")
+    _gravar(db, conciliacao_id, ERRO)
+    resumo["contas_com_erro"] += 1
+    resumo["erros"].append({"empresa_id": empresa_id, "conta_contabil": conta_contabil, "erro": erro})
+
+
+# ============================================================
+# EXECUÇÃO EM SEGUNDO PLANO (ENDPOINT ADMIN)
+# ============================================================
+
+def iniciar_fechamento(periodo: str, reprocessar: bool = False) -> bool:
+    """
+    Dispara fechar_periodo numa thread. False se já há um fechamento do
+    período em andamento neste processo.
+    """
+    data_base_do_periodo(periodo)
+
+    with _lock:
+        atual = _fechamentos.get(periodo)
+        if atual is not None and atual["status"] == PROCESSANDO:
+            return False
+        _fechamentos[periodo] = {
+            "status": PROCESSANDO,
+            "iniciado_em": datetime.now(timezone.utc).isoformat(),
+            "finalizado_em": None,
+            "resumo": None,
+            "erro": None,
+        }
+
+    def executar():
+        try:
+            resumo, status, erro = fechar_periodo(periodo, reprocessar), CONCLUIDO, None
+        except Exception as e:
+            logger.error(f"❌ Fechamento {periodo} falhou: {e}", exc_info=True)
+            resumo, status, erro = None, ERRO, str(e)
+        with _lock:
+            _fechamentos[periodo].update({
+                "status": status,
+                "resumo": resumo,
+                "erro": erro,
+                "finalizado_em": datetime.now(timezone.utc).isoformat(),
+            })
+
+    threading.Thread(target=executar, name=f"fechamento-{periodo}", daemon=True).start()
+    return True
+
+
+def situacao_fechamento(db: Session, periodo: str) -> Dict:
+    """
+    Contas conciliáveis das empresas ativas por status da conciliação no
+    período (lido do banco), e o último fechamento disparado neste processo.
+    """
+    contagem = dict(
+        db.query(func.coalesce(Conciliacao.status, PENDENTE), func.count(PlanoDeContas.id))
+        .join(Empresa, Empresa.id == PlanoDeContas.empresa_id)
+        .outerjoin(Conciliacao, (Conciliacao.conta_contabil_id == PlanoDeContas.id)
+                   & (Conciliacao.periodo == periodo))
+        .filter(Empresa.status.is_(True), PlanoDeContas.conciliavel.is_(True))
+        .group_by(func.coalesce(Conciliacao.status, PENDENTE))
+        .all()
+    )
+    with _lock:
+        execucao = dict(_fechamentos[periodo]) if periodo in _fechamentos else None
+
+    return {
+        "periodo": periodo,
+        "contas_por_status": contagem,
+        "execucao": execucao,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--periodo", required=True, help="período do fechamento (AAAA-MM ou MM/AAAA)")
+    parser.add_argument("--reprocessar", action="store_true",
+                        help="refaz também as contas já concluídas no período")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    try:
+        resumo = fechar_periodo(args.periodo, args.reprocessar)
+    finally:
+        pool_fechamento.encerrar()
+
+    print(json.dumps(resumo, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# services/hierarquia_plano.py
+"""
+Cache por empresa do índice de hierarquia do plano de contas (tools.hierarquia).
+
+O índice é montado na primeira consulta e descartado por invalidar_indice
+(chamado em criar/atualizar/deletar/importar conta). Como cada worker do
+uvicorn tem o seu cache, toda consulta também confere uma assinatura barata
+do plano no banco (quantidade, maior id e maior updated_at): se outro worker
+alterou o plano, o índice é remontado.
+"""
+import logging
+import threading
+from typing import Dict, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models.planodecontas import PlanoDeContas
+from tools.hierarquia import IndiceHierarquia
+
+logger = logging.getLogger(__name__)
+
+_indices: Dict[int, Tuple[tuple, IndiceHierarquia]] = {}
+_lock = threading.Lock()
+
+
+def assinatura_plano(db: Session, empresa_id: int) -> tuple:
+    """(quantidade, maior id, maior updated_at) das contas da empresa."""
+    quantidade, maior_id, atualizado = db.query(
+        func.count(PlanoDeContas.id),
+        func.max(PlanoDeContas.id),
+        func.max(PlanoDeContas.updated_at),
+    ).filter(PlanoDeContas.empresa_id == empresa_id).one()
+    return quantidade, maior_id, atualizado
+
+
+def obter_indice(db: Session, empresa_id: int) -> IndiceHierarquia:
+    """Índice da empresa, do cache ou montado a partir do banco."""
+    assinatura = assinatura_plano(db, empresa_id)
+
+    with _lock:
+        em_cache = _indices.get(empresa_id)
+    if em_cache is not None and em_cache[0] == assinatura:
+        return em_cache[1]
+
+    contas = db.query(
+        PlanoDeContas.id,
+        PlanoDeContas.conta_contabil,
+        PlanoDeContas.conta_superior,
+        PlanoDeContas.tipo_conta,
+        PlanoDeContas.conciliavel,
+        PlanoDeContas.descricao,
+    ).filter(PlanoDeContas.empresa_id == empresa_id).all()
+
+    indice = IndiceHierarquia(contas)
+    if indice.ciclos_quebrados:
+        logger.warning(
+            f"⚠️ Plano de contas da empresa {empresa_id}: {indice.ciclos_quebrados} "
+            f"ciclo(s) em conta_superior foram quebrados no índice"
+        )
+
+    with _lock:
+        _indices[empresa_id] = (assinatura, indice)
+
+    logger.info(f"🌳 Índice de hierarquia montado: empresa {empresa_id}, {len(indice)} contas")
+    return indice
+
+
+def invalidar_indice(empresa_id: int):
+    """Descarta o índice da empresa (o próximo acesso remonta)."""
+    with _lock:
+        _indices.pop(empresa_id, None)
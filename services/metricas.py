@@ -0,0 +1,245 @@
+# services/metricas.py
+"""
+Instrumentação das etapas da conciliação.
+
+- MedidorEtapas: cronometra cada etapa de ConciliacaoService.executar
+  (duração, linhas de entrada/saída e variação de memória). Roda dentro do
+  worker e devolve uma lista de dicts serializáveis.
+- formatar_server_timing: monta o cabeçalho HTTP Server-Timing.
+- RegistroMetricas: histogramas em memória no processo da API, exportados
+  no formato texto do Prometheus em GET /metrics, e o maior pico de RSS
+  informado pelos workers (gauge).
+
+Configuração via ambiente:
+    CONCILIACAO_METRICAS_TRACEMALLOC=1  mede também o pico alocado pelo
+                                        Python em cada etapa (mais lento)
+"""
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# ============================================================
+# CONFIGURAÇÃO (via ambiente)
+# ============================================================
+
+METRICAS_TRACEMALLOC = os.getenv("CONCILIACAO_METRICAS_TRACEMALLOC", "0") == "1"
+
+BUCKETS_SEGUNDOS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+BUCKETS_LINHAS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+BUCKETS_BYTES = tuple(mb * 1024 ** 2 for mb in (1, 8, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192))
+
+# Faixas de tamanho da entrada (rótulo de baixa cardinalidade)
+FAIXAS_LINHAS = ((10_000, "ate_10k"), (100_000, "ate_100k"), (1_000_000, "ate_1m"))
+
+
+def faixa_linhas(linhas: int) -> str:
+    for limite, rotulo in FAIXAS_LINHAS:
+        if linhas <= limite:
+            return rotulo
+    return "acima_1m"
+
+
+def _pico_rss_bytes() -> int:
+    """Maior RSS do processo até agora (ru_maxrss é KB no Linux e bytes no macOS)."""
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico if sys.platform == "darwin" else pico * 1024
+
+
+def _rss_atual_bytes() -> Optional[int]:
+    """RSS atual do processo (/proc, só Linux); None onde não há."""
+    try:
+        with open("/proc/self/statm") as arquivo:
+            return int(arquivo.read().split()[1]) * resource.getpagesize()
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+# ============================================================
+# MEDIÇÃO POR ETAPA
+# ============================================================
+
+class MedidorEtapas:
+    """
+    Cronômetro de voltas: cada chamada a `marcar` fecha a etapa que vinha
+    correndo desde a marca anterior (ou desde `iniciar`).
+
+    memoria_delta_bytes é quanto o RSS do processo mudou na etapa (negativo
+    se ela liberou memória; None fora do Linux); com tracemalloc ligado,
+    alocado_pico_bytes é o pico alocado dentro da etapa. memoria_pico_bytes
+    é o pico de RSS da vida inteira do worker, não da etapa: serve para o
+    gauge de RegistroMetricas, não para comparar etapas.
+    """
+
+    def __init__(self, usar_tracemalloc: bool = METRICAS_TRACEMALLOC):
+        self.usar_tracemalloc = usar_tracemalloc
+        self.etapas: List[Dict] = []
+        self._inicio: Optional[float] = None
+        self._rss_inicio: Optional[int] = None
+        self._tracemalloc_proprio = False
+
+    def iniciar(self):
+        self.etapas = []
+        if self.usar_tracemalloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracemalloc_proprio = True
+        self._rss_inicio = _rss_atual_bytes()
+        self._inicio = time.perf_counter()
+
+    def marcar(self, etapa: str, linhas_entrada: Optional[int] = None,
+               linhas_saida: Optional[int] = None):
+        agora = time.perf_counter()
+        if self._inicio is None:
+            self._inicio = agora
+        rss = _rss_atual_bytes()
+        if self._rss_inicio is None:
+            self._rss_inicio = rss
+
+        medicao = {
+            "etapa": etapa,
+            "segundos": agora - self._inicio,
+            "linhas_entrada": linhas_entrada,
+            "linhas_saida": linhas_saida,
+            "memoria_delta_bytes": None if rss is None else rss - self._rss_inicio,
+            "memoria_pico_bytes": _pico_rss_bytes(),
+        }
+
+        if self.usar_tracemalloc and tracemalloc.is_tracing():
+            medicao["alocado_pico_bytes"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.reset_peak()
+
+        self.etapas.append(medicao)
+        self._rss_inicio = rss
+        self._inicio = time.perf_counter()
+
+    def finalizar(self) -> List[Dict]:
+        if self._tracemalloc_proprio:
+            tracemalloc.stop()
+            self._tracemalloc_proprio = False
+        return self.etapas
+
+
+def formatar_server_timing(etapas: Iterable[Dict], extras: Sequence[str] = ()) -> str:
+    """
+    Cabeçalho Server-Timing (duração em ms):
+        normalizar_financeiro;dur=812.3;desc="120000 linhas", ..., total;dur=...
+    """
+    partes = list(extras)
+    total = 0.0
+
+    for medicao in etapas:
+        total += medicao["segundos"]
+        parte = f"{medicao['etapa']};dur={medicao['segundos'] * 1000:.1f}"
+        if medicao.get("linhas_entrada") is not None:
+            parte += f';desc="{medicao["linhas_entrada"]} linhas"'
+        partes.append(parte)
+
+    if total:
+        partes.append(f"total;dur={total * 1000:.1f}")
+
+    return ", ".join(partes)
+
+
+# ============================================================
+# HISTOGRAMAS (FORMATO PROMETHEUS)
+# ============================================================
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Histograma:
+    """Histograma com rótulos, no modelo cumulativo do Prometheus."""
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Tuple[str, ...], buckets: Sequence[float]):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self.buckets = tuple(buckets)
+        # valores dos rótulos -> [contagem por bucket (não cumulativa) + overflow, soma]
+        self._series: Dict[Tuple, list] = {}
+
+    def observar(self, valor: float, *valores_rotulos):
+        serie = self._series.get(valores_rotulos)
+        if serie is None:
+            serie = self._series[valores_rotulos] = [[0] * (len(self.buckets) + 1), 0.0]
+
+        posicao = len(self.buckets)
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                posicao = i
+                break
+        serie[0][posicao] += 1
+        serie[1] += valor
+
+    def exportar(self) -> List[str]:
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} histogram"]
+
+        for valores_rotulos, (contagens, soma) in sorted(self._series.items()):
+            base = ",".join(f'{r}="{_escapar(v)}"' for r, v in zip(self.rotulos, valores_rotulos))
+            prefixo = base + "," if base else ""
+
+            acumulado = 0
+            for limite, contagem in zip(self.buckets, contagens):
+                acumulado += contagem
+                linhas.append(f'{self.nome}_bucket{{{prefixo}le="{limite:g}"}} {acumulado}')
+            acumulado += contagens[-1]
+            linhas.append(f'{self.nome}_bucket{{{prefixo}le="+Inf"}} {acumulado}')
+            linhas.append(f"{self.nome}_sum{{{base}}} {soma:g}")
+            linhas.append(f"{self.nome}_count{{{base}}} {acumulado}")
+
+        return linhas
+
+
+class RegistroMetricas:
+    """Histogramas das etapas da conciliação, por empresa e faixa de tamanho."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.segundos = Histograma(
+            "conciliacao_etapa_segundos",
+            "Duração de cada etapa da conciliação",
+            ("etapa", "empresa", "faixa_linhas"), BUCKETS_SEGUNDOS
+        )
+        self.linhas = Histograma(
+            "conciliacao_etapa_linhas_entrada",
+            "Linhas recebidas por cada etapa da conciliação",
+            ("etapa",), BUCKETS_LINHAS
+        )
+        self.memoria = Histograma(
+            "conciliacao_etapa_memoria_crescimento_bytes",
+            "Quanto o RSS do worker cresceu em cada etapa (0 se diminuiu)",
+            ("etapa",), BUCKETS_BYTES
+        )
+        # Gauge: pico de RSS da vida do worker, não de uma etapa
+        self.memoria_pico_worker = 0
+
+    def registrar(self, etapas: Iterable[Dict], empresa, linhas_entrada: int):
+        faixa = faixa_linhas(linhas_entrada)
+        empresa = "desconhecida" if empresa is None else str(empresa)
+
+        with self._lock:
+            for medicao in etapas:
+                self.segundos.observar(medicao["segundos"], medicao["etapa"], empresa, faixa)
+                if medicao.get("linhas_entrada") is not None:
+                    self.linhas.observar(medicao["linhas_entrada"], medicao["etapa"])
+                if medicao.get("memoria_delta_bytes") is not None:
+                    self.memoria.observar(max(medicao["memoria_delta_bytes"], 0), medicao["etapa"])
+                self.memoria_pico_worker = max(self.memoria_pico_worker,
+                                               medicao.get("memoria_pico_bytes") or 0)
+
+    def exportar(self) -> str:
+        with self._lock:
+            linhas = self.segundos.exportar() + self.linhas.exportar() + self.memoria.exportar()
+            linhas += [
+                "# HELP conciliacao_worker_memoria_pico_bytes Maior pico de RSS informado pelos workers",
+                "# TYPE conciliacao_worker_memoria_pico_bytes gauge",
+                f"conciliacao_worker_memoria_pico_bytes {self.memoria_pico_worker}",
+            ]
+        return "\n".join(linhas) + "\n"
+
+
+metricas_conciliacao = RegistroMetricas()
@@ -0,0 +1,108 @@
+# services/paginacao.py
+"""
+Paginação por cursor (keyset).
+
+Em vez de OFFSET, cada página continua a partir dos valores da ordenação do
+último item devolvido: a consulta usa o índice para ir direto ao ponto, e o
+custo de uma página não cresce com a posição dela. O cursor é opaco para o
+cliente: os valores da ordenação em JSON, codificados em base64 (url-safe).
+
+As listagens que devolvem uma lista simples (empresas, plano de contas,
+arquivos) mantêm o corpo como está e informam a próxima página no cabeçalho
+X-Proximo-Cursor; o total estimado, quando pedido, vai em X-Total-Estimado.
+"""
+import base64
+import binascii
+import json
+import logging
+from typing import Any, List, Optional, Sequence
+
+from fastapi import Response
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+logger = logging.getLogger(__name__)
+
+CABECALHO_CURSOR = "X-Proximo-Cursor"
+CABECALHO_TOTAL = "X-Total-Estimado"
+
+LIMITE_PADRAO = 100
+LIMITE_MAXIMO = 1000
+
+
+def codificar_cursor(valores: List[Any]) -> str:
+    """Cursor opaco a partir dos valores da ordenação do último item."""
+    # default=str: Decimal e datas viajam como texto
+    bruto = json.dumps(list(valores), default=str)
+    return base64.urlsafe_b64encode(bruto.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: Optional[str], quantidade: int) -> Optional[List[Any]]:
+    """Valores gravados no cursor (None sem cursor). ValueError se inválido."""
+    if not cursor:
+        return None
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        valores = json.loads(bruto)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Cursor inválido")
+    if not isinstance(valores, list) or len(valores) != quantidade:
+        raise ValueError("Cursor inválido")
+    return valores
+
+
+def montar_pagina(itens: list, limite: int, chave) -> dict:
+    """
+    Página a partir de uma consulta que buscou limite + 1 itens: o item a
+    mais só indica que há próxima página. chave(item) → valores do cursor.
+    """
+    tem_proxima = len(itens) > limite
+    itens = itens[:limite]
+    return {
+        "itens": itens,
+        "proximo_cursor": codificar_cursor(chave(itens[-1])) if tem_proxima else None,
+    }
+
+
+def paginar(query: Query, colunas: Sequence, cursor: Optional[str], limite: int, skip: int = 0) -> dict:
+    """
+    Página de `query` em ordem crescente de `colunas` (que devem identificar
+    a linha de forma única, ex.: (conta_contabil,) dentro da empresa ou (id,)).
+    A continuação é uma comparação de tupla, atendida pelo índice das colunas.
+
+    skip: OFFSET legado, só aplicado sem cursor
+    """
+    posicao = decodificar_cursor(cursor, len(colunas))
+    if posicao is not None:
+        query = query.filter(tuple_(*colunas) > tuple_(*posicao))
+
+    query = query.order_by(*colunas)
+    if skip and posicao is None:
+        query = query.offset(skip)
+    itens = query.limit(limite + 1).all()
+    return montar_pagina(itens, limite, lambda item: [getattr(item, coluna.key) for coluna in colunas])
+
+
+def estimar_total(query: Query) -> int:
+    """
+    Quantidade aproximada de linhas de `query` sem COUNT(*): no PostgreSQL,
+    a estimativa do planejador (EXPLAIN); em outros bancos, COUNT normal.
+    """
+    conexao = query.session.connection()
+    if conexao.dialect.name != "postgresql":
+        return query.order_by(None).count()
+
+    compilada = query.order_by(None).statement.compile(dialect=conexao.dialect)
+    plano = conexao.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compilada}", compilada.params).scalar()
+    if isinstance(plano, str):
+        plano = json.loads(plano)
+    return int(plano[0]["Plan"]["Plan Rows"])
+
+
+def aplicar_cabecalhos(response: Response, pagina: dict, total_estimado: Optional[int] = None) -> list:
+    """Cabeçalhos de paginação na resposta; devolve os itens da página."""
+    if pagina["proximo_cursor"]:
+        response.headers[CABECALHO_CURSOR] = pagina["proximo_cursor"]
+    if total_estimado is not None:
+        response.headers[CABECALHO_TOTAL] = str(total_estimado)
+    return pagina["itens"]
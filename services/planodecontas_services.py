@@ -1,10 +1,21 @@
 # services/planodecontas_services.py
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 from models.planodecontas import PlanoDeContas
+from pydantic import TypeAdapter
+from schemas.planodecontas_schema import PlanoDeContasResponse
+from services.cache_conciliacao import CacheMemoria
+from services.hierarquia_plano import invalidar_indice
+from services.paginacao import paginar, estimar_total
 from datetime import datetime, timezone
 from typing import List, Dict, Tuple, Optional
+import hashlib
+import io
 import logging
+import os
+import threading
 
+import numpy as np
 import pandas as pd
 #configurar logging
 
@@ -15,12 +26,95 @@ logger = logging.getLogger(__name__)
 
 
 
-def listar_planos_de_contas(db: Session, empresa_id: int, skip: int = 0, limit: int = 1000) -> List[PlanoDeContas]:
-    return db.query(PlanoDeContas).filter(
-        PlanoDeContas.empresa_id == empresa_id
-    ).order_by(
-        PlanoDeContas.conta_contabil  # ← ADICIONADO: Ordena por código da conta
-    ).offset(skip).limit(limit).all()
+def listar_planos_de_contas(db: Session, empresa_id: int, skip: int = 0, limit: int = 1000,
+                            cursor: Optional[str] = None, estimar: bool = False) -> Dict:
+    """
+    Página do plano da empresa ordenada por conta_contabil (única na empresa),
+    continuando do cursor pelo índice (empresa_id, conta_contabil).
+    `skip` (OFFSET) só é usado sem cursor, por compatibilidade.
+    """
+    query = db.query(PlanoDeContas).filter(PlanoDeContas.empresa_id == empresa_id)
+    pagina = paginar(query, (PlanoDeContas.conta_contabil,), cursor, limit, skip)
+    pagina["total_estimado"] = estimar_total(query) if estimar else None
+    return pagina
+
+
+# ============================================================
+# CACHE DE LEITURA DA LISTAGEM (por empresa)
+# ============================================================
+#
+# A listagem é lida a cada tela e o plano quase nunca muda: cada página fica
+# em memória já serializada (bytes JSON + cabeçalhos), e a repetição não vai
+# ao banco nem ao pydantic. Cada empresa tem uma versão que entra na chave;
+# criar/atualizar/deletar/importar incrementam a versão e as páginas antigas
+# deixam de ser encontradas (o LRU as descarta). O cache é por processo: a
+# alteração feita em outro worker do uvicorn aparece em até
+# PLANO_CONTAS_CACHE_TTL_SEGUNDOS.
+#
+# O ETag é o hash do corpo, calculado uma vez ao guardar a página: igual em
+# todos os workers para o mesmo conteúdo, e diferente após qualquer alteração.
+
+PLANO_CACHE_MAX = int(os.getenv("PLANO_CONTAS_CACHE_MAX", "256"))
+PLANO_CACHE_TTL_SEGUNDOS = int(os.getenv("PLANO_CONTAS_CACHE_TTL_SEGUNDOS", "60"))
+
+_paginas_plano = CacheMemoria(max_itens=PLANO_CACHE_MAX, ttl_segundos=PLANO_CACHE_TTL_SEGUNDOS)
+_versoes_plano: Dict[int, int] = {}
+_lock_versoes = threading.Lock()
+_serializador_contas = TypeAdapter(List[PlanoDeContasResponse])
+
+
+def versao_plano(empresa_id: int) -> int:
+    """Versão do cache do plano da empresa (muda a cada invalidação)."""
+    with _lock_versoes:
+        return _versoes_plano.get(empresa_id, 0)
+
+
+def invalidar_cache_plano(empresa_id: int):
+    """Descarta as páginas em cache do plano da empresa."""
+    with _lock_versoes:
+        _versoes_plano[empresa_id] = _versoes_plano.get(empresa_id, 0) + 1
+
+
+def obter_pagina_plano(db: Session, empresa_id: int, skip: int = 0, limit: int = 1000,
+                       cursor: Optional[str] = None, estimar: bool = False) -> Dict:
+    """
+    listar_planos_de_contas já serializada, do cache ou do banco.
+
+    Retorna dict com conteudo (bytes JSON da lista de PlanoDeContasResponse),
+    etag, proximo_cursor e total_estimado.
+    """
+    # A versão é lida antes da consulta: uma invalidação durante a leitura
+    # deixa a página guardada numa versão que já não será procurada
+    versao = versao_plano(empresa_id)
+    chave = f"{empresa_id}:{versao}:{skip}:{limit}:{cursor or ''}:{int(estimar)}"
+    pagina = _paginas_plano.obter(chave)
+    if pagina is not None:
+        return pagina
+
+    resultado = listar_planos_de_contas(db, empresa_id, skip, limit, cursor, estimar)
+    conteudo = _serializador_contas.dump_json(
+        _serializador_contas.validate_python(resultado["itens"], from_attributes=True)
+    )
+    pagina = {
+        "conteudo": conteudo,
+        "etag": f'"{hashlib.sha256(conteudo).hexdigest()[:32]}"',
+        "proximo_cursor": resultado["proximo_cursor"],
+        "total_estimado": resultado["total_estimado"],
+    }
+    _paginas_plano.guardar(chave, pagina)
+    return pagina
+
+
+def etag_confere(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match (lista de ETags ou *) contém o ETag? Comparação fraca, como pede o 304."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidato.strip().removeprefix("W/") == etag
+        for candidato in if_none_match.split(",")
+    )
 
 
 def buscar_conta(db: Session, id: int) -> Optional[PlanoDeContas]:
@@ -32,6 +126,8 @@ def criar_conta(db: Session, dados: dict) -> PlanoDeContas:
     db.add(db_conta)
     db.commit()
     db.refresh(db_conta)
+    invalidar_indice(db_conta.empresa_id)
+    invalidar_cache_plano(db_conta.empresa_id)
     return db_conta
 
 
@@ -39,11 +135,16 @@ def atualizar_conta(db: Session, id: int, dados: dict) -> Optional[PlanoDeContas
     db_conta = buscar_conta(db, id)
     if not db_conta:
         return None
+    empresa_anterior = db_conta.empresa_id
     for key, value in dados.items():
         setattr(db_conta, key, value)
     db_conta.updated_at = datetime.now(timezone.utc)
     db.commit()
     db.refresh(db_conta)
+    invalidar_indice(empresa_anterior)
+    invalidar_indice(db_conta.empresa_id)
+    invalidar_cache_plano(empresa_anterior)
+    invalidar_cache_plano(db_conta.empresa_id)
     return db_conta
 
 
@@ -53,6 +154,8 @@ def deletar_conta(db: Session, id: int) -> bool:
         return False
     db.delete(db_conta)
     db.commit()
+    invalidar_indice(db_conta.empresa_id)
+    invalidar_cache_plano(db_conta.empresa_id)
     return True
 
 
@@ -87,6 +190,24 @@ def ordenar_contas_hierarquicamente(df: pd.DataFrame) -> pd.DataFrame:
     return df_ordenado.reset_index(drop=True)
 
 
+# Colunas lidas do arquivo de importação e seus tipos (ver tools.leitura)
+COLUNAS_IMPORTACAO = {
+    'conta_contabil': 'texto',
+    'descricao': 'texto',
+    'conciliavel': 'bruto',
+    'tipo_conta': 'bruto',
+    'conta_superior': 'texto',
+}
+
+
+def colunas_arquivo_importacao(cabecalho: List[str]) -> Dict[str, str]:
+    """
+    Seletor para a leitura projetada do arquivo: só as colunas do plano de
+    contas presentes no cabeçalho (as ausentes são apontadas na validação)
+    """
+    return {coluna: tipo for coluna, tipo in COLUNAS_IMPORTACAO.items() if coluna in cabecalho}
+
+
 def validar_estrutura_arquivo(df: pd.DataFrame) -> Tuple[bool, List[str]]:
     """
     Valida se o arquivo possui a estrutura esperada
@@ -179,128 +300,223 @@ def converter_conciliavel(valor) -> bool:
 
 
 
-def importar_plano_contas(df_sinteticas: pd.DataFrame, df_analiticas: pd.DataFrame, empresa_id: int, db: Session) -> Dict:
+
+
+# ============================================================
+# IMPORTAÇÃO EM MASSA
+# ============================================================
+#
+# Validação e conversão vetorizadas sobre o DataFrame inteiro; as linhas
+# válidas vão para uma tabela temporária (COPY no PostgreSQL) e entram no
+# plano com um único INSERT ... SELECT ... ON CONFLICT sobre o índice único
+# (empresa_id, conta_contabil). Linhas inválidas voltam em estatisticas['erros']
+# sem derrubar o restante.
+
+TABELA_STAGING = "plano_contas_importacao"
+COLUNAS_STAGING = ['conta_contabil', 'tipo_conta', 'conciliavel', 'descricao', 'conta_superior']
+
+# Tamanhos das colunas em PlanoDeContas
+TAMANHOS_COLUNAS = {'conta_contabil': 50, 'descricao': 255, 'conta_superior': 50}
+
+# Linha 1 da planilha é o cabeçalho
+_PRIMEIRA_LINHA_DADOS = 2
+
+
+def converter_conciliavel_serie(serie: pd.Series) -> Tuple[pd.Series, pd.Series]:
     """
-    Função principal de importação do plano de contas
-    
-    Processo:
-    1. Importa primeiro as contas sintéticas
-    2. Importa depois as contas analíticas
-    
-    Args:
-        df_sinteticas: DataFrame com as contas sintéticas
-        df_analiticas: DataFrame com as contas analíticas
-        empresa_id: ID da empresa
-        db: Sessão do banco de dados
-        
+    Versão vetorizada de converter_conciliavel.
+
+    Retorna (valores bool, invalidos): números valem True quando == 1, texto
+    só aceita "1" ou "0", vazio é False.
+    """
+    # .str só existe quando há algum texto: coluna só com números não tem
+    eh_texto = serie.astype(object).map(lambda valor: isinstance(valor, str))
+    valores = pd.Series(False, index=serie.index)
+    invalidos = pd.Series(False, index=serie.index)
+
+    numeros = pd.to_numeric(serie[~eh_texto], errors="coerce")
+    valores[~eh_texto] = (numeros == 1).to_numpy()
+
+    texto = serie[eh_texto].astype(str).str.strip().str.upper()
+    valores[eh_texto] = (texto == "1").to_numpy()
+    invalidos[eh_texto] = (~texto.isin(["1", "0"])).to_numpy()
+
+    return valores, invalidos
+
+
+def _texto_limpo(serie: pd.Series) -> pd.Series:
+    """str sem espaços nas pontas; vazio vira None."""
+    texto = serie.astype("string").str.strip()
+    return texto.astype(object).where(texto.notna() & (texto != ""), None)
+
+
+def validar_contas_importacao(df: pd.DataFrame) -> Tuple[pd.DataFrame, List[Dict]]:
+    """
+    Valida e converte as contas do arquivo de uma vez.
+
+    Retorna (contas válidas com COLUNAS_STAGING, erros por linha no formato
+    de ImportacaoErro: linha, codigo_conta, erro). Descrição vazia é erro
+    da linha. Contas repetidas no arquivo: vale a primeira, as demais viram erro.
+    """
+    contas = pd.DataFrame({
+        'linha': np.arange(len(df)) + _PRIMEIRA_LINHA_DADOS,
+        'conta_contabil': _texto_limpo(df['conta_contabil']).to_numpy(),
+        'descricao': _texto_limpo(df['descricao']).to_numpy(),
+        'conta_superior': _texto_limpo(df['conta_superior']).to_numpy(),
+    })
+
+    tipo = pd.to_numeric(df['tipo_conta'], errors="coerce").to_numpy()
+    contas['tipo_conta'] = np.where(tipo == 1, "1", np.where(tipo == 2, "2", None))
+
+    conciliavel, conciliavel_invalido = converter_conciliavel_serie(df['conciliavel'])
+    contas['conciliavel'] = conciliavel.to_numpy()
+
+    # Motivo de erro por linha (o primeiro que se aplica)
+    motivos = pd.Series(None, index=contas.index, dtype=object)
+
+    def marcar(mascara, motivo):
+        mascara = np.asarray(mascara) & motivos.isna().to_numpy()
+        motivos[mascara] = motivo
+
+    marcar(contas['conta_contabil'].isna(), "conta_contabil vazia")
+    # PlanoDeContasResponse exige descrição: sem ela a conta quebraria as listagens
+    marcar(contas['descricao'].isna(), "descricao vazia")
+    marcar(contas['tipo_conta'].isna(),
+           "tipo_conta inválido (use 1 = sintética ou 2 = analítica)")
+    marcar(conciliavel_invalido.to_numpy(), "conciliavel inválido (use apenas 1 ou 0)")
+    for coluna, tamanho in TAMANHOS_COLUNAS.items():
+        marcar(contas[coluna].str.len().to_numpy(dtype=float, na_value=0) > tamanho,
+               f"{coluna} com mais de {tamanho} caracteres")
+    marcar(contas['conta_contabil'].notna() & contas['conta_contabil'].duplicated(),
+           "conta_contabil repetida no arquivo")
+
+    invalidas = motivos.notna()
+    erros = [
+        {'linha': int(linha), 'codigo_conta': None if pd.isna(codigo) else codigo, 'erro': motivo}
+        for linha, codigo, motivo in zip(
+            contas.loc[invalidas, 'linha'],
+            contas.loc[invalidas, 'conta_contabil'],
+            motivos[invalidas],
+        )
+    ]
+
+    return contas.loc[~invalidas, COLUNAS_STAGING].reset_index(drop=True), erros
+
+
+def _carregar_staging(db: Session, contas: pd.DataFrame):
+    """Cria a tabela temporária e carrega as contas (COPY quando o driver permite)."""
+    db.execute(text(f"DROP TABLE IF EXISTS {TABELA_STAGING}"))
+    db.execute(text(
+        f"CREATE TEMPORARY TABLE {TABELA_STAGING} ("
+        "conta_contabil VARCHAR(50) NOT NULL, "
+        "tipo_conta VARCHAR(20) NOT NULL, "
+        "conciliavel BOOLEAN NOT NULL, "
+        "descricao VARCHAR(255), "
+        "conta_superior VARCHAR(50))"
+    ))
+
+    cursor = db.connection().connection.cursor()
+    try:
+        if hasattr(cursor, "copy_expert"):
+            # psycopg2: COPY ... FROM STDIN em CSV (campo vazio sem aspas = NULL)
+            buffer = io.StringIO()
+            contas.to_csv(buffer, index=False, header=False)
+            buffer.seek(0)
+            cursor.copy_expert(
+                f"COPY {TABELA_STAGING} ({', '.join(COLUNAS_STAGING)}) FROM STDIN WITH (FORMAT csv)",
+                buffer
+            )
+            return
+    finally:
+        cursor.close()
+
+    # Outros drivers: INSERT em lote na tabela temporária
+    registros = contas.astype(object).where(contas.notna(), None).to_dict(orient="records")
+    db.execute(
+        text(
+            f"INSERT INTO {TABELA_STAGING} ({', '.join(COLUNAS_STAGING)}) "
+            f"VALUES ({', '.join(':' + coluna for coluna in COLUNAS_STAGING)})"
+        ),
+        registros
+    )
+
+
+def importar_plano_contas_em_massa(df: pd.DataFrame, empresa_id: int, db: Session) -> Dict:
+    """
+    Importa (insere ou atualiza) o plano de contas lido do arquivo.
+
+    Contas já existentes para a empresa (mesma conta_contabil) têm tipo,
+    descrição, conciliável e conta superior atualizados.
+
     Returns:
         Dicionário com estatísticas da importação
     """
-    logger.info("="*80)
-    logger.info("INICIANDO IMPORTAÇÃO DO PLANO DE CONTAS")
-    logger.info("="*80)
-    
-    try:
-        estatisticas = {
-            'total_contas': len(df_sinteticas) + len(df_analiticas),
-            'sinteticas_importadas': 0,
-            'analiticas_importadas': 0,
-            'erros': []
-        }
-        
-        # FASE 1: Importar contas sintéticas
-        logger.info("\n" + "="*80)
-        logger.info("FASE 1: IMPORTANDO CONTAS SINTÉTICAS")
-        logger.info("="*80)
-        
-        for idx, conta in df_sinteticas.iterrows():
-            try:
-                # Preparar conta_superior (código contábil da conta superior)
-                conta_superior = None
-                if pd.notna(conta['conta_superior']) and str(conta['conta_superior']).strip():
-                    conta_superior = str(conta['conta_superior']).strip()
-                
-                logger.info(f"Importando sintética: {conta['conta_contabil']} - {conta['descricao']}")
-                
-                # Criar conta no banco - atribuição direta
-                db_conta = PlanoDeContas()
-                db_conta.conta_contabil = str(conta['conta_contabil'])
-                db_conta.descricao = conta['descricao']
-                db_conta.conciliavel = converter_conciliavel(conta['conciliavel'])
-                db_conta.tipo_conta = str(conta['tipo_conta'])
-                db_conta.conta_superior = conta_superior
-                db_conta.empresa_id = empresa_id
-                
-                db.add(db_conta)
-                
-                estatisticas['sinteticas_importadas'] += 1
-                
-            except Exception as e:
-                erro_msg = f"Erro ao importar conta {conta['conta_contabil']}: {str(e)}"
-                logger.error(erro_msg)
-                estatisticas['erros'].append(erro_msg)
-                db.rollback()  # Rollback apenas desta conta com erro
-        
-        # Commit das contas sintéticas
-        db.commit()
-        logger.info(f"✓ Commit de {estatisticas['sinteticas_importadas']} contas sintéticas")
-        
-        # FASE 2: Importar contas analíticas
-        logger.info("\n" + "="*80)
-        logger.info("FASE 2: IMPORTANDO CONTAS ANALÍTICAS")
-        logger.info("="*80)
-        
-        for idx, conta in df_analiticas.iterrows():
-            try:
-                # Preparar conta_superior (código contábil da conta superior)
-                conta_superior = None
-                if pd.notna(conta['conta_superior']) and str(conta['conta_superior']).strip():
-                    conta_superior = str(conta['conta_superior']).strip()
-                
-                logger.info(f"Importando analítica: {conta['conta_contabil']} - {conta['descricao']}")
-                
-                # Criar conta no banco - atribuição direta
-                db_conta = PlanoDeContas()
-                db_conta.conta_contabil = str(conta['conta_contabil'])
-                db_conta.descricao = conta['descricao']
-                db_conta.conciliavel = bool(conta['conciliavel'])
-                db_conta.tipo_conta = str(conta['tipo_conta'])
-                db_conta.conta_superior = conta_superior
-                db_conta.empresa_id = empresa_id
-                
-                db.add(db_conta)
-                
-                estatisticas['analiticas_importadas'] += 1
-                
-            except Exception as e:
-                erro_msg = f"Erro ao importar conta {conta['conta_contabil']}: {str(e)}"
-                logger.error(erro_msg)
-                estatisticas['erros'].append(erro_msg)
-                db.rollback()  # Rollback apenas desta conta com erro
-        
-        # Commit das contas analíticas
-        db.commit()
-        logger.info(f"✓ Commit de {estatisticas['analiticas_importadas']} contas analíticas")
-        
-        # Resumo final
-        logger.info("\n" + "="*80)
-        logger.info("RESUMO DA IMPORTAÇÃO")
-        logger.info("="*80)
-        logger.info(f"Total de contas no arquivo: {estatisticas['total_contas']}")
-        logger.info(f"Contas sintéticas importadas: {estatisticas['sinteticas_importadas']}")
-        logger.info(f"Contas analíticas importadas: {estatisticas['analiticas_importadas']}")
-        logger.info(f"Total importado: {estatisticas['sinteticas_importadas'] + estatisticas['analiticas_importadas']}")
-        
-        if estatisticas['erros']:
-            logger.warning(f"\nErros encontrados: {len(estatisticas['erros'])}")
-            for erro in estatisticas['erros']:
-                logger.warning(f"  - {erro}")
-        else:
-            logger.info("\n✓ Importação concluída com sucesso!")
-        
-        return estatisticas
-        
-    except Exception as e:
-        logger.error(f"\nERRO FATAL na importação: {str(e)}")
-        db.rollback()  # Rollback completo em caso de erro fatal
-        raise
\ No newline at end of file
+    # Sem as colunas (ou sem linhas) não há o que importar; o resto é por linha
+    if set(COLUNAS_IMPORTACAO) - set(df.columns) or df.empty:
+        _, erros_estrutura = validar_estrutura_arquivo(df)
+        raise ValueError(f"Erro na validação do arquivo:\n" + "\n".join(erros_estrutura))
+
+    contas, erros = validar_contas_importacao(df)
+    contas = ordenar_contas_hierarquicamente(contas)
+
+    estatisticas = {
+        'total_contas': len(df),
+        'sinteticas_importadas': int((contas['tipo_conta'] == "1").sum()),
+        'analiticas_importadas': int((contas['tipo_conta'] == "2").sum()),
+        'inseridas': 0,
+        'atualizadas': 0,
+        'erros': erros,
+    }
+
+    if not contas.empty:
+        tabela = f"{PlanoDeContas.__table__.schema}.{PlanoDeContas.__tablename__}"
+        try:
+            _carregar_staging(db, contas)
+
+            existentes = db.execute(text(
+                f"SELECT COUNT(*) FROM {TABELA_STAGING} s "
+                f"JOIN {tabela} p ON p.empresa_id = :empresa_id AND p.conta_contabil = s.conta_contabil"
+            ), {'empresa_id': empresa_id}).scalar()
+
+            # WHERE true: o SQLite exige para não confundir ON CONFLICT com um JOIN
+            db.execute(text(
+                f"INSERT INTO {tabela} (empresa_id, {', '.join(COLUNAS_STAGING)}) "
+                f"SELECT :empresa_id, {', '.join(COLUNAS_STAGING)} FROM {TABELA_STAGING} WHERE true "
+                "ON CONFLICT (empresa_id, conta_contabil) DO UPDATE SET "
+                "tipo_conta = excluded.tipo_conta, "
+                "conciliavel = excluded.conciliavel, "
+                "descricao = excluded.descricao, "
+                "conta_superior = excluded.conta_superior, "
+                "updated_at = CURRENT_TIMESTAMP"
+            ), {'empresa_id': empresa_id})
+
+            db.execute(text(f"DROP TABLE IF EXISTS {TABELA_STAGING}"))
+            db.commit()
+            invalidar_indice(empresa_id)
+            invalidar_cache_plano(empresa_id)
+        except Exception as e:
+            logger.error(f"❌ Erro fatal na importação do plano de contas: {e}")
+            db.rollback()
+            raise
+
+        estatisticas['atualizadas'] = int(existentes)
+        estatisticas['inseridas'] = len(contas) - int(existentes)
+
+    logger.info(
+        f"✅ Plano de contas importado (empresa {empresa_id}): "
+        f"{estatisticas['inseridas']} inseridas, {estatisticas['atualizadas']} atualizadas, "
+        f"{len(erros)} com erro de {estatisticas['total_contas']} linhas"
+    )
+    if erros:
+        logger.warning(f"⚠️ Exemplos de linhas rejeitadas: {erros[:5]}")
+
+    return estatisticas
+
+
+def importar_plano_contas(df_sinteticas: pd.DataFrame, df_analiticas: pd.DataFrame, empresa_id: int, db: Session) -> Dict:
+    """
+    Importa o plano de contas já separado por preparar_dados_importacao
+    (mantido por compatibilidade; usa importar_plano_contas_em_massa)
+    """
+    df = pd.concat([df_sinteticas, df_analiticas], ignore_index=True)
+    return importar_plano_contas_em_massa(df, empresa_id, db)
@@ -0,0 +1,84 @@
+# services/relatorio_conciliacao.py
+"""
+Relatório de diferenças em Excel gerado em segundo plano.
+
+Roda no pool de processos via job_store.submeter(tarefa=gerar_relatorio_conciliacao)
+e grava o .xlsx em CONCILIACAO_RELATORIOS_DIR/<job_id>.xlsx; o arquivo é
+apagado quando o job expira.
+"""
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+from schemas.conciliacao_schema import RequestConciliacao
+from services.conciliacao_jobs import notificador_progresso
+from services.conciliacao_service import ConciliacaoService
+from services.metricas import MedidorEtapas
+from tools.calc_diferencas import calcular_diferencas, salvar_planilha_diferencas
+from tools.contabilidade import normalizar_planilha_contabilidade
+from tools.financeiro import normalizar_planilha_financeira
+
+logger = logging.getLogger(__name__)
+
+RELATORIOS_DIR = Path(os.getenv("CONCILIACAO_RELATORIOS_DIR", "relatorios_conciliacao"))
+
+# Etapas de gerar_relatorio_conciliacao(), na ordem em que são concluídas
+ETAPAS_RELATORIO = [
+    "normalizar_financeiro",
+    "normalizar_contabilidade",
+    "calcular_diferencas",
+    "gerar_planilha",
+]
+
+
+def caminho_relatorio(job_id: str) -> Path:
+    return RELATORIOS_DIR / f"{job_id}.xlsx"
+
+
+def gerar_relatorio_conciliacao(request: RequestConciliacao, progresso=None,
+                                job_id: str = None) -> Tuple[Dict, List[Dict]]:
+    """
+    Ponto de entrada executado dentro do processo worker.
+
+    Retorna ({caminho_arquivo, resumo}, medições por etapa).
+    """
+    notificar = notificador_progresso(progresso, job_id)
+    medidor = MedidorEtapas()
+    medidor.iniciar()
+
+    df_financeiro_raw = pd.DataFrame(request.base_origem.registros)
+    financeiro_norm = normalizar_planilha_financeira(
+        df_financeiro_raw,
+        data_base=ConciliacaoService.obter_data_base(request)
+    )
+    medidor.marcar("normalizar_financeiro", len(df_financeiro_raw), len(financeiro_norm))
+    notificar("normalizar_financeiro")
+
+    df_contabil_raw = pd.DataFrame(request.base_contabil_filtrada.registros)
+    contabil_norm = normalizar_planilha_contabilidade(df_contabil_raw)
+    medidor.marcar("normalizar_contabilidade", len(df_contabil_raw), len(contabil_norm))
+    notificar("normalizar_contabilidade")
+
+    resultado = calcular_diferencas(financeiro_norm, contabil_norm, salvar_arquivo=False)
+    df_completo = resultado["df_completo"]
+    medidor.marcar("calcular_diferencas", len(financeiro_norm) + len(contabil_norm), len(df_completo))
+    notificar("calcular_diferencas")
+
+    # Grava em arquivo temporário e renomeia: o download nunca vê um .xlsx pela metade
+    RELATORIOS_DIR.mkdir(parents=True, exist_ok=True)
+    caminho = caminho_relatorio(job_id or "relatorio")
+    temporario = caminho.with_name(f".{caminho.stem}.{os.getpid()}.tmp")
+    salvar_planilha_diferencas(df_completo, resultado["resumo"], str(temporario))
+    os.replace(temporario, caminho)
+    medidor.marcar("gerar_planilha", len(df_completo), len(df_completo))
+    notificar("gerar_planilha")
+
+    logger.info(f"💾 Relatório de diferenças gerado: {caminho}")
+
+    return {
+        "caminho_arquivo": str(caminho),
+        "resumo": resultado["resumo"],
+    }, medidor.finalizar()
@@ -0,0 +1,59 @@
+"""
+Fixtures dos testes.
+
+db.py exige DATABASE_URL ao ser importado; sem .env, um endereço qualquer
+basta (o engine só conecta no primeiro uso). As rotas que usam o banco
+rodam sobre um SQLite com o schema "concilia" anexado.
+"""
+import os
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+os.environ.setdefault("DATABASE_URL", "postgresql://localhost/concilia")
+
+
+@pytest.fixture
+def sessao_sqlite(tmp_path):
+    """sessionmaker sobre SQLite com todas as tabelas do schema concilia."""
+    from db import Base
+    import models  # noqa: F401 (registra os modelos no metadata)
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'principal.db'}")
+
+    @event.listens_for(engine, "connect")
+    def _preparar(conexao, _):
+        conexao.create_function("NOW", 0, lambda: "2026-01-01 00:00:00")
+        conexao.execute(f"ATTACH '{tmp_path / 'concilia.db'}' AS concilia")
+
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def cliente(sessao_sqlite):
+    """TestClient da aplicação com get_db apontando para o SQLite."""
+    from fastapi.testclient import TestClient
+
+    from db import get_db
+    from main import app
+    from services.hierarquia_plano import _indices
+    from services.planodecontas_services import _paginas_plano
+
+    # Cada teste começa com um banco novo: páginas e índices de outro teste não valem
+    _paginas_plano.limpar()
+    _indices.clear()
+
+    def _get_db():
+        db = sessao_sqlite()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = _get_db
+    with TestClient(app) as cliente:
+        yield cliente
+    app.dependency_overrides.clear()
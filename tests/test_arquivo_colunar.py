@@ -0,0 +1,58 @@
+"""Cópia colunar gerada depois do upload (services.arquivo_colunar)."""
+from datetime import datetime
+
+import pandas as pd
+
+import services.arquivo_colunar as arquivo_colunar
+from models import ArquivoConciliacao
+from tools.colunar import colunar_em_dia
+from tools.leitura import ler_planilha
+
+
+def test_copia_colunar_registrada_e_visivel_na_api(cliente, sessao_sqlite, tmp_path, monkeypatch):
+    original = pd.DataFrame({
+        "Codigo": ["001", "002", "003"],
+        "Descricao": ["Cliente A", "Cliente B", None],
+        "Saldo atual": [10.5, -3.25, 0.0],
+    })
+    caminho = tmp_path / "1_balancete.xlsx"
+    original.to_excel(caminho, index=False)
+
+    db = sessao_sqlite()
+    db.add(ArquivoConciliacao(id=1, conciliacao_id=1, caminho_arquivo=str(caminho),
+                              data_conciliacao=datetime(2026, 1, 31)))
+    db.commit()
+    db.close()
+
+    monkeypatch.setattr(arquivo_colunar, "SessionLocal", sessao_sqlite)
+    arquivo_colunar.gerar_copia_colunar(1)
+
+    resposta = cliente.get("/api/arquivos/1")
+    assert resposta.status_code == 200, resposta.text
+    assert resposta.json()["status_colunar"] == "concluido"
+    assert colunar_em_dia(caminho) is not None
+
+    # A leitura por caminho passa a vir da cópia, com o mesmo resultado
+    tipos = {"Codigo": "texto", "Descricao": "texto", "Saldo atual": "numero"}
+    lido = ler_planilha(caminho, colunas=lambda cabecalho: tipos)
+    assert lido["Codigo"].tolist() == ["001", "002", "003"]
+    assert lido["Saldo atual"].tolist() == [10.5, -3.25, 0.0]
+    assert pd.isna(lido["Descricao"].iloc[2])
+
+
+def test_arquivo_nao_xlsx_fica_nao_suportado(sessao_sqlite, tmp_path, monkeypatch):
+    caminho = tmp_path / "1_balancete.csv"
+    caminho.write_text("Codigo;Saldo atual\n1;10\n")
+
+    db = sessao_sqlite()
+    db.add(ArquivoConciliacao(id=1, conciliacao_id=1, caminho_arquivo=str(caminho),
+                              data_conciliacao=datetime(2026, 1, 31)))
+    db.commit()
+    db.close()
+
+    monkeypatch.setattr(arquivo_colunar, "SessionLocal", sessao_sqlite)
+    arquivo_colunar.gerar_copia_colunar(1)
+
+    db = sessao_sqlite()
+    assert db.get(ArquivoConciliacao, 1).status_colunar == arquivo_colunar.NAO_SUPORTADO
+    db.close()
@@ -0,0 +1,51 @@
+"""Gravação dos uploads (services.arquivo_upload.salvar_upload)."""
+import hashlib
+import io
+import threading
+
+import pytest
+
+from services.arquivo_upload import salvar_upload
+
+
+class _OrigemLenta(io.BytesIO):
+    """Origem que cede a vez a cada bloco, para intercalar as threads."""
+
+    def __init__(self, dados, barreira):
+        super().__init__(dados)
+        self.barreira = barreira
+
+    def read(self, tamanho=-1):
+        try:
+            self.barreira.wait(timeout=1)
+        except threading.BrokenBarrierError:
+            pass
+        return super().read(tamanho)
+
+
+def test_uploads_simultaneos_do_mesmo_destino_nao_se_misturam(tmp_path):
+    destino = tmp_path / "1_balancete.xlsx"
+    conteudos = [bytes([i]) * 64 * 1024 for i in range(1, 5)]
+    barreira = threading.Barrier(len(conteudos))
+    resultados = {}
+
+    def enviar(i):
+        resultados[i] = salvar_upload(_OrigemLenta(conteudos[i], barreira), destino, bloco_bytes=4096)
+
+    threads = [threading.Thread(target=enviar, args=(i,)) for i in range(len(conteudos))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    final = destino.read_bytes()
+    assert final in conteudos
+    assert hashlib.sha256(final).hexdigest() in {sha for sha, _ in resultados.values()}
+    assert [p.name for p in tmp_path.iterdir()] == [destino.name]
+
+
+def test_upload_acima_do_limite_nao_deixa_arquivo(tmp_path):
+    destino = tmp_path / "grande.xlsx"
+    with pytest.raises(ValueError):
+        salvar_upload(io.BytesIO(b"x" * 100), destino, max_bytes=10, bloco_bytes=8)
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,107 @@
+"""Busca de combinações de valores (tools.combinacao_valores)."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import services.conciliacao_service as conciliacao_service
+from schemas.conciliacao_schema import (
+    BaseContabilFiltrada,
+    BaseContabilGeral,
+    BaseOrigem,
+    RequestConciliacao
+)
+from tools.combinacao_valores import (
+    BITS_MASCARA,
+    LIMITE_ITENS_COMBINACAO,
+    MAX_SOMAS_METADE,
+    OrcamentoBusca,
+    _itens_por_metade,
+    _quantidade_somas,
+    buscar_combinacoes
+)
+
+
+def test_grupos_que_somam_o_alvo():
+    titulos = pd.DataFrame({"codigo": ["A"] * 4, "centavos": [1000, 2500, 3333, 700]}, index=[10, 11, 12, 13])
+    lancamentos = pd.DataFrame({"codigo": ["A", "A"], "centavos": [3500, 4033]})
+    resultado = buscar_combinacoes(titulos, lancamentos, ["A"])
+    grupos = sorted((g["valor_alvo"], sorted(g["linhas"])) for g in resultado["grupos"])
+    assert grupos == [(35.0, [10, 11]), (40.33, [12, 13])]
+    assert not resultado["esgotado"]
+
+
+@pytest.mark.parametrize("max_itens", range(2, LIMITE_ITENS_COMBINACAO + 1))
+def test_metade_respeita_max_somas(max_itens):
+    itens = _itens_por_metade(max_itens)
+    assert itens <= BITS_MASCARA
+    assert _quantidade_somas(itens, max_itens) <= MAX_SOMAS_METADE
+    assert itens == BITS_MASCARA or _quantidade_somas(itens + 1, max_itens) > MAX_SOMAS_METADE
+
+
+def test_max_itens_da_requisicao_e_limitado():
+    rng = np.random.default_rng(0)
+    titulos = pd.DataFrame({"codigo": "P", "centavos": rng.integers(1, 10 ** 5, 60)})
+    lancamentos = pd.DataFrame({"codigo": ["P"], "centavos": [10 ** 9]})
+    resultado = buscar_combinacoes(titulos, lancamentos, ["P"], max_itens=28,
+                                   orcamento=OrcamentoBusca(segundos=5))
+    assert resultado["candidatos"] <= 2 * MAX_SOMAS_METADE
+
+
+def _cliente_com_200_titulos():
+    # 198 títulos perto do alvo (nenhum par deles soma 1000,00) e o par real longe dele
+    rng = np.random.default_rng(1)
+    centavos = rng.integers(95_000, 99_999, 198).tolist() + [30_000, 70_000]
+    titulos = pd.DataFrame({"codigo": "C", "centavos": centavos}, index=range(100, 300))
+    lancamentos = pd.DataFrame({"codigo": ["C"], "centavos": [100_000]})
+    return titulos, lancamentos
+
+
+@pytest.mark.parametrize("max_itens", [2, 3, 4])
+def test_cliente_com_muitos_titulos_nao_estoura_a_mascara(max_itens):
+    titulos, lancamentos = _cliente_com_200_titulos()
+    resultado = buscar_combinacoes(titulos, lancamentos, ["C"], max_itens=max_itens,
+                                   orcamento=OrcamentoBusca(segundos=30))
+    assert not resultado["esgotado"]
+    assert resultado["buscas_truncadas"] == 1
+    assert resultado["codigos_truncados"] == ["C"]
+
+
+def test_busca_sem_corte_nao_e_marcada_como_truncada():
+    titulos = pd.DataFrame({"codigo": "C", "centavos": [30_000, 70_000, 5]}, index=[1, 2, 3])
+    lancamentos = pd.DataFrame({"codigo": ["C"], "centavos": [100_000]})
+    resultado = buscar_combinacoes(titulos, lancamentos, ["C"])
+    assert [sorted(g["linhas"]) for g in resultado["grupos"]] == [[1, 2]]
+    assert resultado["buscas_truncadas"] == 0
+    assert resultado["codigos_truncados"] == []
+
+
+def test_orcamento_consultado_antes_de_enumerar():
+    titulos = pd.DataFrame({"codigo": "P", "centavos": np.arange(1, 41)})
+    lancamentos = pd.DataFrame({"codigo": ["P"], "centavos": [10 ** 9]})
+    orcamento = OrcamentoBusca(segundos=5, max_candidatos=10)
+    resultado = buscar_combinacoes(titulos, lancamentos, ["P"], orcamento=orcamento)
+    assert resultado["esgotado"]
+    assert resultado["codigos_pendentes"] == 1
+
+
+@pytest.mark.parametrize("parametro, esperado", [(0, 0), (None, 1), (0.05, 5)])
+def test_tolerancia_zero_pode_ser_pedida(monkeypatch, parametro, esperado):
+    chamadas = []
+    vazio = pd.DataFrame({"codigo": [], "centavos": []})
+    monkeypatch.setattr(conciliacao_service, "normalizar_titulos_financeiro", lambda df, hoje: vazio)
+    monkeypatch.setattr(conciliacao_service, "normalizar_lancamentos_contabilidade", lambda df: vazio)
+    monkeypatch.setattr(conciliacao_service, "buscar_combinacoes",
+                        lambda *args, **kwargs: chamadas.append(kwargs))
+
+    parametros = {"data_base": "2026-01-31"}
+    if parametro is not None:
+        parametros["tolerancia_combinacao"] = parametro
+    request = RequestConciliacao(
+        base_origem=BaseOrigem(registros=[]),
+        base_contabil_filtrada=BaseContabilFiltrada(registros=[], conta_contabil="1"),
+        base_contabil_geral=BaseContabilGeral(registros=[]),
+        parametros=parametros
+    )
+    df_completo = pd.DataFrame({"Origem": [], "Diferença Absoluta": [], "Código": []})
+    conciliacao_service.ConciliacaoService().combinar_valores(request, vazio, vazio, df_completo)
+    assert chamadas[0]["tolerancia_centavos"] == esperado
@@ -0,0 +1,114 @@
+"""Consulta ao cache de resultados nas rotas async (routers.conciliacao_router)."""
+import asyncio
+
+import pytest
+
+import routers.conciliacao_router as conciliacao_router
+import services.conciliacao_jobs as conciliacao_jobs
+
+_RESULTADO = {"resumo": {"situacao": "CONCILIADO"}, "observacoes": ["do cache"]}
+
+_REQUEST = {
+    "base_origem": {"registros": [{"cliente": "001 - A", "valor": 10}]},
+    "base_contabil_filtrada": {"registros": [{"Codigo": "001", "Saldo atual": 10}], "conta_contabil": "1.01"},
+    "base_contabil_geral": {"registros": [{"conta": "1.01", "valor": 10}]},
+    "parametros": {"data_base": "2026-01-31"},
+}
+
+
+class _CacheFalso:
+    """Sempre acerta; registra se foi chamado de dentro do event loop."""
+
+    def __init__(self):
+        self.no_event_loop = []
+
+    def obter(self, chave):
+        try:
+            asyncio.get_running_loop()
+            self.no_event_loop.append(True)
+        except RuntimeError:
+            self.no_event_loop.append(False)
+        return _RESULTADO
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    falso = _CacheFalso()
+    monkeypatch.setattr(conciliacao_router, "cache_conciliacao", falso)
+    monkeypatch.setattr(conciliacao_jobs, "cache_conciliacao", falso)
+    return falso
+
+
+def test_contabil_consulta_o_cache_fora_do_event_loop(cliente, cache):
+    resposta = cliente.post("/api/conciliacoes/contabil", json=_REQUEST)
+
+    assert resposta.status_code == 200, resposta.text
+    assert resposta.json() == _RESULTADO
+    assert cache.no_event_loop == [False]
+
+
+def test_job_consulta_o_cache_fora_do_event_loop(cliente, cache):
+    resposta = cliente.post("/api/conciliacoes/contabil/jobs", json=_REQUEST)
+
+    assert resposta.status_code == 202, resposta.text
+    assert resposta.json()["status"] == conciliacao_jobs.CONCLUIDO
+    assert cache.no_event_loop == [False]
+
+
+def test_cache_em_disco_aguenta_escritas_simultaneas_da_mesma_chave(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from services.cache_conciliacao import CacheDisco
+
+    cache = CacheDisco(tmp_path)
+
+    def gravar(_):
+        for _ in range(20):
+            cache.guardar("a" * 64, _RESULTADO)
+
+    with ThreadPoolExecutor(4) as executor:
+        list(executor.map(gravar, range(4)))
+
+    assert cache.obter("a" * 64) == _RESULTADO
+    assert list(tmp_path.glob("*.tmp")) == []
+
+
+class _CacheSemEscrita:
+    """Nunca acerta e falha ao gravar (ex.: disco cheio)."""
+
+    def obter(self, chave):
+        return None
+
+    def guardar(self, chave, resultado):
+        raise OSError("disco cheio")
+
+
+def test_falha_ao_gravar_no_cache_nao_derruba_a_conciliacao(cliente, monkeypatch):
+    from concurrent.futures import Future
+
+    import services.cache_conciliacao as cache_conciliacao
+
+    falso = _CacheSemEscrita()
+    monkeypatch.setattr(conciliacao_router, "cache_conciliacao", falso)
+    monkeypatch.setattr(cache_conciliacao, "cache_conciliacao", falso)
+
+    def submeter(funcao, request):
+        future = Future()
+        future.set_result((_RESULTADO, []))
+        return future
+
+    monkeypatch.setattr(conciliacao_router, "submeter_no_pool", submeter)
+
+    resposta = cliente.post("/api/conciliacoes/contabil", json=_REQUEST)
+    assert resposta.status_code == 200, resposta.text
+    assert resposta.json() == _RESULTADO
+
+
+def test_server_timing_legivel_pelo_frontend(cliente, cache):
+    resposta = cliente.post("/api/conciliacoes/contabil", json=_REQUEST,
+                            headers={"Origin": "https://app.exemplo.com.br"})
+
+    assert resposta.status_code == 200, resposta.text
+    assert resposta.headers["Server-Timing"] == 'cache;desc="hit"'
+    assert resposta.headers["Timing-Allow-Origin"] == "*"
+    assert "server-timing" in resposta.headers["Access-Control-Expose-Headers"].lower()
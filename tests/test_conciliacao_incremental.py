@@ -0,0 +1,122 @@
+"""Conciliação incremental por deltas (services.conciliacao_incremental)."""
+import pytest
+
+from schemas.conciliacao_schema import RequestConciliacao
+from services.conciliacao_incremental import estados_conciliacao
+from services.conciliacao_service import ConciliacaoService
+
+FINANCEIRO = [
+    {"cliente": "000672-01-A DANTAS", "valor": "1.000,00", "vencimento": "2026-01-10"},
+    {"cliente": "000673-01-B SILVA", "valor": "500,00", "vencimento": "2025-12-10"},
+    {"cliente": "000673-01-B SILVA", "valor": "250,00", "vencimento": "2025-12-20"},
+    {"cliente": "000676-01-E COSTA", "valor": "90,00", "vencimento": "2025-11-30"},
+]
+BALANCETE = [
+    {"Codigo": "C00067201", "Descricao": "A DANTAS", "Saldo atual": 1000},
+    {"Codigo": "C00067301", "Descricao": "B SILVA", "Saldo atual": 700},
+    {"Codigo": "C00067401", "Descricao": "C SOUZA", "Saldo atual": 80},
+    {"Codigo": "C00067601", "Descricao": "E COSTA", "Saldo atual": 60},
+]
+RAZAO_GERAL = [{"conta": "2.01", "codigo": "C00067301", "valor": 50}]
+
+
+def _request(financeiro, balancete) -> dict:
+    return {
+        "base_origem": {"registros": financeiro},
+        "base_contabil_filtrada": {"registros": balancete, "conta_contabil": "1.01"},
+        "base_contabil_geral": {"registros": RAZAO_GERAL},
+        "parametros": {"data_base": "2026-01-31"},
+    }
+
+
+def _completa(financeiro, balancete) -> dict:
+    return ConciliacaoService().executar(RequestConciliacao(**_request(financeiro, balancete)))
+
+
+def _sem_horario(retorno: dict) -> dict:
+    retorno = dict(retorno, resumo=dict(retorno["resumo"]))
+    retorno["resumo"].pop("data_processamento")
+    retorno.pop("incremental", None)
+    return retorno
+
+
+@pytest.fixture
+def incremental(cliente):
+    estados_conciliacao.limpar()
+    resposta = cliente.post("/api/conciliacoes/contabil/incremental", json={
+        "empresa_id": 1, "periodo": "2026-01", "conciliacao": _request(FINANCEIRO, BALANCETE),
+    })
+    assert resposta.status_code == 200, resposta.text
+    assert _sem_horario(resposta.json()) == _sem_horario(_completa(FINANCEIRO, BALANCETE))
+    yield cliente
+    estados_conciliacao.limpar()
+
+
+def _patch(cliente, base_origem=None, base_contabil_filtrada=None, empresa_id=1):
+    return cliente.patch("/api/conciliacoes/contabil/incremental", json={
+        "empresa_id": empresa_id, "conta_contabil": "1.01", "periodo": "2026-01",
+        "base_origem": base_origem or {},
+        "base_contabil_filtrada": base_contabil_filtrada or {},
+    })
+
+
+def test_delta_nas_duas_bases_igual_a_conciliacao_completa(incremental):
+    novo_titulo = {"cliente": "000674-01-C SOUZA", "valor": "80,00", "vencimento": "2026-01-05"}
+    titulo_corrigido = {"cliente": "000673-01-B SILVA", "valor": "200,00", "vencimento": "2025-12-20"}
+    lancamento_novo = {"Codigo": "C00067501", "Descricao": "D LIMA", "Saldo atual": 40}
+    lancamento_corrigido = {"Codigo": "C00067201", "Descricao": "A DANTAS", "Saldo atual": 1100}
+
+    resposta = _patch(
+        incremental,
+        base_origem={
+            "adicionados": [novo_titulo],
+            "alterados": [{"anterior": FINANCEIRO[2], "atual": titulo_corrigido}],
+            "removidos": [FINANCEIRO[3]],
+        },
+        base_contabil_filtrada={
+            "adicionados": [lancamento_novo],
+            "alterados": [{"anterior": BALANCETE[0], "atual": lancamento_corrigido}],
+            "removidos": [BALANCETE[3]],
+        },
+    )
+    assert resposta.status_code == 200, resposta.text
+    assert resposta.json()["incremental"]["registros_nao_encontrados"] == []
+
+    financeiro = [FINANCEIRO[0], FINANCEIRO[1], titulo_corrigido, novo_titulo]
+    balancete = [lancamento_corrigido, BALANCETE[1], BALANCETE[2], lancamento_novo]
+    esperado = _completa(financeiro, balancete)
+    assert _sem_horario(resposta.json()) == _sem_horario(esperado)
+    # A correção do A DANTAS passa a ser diferença do lado da contabilidade
+    assert [item["identificador"] for item in esperado["diferencas_contabilidade_maior"]] == ["C00067201"]
+
+
+def test_remocao_que_esvazia_um_codigo(incremental):
+    # E COSTA sai das duas bases: o código some do resultado
+    resposta = _patch(
+        incremental,
+        base_origem={"removidos": [FINANCEIRO[3]]},
+        base_contabil_filtrada={"removidos": [BALANCETE[3]]},
+    )
+    assert resposta.status_code == 200, resposta.text
+
+    esperado = _completa(FINANCEIRO[:3], BALANCETE[:3])
+    assert _sem_horario(resposta.json()) == _sem_horario(esperado)
+    identificadores = [item["cnpj"] for item in resposta.json()["diferencas_origem_maior"]]
+    assert "C00067601" not in identificadores
+    assert resposta.json()["resumo"]["quantidade_registros_origem"] == 3
+
+
+def test_registro_removido_que_nao_existe_vira_alerta(incremental):
+    inexistente = {"cliente": "000699-01-Z NINGUEM", "valor": "1,00", "vencimento": "2026-01-01"}
+    resposta = _patch(incremental, base_origem={"removidos": [inexistente]})
+
+    assert resposta.status_code == 200, resposta.text
+    assert len(resposta.json()["incremental"]["registros_nao_encontrados"]) == 1
+    assert any("não encontrados" in alerta for alerta in resposta.json()["alertas"])
+
+
+@pytest.mark.parametrize("campo, valor", [("empresa_id", 2), ("conta_contabil", "9.99"), ("periodo", "2026-02")])
+def test_delta_sem_estado_devolve_404(incremental, campo, valor):
+    corpo = {"empresa_id": 1, "conta_contabil": "1.01", "periodo": "2026-01", campo: valor}
+    resposta = incremental.patch("/api/conciliacoes/contabil/incremental", json=corpo)
+    assert resposta.status_code == 404
@@ -0,0 +1,135 @@
+"""Pool de processos e store de jobs (services.conciliacao_jobs)."""
+import os
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import services.cache_conciliacao as cache_conciliacao
+import services.conciliacao_jobs as conciliacao_jobs
+from schemas.conciliacao_schema import RequestConciliacao
+from services.conciliacao_jobs import CONCLUIDO, FilaDeJobsCheia, JobStore, PoolProcessos
+
+
+def _dobrar(valor):
+    return valor * 2
+
+
+def _morrer():
+    # Simula o worker morto pelo OOM killer
+    os._exit(1)
+
+
+def test_pool_recriado_depois_de_worker_morto():
+    pool = PoolProcessos("teste", 1)
+    try:
+        assert pool.submeter(_dobrar, 2).result(timeout=30) == 4
+        quebrado = pool.executor()
+
+        with pytest.raises(BrokenProcessPool):
+            pool.submeter(_morrer).result(timeout=30)
+
+        # O próximo job roda num executor novo, não falha com o pool quebrado
+        assert pool.submeter(_dobrar, 21).result(timeout=30) == 42
+        assert pool.executor() is not quebrado
+    finally:
+        pool.encerrar()
+
+
+def test_submit_em_pool_quebrado_vai_para_executor_novo():
+    pool = PoolProcessos("teste", 1)
+    try:
+        quebrado = pool.executor()
+        with pytest.raises(BrokenProcessPool):
+            quebrado.submit(_morrer).result(timeout=30)
+
+        # Sem passar por submeter, o pool ainda aponta para o executor quebrado
+        assert pool.executor() is quebrado
+        assert pool.submeter(_dobrar, 5).result(timeout=30) == 10
+        assert pool.executor() is not quebrado
+    finally:
+        pool.encerrar()
+
+
+_REQUEST = RequestConciliacao(
+    base_origem={"registros": [{"cliente": "001 - A", "valor": 10}]},
+    base_contabil_filtrada={"registros": [{"Codigo": "001", "Saldo atual": 10}], "conta_contabil": "1.01"},
+    base_contabil_geral={"registros": [{"conta": "1.01", "valor": 10}]},
+    parametros={"data_base": "2026-01-31"},
+)
+
+
+@pytest.fixture
+def futures(monkeypatch):
+    """Troca o pool por futures controlados pelo teste."""
+    criados = []
+
+    def submeter(funcao, *args):
+        criados.append(Future())
+        return criados[-1]
+
+    monkeypatch.setattr(conciliacao_jobs, "submeter_no_pool", submeter)
+    return criados
+
+
+def _store(max_jobs):
+    store = JobStore(max_jobs=max_jobs)
+    store._progresso = {}   # sem Manager: os futures não vão para outro processo
+    return store
+
+
+def test_store_recusa_jobs_acima_do_limite_de_andamento(futures):
+    store = _store(max_jobs=2)
+    primeiro = store.submeter(_REQUEST)
+    store.submeter(_REQUEST)
+
+    with pytest.raises(FilaDeJobsCheia):
+        store.submeter(_REQUEST)
+
+    # Um job finalizado libera a vaga (e passa a ser o descartável)
+    futures[0].set_result(({"resumo": {}}, []))
+    assert store.obter(primeiro)["status"] == CONCLUIDO
+    store.submeter(_REQUEST)
+    assert len(store._jobs) == 2
+
+
+class _CacheQuebrado:
+    def __init__(self, store):
+        self.store = store
+        self.lock_ocupado = None
+
+    def obter(self, chave):
+        return None
+
+    def guardar(self, chave, resultado):
+        self.lock_ocupado = self.store._lock.locked()
+        raise OSError("disco cheio")
+
+
+def test_falha_no_cache_nao_vira_erro_do_job(futures, monkeypatch):
+    store = _store(max_jobs=10)
+    cache = _CacheQuebrado(store)
+    monkeypatch.setattr(cache_conciliacao, "cache_conciliacao", cache)
+    monkeypatch.setattr(conciliacao_jobs, "cache_conciliacao", cache)
+
+    job_id = store.submeter(_REQUEST, chave_cache="a" * 64)
+    futures[0].set_result(({"resumo": {"situacao": "CONCILIADO"}}, []))
+
+    job = store.obter_resultado(job_id)
+    assert job["status"] == CONCLUIDO
+    assert job["resultado"] == {"resumo": {"situacao": "CONCILIADO"}}
+    # A gravação no cache roda sem o lock do store
+    assert cache.lock_ocupado is False
+
+
+def test_rota_devolve_503_com_a_fila_cheia(cliente, futures, monkeypatch):
+    import routers.conciliacao_router as conciliacao_router
+
+    monkeypatch.setattr(conciliacao_router, "cache_conciliacao", None)
+    monkeypatch.setattr(conciliacao_jobs, "cache_conciliacao", None)
+    monkeypatch.setattr(conciliacao_jobs.job_store, "max_jobs", 0)
+    monkeypatch.setattr(conciliacao_jobs.job_store, "_progresso", {})
+
+    resposta = cliente.post("/api/conciliacoes/contabil/jobs", json=_REQUEST.model_dump())
+    assert resposta.status_code == 503
+    assert resposta.headers["Retry-After"] == "30"
@@ -0,0 +1,38 @@
+"""Conciliação em lote (services.conciliacao_lote)."""
+from concurrent.futures import Future
+
+import services.conciliacao_lote as conciliacao_lote
+from schemas.conciliacao_schema import RequestConciliacaoLote
+
+
+def _lote(base_origem, contas):
+    return RequestConciliacaoLote(
+        base_origem={"registros": base_origem},
+        base_contabil_geral={"registros": [{"conta": "1.01", "valor": 1}]},
+        contas=contas,
+        parametros={"data_base": "2026-01-31"},
+    )
+
+
+def test_base_compartilhada_vazia_quando_todas_as_contas_tem_a_propria(monkeypatch):
+    recebidos = []
+
+    def submeter(funcao, requisicao, financeiro):
+        recebidos.append((requisicao.base_contabil_filtrada.conta_contabil, financeiro))
+        future = Future()
+        future.set_exception(RuntimeError("sem worker no teste"))
+        return future
+
+    monkeypatch.setattr(conciliacao_lote, "submeter_no_pool", submeter)
+    propria = {"registros": [{"cliente": "A", "valor": 10}]}
+    request = _lote([], [
+        {"conta_contabil": "1.01", "registros": [{"x": 1}], "base_origem": propria},
+        {"conta_contabil": "1.02", "registros": [{"x": 1}], "base_origem": propria},
+    ])
+
+    assert conciliacao_lote.validar_lote(request) == (True, "")
+    resultado = conciliacao_lote.executar_lote(request)
+
+    # A base compartilhada vazia não é preparada; cada conta segue com a sua
+    assert recebidos == [("1.01", None), ("1.02", None)]
+    assert resultado["resumo"]["contas_com_erro"] == 2
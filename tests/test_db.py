@@ -0,0 +1,21 @@
+"""Configuração do banco (db.py)."""
+import db
+
+
+def test_url_assincrona_troca_driver_e_sslmode():
+    url, connect_args = db.url_assincrona("postgresql://u:s@host:5432/base?sslmode=require")
+    assert url.drivername == "postgresql+asyncpg"
+    assert "sslmode" not in url.query
+    assert connect_args == {"ssl": "require"}
+
+
+def test_url_assincrona_sqlite():
+    url, connect_args = db.url_assincrona("sqlite:///local.db")
+    assert url.drivername == "sqlite+aiosqlite"
+    assert connect_args == {}
+
+
+def test_engine_assincrono_so_no_primeiro_uso():
+    # Importar a aplicação não abre o segundo pool
+    import main  # noqa: F401
+    assert db._async_engine is None
@@ -0,0 +1,55 @@
+"""Diferenças persistidas (services.diferencas_conciliacao, tools.mappers)."""
+from decimal import Decimal
+
+import pandas as pd
+
+from models import DiferencaConciliacao
+from services.diferencas_conciliacao import listar_diferencas
+from tools.mappers import tabela_diferencas
+
+
+def _popular(sessao, valores):
+    db = sessao()
+    db.add_all([
+        DiferencaConciliacao(
+            id=i + 1, conciliacao_id=1, codigo=f"C{i}", cliente="Cliente",
+            valor_financeiro=0, valor_contabilidade=valor, diferenca=valor,
+            diferenca_abs=abs(valor), origem="Ambos", tipo_diferenca="Contabilidade maior"
+        )
+        for i, valor in enumerate(valores)
+    ])
+    db.commit()
+    return db
+
+
+def test_paginas_em_ordem_sem_repetir_com_empates(sessao_sqlite):
+    # Muitos empates em diferenca_abs: o id desempata na mesma direção
+    valores = [Decimal(v) for v in ["10.00", "-5.00", "10.00", "7.50", "5.00", "10.00", "1.00", "-7.50"]]
+    db = _popular(sessao_sqlite, valores)
+
+    vistos, cursor = [], None
+    while True:
+        pagina = listar_diferencas(db, 1, cursor=cursor, limite=3)
+        vistos += [(item.diferenca_abs, item.id) for item in pagina["itens"]]
+        cursor = pagina["proximo_cursor"]
+        if not cursor:
+            break
+    db.close()
+
+    assert len(vistos) == len(valores) == len(set(vistos))
+    assert vistos == sorted(vistos, reverse=True)
+
+
+def test_tabela_diferencas_corta_codigo_e_cliente():
+    df_completo = pd.DataFrame({
+        "Código": ["X" * 80],
+        "Cliente": ["Y" * 300],
+        "Valor Financeiro": [1.0],
+        "Valor Contabilidade": [0.0],
+        "Diferença": [-1.0],
+        "Origem": ["Só Financeiro"],
+        "Tipo Diferença": ["Exclusivo"],
+    })
+    tabela = tabela_diferencas(df_completo)
+    assert len(tabela.loc[0, "codigo"]) == 50
+    assert len(tabela.loc[0, "cliente"]) == 255
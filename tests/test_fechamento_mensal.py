@@ -0,0 +1,77 @@
+"""Fechamento mensal (services.fechamento_mensal)."""
+from concurrent.futures import Future
+from datetime import datetime
+
+import pandas as pd
+
+import services.fechamento_mensal as fechamento_mensal
+from models import ArquivoConciliacao, Conciliacao, Empresa, PlanoDeContas
+
+
+class _PoolFalso:
+    """Registra os envios; cada conta termina com erro na hora."""
+
+    def __init__(self, eventos):
+        self.eventos = eventos
+
+    def submeter(self, funcao, caminho, conta_contabil, parametros, financeiro):
+        self.eventos.append(("enviada", parametros["empresa_id"], conta_contabil))
+        future = Future()
+        future.set_exception(RuntimeError("sem worker no teste"))
+        return future
+
+
+def _popular(db, tmp_path, empresa_id):
+    db.add(Empresa(id=empresa_id, nome=f"Empresa {empresa_id}", cnpj=str(empresa_id), status=True))
+    for indice, conta in enumerate(["1.01", "1.02"], start=1):
+        conta_id = empresa_id * 10 + indice
+        db.add(PlanoDeContas(id=conta_id, empresa_id=empresa_id, conta_contabil=conta,
+                             tipo_conta="2", conciliavel=True, descricao=conta))
+        db.add(Conciliacao(id=conta_id, empresa_id=empresa_id, conta_contabil_id=conta_id,
+                           periodo="2026-01", saldo=0, status="pendente"))
+
+        balancete = tmp_path / f"{conta_id}_balancete.xlsx"
+        pd.DataFrame({"Codigo": ["001"], "Descricao": ["Cliente A"], "Saldo atual": [10.0]}) \
+            .to_excel(balancete, index=False)
+        db.add(ArquivoConciliacao(conciliacao_id=conta_id, caminho_arquivo=str(balancete),
+                                  data_conciliacao=datetime(2026, 1, 31)))
+
+    financeiro = tmp_path / f"{empresa_id}_financeiro.xlsx"
+    pd.DataFrame({"cliente": ["001 - Cliente A"], "valor": [10.0], "vencimento": [datetime(2026, 1, 10)]}) \
+        .to_excel(financeiro, index=False)
+    db.add(ArquivoConciliacao(conciliacao_id=empresa_id * 10 + 1, caminho_arquivo=str(financeiro),
+                              data_conciliacao=datetime(2026, 1, 31)))
+
+
+def test_todas_as_empresas_vao_ao_pool_antes_da_coleta(sessao_sqlite, tmp_path, monkeypatch):
+    db = sessao_sqlite()
+    _popular(db, tmp_path, 1)
+    _popular(db, tmp_path, 2)
+    db.commit()
+    db.close()
+
+    eventos = []
+    registrar_erro = fechamento_mensal._registrar_erro
+
+    def coletada(db, resumo, empresa_id, conta_contabil, conciliacao_id, erro):
+        eventos.append(("coletada", empresa_id, conta_contabil))
+        registrar_erro(db, resumo, empresa_id, conta_contabil, conciliacao_id, erro)
+
+    monkeypatch.setattr(fechamento_mensal, "SessionLocal", sessao_sqlite)
+    monkeypatch.setattr(fechamento_mensal, "pool_fechamento", _PoolFalso(eventos))
+    monkeypatch.setattr(fechamento_mensal, "_registrar_erro", coletada)
+
+    resumo = fechamento_mensal.fechar_periodo("2026-01")
+
+    assert [evento[0] for evento in eventos] == ["enviada"] * 4 + ["coletada"] * 4
+    assert sorted(evento[1:] for evento in eventos[4:]) == [
+        (1, "1.01"), (1, "1.02"), (2, "1.01"), (2, "1.02")
+    ]
+    assert resumo["contas_com_erro"] == 4
+    assert resumo["contas_sem_arquivo"] == 0
+
+
+def test_pool_do_fechamento_separado_do_da_conciliacao():
+    from services.conciliacao_jobs import pool_conciliacao
+
+    assert fechamento_mensal.pool_fechamento is not pool_conciliacao
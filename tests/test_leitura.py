@@ -0,0 +1,137 @@
+"""Leitura projetada do .xlsx (tools.leitura) comparada com o pd.read_excel."""
+import io
+import zipfile
+
+import pandas as pd
+import pytest
+
+from tools.colunar import converter_para_colunar
+from tools.leitura import ler_planilha, ler_planilha_em_lotes
+
+_TIPOS = {"Conta": "texto", "Historico": "texto", "Valor": "numero", "Data": "data"}
+
+# Linha 4 ausente do XML, linha 6 presente mas vazia, linha 10 vazia no final;
+# textos compartilhados com rich text (<r><t>), textos inline e data1904
+_ABA = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">
+<sheetData>
+<row r="1"><c r="A1" t="s"><v>0</v></c><c r="B1" t="s"><v>1</v></c><c r="C1" t="s"><v>2</v></c><c r="D1" t="s"><v>3</v></c></row>
+<row r="2"><c r="A2" t="s"><v>4</v></c><c r="B2" t="s"><v>5</v></c><c r="C2"><v>10.5</v></c><c r="D2" s="1"><v>44000</v></c></row>
+<row r="3"><c r="A3" t="inlineStr"><is><t>1.02</t></is></c><c r="B3" t="inlineStr"><is><r><t>Pagamento </t></r><r><rPr><b/></rPr><t>fornecedor</t></r></is></c><c r="C3"><v>-3.25</v></c></row>
+<row r="5"><c r="A5"><v>103</v></c><c r="C5"><v>7</v></c><c r="D5" s="1"><v>44001.5</v></c></row>
+<row r="6"/>
+<row r="8"><c r="A8" t="s"><v>4</v></c><c r="B8" t="inlineStr"><is><t>Linha 8</t></is></c><c r="C8"><v>0</v></c></row>
+<row r="10"/>
+</sheetData>
+</worksheet>"""
+
+_STRINGS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">
+<si><t>Conta</t></si><si><t>Historico</t></si><si><t>Valor</t></si><si><t>Data</t></si>
+<si><t>1.01</t></si>
+<si><r><t>Recebimento </t></r><r><rPr><i/></rPr><t>cliente</t></r></si>
+</sst>"""
+
+_ESTILOS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">
+<fonts count="1"><font><sz val="11"/></font></fonts><fills count="1"><fill><patternFill patternType="none"/></fill></fills>
+<borders count="1"><border/></borders>
+<cellStyleXfs count="1"><xf numFmtId="0"/></cellStyleXfs>
+<cellXfs count="2"><xf numFmtId="0"/><xf numFmtId="22" applyNumberFormat="1"/></cellXfs>
+<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>
+</styleSheet>"""
+
+_PASTA = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+ xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<workbookPr date1904="1"/>
+<sheets><sheet name="Plan1" sheetId="1" r:id="rId1"/></sheets>
+</workbook>"""
+
+_RELACOES_PASTA = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>
+<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" Target="sharedStrings.xml"/>
+<Relationship Id="rId3" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>
+</Relationships>"""
+
+_RELACOES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>"""
+
+_TIPOS_CONTEUDO = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
+<Override PartName="/xl/sharedStrings.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>
+<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>
+</Types>"""
+
+
+@pytest.fixture
+def planilha(tmp_path):
+    caminho = tmp_path / "razao.xlsx"
+    with zipfile.ZipFile(caminho, "w") as pacote:
+        pacote.writestr("[Content_Types].xml", _TIPOS_CONTEUDO)
+        pacote.writestr("_rels/.rels", _RELACOES)
+        pacote.writestr("xl/workbook.xml", _PASTA)
+        pacote.writestr("xl/_rels/workbook.xml.rels", _RELACOES_PASTA)
+        pacote.writestr("xl/worksheets/sheet1.xml", _ABA)
+        pacote.writestr("xl/sharedStrings.xml", _STRINGS)
+        pacote.writestr("xl/styles.xml", _ESTILOS)
+    return caminho
+
+
+def _esperado(caminho) -> pd.DataFrame:
+    df = pd.read_excel(caminho, dtype={"Conta": str})
+    df["Valor"] = df["Valor"].astype("float64")
+    df["Data"] = pd.to_datetime(df["Data"])
+    return df
+
+
+def test_mesmas_linhas_e_valores_do_read_excel(planilha):
+    esperado = _esperado(planilha)
+    lido = ler_planilha(planilha, colunas=lambda cabecalho: _TIPOS)
+
+    # Vazias do meio ficam (linha 8 da planilha continua no índice 6), a do final não
+    assert len(lido) == len(esperado) == 7
+    assert lido["Historico"].tolist()[1] == "Pagamento fornecedor"
+    assert lido["Historico"].tolist()[0] == "Recebimento cliente"
+    esperado["Data"] = esperado["Data"].astype(lido["Data"].dtype)
+    pd.testing.assert_frame_equal(lido, esperado, check_dtype=False)
+    assert lido["Data"].iloc[0] == pd.Timestamp("2024-06-19")
+
+
+def test_lotes_e_arquivo_aberto_dao_o_mesmo_resultado(planilha):
+    inteiro = ler_planilha(planilha, colunas=lambda cabecalho: _TIPOS)
+
+    lotes = list(ler_planilha_em_lotes(planilha, 2, colunas=lambda cabecalho: _TIPOS,
+                                       usar_colunar=False))
+    assert [len(lote) for lote in lotes] == [2, 2, 2, 1]
+    pd.testing.assert_frame_equal(pd.concat(lotes, ignore_index=True), inteiro)
+
+    aberto = ler_planilha(io.BytesIO(planilha.read_bytes()), colunas=lambda cabecalho: _TIPOS)
+    pd.testing.assert_frame_equal(aberto, inteiro)
+
+    # Sem projeção (openpyxl) e pela cópia colunar: mesmas linhas
+    assert len(ler_planilha(planilha)) == len(inteiro)
+    converter_para_colunar(planilha, tamanho_lote=3)
+    pd.testing.assert_frame_equal(ler_planilha(planilha, colunas=lambda cabecalho: _TIPOS), inteiro)
+
+
+def test_linha_do_erro_na_importacao_aponta_a_linha_da_planilha(planilha):
+    from services.planodecontas_services import validar_contas_importacao
+
+    lido = ler_planilha(planilha, colunas=lambda cabecalho: _TIPOS)
+    df = pd.DataFrame({
+        "conta_contabil": lido["Conta"], "descricao": lido["Historico"],
+        "conciliavel": 0, "tipo_conta": 2, "conta_superior": None,
+    })
+    _, erros = validar_contas_importacao(df)
+    linhas = {erro["linha"]: erro["erro"] for erro in erros}
+    # 1.01 da linha 8 repete a da linha 2
+    assert linhas[8] == "conta_contabil repetida no arquivo"
+    assert linhas[5] == "descricao vazia"
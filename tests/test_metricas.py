@@ -0,0 +1,47 @@
+"""Medição das etapas e exportação para o Prometheus (services.metricas)."""
+import sys
+
+import pytest
+
+from services.metricas import MedidorEtapas, RegistroMetricas
+
+_MB = 1024 ** 2
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="RSS atual vem de /proc")
+def test_memoria_medida_por_etapa():
+    medidor = MedidorEtapas(usar_tracemalloc=False)
+    medidor.iniciar()
+
+    grande = b"x" * (64 * _MB)
+    medidor.marcar("alocar")
+    medidor.marcar("nada")
+    del grande
+    etapas = medidor.finalizar()
+
+    alocar, nada = etapas
+    assert alocar["memoria_delta_bytes"] >= 48 * _MB
+    # A etapa seguinte não herda o crescimento da anterior
+    assert abs(nada["memoria_delta_bytes"]) < 8 * _MB
+    # O pico da vida do processo continua disponível, mas à parte
+    assert nada["memoria_pico_bytes"] >= alocar["memoria_delta_bytes"]
+
+
+def test_exporta_crescimento_por_etapa_e_pico_do_worker():
+    registro = RegistroMetricas()
+    registro.registrar([
+        {"etapa": "normalizar_financeiro", "segundos": 0.5, "linhas_entrada": 100,
+         "memoria_delta_bytes": 10 * _MB, "memoria_pico_bytes": 900 * _MB},
+        {"etapa": "calcular_diferencas", "segundos": 0.1, "linhas_entrada": 100,
+         "memoria_delta_bytes": -5 * _MB, "memoria_pico_bytes": 900 * _MB},
+    ], empresa=1, linhas_entrada=100)
+    registro.registrar([
+        {"etapa": "normalizar_financeiro", "segundos": 0.5, "linhas_entrada": 100,
+         "memoria_delta_bytes": None, "memoria_pico_bytes": 300 * _MB},
+    ], empresa=2, linhas_entrada=100)
+
+    texto = registro.exportar()
+    assert f'conciliacao_etapa_memoria_crescimento_bytes_sum{{etapa="normalizar_financeiro"}} {10 * _MB:g}' in texto
+    assert 'conciliacao_etapa_memoria_crescimento_bytes_sum{etapa="calcular_diferencas"} 0' in texto
+    assert "# TYPE conciliacao_worker_memoria_pico_bytes gauge" in texto
+    assert f"conciliacao_worker_memoria_pico_bytes {900 * _MB}" in texto
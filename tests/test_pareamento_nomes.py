@@ -0,0 +1,79 @@
+"""Pareamento por nome dos exclusivos (tools.pareamento_nomes)."""
+import pandas as pd
+import pytest
+
+from tools.pareamento_nomes import COLUNAS_PARES, propor_pares_por_nome
+
+# Nomes sem relação com os demais: dão peso (IDF) aos tokens dos testes
+_OUTROS_FIN = ["ZULMIRA PEREIRA", "OTAVIO RAMOS"]
+_OUTROS_CONT = ["HORACIO LUZ", "TEREZINHA MOTA"]
+
+
+def _completo(financeiro, contabilidade):
+    linhas = [
+        {"Código": f"F{i}", "Cliente": nome, "Valor Financeiro": 10.0 * (i + 1),
+         "Valor Contabilidade": 0.0, "Origem": "Só Financeiro"}
+        for i, nome in enumerate(financeiro)
+    ] + [
+        {"Código": f"C{i}", "Cliente": nome, "Valor Financeiro": 0.0,
+         "Valor Contabilidade": 10.0 * (i + 1), "Origem": "Só Contabilidade"}
+        for i, nome in enumerate(contabilidade)
+    ]
+    return pd.DataFrame(linhas, columns=["Código", "Cliente", "Valor Financeiro", "Valor Contabilidade", "Origem"])
+
+
+def _pares(pares):
+    return sorted(zip(pares["codigo_financeiro"], pares["codigo_contabilidade"]))
+
+
+def test_acentos_e_forma_juridica_nao_atrapalham():
+    pares = propor_pares_por_nome(_completo(
+        ["JOSE SILVA COMERCIO"] + _OUTROS_FIN,
+        ["JOSÉ DA SILVA COMÉRCIO LTDA"] + _OUTROS_CONT,
+    ))
+
+    assert list(pares.columns) == COLUNAS_PARES
+    assert _pares(pares) == [("F0", "C0")]
+    assert pares.loc[0, "similaridade"] == 1.0
+    assert pares.loc[0, "valor_financeiro"] == 10.0
+    assert pares.loc[0, "cliente_contabilidade"] == "JOSÉ DA SILVA COMÉRCIO LTDA"
+
+
+def test_atribuicao_um_para_um_fica_com_o_mais_parecido():
+    # PEDRO ALVES NETO também é candidato de C0, mas o par exato vence
+    # e cada código aparece em um único par
+    pares = propor_pares_por_nome(_completo(
+        ["PEDRO ALVES NETO", "PEDRO ALVES", "MARIA SOUZA SANTOS", "MARIA SOUZA"] + _OUTROS_FIN,
+        ["PEDRO ALVES", "MARIA SOUZA", "MARIA SOUZA SANTOS"] + _OUTROS_CONT,
+    ), limiar=0.5)
+
+    assert _pares(pares) == [("F1", "C0"), ("F2", "C2"), ("F3", "C1")]
+    assert pares["codigo_financeiro"].is_unique and pares["codigo_contabilidade"].is_unique
+    assert pares["similaridade"].tolist() == [1.0, 1.0, 1.0]
+
+
+def test_token_comum_demais_nao_bloqueia():
+    completo = _completo(
+        ["COMERCIAL ALFA", "COMERCIAL BETA"] + _OUTROS_FIN,
+        ["COMERCIAL ALFA", "COMERCIAL GAMA"] + _OUTROS_CONT,
+    )
+
+    # COMERCIAL gera 2 x 2 candidatos: acima do limite, BETA e GAMA nem são comparados
+    pares = propor_pares_por_nome(completo, limiar=0.0, max_pares_por_token=1)
+    assert _pares(pares) == [("F0", "C0")]
+
+    # Abaixo do limite o token bloqueia e o par BETA/GAMA vira candidato
+    pares = propor_pares_por_nome(completo, limiar=0.0, max_pares_por_token=4)
+    assert _pares(pares) == [("F0", "C0"), ("F1", "C1")]
+
+
+@pytest.mark.parametrize("financeiro, contabilidade", [
+    ([], ["JOSE SILVA"]),
+    (["JOSE SILVA"], []),
+    (["JOSE SILVA"], ["MARIA SOUZA"]),
+])
+def test_sem_candidatos_devolve_tabela_vazia(financeiro, contabilidade):
+    pares = propor_pares_por_nome(_completo(financeiro, contabilidade))
+
+    assert pares.empty
+    assert list(pares.columns) == COLUNAS_PARES
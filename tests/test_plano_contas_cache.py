@@ -0,0 +1,82 @@
+"""Cache de leitura e ETag de GET /api/plano-contas/."""
+from sqlalchemy import event
+
+from models import Empresa, PlanoDeContas
+
+URL = "/api/plano-contas/"
+
+
+def _popular(sessao, contas=5):
+    db = sessao()
+    db.add(Empresa(id=1, nome="Empresa", cnpj="1"))
+    db.add_all([
+        PlanoDeContas(empresa_id=1, conta_contabil=f"1.{i:02d}", tipo_conta="2", descricao=f"Conta {i}")
+        for i in range(contas)
+    ])
+    db.commit()
+    db.close()
+
+
+def test_if_none_match_devolve_304_sem_ir_ao_banco(cliente, sessao_sqlite):
+    _popular(sessao_sqlite)
+    consultas = []
+    event.listen(sessao_sqlite.kw["bind"], "before_cursor_execute", lambda *a: consultas.append(a[2]))
+
+    resposta = cliente.get(URL, params={"empresa_id": 1})
+    assert resposta.status_code == 200
+    assert [c["conta_contabil"] for c in resposta.json()] == [f"1.{i:02d}" for i in range(5)]
+    etag = resposta.headers["etag"]
+    assert etag.startswith('"') and not etag.startswith("W/")
+
+    consultas.clear()
+    repetida = cliente.get(URL, params={"empresa_id": 1}, headers={"If-None-Match": etag})
+    assert repetida.status_code == 304
+    assert repetida.content == b""
+    assert repetida.headers["etag"] == etag
+    assert consultas == []
+
+    # Lista de ETags e forma fraca também conferem
+    assert cliente.get(URL, params={"empresa_id": 1},
+                       headers={"If-None-Match": f'"outro", W/{etag}'}).status_code == 304
+    assert cliente.get(URL, params={"empresa_id": 1},
+                       headers={"If-None-Match": '"outro"'}).status_code == 200
+
+
+def test_escrita_invalida_o_cache(cliente, sessao_sqlite):
+    _popular(sessao_sqlite)
+    etag = cliente.get(URL, params={"empresa_id": 1}).headers["etag"]
+
+    criada = cliente.post(URL, json={
+        "empresa_id": 1, "conta_contabil": "0.01", "descricao": "Nova", "tipo_conta": "1"
+    })
+    assert criada.status_code == 201
+
+    resposta = cliente.get(URL, params={"empresa_id": 1}, headers={"If-None-Match": etag})
+    assert resposta.status_code == 200
+    assert resposta.json()[0]["conta_contabil"] == "0.01"
+    etag_nova = resposta.headers["etag"]
+    assert etag_nova != etag
+
+    cliente.put(f"{URL}{criada.json()['id']}", json={"descricao": "Alterada"})
+    resposta = cliente.get(URL, params={"empresa_id": 1})
+    assert resposta.json()[0]["descricao"] == "Alterada"
+
+    # Sem a conta criada, o conteúdo (e o ETag) volta a ser o original
+    assert cliente.delete(f"{URL}{criada.json()['id']}").status_code == 204
+    assert cliente.get(URL, params={"empresa_id": 1}).headers["etag"] == etag
+
+
+def test_paginas_por_cursor_saem_do_cache(cliente, sessao_sqlite):
+    _popular(sessao_sqlite, contas=7)
+    contas, cursor = [], None
+    while True:
+        params = {"empresa_id": 1, "limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        resposta = cliente.get(URL, params=params)
+        contas += [c["conta_contabil"] for c in resposta.json()]
+        cursor = resposta.headers.get("x-proximo-cursor")
+        if not cursor:
+            break
+    assert contas == [f"1.{i:02d}" for i in range(7)]
+    assert cliente.get(URL, params={"empresa_id": 1, "cursor": "xyz"}).status_code == 400
@@ -0,0 +1,46 @@
+"""POST /api/plano-contas/consolidacao."""
+import io
+
+import pandas as pd
+
+from tests.test_plano_contas_hierarquia import popular_plano
+
+URL = "/api/plano-contas/consolidacao"
+
+
+def _balancete_xlsx(linhas):
+    buffer = io.BytesIO()
+    pd.DataFrame(linhas, columns=["Codigo", "Descricao", "Saldo atual"]).to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+def test_consolidacao_soma_analiticas_e_aponta_divergencias(cliente, sessao_sqlite):
+    popular_plano(sessao_sqlite)
+    arquivo = _balancete_xlsx([
+        ("1", "Ativo", 999.0),          # informado diverge do calculado (950)
+        ("1.01", "Circulante", 250.0),  # confere
+        ("1.01.001", "Caixa", 100.0),
+        ("1.01.002", "Bancos", 150.0),
+        ("1.02.001", "Estoque", 700.0),
+        ("9.99", "Fora do plano", 5.0),
+    ])
+
+    resposta = cliente.post(
+        URL,
+        params={"empresa_id": 1, "somente_divergencias": False},
+        files={"file": ("balancete.xlsx", arquivo)},
+    )
+    assert resposta.status_code == 200, resposta.text
+    corpo = resposta.json()
+
+    saldos = {item["conta_contabil"]: item for item in corpo["saldos"]}
+    assert saldos["1"]["saldo_calculado"] == 950.0
+    assert saldos["1.01"]["saldo_calculado"] == 250.0
+    assert saldos["1.02"]["saldo_calculado"] == 700.0
+    assert saldos["1.02"]["saldo_informado"] is None
+    assert saldos["1"]["divergente"] and not saldos["1.01"]["divergente"]
+    assert corpo["contas_fora_do_plano"] == ["9.99"]
+    assert corpo["resumo"]["sinteticas_divergentes"] == 1
+
+    resposta = cliente.post(URL, params={"empresa_id": 1}, files={"file": ("balancete.xlsx", arquivo)})
+    assert [item["conta_contabil"] for item in resposta.json()["saldos"]] == ["1"]
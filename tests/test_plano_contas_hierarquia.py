@@ -0,0 +1,68 @@
+"""Consultas de hierarquia em /api/plano-contas/hierarquia/*."""
+from models import Empresa, PlanoDeContas
+
+URL = "/api/plano-contas/hierarquia"
+
+# (conta, conta superior, tipo, conciliável)
+PLANO = [
+    ("1", None, "1", False),
+    ("1.01", "1", "1", False),
+    ("1.01.001", "1.01", "2", True),
+    ("1.01.002", "1.01", "2", False),
+    ("1.02", "1", "1", False),
+    ("1.02.001", "1.02", "2", True),
+    ("2", None, "1", False),
+    ("2.01", "2", "2", True),
+]
+
+
+def popular_plano(sessao, plano=PLANO):
+    db = sessao()
+    db.add(Empresa(id=1, nome="Empresa", cnpj="1"))
+    db.add_all([
+        PlanoDeContas(empresa_id=1, conta_contabil=conta, conta_superior=superior,
+                      tipo_conta=tipo, conciliavel=conciliavel, descricao=f"Conta {conta}")
+        for conta, superior, tipo, conciliavel in plano
+    ])
+    db.commit()
+    db.close()
+
+
+def _contas(resposta):
+    assert resposta.status_code == 200, resposta.text
+    return [item["conta_contabil"] for item in resposta.json()]
+
+
+def test_subarvore_em_pre_ordem(cliente, sessao_sqlite):
+    popular_plano(sessao_sqlite)
+    resposta = cliente.get(f"{URL}/subarvore", params={"empresa_id": 1, "conta": "1"})
+    assert _contas(resposta) == ["1", "1.01", "1.01.001", "1.01.002", "1.02", "1.02.001"]
+    assert [item["profundidade"] for item in resposta.json()] == [0, 1, 2, 2, 1, 2]
+
+
+def test_ancestrais(cliente, sessao_sqlite):
+    popular_plano(sessao_sqlite)
+    resposta = cliente.get(f"{URL}/ancestrais", params={"empresa_id": 1, "conta": "1.01.002"})
+    assert _contas(resposta) == ["1", "1.01"]
+
+
+def test_conciliaveis(cliente, sessao_sqlite):
+    popular_plano(sessao_sqlite)
+    assert _contas(cliente.get(f"{URL}/conciliaveis", params={"empresa_id": 1, "conta": "1"})) == [
+        "1.01.001", "1.02.001"
+    ]
+    assert _contas(cliente.get(f"{URL}/conciliaveis", params={"empresa_id": 1})) == [
+        "1.01.001", "1.02.001", "2.01"
+    ]
+
+
+def test_conta_inexistente_404(cliente, sessao_sqlite):
+    popular_plano(sessao_sqlite)
+    resposta = cliente.get(f"{URL}/subarvore", params={"empresa_id": 1, "conta": "9"})
+    assert resposta.status_code == 404
+
+
+def test_ciclo_quebrado_nao_trava(cliente, sessao_sqlite):
+    popular_plano(sessao_sqlite, [("A", "B", "1", False), ("B", "A", "1", False), ("C", "A", "2", True)])
+    contas = _contas(cliente.get(f"{URL}/conciliaveis", params={"empresa_id": 1}))
+    assert contas == ["C"]
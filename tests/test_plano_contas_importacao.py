@@ -0,0 +1,45 @@
+"""Importação do plano de contas (services.planodecontas_services)."""
+import pandas as pd
+
+from services.planodecontas_services import validar_contas_importacao
+
+
+def _arquivo(linhas):
+    return pd.DataFrame(linhas, columns=["conta_contabil", "descricao", "conciliavel", "tipo_conta", "conta_superior"])
+
+
+def test_descricao_vazia_e_erro_da_linha():
+    df = _arquivo([
+        ("1", "Ativo", 0, 1, None),
+        ("1.01", None, 0, 1, "1"),
+        ("1.02", "   ", 1, 2, "1"),
+        ("1.03", "Estoque", 1, 2, "1"),
+    ])
+    contas, erros = validar_contas_importacao(df)
+    assert contas["conta_contabil"].tolist() == ["1", "1.03"]
+    assert [(e["linha"], e["codigo_conta"], e["erro"]) for e in erros] == [
+        (3, "1.01", "descricao vazia"),
+        (4, "1.02", "descricao vazia"),
+    ]
+
+
+def test_importacao_lista_sem_erro(cliente, sessao_sqlite):
+    import io
+    buffer = io.BytesIO()
+    _arquivo([("1", "Ativo", 0, 1, None), ("1.01", "", 1, 2, "1")]).to_excel(buffer, index=False)
+
+    resposta = cliente.post("/api/plano-contas/importar", params={"empresa_id": 1},
+                            files={"file": ("plano.xlsx", buffer.getvalue())})
+    assert resposta.status_code == 200, resposta.text
+    assert [e["codigo_conta"] for e in resposta.json()["erros"]] == ["1.01"]
+
+    listagem = cliente.get("/api/plano-contas/", params={"empresa_id": 1})
+    assert listagem.status_code == 200
+    assert [c["conta_contabil"] for c in listagem.json()] == ["1"]
+
+
+def test_conciliavel_so_com_numeros():
+    df = _arquivo([("1", "Ativo", 0, 1, None), ("1.01", "Caixa", 1, 2, "1")]).astype(object)
+    contas, erros = validar_contas_importacao(df)
+    assert erros == []
+    assert contas["conciliavel"].tolist() == [False, True]
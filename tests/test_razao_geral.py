@@ -0,0 +1,91 @@
+"""Busca das diferenças no razão geral (tools.razao_geral)."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from tools.razao_geral import ALTA, BAIXA, MEDIA, IndiceRazaoGeral
+
+
+def _buscar(registros, codigos, valores, conta_esperada="1.01"):
+    indice = IndiceRazaoGeral(pd.DataFrame(registros), conta_esperada)
+    return indice.buscar(codigos, np.array(valores, dtype=np.float64)).to_dict("records")
+
+
+def test_codigo_e_valor_em_outra_conta_tem_confianca_alta():
+    registros = [
+        {"conta": "1.01", "codigo": "C001", "valor": 50, "historico": "na conta conciliada"},
+        {"conta": "2.01", "codigo": "C001", "valor": "-50,00", "historico": "lançado em outra conta"},
+    ]
+    resultado = _buscar(registros, ["C001"], [50.0])
+
+    # O primeiro lançamento é da conta esperada: vale o primeiro de outra conta
+    assert resultado == [{"posicao": 1, "criterio": "codigo_valor", "confianca": ALTA}]
+
+
+def test_lancamento_so_na_conta_esperada_e_ignorado():
+    registros = [
+        {"conta": "1.01", "codigo": "C001", "valor": 50},
+        {"conta": "1.01", "codigo": "C001", "valor": 50},
+        {"conta": "2.01", "codigo": "C002", "valor": 70},
+    ]
+    resultado = _buscar(registros, ["C001"], [50.0])
+
+    assert resultado == [{"posicao": -1, "criterio": "", "confianca": ""}]
+
+
+def test_conta_excluida_nao_conta_na_quantidade():
+    # Dois lançamentos de 30 (um na conta esperada): fora dela o valor é único
+    registros = [
+        {"conta": "1.01", "codigo": "C009", "valor": 30},
+        {"conta": "3.01", "codigo": "C008", "valor": 30},
+    ]
+    resultado = _buscar(registros, ["C001"], [30.0])
+
+    assert resultado == [{"posicao": 1, "criterio": "valor", "confianca": MEDIA}]
+
+
+@pytest.mark.parametrize("repeticoes, confianca", [(1, MEDIA), (2, BAIXA)])
+def test_so_valor_unico_ou_repetido(repeticoes, confianca):
+    registros = [{"conta": "2.01", "codigo": "C009", "valor": 80}] * repeticoes
+    resultado = _buscar(registros, ["C001"], [80.0])
+
+    assert resultado == [{"posicao": 0, "criterio": "valor", "confianca": confianca}]
+
+
+def test_codigo_sem_o_valor_tem_confianca_media():
+    registros = [
+        {"conta": "2.01", "codigo": "C001", "valor": 10},
+        {"conta": "2.02", "codigo": "C001", "valor": 20},
+    ]
+    resultado = _buscar(registros, ["C001"], [99.0])
+
+    assert resultado == [{"posicao": 0, "criterio": "codigo", "confianca": MEDIA}]
+
+
+def test_razao_sem_coluna_de_codigo_busca_so_pelo_valor():
+    registros = [
+        {"conta": "1.01", "valor": 50},
+        {"conta": "2.01", "valor": 50},
+        {"conta": "2.02", "valor": 60},
+    ]
+    resultado = _buscar(registros, ["C001", "C002", None], [50.0, 60.0, 70.0])
+
+    assert resultado == [
+        {"posicao": 1, "criterio": "valor", "confianca": MEDIA},
+        {"posicao": 2, "criterio": "valor", "confianca": MEDIA},
+        {"posicao": -1, "criterio": "", "confianca": ""},
+    ]
+
+
+def test_preencher_diferencas_informa_a_conta_encontrada():
+    indice = IndiceRazaoGeral.de_registros([
+        {"conta": "1.01", "codigo": "C001", "valor": 50, "historico": "conciliada"},
+        {"conta": "2.01", "codigo": "C001", "valor": 50, "historico": "transferência"},
+    ], conta_esperada="1.01")
+    diferencas = [{"cnpj": "C001", "diferenca": 50.0}, {"cnpj": "C002", "diferenca": 1.0}]
+
+    assert indice.preencher_diferencas(diferencas) == 1
+    assert diferencas[0]["conta_contabil_encontrada"] == "2.01"
+    assert diferencas[0]["historico_lancamento"] == "transferência"
+    assert diferencas[1]["encontrado_lancamentos"] is False
+    assert diferencas[1]["conta_contabil_esperada"] == "1.01"
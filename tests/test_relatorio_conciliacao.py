@@ -0,0 +1,114 @@
+"""Relatório de diferenças em Excel gerado por job (services.relatorio_conciliacao)."""
+from concurrent.futures import Future
+
+import openpyxl
+import pandas as pd
+import pytest
+
+import routers.conciliacao_router as conciliacao_router
+import services.conciliacao_jobs as conciliacao_jobs
+import services.relatorio_conciliacao as relatorio_conciliacao
+from schemas.conciliacao_schema import RequestConciliacao
+from services.conciliacao_jobs import CONCLUIDO, JobStore
+from services.conciliacao_service import ConciliacaoService
+from tools.calc_diferencas import COLUNAS_MOEDA, FORMATO_MOEDA, FORMATO_PERCENTUAL, calcular_diferencas
+from tools.contabilidade import normalizar_planilha_contabilidade
+from tools.financeiro import normalizar_planilha_financeira
+
+# 30 clientes no financeiro, 25 no balancete: 20 em comum (metade com
+# diferença), 10 só no financeiro e 5 só na contabilidade
+FINANCEIRO = [
+    {"cliente": f"{700 + i:06d}-01-CLIENTE {i}", "valor": f"{100 + i},00", "vencimento": "2026-01-10"}
+    for i in range(30)
+]
+BALANCETE = [
+    {"Codigo": f"C{700 + i:06d}01", "Descricao": f"CLIENTE {i}", "Saldo atual": 100 + i + (i % 2) * 7.5}
+    for i in range(20)
+] + [
+    {"Codigo": f"C{900 + i:06d}01", "Descricao": f"OUTRO {i}", "Saldo atual": 40 + i}
+    for i in range(5)
+]
+REQUEST = {
+    "base_origem": {"registros": FINANCEIRO},
+    "base_contabil_filtrada": {"registros": BALANCETE, "conta_contabil": "1.01"},
+    "base_contabil_geral": {"registros": [{"conta": "1.01", "valor": 1}]},
+    "parametros": {"data_base": "2026-01-31"},
+}
+
+
+@pytest.fixture
+def relatorios(cliente, monkeypatch, tmp_path):
+    """Jobs rodando na hora, no próprio processo, com os relatórios em tmp_path."""
+    store = JobStore()
+    store._progresso = {}   # sem Manager: a tarefa roda neste processo
+
+    def submeter(funcao, *args):
+        future = Future()
+        future.set_result(funcao(*args))
+        return future
+
+    monkeypatch.setattr(conciliacao_router, "job_store", store)
+    monkeypatch.setattr(conciliacao_jobs, "submeter_no_pool", submeter)
+    monkeypatch.setattr(relatorio_conciliacao, "RELATORIOS_DIR", tmp_path / "relatorios")
+    return cliente
+
+
+def _df_completo() -> pd.DataFrame:
+    request = RequestConciliacao(**REQUEST)
+    financeiro = normalizar_planilha_financeira(
+        pd.DataFrame(FINANCEIRO), data_base=ConciliacaoService.obter_data_base(request)
+    )
+    contabil = normalizar_planilha_contabilidade(pd.DataFrame(BALANCETE))
+    return calcular_diferencas(financeiro, contabil, salvar_arquivo=False)["df_completo"]
+
+
+def test_relatorio_gerado_e_baixado(relatorios, tmp_path):
+    resposta = relatorios.post("/api/conciliacoes/contabil/relatorios", json=REQUEST)
+    assert resposta.status_code == 202, resposta.text
+    job_id = resposta.json()["job_id"]
+
+    job = relatorios.get(f"/api/conciliacoes/contabil/jobs/{job_id}").json()
+    assert job["status"] == CONCLUIDO
+    assert job["progresso_percentual"] == 100.0
+
+    download = relatorios.get(f"/api/conciliacoes/contabil/relatorios/{job_id}/download")
+    assert download.status_code == 200, download.text
+    assert f"diferencas_{job_id}.xlsx" in download.headers["content-disposition"]
+    arquivo = tmp_path / "baixado.xlsx"
+    arquivo.write_bytes(download.content)
+    # O temporário foi renomeado: só sobra o relatório final
+    assert [p.name for p in (tmp_path / "relatorios").iterdir()] == [f"{job_id}.xlsx"]
+
+    esperado = _df_completo()
+    abas = pd.read_excel(arquivo, sheet_name=None)
+    assert list(abas) == ["Todas Diferenças", "Com Diferenças", "Só Financeiro", "Só Contabilidade", "Resumo"]
+
+    todas = abas["Todas Diferenças"]
+    assert list(todas.columns) == list(esperado.columns)
+    assert len(todas) == len(esperado) == 35
+    assert todas["Código"].astype(str).tolist() == esperado["Código"].astype(str).tolist()
+    assert todas["Diferença"].round(2).tolist() == esperado["Diferença"].round(2).tolist()
+    assert len(abas["Com Diferenças"]) == int((esperado["Diferença Absoluta"] > 0.01).sum()) == 25
+    assert len(abas["Só Financeiro"]) == 10
+    assert len(abas["Só Contabilidade"]) == 5
+
+    # Formatos aplicados na escrita (write-only), em todas as linhas de dados
+    planilha = openpyxl.load_workbook(arquivo)["Todas Diferenças"]
+    cabecalho = [celula.value for celula in planilha[1]]
+    assert all(celula.font.bold for celula in planilha[1])
+    for coluna in COLUNAS_MOEDA:
+        celulas = planilha.iter_rows(min_row=2, min_col=cabecalho.index(coluna) + 1,
+                                     max_col=cabecalho.index(coluna) + 1)
+        assert {linha[0].number_format for linha in celulas if linha[0].value is not None} == {FORMATO_MOEDA}
+    celulas = planilha.iter_rows(min_row=2, min_col=cabecalho.index("Diferença %") + 1,
+                                 max_col=cabecalho.index("Diferença %") + 1)
+    assert {linha[0].number_format for linha in celulas if linha[0].value is not None} == {FORMATO_PERCENTUAL}
+    assert planilha.column_dimensions["B"].width == 35
+
+
+def test_download_de_job_de_conciliacao_devolve_404(relatorios):
+    resposta = relatorios.post("/api/conciliacoes/contabil/jobs", json=REQUEST)
+    assert resposta.status_code == 202, resposta.text
+
+    download = relatorios.get(f"/api/conciliacoes/contabil/relatorios/{resposta.json()['job_id']}/download")
+    assert download.status_code == 404
@@ -0,0 +1,24 @@
+"""Rotas montadas na aplicação (conferido pelo schema OpenAPI)."""
+from main import app
+
+
+def test_rotas_montadas_sob_api():
+    caminhos = set(app.openapi()["paths"])
+
+    esperados = {
+        "/api/empresas/",
+        "/api/plano-contas/",
+        "/api/plano-contas/hierarquia/subarvore",
+        "/api/plano-contas/hierarquia/ancestrais",
+        "/api/plano-contas/hierarquia/conciliaveis",
+        "/api/plano-contas/consolidacao",
+        "/api/plano-contas/importar",
+        "/api/arquivos/",
+        "/api/arquivos/upload",
+        "/api/conciliacoes/contabil",
+        "/api/conciliacoes/contabil/lote",
+        "/api/conciliacoes/{conciliacao_id}/diferencas",
+        "/api/admin/fechamento/{periodo}",
+        "/metrics",
+    }
+    assert esperados <= caminhos, sorted(esperados - caminhos)
@@ -0,0 +1,36 @@
+"""Conversão de valores no formato brasileiro (tools.valores)."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from tools.valores import converter_valores_br
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("1.234,56", 1234.56),
+    ("1234,56", 1234.56),
+    ("1234", 1234.0),
+    ("R$ 1.234,56", 1234.56),
+    ("R$ -10,00", -10.0),
+    ("R$-1.234,56", -1234.56),
+    ("-R$ 10,00", -10.0),
+    ("  -1.234,56", -1234.56),
+    ("(1.234,56)", -1234.56),
+    ("R$ (1.234,56)", -1234.56),
+    ("1.234,56-", -1234.56),
+    ("1.234,56D", 1234.56),
+    ("1.234,56C", -1234.56),
+    ("R$ -10,00C", 10.0),
+])
+def test_formatos_aceitos(texto, esperado):
+    valores, falhas = converter_valores_br(pd.Series([texto], dtype=object))
+    assert valores.iloc[0] == pytest.approx(esperado)
+    assert not falhas.iloc[0]
+
+
+def test_coluna_mista_vazio_e_invalido():
+    serie = pd.Series([10, "R$ -5,50", "", None, "abc", 2.5], dtype=object)
+    valores, falhas = converter_valores_br(serie)
+    assert valores.iloc[[0, 1, 5]].tolist() == [10.0, -5.5, 2.5]
+    assert np.isnan(valores.iloc[2]) and np.isnan(valores.iloc[3]) and np.isnan(valores.iloc[4])
+    assert falhas.tolist() == [False, False, False, False, True, False]
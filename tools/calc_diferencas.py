@@ -1,6 +1,9 @@
+import numpy as np
 import pandas as pd
 from datetime import datetime
-from openpyxl import load_workbook
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
 
 
 def calcular_diferencas(df_financeiro: pd.DataFrame, df_contabilidade: pd.DataFrame, 
@@ -29,97 +32,14 @@ def calcular_diferencas(df_financeiro: pd.DataFrame, df_contabilidade: pd.DataFr
     
     print("📊 Calculando diferenças...")
     
-    # Padronizar nomes das colunas
-    df_fin = df_financeiro.copy()
-    df_cont = df_contabilidade.copy()
-    
     # Garantir que as colunas existem
-    if 'codigo' not in df_fin.columns or 'valor' not in df_fin.columns:
+    if 'codigo' not in df_financeiro.columns or 'valor' not in df_financeiro.columns:
         raise ValueError("df_financeiro deve ter colunas 'codigo' e 'valor'")
-    if 'codigo' not in df_cont.columns or 'valor' not in df_cont.columns:
+    if 'codigo' not in df_contabilidade.columns or 'valor' not in df_contabilidade.columns:
         raise ValueError("df_contabilidade deve ter colunas 'codigo' e 'valor'")
     
-    # Fazer merge completo (outer join) para pegar todos os códigos
-    df_merge = pd.merge(
-        df_fin[['codigo', 'cliente', 'valor']],
-        df_cont[['codigo', 'cliente', 'valor']],
-        on='codigo',
-        how='outer',
-        suffixes=('_fin', '_cont')
-    )
-    
-    # Preencher valores NaN com 0
-    df_merge['valor_fin'] = df_merge['valor_fin'].fillna(0)
-    df_merge['valor_cont'] = df_merge['valor_cont'].fillna(0)
-    
-    # Usar cliente do financeiro, se não existir usar da contabilidade
-    df_merge['cliente'] = df_merge['cliente_fin'].fillna(df_merge['cliente_cont'])
-    
-    # Calcular diferença: Contabilidade - Financeiro
-    df_merge['diferenca'] = df_merge['valor_cont'] - df_merge['valor_fin']
-    df_merge['diferenca_abs'] = df_merge['diferenca'].abs()
-    
-    # Calcular percentual de diferença
-    df_merge['diferenca_perc'] = 0.0
-    mask = df_merge['valor_fin'] != 0
-    df_merge.loc[mask, 'diferenca_perc'] = (
-        (df_merge.loc[mask, 'diferenca'] / df_merge.loc[mask, 'valor_fin']) * 100
-    )
-    
-    # Classificar origem dos registros
-    df_merge['origem'] = 'Ambos'
-    df_merge.loc[df_merge['valor_fin'] == 0, 'origem'] = 'Só Contabilidade'
-    df_merge.loc[df_merge['valor_cont'] == 0, 'origem'] = 'Só Financeiro'
-    
-    # Classificar tipo de diferença
-    df_merge['tipo_diferenca'] = 'Sem diferença'
-    df_merge.loc[df_merge['diferenca'] > 0, 'tipo_diferenca'] = 'Contabilidade > Financeiro'
-    df_merge.loc[df_merge['diferenca'] < 0, 'tipo_diferenca'] = 'Financeiro > Contabilidade'
-    df_merge.loc[df_merge['origem'] != 'Ambos', 'tipo_diferenca'] = 'Exclusivo'
-    
-    # Selecionar e ordenar colunas finais
-    df_resultado = df_merge[[
-        'codigo',
-        'cliente',
-        'valor_fin',
-        'valor_cont',
-        'diferenca',
-        'diferenca_abs',
-        'diferenca_perc',
-        'origem',
-        'tipo_diferenca'
-    ]].copy()
-    
-    # Renomear para melhor visualização
-    df_resultado.columns = [
-        'Código',
-        'Cliente',
-        'Valor Financeiro',
-        'Valor Contabilidade',
-        'Diferença',
-        'Diferença Absoluta',
-        'Diferença %',
-        'Origem',
-        'Tipo Diferença'
-    ]
-    
-    # Ordenar por diferença absoluta (maiores primeiro)
-    df_resultado = df_resultado.sort_values('Diferença Absoluta', ascending=False)
-    
-    # Calcular resumo
-    resumo = {
-        'total_registros': len(df_resultado),
-        'registros_ambos': len(df_resultado[df_resultado['Origem'] == 'Ambos']),
-        'registros_so_financeiro': len(df_resultado[df_resultado['Origem'] == 'Só Financeiro']),
-        'registros_so_contabilidade': len(df_resultado[df_resultado['Origem'] == 'Só Contabilidade']),
-        'registros_com_diferenca': len(df_resultado[df_resultado['Diferença Absoluta'] > 0.01]),
-        'registros_sem_diferenca': len(df_resultado[df_resultado['Diferença Absoluta'] <= 0.01]),
-        'diferenca_total': df_resultado['Diferença'].sum(),
-        'diferenca_absoluta_total': df_resultado['Diferença Absoluta'].sum(),
-        'maior_diferenca': df_resultado['Diferença Absoluta'].max(),
-        'valor_total_financeiro': df_resultado['Valor Financeiro'].sum(),
-        'valor_total_contabilidade': df_resultado['Valor Contabilidade'].sum()
-    }
+    df_resultado = classificar_diferencas(df_financeiro, df_contabilidade)
+    resumo = calcular_resumo(df_resultado)
     
     print(f"   ✓ Total de registros analisados: {resumo['total_registros']}")
     print(f"   ✓ Registros com diferença: {resumo['registros_com_diferenca']}")
@@ -137,32 +57,7 @@ def calcular_diferencas(df_financeiro: pd.DataFrame, df_contabilidade: pd.DataFr
         # Criar arquivo Excel com múltiplas abas
         print(f"\n💾 Salvando arquivo: {caminho_arquivo}")
         
-        with pd.ExcelWriter(caminho_arquivo, engine='openpyxl') as writer:
-            # Aba 1: Todas as diferenças
-            df_resultado.to_excel(writer, sheet_name='Todas Diferenças', index=False)
-            
-            # Aba 2: Apenas com diferenças significativas
-            df_com_dif = df_resultado[df_resultado['Diferença Absoluta'] > 0.01].copy()
-            df_com_dif.to_excel(writer, sheet_name='Com Diferenças', index=False)
-            
-            # Aba 3: Apenas no Financeiro
-            df_so_fin = df_resultado[df_resultado['Origem'] == 'Só Financeiro'].copy()
-            if len(df_so_fin) > 0:
-                df_so_fin.to_excel(writer, sheet_name='Só Financeiro', index=False)
-            
-            # Aba 4: Apenas na Contabilidade
-            df_so_cont = df_resultado[df_resultado['Origem'] == 'Só Contabilidade'].copy()
-            if len(df_so_cont) > 0:
-                df_so_cont.to_excel(writer, sheet_name='Só Contabilidade', index=False)
-            
-            # Aba 5: Resumo
-            df_resumo = pd.DataFrame([resumo]).T
-            df_resumo.columns = ['Valor']
-            df_resumo.index.name = 'Métrica'
-            df_resumo.to_excel(writer, sheet_name='Resumo')
-        
-        # Aplicar formatação
-        _formatar_arquivo_excel(caminho_arquivo)
+        salvar_planilha_diferencas(df_resultado, resumo, caminho_arquivo)
         
         print(f"   ✓ Arquivo salvo com {len(df_resultado)} registros")
         print(f"   ✓ Abas criadas: Todas Diferenças, Com Diferenças, Só Financeiro, Só Contabilidade, Resumo")
@@ -174,44 +69,208 @@ def calcular_diferencas(df_financeiro: pd.DataFrame, df_contabilidade: pd.DataFr
     }
 
 
-def _formatar_arquivo_excel(caminho_arquivo: str):
-    """Aplica formatação ao arquivo Excel gerado"""
+# Categorias fixas das colunas classificadas (a posição é o código categórico)
+ORIGENS = ['Ambos', 'Só Financeiro', 'Só Contabilidade']
+TIPOS_DIFERENCA = [
+    'Sem diferença',
+    'Contabilidade > Financeiro',
+    'Financeiro > Contabilidade',
+    'Exclusivo'
+]
+
+# Tolerância abaixo da qual um registro é considerado sem diferença
+TOLERANCIA_DIFERENCA = 0.01
+
+
+def classificar_diferencas(df_financeiro: pd.DataFrame, df_contabilidade: pd.DataFrame) -> pd.DataFrame:
+    """
+    Faz o merge por código e classifica origem/tipo de diferença em uma única
+    passada vetorizada, já devolvendo o DataFrame final ordenado.
     
-    wb = load_workbook(caminho_arquivo)
+    'Origem' e 'Tipo Diferença' saem como Categorical (códigos int8), o que
+    evita materializar milhões de strings repetidas.
+    """
     
-    # Formatar cada aba
-    for sheet_name in wb.sheetnames:
-        ws = wb[sheet_name]
-        
-        if sheet_name == 'Resumo':
-            continue
-        
-        # Encontrar colunas de valor
-        header = [cell.value for cell in ws[1]]
-        
-        for idx, col_name in enumerate(header, 1):
-            if col_name in ['Valor Financeiro', 'Valor Contabilidade', 'Diferença', 
-                           'Diferença Absoluta']:
-                # Aplicar formato de moeda
-                for row in range(2, ws.max_row + 1):
-                    cell = ws.cell(row=row, column=idx)
-                    cell.number_format = 'R$ #,##0.00;[RED]-R$ #,##0.00'
-            
-            elif col_name == 'Diferença %':
-                # Aplicar formato de percentual
-                for row in range(2, ws.max_row + 1):
-                    cell = ws.cell(row=row, column=idx)
-                    cell.number_format = '0.00%'
-        
-        # Ajustar largura das colunas
-        ws.column_dimensions['A'].width = 12  # Código
-        ws.column_dimensions['B'].width = 35  # Cliente
-        ws.column_dimensions['C'].width = 18  # Valor Financeiro
-        ws.column_dimensions['D'].width = 20  # Valor Contabilidade
-        ws.column_dimensions['E'].width = 15  # Diferença
-        ws.column_dimensions['F'].width = 18  # Diferença Absoluta
-        ws.column_dimensions['G'].width = 12  # Diferença %
-        ws.column_dimensions['H'].width = 18  # Origem
-        ws.column_dimensions['I'].width = 25  # Tipo Diferença
+    # Fazer merge completo (outer join) para pegar todos os códigos
+    df_merge = pd.merge(
+        df_financeiro[['codigo', 'cliente', 'valor']],
+        df_contabilidade[['codigo', 'cliente', 'valor']],
+        on='codigo',
+        how='outer',
+        suffixes=('_fin', '_cont')
+    )
+    
+    valor_fin = df_merge['valor_fin'].fillna(0).to_numpy(dtype=np.float64)
+    valor_cont = df_merge['valor_cont'].fillna(0).to_numpy(dtype=np.float64)
+    
+    # Diferença: Contabilidade - Financeiro
+    diferenca = valor_cont - valor_fin
+    diferenca_abs = np.abs(diferenca)
+    
+    diferenca_perc = np.zeros_like(diferenca)
+    np.divide(diferenca, valor_fin, out=diferenca_perc, where=valor_fin != 0)
+    diferenca_perc *= 100
+    
+    # Origem: 0=Ambos, 1=Só Financeiro, 2=Só Contabilidade
+    # (valor_cont == 0 tem precedência, como na classificação original)
+    origem = np.where(valor_cont == 0, 1, np.where(valor_fin == 0, 2, 0)).astype(np.int8)
+    
+    # Tipo: 0=Sem diferença, 1=Cont > Fin, 2=Fin > Cont, 3=Exclusivo
+    tipo = (diferenca > 0).astype(np.int8) + 2 * (diferenca < 0).astype(np.int8)
+    tipo[origem != 0] = 3
+    
+    # Ordenar por diferença absoluta (maiores primeiro)
+    ordem = np.argsort(-diferenca_abs, kind='stable')
+    
+    # Usar cliente do financeiro, se não existir usar da contabilidade
+    # (.array.take mantém o dtype original e evita conversão para object)
+    cliente = df_merge['cliente_fin'].fillna(df_merge['cliente_cont']).array
+    
+    return pd.DataFrame(
+        {
+            'Código': df_merge['codigo'].array.take(ordem),
+            'Cliente': cliente.take(ordem),
+            'Valor Financeiro': valor_fin[ordem],
+            'Valor Contabilidade': valor_cont[ordem],
+            'Diferença': diferenca[ordem],
+            'Diferença Absoluta': diferenca_abs[ordem],
+            'Diferença %': diferenca_perc[ordem],
+            'Origem': pd.Categorical.from_codes(origem[ordem], categories=ORIGENS),
+            'Tipo Diferença': pd.Categorical.from_codes(tipo[ordem], categories=TIPOS_DIFERENCA),
+        },
+        index=df_merge.index.to_numpy()[ordem]
+    )
+
+
+def calcular_resumo(df_resultado: pd.DataFrame) -> dict:
+    """
+    Monta o resumo a partir de uma única redução agrupada por
+    (origem, com diferença), em vez de uma varredura por métrica.
+    """
+    
+    origem = df_resultado['Origem'].cat.codes.to_numpy()
+    diferenca = df_resultado['Diferença'].to_numpy()
+    diferenca_abs = df_resultado['Diferença Absoluta'].to_numpy()
+    com_diferenca = diferenca_abs > TOLERANCIA_DIFERENCA
+    
+    # Grupo = origem * 2 + com_diferenca → 6 grupos possíveis
+    grupos = origem.astype(np.intp) * 2 + com_diferenca
+    contagem = np.bincount(grupos, minlength=6).reshape(3, 2)
+    
+    return {
+        'total_registros': len(df_resultado),
+        'registros_ambos': int(contagem[0].sum()),
+        'registros_so_financeiro': int(contagem[1].sum()),
+        'registros_so_contabilidade': int(contagem[2].sum()),
+        'registros_com_diferenca': int(contagem[:, 1].sum()),
+        'registros_sem_diferenca': int(contagem[:, 0].sum()),
+        'diferenca_total': float(diferenca.sum()),
+        'diferenca_absoluta_total': float(diferenca_abs.sum()),
+        'maior_diferenca': float(diferenca_abs.max()) if len(diferenca_abs) else float('nan'),
+        'valor_total_financeiro': float(df_resultado['Valor Financeiro'].to_numpy().sum()),
+        'valor_total_contabilidade': float(df_resultado['Valor Contabilidade'].to_numpy().sum())
+    }
+
+
+# Formatos e larguras da planilha exportada
+FORMATO_MOEDA = 'R$ #,##0.00;[RED]-R$ #,##0.00'
+FORMATO_PERCENTUAL = '0.00%'
+COLUNAS_MOEDA = ['Valor Financeiro', 'Valor Contabilidade', 'Diferença', 'Diferença Absoluta']
+LARGURAS_COLUNAS = {
+    'A': 12,  # Código
+    'B': 35,  # Cliente
+    'C': 18,  # Valor Financeiro
+    'D': 20,  # Valor Contabilidade
+    'E': 15,  # Diferença
+    'F': 18,  # Diferença Absoluta
+    'G': 12,  # Diferença %
+    'H': 18,  # Origem
+    'I': 25,  # Tipo Diferença
+}
+
+
+def salvar_planilha_diferencas(df_resultado: pd.DataFrame, resumo: dict, caminho_arquivo: str):
+    """
+    Grava as abas do relatório em modo write-only do openpyxl: as linhas vão
+    direto para o arquivo, já com formato de moeda/percentual e larguras,
+    sem reabrir a planilha para formatar célula a célula.
+    """
+    wb = Workbook(write_only=True)
+    
+    # Aba 1: Todas as diferenças
+    _escrever_aba_diferencas(wb, 'Todas Diferenças', df_resultado)
+    
+    # Aba 2: Apenas com diferenças significativas
+    _escrever_aba_diferencas(wb, 'Com Diferenças', df_resultado[df_resultado['Diferença Absoluta'] > 0.01])
+    
+    # Aba 3: Apenas no Financeiro
+    df_so_fin = df_resultado[df_resultado['Origem'] == 'Só Financeiro']
+    if len(df_so_fin) > 0:
+        _escrever_aba_diferencas(wb, 'Só Financeiro', df_so_fin)
+    
+    # Aba 4: Apenas na Contabilidade
+    df_so_cont = df_resultado[df_resultado['Origem'] == 'Só Contabilidade']
+    if len(df_so_cont) > 0:
+        _escrever_aba_diferencas(wb, 'Só Contabilidade', df_so_cont)
+    
+    # Aba 5: Resumo
+    ws = wb.create_sheet('Resumo')
+    ws.append([_celula(ws, 'Métrica', negrito=True), _celula(ws, 'Valor', negrito=True)])
+    for metrica, valor in resumo.items():
+        ws.append([_celula(ws, metrica, negrito=True), _valor_excel(valor)])
     
     wb.save(caminho_arquivo)
+
+
+def _escrever_aba_diferencas(wb: Workbook, nome_aba: str, df: pd.DataFrame):
+    """Escreve uma aba linha a linha, com os formatos aplicados na escrita."""
+    
+    ws = wb.create_sheet(nome_aba)
+    
+    # Em write-only, larguras precisam ser definidas antes da primeira linha
+    for letra, largura in LARGURAS_COLUNAS.items():
+        ws.column_dimensions[letra].width = largura
+    
+    ws.append([_celula(ws, coluna, negrito=True) for coluna in df.columns])
+    
+    formatos = [
+        FORMATO_MOEDA if coluna in COLUNAS_MOEDA
+        else FORMATO_PERCENTUAL if coluna == 'Diferença %'
+        else None
+        for coluna in df.columns
+    ]
+    
+    # Uma célula modelo por coluna formatada: só o valor muda a cada linha
+    modelos = [_celula(ws, None, formato=formato) if formato else None for formato in formatos]
+    colunas = [_valores_coluna(df[coluna]) for coluna in df.columns]
+    
+    for linha in zip(*colunas):
+        valores = list(linha)
+        for i, modelo in enumerate(modelos):
+            if modelo is not None and valores[i] is not None:
+                modelo.value = valores[i]
+                valores[i] = modelo
+        ws.append(valores)
+
+
+def _celula(ws, valor, negrito: bool = False, formato: str = None) -> WriteOnlyCell:
+    celula = WriteOnlyCell(ws, value=valor)
+    if negrito:
+        celula.font = Font(bold=True)
+    if formato:
+        celula.number_format = formato
+    return celula
+
+
+def _valores_coluna(serie: pd.Series) -> list:
+    """Valores nativos do Python, com NaN/NA como None (célula vazia)."""
+    if pd.api.types.is_float_dtype(serie.dtype) and not serie.isna().any():
+        return serie.to_numpy().tolist()
+    return serie.astype(object).where(serie.notna(), None).tolist()
+
+
+def _valor_excel(valor):
+    """NaN vira célula vazia; tipos numpy viram nativos."""
+    if valor is None or (isinstance(valor, float) and np.isnan(valor)):
+        return None
+    return valor.item() if isinstance(valor, np.generic) else valor
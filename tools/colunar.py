@@ -0,0 +1,354 @@
+"""
+Cópia colunar (Arrow IPC) de planilhas enviadas.
+
+A planilha original é convertida uma única vez (converter_para_colunar) num
+arquivo .arrow comprimido ao lado dela. As leituras seguintes por caminho
+(ler_planilha_em_lotes com `colunas`) mapeiam a cópia em memória e
+descomprimem só as colunas pedidas, sem voltar ao XML do Excel.
+
+A mesma coluna do Excel pode misturar números, texto e booleanos, então cada
+coluna da planilha vira três colunas físicas:
+    n<i>  float64  células numéricas (datas ficam como serial do Excel)
+    t<i>  string   células de texto
+    b<i>  bool     células lógicas
+A leitura remonta os valores das células e aplica os mesmos tipos da leitura
+projetada do .xlsx (texto/numero/data/bruto), com resultado idêntico.
+
+Os metadados do schema guardam o cabeçalho, o sistema de datas (1900/1904)
+e o tamanho/mtime do original, usados para saber se a cópia está em dia.
+Colunas com nome repetido: vale a primeira, como na leitura projetada.
+"""
+import json
+import logging
+import os
+import time
+import uuid
+import zipfile
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from tools.leitura import (
+    SeletorColunas,
+    TAMANHO_LOTE_PADRAO,
+    _converter_coluna,
+    _localizar_primeira_aba,
+    _validar_tipos,
+    ler_planilha_em_lotes,
+)
+
+logger = logging.getLogger(__name__)
+
+EXTENSAO_COLUNAR = ".arrow"
+COMPRESSOES = ("lz4", "zstd")
+
+_META_CABECALHO = b"conciliacao.cabecalho"
+_META_DATA1904 = b"conciliacao.data1904"
+_META_ORIGEM_BYTES = b"conciliacao.origem_bytes"
+_META_ORIGEM_MTIME = b"conciliacao.origem_mtime_ns"
+
+# Inteiros até 2**53 são exatos em float64 (mesmo critério do int() do bruto)
+_LIMITE_INTEIRO = 2 ** 53
+
+
+def caminho_colunar(origem) -> Path:
+    """uploads/123_balancete.xlsx → uploads/123_balancete.xlsx.arrow"""
+    origem = Path(origem)
+    return origem.with_name(origem.name + EXTENSAO_COLUNAR)
+
+
+def suporta_colunar(origem) -> bool:
+    """Só planilhas OOXML (.xlsx/.xlsm) têm cópia colunar."""
+    return zipfile.is_zipfile(origem)
+
+
+def colunar_em_dia(origem) -> Optional[Path]:
+    """Caminho da cópia colunar se ela existir e corresponder ao original atual."""
+    copia = caminho_colunar(origem)
+    try:
+        estado = os.stat(origem)
+        with pa.memory_map(str(copia), "r") as fonte:
+            metadados = ipc.open_file(fonte).schema.metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return None
+
+    em_dia = (
+        metadados.get(_META_ORIGEM_BYTES) == str(estado.st_size).encode()
+        and metadados.get(_META_ORIGEM_MTIME) == str(estado.st_mtime_ns).encode()
+    )
+    return copia if em_dia else None
+
+
+# ============================================================
+# CONVERSÃO
+# ============================================================
+
+def converter_para_colunar(origem, destino=None, tamanho_lote: int = TAMANHO_LOTE_PADRAO,
+                           compressao: str = "lz4") -> Dict:
+    """
+    Converte a primeira aba de um .xlsx para Arrow IPC, lote a lote.
+
+    Grava num temporário e renomeia no fim: leitores concorrentes nunca veem
+    uma cópia pela metade. Retorna {caminho, linhas, colunas, bytes, segundos}.
+    """
+    origem = Path(origem)
+    destino = Path(destino) if destino else caminho_colunar(origem)
+    if compressao not in COMPRESSOES:
+        raise ValueError(f"Compressão inválida: {compressao}. Aceitas: {COMPRESSOES}")
+    if not suporta_colunar(origem):
+        raise ValueError(f"Formato sem cópia colunar (só .xlsx/.xlsm): {origem.name}")
+
+    inicio = time.perf_counter()
+    estado = origem.stat()
+    with zipfile.ZipFile(origem) as pacote:
+        data1904 = _localizar_primeira_aba(pacote)[2]
+
+    cabecalho: List[str] = []
+
+    def todas_as_colunas(nomes: List[str]) -> Dict[str, str]:
+        cabecalho[:] = list(dict.fromkeys(nomes))
+        return {nome: "bruto" for nome in cabecalho}
+
+    # Nome único por conversão: duas threads do mesmo processo não dividem o temporário
+    temporario = destino.with_name(f".{destino.name}.{uuid.uuid4().hex}.tmp")
+    opcoes = ipc.IpcWriteOptions(compression=compressao)
+    escritor = schema = None
+    linhas = 0
+
+    try:
+        for lote in ler_planilha_em_lotes(origem, tamanho_lote, colunas=todas_as_colunas,
+                                          usar_colunar=False):
+            if escritor is None:
+                schema = _schema_colunar(cabecalho, data1904, estado)
+                escritor = ipc.new_file(str(temporario), schema, options=opcoes)
+            escritor.write_batch(_codificar_lote(lote, cabecalho, schema))
+            linhas += len(lote)
+
+        if escritor is None:
+            if not cabecalho:
+                raise ValueError("Planilha sem cabeçalho")
+            schema = _schema_colunar(cabecalho, data1904, estado)
+            escritor = ipc.new_file(str(temporario), schema, options=opcoes)
+
+        escritor.close()
+        os.replace(temporario, destino)
+    except BaseException:
+        if escritor is not None:
+            escritor.close()
+        temporario.unlink(missing_ok=True)
+        raise
+
+    segundos = time.perf_counter() - inicio
+    logger.info(
+        f"🗜️ Cópia colunar gerada: {destino} ({linhas} linhas, {len(cabecalho)} colunas, "
+        f"{segundos:.1f}s)"
+    )
+
+    return {
+        "caminho": str(destino),
+        "linhas": linhas,
+        "colunas": len(cabecalho),
+        "bytes": destino.stat().st_size,
+        "segundos": segundos,
+    }
+
+
+def _schema_colunar(cabecalho: List[str], data1904: bool, estado: os.stat_result) -> pa.Schema:
+    campos = []
+    for indice in range(len(cabecalho)):
+        campos += [
+            pa.field(f"n{indice}", pa.float64()),
+            pa.field(f"t{indice}", pa.string()),
+            pa.field(f"b{indice}", pa.bool_()),
+        ]
+    return pa.schema(campos, metadata={
+        _META_CABECALHO: json.dumps(cabecalho, ensure_ascii=False).encode(),
+        _META_DATA1904: b"1" if data1904 else b"0",
+        _META_ORIGEM_BYTES: str(estado.st_size).encode(),
+        _META_ORIGEM_MTIME: str(estado.st_mtime_ns).encode(),
+    })
+
+
+def _codificar_lote(lote: pd.DataFrame, cabecalho: List[str], schema: pa.Schema) -> pa.RecordBatch:
+    """Separa os valores brutos de cada coluna em número / texto / booleano."""
+    tamanho = len(lote)
+    arrays = []
+
+    for nome in cabecalho:
+        valores = lote[nome].to_numpy(dtype=object)
+        numeros = pa.nulls(tamanho, pa.float64())
+        textos = pa.nulls(tamanho, pa.string())
+        logicos = pa.nulls(tamanho, pa.bool_())
+
+        try:
+            # Coluna homogênea: o pyarrow infere o tipo sem laço em Python
+            array = pa.array(valores, from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+            array = None
+
+        if array is not None and pa.types.is_string(array.type):
+            textos = array
+        elif array is not None and (pa.types.is_integer(array.type) or pa.types.is_floating(array.type)):
+            numeros = array.cast(pa.float64())
+        elif array is not None and pa.types.is_boolean(array.type):
+            logicos = array
+        elif array is None or not pa.types.is_null(array.type):
+            # Coluna mista: uma passada separando por tipo
+            so_numeros, so_textos, so_logicos = [None] * tamanho, [None] * tamanho, [None] * tamanho
+            for posicao, valor in enumerate(valores):
+                if isinstance(valor, bool):
+                    so_logicos[posicao] = valor
+                elif isinstance(valor, str):
+                    so_textos[posicao] = valor
+                elif valor is not None:
+                    so_numeros[posicao] = float(valor)
+            numeros = pa.array(so_numeros, pa.float64())
+            textos = pa.array(so_textos, pa.string())
+            logicos = pa.array(so_logicos, pa.bool_())
+
+        arrays += [numeros, textos, logicos]
+
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+# ============================================================
+# LEITURA
+# ============================================================
+
+def ler_colunar_em_lotes(caminho, tamanho_lote: Optional[int] = TAMANHO_LOTE_PADRAO,
+                         colunas: Optional[SeletorColunas] = None) -> Iterator[pd.DataFrame]:
+    """
+    Lê a cópia colunar em DataFrames de até `tamanho_lote` linhas
+    (None = tudo em um único DataFrame).
+
+    Sem `colunas`, devolve todas as colunas com o tipo "bruto".
+    """
+    with pa.memory_map(str(caminho), "r") as fonte:
+        metadados = ipc.open_file(fonte).schema.metadata
+        cabecalho = json.loads(metadados[_META_CABECALHO])
+        data1904 = metadados[_META_DATA1904] == b"1"
+
+        escolhidas = (
+            {nome: "bruto" for nome in cabecalho} if colunas is None
+            else _validar_tipos(colunas(list(cabecalho)))
+        )
+        faltantes = set(escolhidas) - set(cabecalho)
+        if faltantes:
+            raise ValueError(f"Colunas não encontradas no cabeçalho: {sorted(faltantes)}")
+
+        indices = [cabecalho.index(nome) for nome in escolhidas]
+        # Só os buffers das colunas escolhidas são lidos do mapa e descomprimidos
+        campos = [3 * indice + deslocamento for indice in indices for deslocamento in range(3)]
+        leitor = ipc.open_file(fonte, options=ipc.IpcReadOptions(included_fields=campos))
+
+        partes = []
+        for posicao in range(leitor.num_record_batches):
+            lote = leitor.get_batch(posicao)
+            df = pd.DataFrame({
+                nome: _decodificar_coluna(
+                    lote.column(3 * ordem), lote.column(3 * ordem + 1), lote.column(3 * ordem + 2),
+                    tipo, data1904
+                )
+                for ordem, (nome, tipo) in enumerate(escolhidas.items())
+            })
+
+            if tamanho_lote is None:
+                partes.append(df)
+                continue
+            for inicio in range(0, len(df), tamanho_lote):
+                yield df.iloc[inicio:inicio + tamanho_lote].reset_index(drop=True)
+
+        if tamanho_lote is None:
+            if not partes:
+                partes = [pd.DataFrame({
+                    nome: _decodificar_coluna(
+                        pa.array([], pa.float64()), pa.array([], pa.string()),
+                        pa.array([], pa.bool_()), tipo, data1904
+                    )
+                    for nome, tipo in escolhidas.items()
+                })]
+            yield partes[0] if len(partes) == 1 else pd.concat(partes, ignore_index=True)
+
+
+def _decodificar_coluna(numeros: pa.Array, textos: pa.Array, logicos: pa.Array,
+                        tipo: str, data1904: bool) -> pd.Series:
+    tamanho = len(numeros)
+    sem_numeros = numeros.null_count == tamanho
+    sem_textos = textos.null_count == tamanho
+    sem_logicos = logicos.null_count == tamanho
+
+    # Caminhos vetorizados para as colunas homogêneas (o caso comum)
+    if sem_textos and sem_logicos and tipo in ("numero", "data", "bruto"):
+        valores = numeros.to_numpy(zero_copy_only=False)
+        if tipo == "numero":
+            return pd.Series(valores, dtype="float64")
+        if tipo == "data":
+            origem = "1904-01-01" if data1904 else "1899-12-30"
+            # Mesmas operações do _converter_coluna, para chegar ao mesmo dtype
+            serie = pd.Series(valores)
+            preenchidos = serie.notna()
+            datas = pd.to_datetime(pd.Series(None, index=serie.index, dtype=object), errors="coerce")
+            if preenchidos.any():
+                datas[preenchidos] = pd.to_datetime(
+                    serie[preenchidos], unit="D", origin=origem
+                ).dt.round("s")
+            return datas
+        return _numeros_brutos(valores)
+
+    if sem_numeros and sem_logicos and tipo in ("texto", "bruto"):
+        valores = textos.to_numpy(zero_copy_only=False)
+        if tipo == "texto":
+            valores[pd.isna(valores)] = np.nan
+        return pd.Series(valores, dtype=object)
+
+    # Coluna mista: remonta os valores das células e converte como no .xlsx
+    valores = textos.to_pylist()
+    for outros in (numeros, logicos):
+        if outros.null_count < tamanho:
+            for posicao, valor in enumerate(outros.to_pylist()):
+                if valor is not None:
+                    valores[posicao] = valor
+    return _converter_coluna(valores, tipo, data1904)
+
+
+def _numeros_brutos(valores: np.ndarray) -> pd.Series:
+    """Como o bruto do .xlsx: inteiros viram int, vazios viram None."""
+    resultado = np.full(len(valores), None, dtype=object)
+    preenchidos = ~np.isnan(valores)
+    inteiros = preenchidos & (np.abs(valores) < _LIMITE_INTEIRO) & (np.floor(valores) == valores)
+    fracionarios = preenchidos & ~inteiros
+
+    resultado[inteiros] = valores[inteiros].astype(np.int64).astype(object)
+    resultado[fracionarios] = [
+        int(valor) if valor.is_integer() else valor
+        for valor in valores[fracionarios].tolist()
+    ]
+    return pd.Series(resultado, dtype=object)
+
+
+def ler_previa(origem, linhas: int = 20) -> Dict:
+    """
+    Primeiras linhas de uma planilha enviada (todas as colunas, valores brutos).
+    Usa a cópia colunar quando ela está em dia.
+    """
+    copia = colunar_em_dia(origem)
+    if copia is not None:
+        df = next(ler_colunar_em_lotes(copia, tamanho_lote=linhas), None)
+        fonte = "colunar"
+    else:
+        df = next(ler_planilha_em_lotes(origem, tamanho_lote=linhas, usar_colunar=False), None)
+        fonte = "original"
+
+    if df is None:
+        return {"fonte": fonte, "colunas": [], "linhas": []}
+
+    df = df.head(linhas).astype(object)
+    return {
+        "fonte": fonte,
+        "colunas": [str(coluna) for coluna in df.columns],
+        "linhas": df.where(df.notna(), None).to_dict(orient="records"),
+    }
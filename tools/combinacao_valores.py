@@ -0,0 +1,268 @@
+"""
+Busca de combinações de valores que explicam diferenças residuais.
+
+Uma diferença comum é vários títulos do financeiro somarem um único
+lançamento da contabilidade (ou o contrário). Para cada código com
+diferença, buscar_combinacoes procura pequenos subconjuntos de um lado cuja
+soma bate, dentro da tolerância, com um valor do outro lado.
+
+Cada busca é um meet-in-the-middle em centavos inteiros: os itens
+elegíveis são divididos em duas metades, as somas de cada metade (com até
+max_itens itens) são enumeradas de forma vetorizada e, para cada soma da
+esquerda, o complemento é procurado por busca binária na direita ordenada.
+
+O custo é limitado por um OrcamentoBusca (tempo e quantidade de somas
+enumeradas) compartilhado pela requisição inteira, consultado antes de cada
+enumeração; max_itens é limitado a LIMITE_ITENS_COMBINACAO e, por alvo, o
+número de itens elegíveis é cortado para que cada metade enumere no máximo
+MAX_SOMAS_METADE somas (e tenha no máximo BITS_MASCARA itens, o que cabe na
+máscara int64 dos subconjuntos). Os códigos são examinados do menor para o
+maior: um cliente patológico não trava a conciliação nem impede a busca nos
+demais, só deixa a busca incompleta (esgotado=True). Um alvo cujos itens
+foram cortados pode ter uma combinação que não foi vista: o código sai em
+codigos_truncados.
+"""
+import logging
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+MAX_ITENS_COMBINACAO = 4
+# Teto para o max_itens vindo da requisição (as somas crescem com C(n, max_itens))
+LIMITE_ITENS_COMBINACAO = 6
+MAX_SOMAS_METADE = 200_000
+# Itens por metade: a máscara de cada subconjunto é um int64 (bit 63 é o sinal)
+BITS_MASCARA = 62
+TEMPO_MAXIMO_SEGUNDOS = 2.0
+MAX_CANDIDATOS = 5_000_000
+
+FINANCEIRO_PARA_CONTABIL = "titulos_para_lancamento"
+CONTABIL_PARA_FINANCEIRO = "lancamentos_para_titulo"
+
+
+class OrcamentoBusca:
+    """Limite de tempo e de somas enumeradas, compartilhado entre códigos."""
+
+    def __init__(self, segundos: float = TEMPO_MAXIMO_SEGUNDOS, max_candidatos: int = MAX_CANDIDATOS):
+        self.prazo = time.monotonic() + segundos
+        self.max_candidatos = max_candidatos
+        self.candidatos = 0
+        self.esgotado = False
+
+    def consumir(self, quantidade: int) -> bool:
+        """Registra somas enumeradas; False quando o orçamento acabou."""
+        self.candidatos += quantidade
+        if self.candidatos > self.max_candidatos or time.monotonic() > self.prazo:
+            self.esgotado = True
+        return not self.esgotado
+
+
+def buscar_combinacoes(titulos: pd.DataFrame, lancamentos: pd.DataFrame, codigos: List[str],
+                       tolerancia_centavos: int = 1, max_itens: int = MAX_ITENS_COMBINACAO,
+                       orcamento: Optional[OrcamentoBusca] = None) -> Dict:
+    """
+    Procura, em cada código informado, grupos de títulos que somam um
+    lançamento e grupos de lançamentos que somam um título.
+
+    Parâmetros:
+    -----------
+    titulos : pd.DataFrame
+        normalizar_titulos_financeiro (codigo | centavos; o índice identifica a linha)
+    lancamentos : pd.DataFrame
+        normalizar_lancamentos_contabilidade (codigo | centavos; idem)
+    codigos : list
+        Códigos a examinar (ex.: os com diferença)
+
+    Retorna:
+    --------
+    dict com:
+        - grupos: lista de {codigo, tipo, valor_alvo, linha_alvo, valores, linhas, soma, diferenca}
+        - codigos_examinados / codigos_pendentes
+        - candidatos: somas enumeradas
+        - esgotado: True se o orçamento acabou antes de examinar todos os códigos
+        - buscas_truncadas / codigos_truncados: alvos (e seus códigos) em que só
+          os itens de magnitude mais próxima da do alvo foram considerados
+    """
+    orcamento = orcamento or OrcamentoBusca()
+    max_itens = min(max(int(max_itens), 2), LIMITE_ITENS_COMBINACAO)
+
+    por_codigo_fin = titulos.groupby("codigo", sort=False).indices
+    por_codigo_cont = lancamentos.groupby("codigo", sort=False).indices
+
+    # Códigos menores primeiro: um código enorme só consome o que sobrar do orçamento
+    def tamanho(codigo):
+        return len(por_codigo_fin.get(codigo, ())) + len(por_codigo_cont.get(codigo, ()))
+    codigos = sorted(dict.fromkeys(codigos), key=tamanho)
+
+    centavos_fin = titulos["centavos"].to_numpy(dtype=np.int64)
+    centavos_cont = lancamentos["centavos"].to_numpy(dtype=np.int64)
+    linhas_fin = titulos.index.to_numpy()
+    linhas_cont = lancamentos.index.to_numpy()
+
+    grupos = []
+    examinados = 0
+    buscas_truncadas = 0
+    codigos_truncados = []
+    for codigo in codigos:
+        if orcamento.esgotado:
+            break
+        pos_fin = por_codigo_fin.get(codigo)
+        pos_cont = por_codigo_cont.get(codigo)
+        if pos_fin is None or pos_cont is None:
+            examinados += 1
+            continue
+
+        itens_fin = list(zip(centavos_fin[pos_fin].tolist(), linhas_fin[pos_fin].tolist()))
+        itens_cont = list(zip(centavos_cont[pos_cont].tolist(), linhas_cont[pos_cont].tolist()))
+
+        # Os itens usados num grupo não entram em outro
+        for tipo, itens, alvos in (
+            (FINANCEIRO_PARA_CONTABIL, itens_fin, itens_cont),
+            (CONTABIL_PARA_FINANCEIRO, itens_cont, itens_fin),
+        ):
+            for alvo in sorted(alvos, key=lambda item: -abs(item[0])):
+                if orcamento.esgotado or len(itens) < 2:
+                    break
+                escolhidos, truncado = _combinar(itens, alvo[0], tolerancia_centavos, max_itens, orcamento)
+                if truncado:
+                    buscas_truncadas += 1
+                    if not codigos_truncados or codigos_truncados[-1] != codigo:
+                        codigos_truncados.append(codigo)
+                if escolhidos is None:
+                    continue
+
+                valores = [itens[i][0] for i in escolhidos]
+                grupos.append({
+                    "codigo": codigo,
+                    "tipo": tipo,
+                    "valor_alvo": alvo[0] / 100,
+                    "linha_alvo": alvo[1],
+                    "valores": [v / 100 for v in valores],
+                    "linhas": [itens[i][1] for i in escolhidos],
+                    "soma": sum(valores) / 100,
+                    "diferenca": (alvo[0] - sum(valores)) / 100,
+                })
+                alvos.remove(alvo)
+                for i in sorted(escolhidos, reverse=True):
+                    itens.pop(i)
+
+        if not orcamento.esgotado:
+            examinados += 1
+
+    if orcamento.esgotado:
+        logger.warning(
+            f"⏱️ Busca de combinações interrompida pelo orçamento: "
+            f"{examinados} de {len(codigos)} códigos examinados"
+        )
+    if codigos_truncados:
+        logger.warning(
+            f"✂️ Busca de combinações limitada aos itens mais próximos do alvo em "
+            f"{len(codigos_truncados)} códigos ({buscas_truncadas} alvos)"
+        )
+
+    return {
+        "grupos": grupos,
+        "codigos_examinados": examinados,
+        "codigos_pendentes": len(codigos) - examinados,
+        "candidatos": orcamento.candidatos,
+        "esgotado": orcamento.esgotado,
+        "buscas_truncadas": buscas_truncadas,
+        "codigos_truncados": codigos_truncados,
+    }
+
+
+def _combinar(itens: List[tuple], alvo: int, tolerancia: int, max_itens: int,
+              orcamento: OrcamentoBusca) -> Tuple[Optional[List[int]], bool]:
+    """
+    Menor subconjunto (2 a max_itens itens) cuja soma fica a até `tolerancia`
+    centavos do alvo. Retorna (posições em `itens` ou None, se os elegíveis
+    foram cortados).
+    """
+    elegiveis = [i for i, (valor, _) in enumerate(itens) if valor != 0]
+    # Sem estornos (todos com o sinal do alvo), item maior que o alvo não entra em grupo
+    if all((itens[i][0] > 0) == (alvo > 0) for i in elegiveis):
+        elegiveis = [i for i in elegiveis if abs(itens[i][0]) <= abs(alvo) + tolerancia]
+    if len(elegiveis) < 2:
+        return None, False
+    # Acima do limite ficam os de magnitude mais próxima da do alvo
+    limite = 2 * _itens_por_metade(max_itens)
+    truncado = len(elegiveis) > limite
+    if truncado:
+        elegiveis = sorted(elegiveis, key=lambda i: abs(abs(itens[i][0]) - abs(alvo)))[:limite]
+
+    valores = np.array([itens[i][0] for i in elegiveis], dtype=np.int64)
+    meio = len(valores) // 2
+    # O orçamento é consultado antes de enumerar (a quantidade de somas é conhecida)
+    if not orcamento.consumir(
+        _quantidade_somas(meio, max_itens) + _quantidade_somas(len(valores) - meio, max_itens)
+    ):
+        return None, truncado
+    somas_esq, tamanhos_esq, mascaras_esq = _somas_subconjuntos(valores[:meio], max_itens)
+    somas_dir, tamanhos_dir, mascaras_dir = _somas_subconjuntos(valores[meio:], max_itens)
+
+    ordem = np.argsort(somas_dir, kind="stable")
+    somas_dir, tamanhos_dir, mascaras_dir = somas_dir[ordem], tamanhos_dir[ordem], mascaras_dir[ordem]
+
+    inicio = np.searchsorted(somas_dir, alvo - somas_esq - tolerancia, side="left")
+    fim = np.searchsorted(somas_dir, alvo - somas_esq + tolerancia, side="right")
+
+    com_par = np.flatnonzero(fim > inicio)
+    if not orcamento.consumir(len(com_par)):
+        return None, truncado
+
+    melhor = None
+    for e in com_par:
+        tamanhos = tamanhos_esq[e] + tamanhos_dir[inicio[e]:fim[e]]
+        validos = np.flatnonzero((tamanhos >= 2) & (tamanhos <= max_itens))
+        if len(validos) == 0:
+            continue
+        d = inicio[e] + validos[np.argmin(tamanhos[validos])]
+        tamanho = int(tamanhos_esq[e] + tamanhos_dir[d])
+        if melhor is None or tamanho < melhor[0]:
+            melhor = (tamanho, int(mascaras_esq[e]), int(mascaras_dir[d]))
+            if tamanho == 2:
+                break
+
+    if melhor is None:
+        return None, truncado
+
+    _, mascara_esq, mascara_dir = melhor
+    posicoes = [i for i in range(meio) if mascara_esq >> i & 1]
+    posicoes += [meio + i for i in range(len(valores) - meio) if mascara_dir >> i & 1]
+    return [elegiveis[p] for p in posicoes], truncado
+
+
+def _quantidade_somas(itens: int, max_itens: int) -> int:
+    """Quantos subconjuntos com até max_itens itens (inclusive o vazio) `itens` itens têm."""
+    return sum(math.comb(itens, k) for k in range(min(itens, max_itens) + 1))
+
+
+def _itens_por_metade(max_itens: int) -> int:
+    """
+    Maior metade cujos subconjuntos com até max_itens itens cabem em
+    MAX_SOMAS_METADE, sem passar de BITS_MASCARA itens.
+    """
+    itens = 1
+    while itens < BITS_MASCARA and _quantidade_somas(itens + 1, max_itens) <= MAX_SOMAS_METADE:
+        itens += 1
+    return itens
+
+
+def _somas_subconjuntos(valores: np.ndarray, max_itens: int):
+    """(somas, tamanhos, máscaras) de todos os subconjuntos com até max_itens itens."""
+    somas = np.zeros(1, dtype=np.int64)
+    tamanhos = np.zeros(1, dtype=np.int64)
+    mascaras = np.zeros(1, dtype=np.int64)
+
+    for i, valor in enumerate(valores.tolist()):
+        cabe = tamanhos < max_itens
+        somas = np.concatenate([somas, somas[cabe] + valor])
+        tamanhos = np.concatenate([tamanhos, tamanhos[cabe] + 1])
+        mascaras = np.concatenate([mascaras, mascaras[cabe] | (1 << i)])
+
+    return somas, tamanhos, mascaras
@@ -0,0 +1,139 @@
+"""
+Consolidação de saldos do balancete pela hierarquia do plano de contas.
+
+As contas analíticas (tipo_conta 2) trazem o saldo do balancete; o saldo de
+cada conta sintética (tipo_conta 1) é a soma dos filhos. A soma sobe nível a
+nível, do mais profundo até as raízes, com uma soma agrupada por pai em cada
+nível (sem percorrer a árvore conta a conta).
+
+Tudo é feito em centavos inteiros, como nos normalizadores, para que a
+comparação com o saldo informado das sintéticas seja exata.
+"""
+import logging
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from tools.contabilidade import (
+    colunas_planilha_contabilidade,
+    normalizar_lancamentos_contabilidade
+)
+from tools.hierarquia import IndiceHierarquia
+from tools.leitura import ler_planilha
+
+logger = logging.getLogger(__name__)
+
+TIPO_SINTETICA = "1"
+
+
+def consolidar_saldos(entrada, indice: IndiceHierarquia, tolerancia: float = 0.0) -> Dict:
+    """
+    Calcula o saldo de todas as contas sintéticas a partir das analíticas.
+
+    Parâmetros:
+    -----------
+    entrada : DataFrame, caminho ou arquivo aberto
+        Balancete no layout de normalizar_planilha_contabilidade
+        (Codigo | Descricao | ... | Saldo atual); o código é a conta contábil
+    indice : IndiceHierarquia
+        Hierarquia do plano de contas da empresa
+    tolerancia : float
+        Diferença (em reais) abaixo da qual a sintética não é considerada divergente
+
+    Retorna:
+    --------
+    dict com:
+        - saldos: DataFrame com todas as contas do plano (pré-ordem) e as colunas
+          conta_contabil | descricao | tipo_conta | profundidade |
+          saldo_informado | saldo_calculado | diferenca | divergente
+        - divergencias: linhas de saldos das sintéticas divergentes
+        - contas_fora_do_plano: códigos do balancete que não existem no plano
+        - resumo: totais da consolidação
+    """
+
+    # ==========================
+    # 1️⃣ CARREGAR BALANCETE
+    # ==========================
+    if isinstance(entrada, pd.DataFrame):
+        df = entrada
+    elif isinstance(entrada, (str, Path)) or hasattr(entrada, "read"):
+        df = ler_planilha(entrada, colunas=colunas_planilha_contabilidade)
+    else:
+        raise ValueError("entrada deve ser DataFrame, caminho ou arquivo aberto")
+
+    lancamentos = normalizar_lancamentos_contabilidade(df)
+    codigos = lancamentos["codigo"].astype(str).str.strip()
+    saldos_balancete = lancamentos["centavos"].groupby(codigos.to_numpy()).sum()
+
+    # ==========================
+    # 2️⃣ POSICIONAR NO PLANO
+    # ==========================
+    posicoes = saldos_balancete.index.map(indice.posicoes)
+    no_plano = posicoes.notna()
+    fora_do_plano = saldos_balancete.index[~no_plano].tolist()
+
+    n = len(indice)
+    posicoes = posicoes[no_plano].to_numpy(dtype=np.int64)
+    informado = np.zeros(n, dtype=np.int64)
+    informado[posicoes] = saldos_balancete.to_numpy()[no_plano]
+    presente = np.zeros(n, dtype=bool)
+    presente[posicoes] = True
+
+    # ==========================
+    # 3️⃣ SOMAR NÍVEL A NÍVEL
+    # ==========================
+    sintetica = indice.tipos == TIPO_SINTETICA
+    calculado = np.where(sintetica, 0, informado)
+
+    por_nivel = np.argsort(indice.profundidade, kind="stable")
+    limites = np.searchsorted(
+        indice.profundidade[por_nivel],
+        np.arange(int(indice.profundidade.max(initial=0)) + 2)
+    )
+    for nivel in range(len(limites) - 2, 0, -1):
+        filhos = por_nivel[limites[nivel]:limites[nivel + 1]]
+        np.add.at(calculado, indice.pai[filhos], calculado[filhos])
+
+    # ==========================
+    # 4️⃣ COMPARAR
+    # ==========================
+    diferenca = informado - calculado
+    tolerancia_centavos = int(round(tolerancia * 100))
+    # Sintética que não veio no balancete não tem saldo informado para comparar
+    divergente = sintetica & presente & (np.abs(diferenca) > tolerancia_centavos)
+
+    saldos = pd.DataFrame({
+        "conta_contabil": indice.codigos,
+        "descricao": indice.descricoes,
+        "tipo_conta": indice.tipos,
+        "profundidade": indice.profundidade,
+        "saldo_informado": np.where(presente, informado / 100, np.nan),
+        "saldo_calculado": calculado / 100,
+        "diferenca": np.where(presente, diferenca / 100, np.nan),
+        "divergente": divergente,
+    })
+    divergencias = saldos[divergente]
+
+    if fora_do_plano:
+        logger.warning(
+            f"⚠️ {len(fora_do_plano)} contas do balancete não existem no plano. "
+            f"Exemplos: {fora_do_plano[:5]}"
+        )
+
+    resumo = {
+        "total_contas": n,
+        "contas_sinteticas": int(sintetica.sum()),
+        "contas_no_balancete": int(presente.sum()),
+        "contas_fora_do_plano": len(fora_do_plano),
+        "sinteticas_divergentes": int(divergente.sum()),
+    }
+    logger.info(f"🧮 Consolidação de saldos: {resumo}")
+
+    return {
+        "saldos": saldos,
+        "divergencias": divergencias,
+        "contas_fora_do_plano": fora_do_plano,
+        "resumo": resumo,
+    }
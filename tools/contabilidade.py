@@ -1,5 +1,13 @@
+import numpy as np
 import pandas as pd
-import re
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from tools.leitura import ler_planilha
+from tools.valores import converter_valores_br
+
+logger = logging.getLogger(__name__)
 
 
 def normalizar_planilha_contabilidade(entrada):
@@ -17,20 +25,40 @@ def normalizar_planilha_contabilidade(entrada):
     # 1️⃣ CARREGAR DATAFRAME
     # ==========================
     if isinstance(entrada, pd.DataFrame):
-        df = entrada.copy()
-    elif isinstance(entrada, str):
-        df = pd.read_excel(entrada)
+        df = entrada
+    elif isinstance(entrada, (str, Path)) or hasattr(entrada, "read"):
+        # Lê só código, descrição e saldo do balancete
+        df = ler_planilha(entrada, colunas=colunas_planilha_contabilidade)
     else:
-        raise ValueError("entrada deve ser DataFrame ou caminho de arquivo")
+        raise ValueError("entrada deve ser DataFrame, caminho ou arquivo aberto")
+
+    df_norm = normalizar_lancamentos_contabilidade(df)
 
     # ==========================
-    # 2️⃣ MAPEAR COLUNAS (DIRETO)
+    # 5️⃣ AGRUPAR
     # ==========================
+    # Soma em centavos inteiros (exata, como no financeiro)
+    df_agrupado = (
+        df_norm
+        .groupby(["codigo", "cliente"], dropna=False)
+        .agg({"centavos": "sum"})
+        .reset_index()
+    )
+    df_agrupado["valor"] = df_agrupado.pop("centavos") / 100
+
+    return df_agrupado
+
+
+def mapear_colunas_contabilidade(colunas: Iterable[str]) -> Tuple[str, Optional[str], str]:
+    """
+    (coluna do código, coluna da descrição ou None, coluna do saldo atual)
+    """
+    colunas = list(colunas)
     col_codigo = None
     col_cliente = None
     col_valor = None
 
-    for col in df.columns:
+    for col in colunas:
         if col.lower().startswith("codigo"):
             col_codigo = col
         if col.lower().startswith("descricao"):
@@ -40,40 +68,56 @@ def normalizar_planilha_contabilidade(entrada):
 
     if not col_codigo or not col_valor:
         raise ValueError(
-            f"Layout contábil inválido. Colunas encontradas: {list(df.columns)}"
+            f"Layout contábil inválido. Colunas encontradas: {colunas}"
         )
 
+    return col_codigo, col_cliente, col_valor
+
+
+def colunas_planilha_contabilidade(cabecalho: List[str]) -> Dict[str, str]:
+    """Seletor para a leitura projetada: só código, descrição e saldo."""
+    col_codigo, col_cliente, col_valor = mapear_colunas_contabilidade(cabecalho)
+
+    colunas = {col_codigo: "bruto", col_valor: "bruto"}
+    if col_cliente:
+        colunas[col_cliente] = "texto"
+    return colunas
+
+
+def normalizar_lancamentos_contabilidade(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normaliza as linhas do balancete, sem agrupar.
+    Retorna codigo | cliente | centavos
+    """
+
+    # ==========================
+    # 2️⃣ MAPEAR COLUNAS (DIRETO)
+    # ==========================
+    col_codigo, col_cliente, col_valor = mapear_colunas_contabilidade(df.columns)
+
     # ==========================
     # 3️⃣ NORMALIZAR
     # ==========================
-    df_norm = pd.DataFrame()
+    df_norm = pd.DataFrame(index=df.index)
     df_norm["codigo"] = df[col_codigo]
     df_norm["cliente"] = df[col_cliente] if col_cliente else None
 
     # ==========================
     # 4️⃣ CONVERTER VALOR
     # ==========================
-    def converter_valor(v):
-        if pd.isna(v):
-            return 0.0
-        v = str(v).replace(".", "").replace(",", ".")
-        try:
-            return float(v)
-        except:
-            return 0.0
+    valores, falhas = converter_valores_br(df[col_valor])
+
+    if falhas.any():
+        logger.warning(
+            f"{int(falhas.sum())} valores de '{col_valor}' não puderam ser convertidos "
+            f"e foram descartados. Exemplos: {df.loc[falhas, col_valor].head(5).tolist()}"
+        )
 
-    df_norm["valor"] = df[col_valor].apply(converter_valor)
+    # Saldo vazio no balancete equivale a zero; inválidos são descartados
+    df_norm["centavos"] = np.round(valores.fillna(0.0).to_numpy() * 100).astype(np.int64)
+    df_norm = df_norm[~falhas]
 
     # ==========================
-    # 5️⃣ LIMPAR E AGRUPAR
+    # LIMPAR
     # ==========================
-    df_norm = df_norm[df_norm["codigo"].notna()].copy()
-
-    df_agrupado = (
-        df_norm
-        .groupby(["codigo", "cliente"], dropna=False)
-        .agg({"valor": "sum"})
-        .reset_index()
-    )
-
-    return df_agrupado
+    return df_norm[df_norm["codigo"].notna()]
@@ -1,128 +1,240 @@
+import numpy as np
 import pandas as pd
 from datetime import datetime
+from typing import Dict, Iterable, List, Optional
 import logging
 
+from tools.leitura import ler_planilha, ler_planilha_em_lotes, TAMANHO_LOTE_PADRAO
+from tools.valores import converter_valores_br
+
 logger = logging.getLogger(__name__)
 
+# Colunas aceitas para cada campo, em ordem de preferência
+COLUNAS_CLIENTE = [
+    "codigo_lj_nome_do_cliente",
+    "cliente",
+    "nome_cliente"
+]
+
+COLUNAS_VALOR = [
+    "tit_vencidos_valor_corrigido",
+    "valor_corrigido",
+    "valor"
+]
+
+COLUNAS_VENCIMENTO = [
+    "vencto_real",
+    "data_vencimento",
+    "vencimento"
+]
+
 
 def obter_coluna(df: pd.DataFrame, possiveis: list[str]) -> str:
     """
     Retorna a primeira coluna existente no DataFrame a partir de uma lista.
     """
+    return resolver_coluna(df.columns, possiveis)
+
+
+def resolver_coluna(colunas: Iterable[str], possiveis: list[str]) -> str:
+    """
+    Retorna a primeira de `possiveis` presente em `colunas`.
+    """
+    colunas = list(colunas)
     for col in possiveis:
-        if col in df.columns:
+        if col in colunas:
             return col
     raise ValueError(
         f"Nenhuma das colunas esperadas foi encontrada. "
-        f"Esperadas: {possiveis} | Encontradas: {list(df.columns)}"
+        f"Esperadas: {possiveis} | Encontradas: {colunas}"
     )
 
 
-def normalizar_planilha_financeira(entrada):
+def normalizar_nome_coluna(nome) -> str:
+    """'Codigo-Lj-Nome do Cliente' → 'codigo_lj_nome_do_cliente'"""
+    return str(nome).strip().lower().replace(" ", "_").replace("-", "_")
+
+
+def colunas_planilha_financeira(cabecalho: List[str]) -> Dict[str, str]:
+    """
+    Seletor para a leitura projetada: resolve o fallback de colunas sobre o
+    cabeçalho original e devolve só as três colunas usadas, com seus tipos.
+    """
+    originais = {}
+    for nome in cabecalho:
+        originais.setdefault(normalizar_nome_coluna(nome), nome)
+
+    return {
+        originais[resolver_coluna(originais, COLUNAS_CLIENTE)]: "texto",
+        originais[resolver_coluna(originais, COLUNAS_VALOR)]: "bruto",
+        originais[resolver_coluna(originais, COLUNAS_VENCIMENTO)]: "data",
+    }
+
+
+def normalizar_planilha_financeira(entrada, data_base: Optional[datetime] = None):
     """
     Normaliza a planilha financeira com fallback de colunas.
     Retorna DataFrame agrupado por codigo do cliente.
+
+    data_base: data de referência para dias_vencidos (padrão: agora)
     """
 
     # ==========================
     # 1️⃣ CARREGAR DATAFRAME
     # ==========================
     if isinstance(entrada, pd.DataFrame):
-        df = entrada.copy()
+        df = entrada
     else:
-        df = pd.read_excel(entrada)
+        # Lê só cliente, valor e vencimento (ERP exporta 100+ colunas)
+        df = ler_planilha(entrada, colunas=colunas_planilha_financeira)
 
     logger.info(f"Total de registros lidos: {len(df)}")
 
+    hoje = data_base or datetime.now()
+    df_agrupado = agrupar_titulos_por_codigo(normalizar_titulos_financeiro(df, hoje))
+
+    return finalizar_agrupamento_financeiro(df_agrupado)
+
+
+def normalizar_planilha_financeira_em_lotes(entrada, tamanho_lote: int = TAMANHO_LOTE_PADRAO,
+                                            data_base: Optional[datetime] = None):
+    """
+    Versão em streaming de normalizar_planilha_financeira.
+
+    Lê a entrada em lotes de linhas e mantém apenas o agregado por codigo
+    (soma de valor, primeiro cliente, maior dias_vencidos), de modo que a
+    memória depende da quantidade de clientes e não da quantidade de títulos.
+    O resultado é idêntico ao da versão em memória.
+
+    Parâmetros:
+    -----------
+    entrada : str | Path | pd.DataFrame | Iterable[pd.DataFrame]
+        Planilha (.xlsx/.csv), DataFrame ou iterável de lotes
+    tamanho_lote : int
+        Quantidade de linhas lidas por vez
+    data_base : datetime, opcional
+        Data de referência para dias_vencidos (padrão: agora)
+    """
+    hoje = data_base or datetime.now()
+    acumulado = None
+    total_linhas = 0
+
+    colunas = None if isinstance(entrada, pd.DataFrame) else colunas_planilha_financeira
+    for lote in ler_planilha_em_lotes(entrada, tamanho_lote, colunas=colunas):
+        total_linhas += len(lote)
+        parcial = agrupar_titulos_por_codigo(normalizar_titulos_financeiro(lote, hoje))
+
+        if acumulado is None:
+            acumulado = parcial
+        else:
+            # Acumulado primeiro, para que "first" preserve a ordem de leitura
+            acumulado = agrupar_titulos_por_codigo(pd.concat([acumulado, parcial], ignore_index=True))
+
+    logger.info(f"Total de registros lidos em lotes: {total_linhas}")
+
+    if acumulado is None:
+        raise ValueError("Planilha financeira sem registros")
+
+    return finalizar_agrupamento_financeiro(acumulado)
+
+
+def normalizar_titulos_financeiro(df: pd.DataFrame, hoje: datetime) -> pd.DataFrame:
+    """
+    Normaliza os títulos (linha a linha, sem agrupar).
+    Retorna codigo | cliente | centavos | dias_vencidos
+    """
+
     # ==========================
     # 2️⃣ NORMALIZAR NOMES DAS COLUNAS
     # ==========================
-    df.columns = (
-        df.columns
-        .astype(str)
-        .str.strip()
-        .str.lower()
-        .str.replace(" ", "_")
-        .str.replace("-", "_")
-    )
+    df = df.rename(columns=normalizar_nome_coluna)
 
     # ==========================
     # 3️⃣ FALLBACK DE COLUNAS
     # ==========================
-    col_cliente = obter_coluna(df, [
-        "codigo_lj_nome_do_cliente",
-        "cliente",
-        "nome_cliente"
-    ])
-
-    col_valor = obter_coluna(df, [
-        "tit_vencidos_valor_corrigido",
-        "valor_corrigido",
-        "valor"
-    ])
-
-    col_vencimento = obter_coluna(df, [
-        "vencto_real",
-        "data_vencimento",
-        "vencimento"
-    ])
+    col_cliente = obter_coluna(df, COLUNAS_CLIENTE)
+    col_valor = obter_coluna(df, COLUNAS_VALOR)
+    col_vencimento = obter_coluna(df, COLUNAS_VENCIMENTO)
 
     # ==========================
     # 4️⃣ NORMALIZAR CLIENTE E CÓDIGO
     # ==========================
     # Exemplo esperado: 000672-01-A A DANTAS RIBEIRO
     partes = df[col_cliente].astype(str).str.split("-", n=2, expand=True)
+    for posicao in range(3):
+        if posicao not in partes.columns:
+            partes[posicao] = pd.Series(None, index=partes.index, dtype=partes[0].dtype)
 
     codigo_base = partes[0].str.zfill(6)
     loja = partes[1].str.zfill(2)
-    df["codigo"] = "C" + codigo_base + loja
 
-    df["cliente"] = partes[2].str.strip()
+    titulos = pd.DataFrame({
+        "codigo": "C" + codigo_base + loja,
+        "cliente": partes[2].str.strip(),
+    })
 
     # ==========================
     # 5️⃣ NORMALIZAR VALOR
     # ==========================
-    df["valor"] = (
-        df[col_valor]
-        .astype(str)
-        .str.replace(".", "", regex=False)
-        .str.replace(",", ".", regex=False)
-        .astype(float)
-    )
+    valores, falhas = converter_valores_br(df[col_valor])
+
+    if falhas.any():
+        logger.warning(
+            f"{int(falhas.sum())} valores de '{col_valor}' não puderam ser convertidos "
+            f"e foram descartados. Exemplos: {df.loc[falhas, col_valor].head(5).tolist()}"
+        )
 
     # ==========================
     # 6️⃣ NORMALIZAR DATA / DIAS VENCIDOS
     # ==========================
-    df["data_vencimento"] = pd.to_datetime(
-        df[col_vencimento], errors="coerce"
-    )
-
-    hoje = datetime.now()
-    df["dias_vencidos"] = (hoje - df["data_vencimento"]).dt.days
+    data_vencimento = pd.to_datetime(df[col_vencimento], errors="coerce")
+    titulos["dias_vencidos"] = (hoje - data_vencimento).dt.days.astype("float64")
 
     # ==========================
     # 7️⃣ LIMPEZA
     # ==========================
-    df = df[df["valor"].notna()].copy()
+    validos = valores.notna()
+    titulos = titulos[validos]
 
-    # ==========================
-    # 8️⃣ AGRUPAMENTO FINAL (POR CÓDIGO)
-    # ==========================
-    df_agrupado = (
-        df
-        .groupby("codigo", as_index=False)
+    # Soma em centavos inteiros: exata e independente da ordem/lotes
+    titulos["centavos"] = np.round(valores[validos].to_numpy() * 100).astype(np.int64)
+
+    return titulos
+
+
+def agrupar_titulos_por_codigo(titulos: pd.DataFrame) -> pd.DataFrame:
+    """Agrega títulos (ou agregados parciais) por codigo."""
+    return (
+        titulos
+        .groupby("codigo", as_index=False, sort=False)
         .agg(
             cliente=("cliente", "first"),
-            valor=("valor", "sum"),
+            centavos=("centavos", "sum"),
             dias_vencidos=("dias_vencidos", "max")
         )
     )
 
+
+def finalizar_agrupamento_financeiro(df_agrupado: pd.DataFrame) -> pd.DataFrame:
+    """Ordena por codigo, converte centavos em valor e classifica o prazo."""
+
+    # ==========================
+    # 8️⃣ AGRUPAMENTO FINAL (POR CÓDIGO)
+    # ==========================
+    df_agrupado = df_agrupado.sort_values("codigo", ignore_index=True)
+
+    df_final = pd.DataFrame({
+        "codigo": df_agrupado["codigo"],
+        "cliente": df_agrupado["cliente"],
+        "valor": df_agrupado["centavos"] / 100,
+        "dias_vencidos": df_agrupado["dias_vencidos"],
+    })
+
     # ==========================
     # 9️⃣ TIPO (CURTO / LONGO PRAZO)
     # ==========================
-    df_agrupado["TIPO"] = df_agrupado["dias_vencidos"].apply(
-        lambda x: "LONGO PRAZO" if pd.notna(x) and x > 365 else "CURTO PRAZO"
+    df_final["TIPO"] = np.where(
+        df_final["dias_vencidos"] > 365, "LONGO PRAZO", "CURTO PRAZO"
     )
 
-    return df_agrupado
+    return df_final
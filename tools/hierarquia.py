@@ -0,0 +1,168 @@
+"""
+Índice em memória da hierarquia do plano de contas.
+
+conta_superior é só uma referência lógica (sem FK). O índice resolve essas
+referências uma vez e guarda a árvore em arrays na ordem de pré-ordem
+(DFS, filhos em ordem de código):
+
+- pai[i]          posição do pai (-1 na raiz)
+- fim[i]          a subárvore de i ocupa as posições [i, fim[i])
+- profundidade[i] 0 na raiz
+
+Assim a subárvore é uma fatia, os ancestrais são uma subida pelos pais e
+os descendentes conciliáveis são uma máscara sobre a fatia.
+
+Contas com conta_superior inexistente viram raízes. Contas que só são
+alcançáveis por um ciclo de conta_superior são soltas a partir da de menor
+código, que vira raiz.
+"""
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+class IndiceHierarquia:
+    """Árvore do plano de contas de uma empresa, em arrays de pré-ordem."""
+
+    def __init__(self, contas: Iterable):
+        """
+        contas: objetos ou linhas com id, conta_contabil, conta_superior,
+        tipo_conta, conciliavel e descricao (ex.: query do PlanoDeContas)
+        """
+        contas = sorted(contas, key=lambda conta: str(conta.conta_contabil))
+        n = len(contas)
+        codigos = [str(conta.conta_contabil) for conta in contas]
+        indice_codigo = {codigo: i for i, codigo in enumerate(codigos)}
+
+        # Pai de cada conta na ordem de código (-1 = raiz)
+        pai_codigo = np.full(n, -1, dtype=np.int64)
+        for i, conta in enumerate(contas):
+            superior = conta.conta_superior
+            if superior is not None and str(superior).strip():
+                pai_codigo[i] = indice_codigo.get(str(superior).strip(), -1)
+        pai_codigo[pai_codigo == np.arange(n)] = -1
+
+        ordem, pai, profundidade, self.ciclos_quebrados = _pre_ordem(pai_codigo)
+
+        self.codigos = np.array(codigos, dtype=object)[ordem]
+        self.ids = np.array([conta.id for conta in contas], dtype=np.int64)[ordem]
+        self.tipos = np.array([str(conta.tipo_conta) for conta in contas], dtype=object)[ordem]
+        self.conciliaveis = np.array([bool(conta.conciliavel) for conta in contas], dtype=bool)[ordem]
+        self.descricoes = np.array([conta.descricao for conta in contas], dtype=object)[ordem]
+        self.superiores = np.array([conta.conta_superior for conta in contas], dtype=object)[ordem]
+
+        self.pai = pai
+        self.profundidade = profundidade
+        self.fim = np.arange(n) + _tamanhos_subarvores(pai, profundidade)
+        self.posicoes: Dict[str, int] = {codigo: i for i, codigo in enumerate(self.codigos)}
+
+    def __len__(self) -> int:
+        return len(self.codigos)
+
+    def posicao(self, conta_contabil: str) -> Optional[int]:
+        return self.posicoes.get(str(conta_contabil).strip())
+
+    # ============================================================
+    # CONSULTAS
+    # ============================================================
+
+    def subarvore(self, conta_contabil: str, incluir_conta: bool = True) -> List[Dict]:
+        """A conta e todos os seus descendentes, em pré-ordem."""
+        i = self._posicao_obrigatoria(conta_contabil)
+        inicio = i if incluir_conta else i + 1
+        return self.registros(np.arange(inicio, self.fim[i]))
+
+    def ancestrais(self, conta_contabil: str) -> List[Dict]:
+        """Caminho da raiz até o pai da conta."""
+        i = self._posicao_obrigatoria(conta_contabil)
+        caminho = []
+        atual = self.pai[i]
+        while atual != -1:
+            caminho.append(atual)
+            atual = self.pai[atual]
+        return self.registros(np.array(caminho[::-1], dtype=np.int64))
+
+    def descendentes_conciliaveis(self, conta_contabil: Optional[str] = None) -> List[Dict]:
+        """Contas conciliáveis abaixo da conta (sem conta: do plano inteiro)."""
+        if conta_contabil is None:
+            inicio, fim = 0, len(self)
+        else:
+            i = self._posicao_obrigatoria(conta_contabil)
+            inicio, fim = i + 1, self.fim[i]
+        return self.registros(inicio + np.flatnonzero(self.conciliaveis[inicio:fim]))
+
+    def registros(self, posicoes: np.ndarray) -> List[Dict]:
+        return [
+            {
+                "id": int(self.ids[i]),
+                "conta_contabil": self.codigos[i],
+                "descricao": self.descricoes[i],
+                "tipo_conta": self.tipos[i],
+                "conciliavel": bool(self.conciliaveis[i]),
+                "conta_superior": self.superiores[i],
+                "profundidade": int(self.profundidade[i]),
+            }
+            for i in posicoes
+        ]
+
+    def _posicao_obrigatoria(self, conta_contabil: str) -> int:
+        i = self.posicao(conta_contabil)
+        if i is None:
+            raise KeyError(f"Conta não encontrada no plano: {conta_contabil}")
+        return i
+
+
+def _pre_ordem(pai_codigo: np.ndarray):
+    """
+    DFS iterativa (filhos em ordem de código).
+
+    Retorna (ordem, pai, profundidade, ciclos_quebrados), com pai e
+    profundidade já indexados pela posição em pré-ordem.
+    """
+    n = len(pai_codigo)
+
+    # Filhos de cada conta em formato CSR; argsort estável mantém a ordem de código
+    por_pai = np.argsort(pai_codigo, kind="stable")
+    inicio_filhos = np.searchsorted(pai_codigo[por_pai], np.arange(-1, n), side="left")
+    fim_filhos = np.searchsorted(pai_codigo[por_pai], np.arange(-1, n), side="right")
+
+    ordem = np.empty(n, dtype=np.int64)
+    pai = np.full(n, -1, dtype=np.int64)
+    profundidade = np.zeros(n, dtype=np.int64)
+    visitado = np.zeros(n, dtype=bool)
+    posicao = 0
+    ciclos_quebrados = 0
+
+    def visitar(raiz: int):
+        nonlocal posicao
+        pilha = [(raiz, -1, 0)]
+        while pilha:
+            no, pai_pre, nivel = pilha.pop()
+            if visitado[no]:
+                continue
+            visitado[no] = True
+            ordem[posicao], pai[posicao], profundidade[posicao] = no, pai_pre, nivel
+            atual = posicao
+            posicao += 1
+            filhos = por_pai[inicio_filhos[no + 1]:fim_filhos[no + 1]]
+            pilha.extend((filho, atual, nivel + 1) for filho in filhos[::-1])
+
+    for raiz in por_pai[inicio_filhos[0]:fim_filhos[0]]:
+        visitar(raiz)
+
+    # O que sobrou só é alcançável por ciclos: a menor conta restante vira raiz
+    for no in np.flatnonzero(~visitado):
+        if not visitado[no]:
+            ciclos_quebrados += 1
+            visitar(no)
+
+    return ordem, pai, profundidade, ciclos_quebrados
+
+
+def _tamanhos_subarvores(pai: np.ndarray, profundidade: np.ndarray) -> np.ndarray:
+    """Tamanho da subárvore de cada posição, somando nível a nível de baixo para cima."""
+    tamanhos = np.ones(len(pai), dtype=np.int64)
+    for nivel in range(int(profundidade.max(initial=0)), 0, -1):
+        filhos = np.flatnonzero(profundidade == nivel)
+        np.add.at(tamanhos, pai[filhos], tamanhos[filhos])
+    return tamanhos
@@ -0,0 +1,653 @@
+"""
+Leitura de planilhas em lotes de linhas, para arquivos que não cabem em memória.
+
+Com `colunas`, a leitura é projetada: o cabeçalho é lido primeiro, a função
+`colunas(cabecalho)` escolhe as colunas necessárias (com os fallbacks de
+cada normalizador) e o tipo de cada uma, e só essas colunas são convertidas.
+Para .xlsx isso é feito direto sobre o XML da aba, sem o modelo de células
+do openpyxl.
+
+Tipos aceitos em `colunas`:
+- "texto":  str (números viram texto, 101.0 → "101"); vazio → NaN
+- "numero": float64; o que não for número → NaN
+- "data":   datetime64 (serial do Excel ou texto); inválido → NaT
+- "bruto":  valor como está na célula (int para números inteiros, como o
+            pd.read_excel)
+"""
+import html
+import posixpath
+import re
+import zipfile
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+from xml.etree import ElementTree
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+# Tamanho padrão do lote (linhas por DataFrame)
+TAMANHO_LOTE_PADRAO = 200_000
+
+
+TIPOS_COLUNA = ("texto", "numero", "data", "bruto")
+
+# Seleção de colunas: recebe o cabeçalho e devolve {coluna: tipo}
+SeletorColunas = Callable[[List[str]], Dict[str, str]]
+
+
+def ler_planilha(entrada, colunas: Optional[SeletorColunas] = None) -> pd.DataFrame:
+    """Lê a planilha inteira de uma vez (ver ler_planilha_em_lotes)."""
+    lotes = list(ler_planilha_em_lotes(entrada, tamanho_lote=None, colunas=colunas))
+    if not lotes:
+        raise ValueError("Planilha sem cabeçalho")
+    return lotes[0] if len(lotes) == 1 else pd.concat(lotes, ignore_index=True)
+
+
+def ler_planilha_em_lotes(entrada, tamanho_lote: Optional[int] = TAMANHO_LOTE_PADRAO,
+                          colunas: Optional[SeletorColunas] = None,
+                          usar_colunar: bool = True) -> Iterator[pd.DataFrame]:
+    """
+    Lê uma planilha devolvendo DataFrames de até `tamanho_lote` linhas
+    (None = tudo em um único DataFrame).
+
+    Aceita:
+    - caminho (str/Path) de .xlsx/.xlsm (modo read-only) ou .csv
+    - caminho da cópia colunar (.arrow, ver tools.colunar)
+    - arquivo binário aberto (.xlsx), como o de um UploadFile
+    - DataFrame já carregado (fatiado em lotes)
+    - iterável de DataFrames (repassado como está)
+
+    colunas: seletor {coluna: tipo} aplicado ao cabeçalho (ver docstring do módulo)
+    usar_colunar: com `colunas`, lê a cópia colunar do caminho quando ela
+                  existe e está em dia com o original
+    """
+    if tamanho_lote is not None and tamanho_lote <= 0:
+        raise ValueError("tamanho_lote deve ser maior que zero")
+
+    if isinstance(entrada, pd.DataFrame):
+        if colunas is not None:
+            entrada = entrada[list(colunas([str(c) for c in entrada.columns]))]
+        passo = tamanho_lote or max(len(entrada), 1)
+        for inicio in range(0, len(entrada), passo):
+            yield entrada.iloc[inicio:inicio + passo]
+        return
+
+    if isinstance(entrada, (str, Path)):
+        from tools.colunar import EXTENSAO_COLUNAR, colunar_em_dia, ler_colunar_em_lotes
+
+        copia = None
+        if Path(entrada).suffix.lower() == EXTENSAO_COLUNAR:
+            copia = entrada
+        elif usar_colunar and colunas is not None:
+            copia = colunar_em_dia(entrada)
+        if copia is not None:
+            yield from ler_colunar_em_lotes(copia, tamanho_lote, colunas)
+            return
+
+    if isinstance(entrada, (str, Path)) and Path(entrada).suffix.lower() == ".csv":
+        yield from _ler_csv_em_lotes(Path(entrada), tamanho_lote, colunas)
+        return
+
+    if isinstance(entrada, (str, Path)) or hasattr(entrada, "read"):
+        if colunas is None:
+            yield from _ler_excel_em_lotes(entrada, tamanho_lote)
+        elif zipfile.is_zipfile(entrada):
+            yield from _ler_xlsx_projetado(entrada, colunas, tamanho_lote)
+        else:
+            # .xls (binário antigo) e afins
+            yield _ler_excel_pandas(entrada, colunas)
+        return
+
+    for lote in entrada:
+        yield lote
+
+
+def _ler_excel_em_lotes(caminho, tamanho_lote: Optional[int]) -> Iterator[pd.DataFrame]:
+    """Percorre a primeira aba linha a linha, sem carregar o workbook inteiro."""
+    wb = load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        linhas = wb.worksheets[0].iter_rows(values_only=True)
+
+        cabecalho = next(linhas, None)
+        if cabecalho is None:
+            return
+        colunas = [
+            str(nome) if nome is not None else f"Unnamed: {idx}"
+            for idx, nome in enumerate(cabecalho)
+        ]
+
+        buffer = []
+        vazias = 0
+        for linha in linhas:
+            # Como no pd.read_excel: linhas vazias no meio dos dados ficam
+            # (todas NaN), as do final são descartadas
+            if all(valor is None for valor in linha):
+                vazias += 1
+                continue
+            for _ in range(vazias):
+                buffer.append((None,) * len(colunas))
+                if tamanho_lote and len(buffer) >= tamanho_lote:
+                    yield pd.DataFrame(buffer, columns=colunas)
+                    buffer = []
+            vazias = 0
+            buffer.append(linha[:len(colunas)])
+            if tamanho_lote and len(buffer) >= tamanho_lote:
+                yield pd.DataFrame(buffer, columns=colunas)
+                buffer = []
+
+        if buffer:
+            yield pd.DataFrame(buffer, columns=colunas)
+    finally:
+        wb.close()
+
+
+def _ler_csv_em_lotes(caminho: Path, tamanho_lote: Optional[int],
+                      colunas: Optional[SeletorColunas]) -> Iterator[pd.DataFrame]:
+    if colunas is None:
+        if tamanho_lote is None:
+            yield pd.read_csv(caminho)
+        else:
+            yield from pd.read_csv(caminho, chunksize=tamanho_lote)
+        return
+
+    cabecalho = [str(c) for c in pd.read_csv(caminho, nrows=0).columns]
+    tipos = _validar_tipos(colunas(cabecalho))
+    leitor = pd.read_csv(
+        caminho,
+        usecols=list(tipos),
+        dtype={nome: str for nome, tipo in tipos.items() if tipo == "texto"},
+        chunksize=tamanho_lote,
+    )
+    for lote in ([leitor] if tamanho_lote is None else leitor):
+        for nome, tipo in tipos.items():
+            if tipo == "numero":
+                lote[nome] = pd.to_numeric(lote[nome], errors="coerce")
+            elif tipo == "data":
+                lote[nome] = pd.to_datetime(lote[nome], errors="coerce")
+        yield lote[list(tipos)]
+
+
+def _ler_excel_pandas(entrada, colunas: SeletorColunas) -> pd.DataFrame:
+    """Formatos que não são OOXML (.xls): pd.read_excel só com as colunas escolhidas."""
+    if hasattr(entrada, "seek"):
+        entrada.seek(0)
+    cabecalho = [str(c) for c in pd.read_excel(entrada, nrows=0).columns]
+    tipos = _validar_tipos(colunas(cabecalho))
+
+    if hasattr(entrada, "seek"):
+        entrada.seek(0)
+    df = pd.read_excel(entrada, usecols=list(tipos))
+    return pd.DataFrame({nome: _converter_coluna(df[nome].tolist(), tipo, False)
+                         for nome, tipo in tipos.items()})
+
+
+def _validar_tipos(tipos: Dict[str, str]) -> Dict[str, str]:
+    invalidos = {nome: tipo for nome, tipo in tipos.items() if tipo not in TIPOS_COLUNA}
+    if invalidos:
+        raise ValueError(f"Tipos de coluna inválidos: {invalidos}. Aceitos: {TIPOS_COLUNA}")
+    return tipos
+
+
+# ============================================================
+# XLSX PROJETADO (XML DA ABA)
+# ============================================================
+#
+# O custo de ler uma exportação do ERP com 100+ colunas está quase todo em
+# interpretar células que serão descartadas. Aqui o XML da aba é percorrido
+# em blocos de bytes: cada linha é localizada por regex e, dentro dela, só as
+# células das colunas escolhidas são procuradas pela referência (r="H12") e
+# interpretadas. Linhas sem referências de célula caem no ElementTree.
+# O openpyxl read_only (iter_rows com projeção por índice) ainda cria um
+# valor para cada célula da linha: ver benchmarks/bench_leitura.py.
+
+_REL_ID = "}id"
+_TIPO_STRINGS = "/sharedStrings"
+_BLOCO_BYTES = 4 * 1024 * 1024
+
+_RE_RAIZ = re.compile(rb"<((?:[\w.-]+:)?)worksheet\b[^>]*>")
+_RE_SHEET_DATA = re.compile(rb"<(?:[\w.-]+:)?sheetData\b[^>]*?(/?)>")
+_RE_NUMERO_LINHA = re.compile(rb'\sr="(\d+)"')
+_RE_TIPO_CELULA = re.compile(rb'\st="([^"]*)"')
+_RE_COLUNA_CELULA = re.compile(rb'\sr="([A-Z]+)')
+
+# Acima disto, varrer as células da linha em ordem sai mais barato do que
+# procurar cada uma pela referência (ex.: conversão da planilha inteira)
+_ALVOS_BUSCA_DIRETA = 16
+
+
+def _ler_xlsx_projetado(entrada, colunas: SeletorColunas,
+                        tamanho_lote: Optional[int]) -> Iterator[pd.DataFrame]:
+    """
+    Lê a primeira aba convertendo só as colunas escolhidas.
+
+    A primeira linha com valores é o cabeçalho. Como no pd.read_excel, linhas
+    sem nenhum valor no meio dos dados (inclusive as ausentes do XML) viram
+    linhas vazias e as do final são descartadas: a posição no DataFrame
+    continua correspondendo à linha da planilha.
+    """
+    with zipfile.ZipFile(entrada) as pacote:
+        caminho_aba, caminho_strings, data1904 = _localizar_primeira_aba(pacote)
+        strings = _ler_strings_compartilhadas(pacote, caminho_strings)
+
+        with pacote.open(caminho_aba) as arquivo:
+            leitor = _LeitorLinhas(arquivo)
+
+            nomes: List[str] = []
+            tipos: List[str] = []
+            alvos: List[tuple] = []     # (índice da coluna, letras) por coluna escolhida
+            buffer: List[list] = []
+            anterior = 0                # número da última <row> lida
+            ultima_com_valores = 0      # número da última linha levada ao buffer
+
+            for numero, atributos, conteudo in leitor.linhas():
+                # Sem r="", a linha é a seguinte à anterior
+                anterior = int(numero) if numero is not None else anterior + 1
+
+                if not alvos:
+                    valores = leitor.valores_por_elementtree(atributos, conteudo, strings)
+                    if not valores:
+                        continue
+                    ultima_com_valores = anterior
+                    cabecalho = [
+                        str(valores[i]) if i in valores else f"Unnamed: {i}"
+                        for i in range(max(valores) + 1)
+                    ]
+                    escolhidas = _validar_tipos(colunas(cabecalho))
+                    faltantes = set(escolhidas) - set(cabecalho)
+                    if faltantes:
+                        raise ValueError(f"Colunas não encontradas no cabeçalho: {sorted(faltantes)}")
+                    nomes = list(escolhidas)
+                    tipos = [escolhidas[nome] for nome in nomes]
+                    alvos = [
+                        (indice, _letras_coluna(indice).encode())
+                        for indice in (cabecalho.index(nome) for nome in nomes)
+                    ]
+                    continue
+
+                if conteudo is None:
+                    continue
+
+                linha = leitor.valores_projetados(numero, atributos, conteudo, alvos, strings)
+                if linha is None:
+                    continue
+
+                # Linhas vazias (ou ausentes) desde a última com valores
+                for _ in range(anterior - ultima_com_valores - 1):
+                    buffer.append([None] * len(alvos))
+                    if tamanho_lote and len(buffer) >= tamanho_lote:
+                        yield _montar_lote(buffer, nomes, tipos, data1904)
+                        buffer = []
+                ultima_com_valores = anterior
+
+                buffer.append(linha)
+                if tamanho_lote and len(buffer) >= tamanho_lote:
+                    yield _montar_lote(buffer, nomes, tipos, data1904)
+                    buffer = []
+
+            if not alvos:
+                return
+            if buffer or tamanho_lote is None:
+                yield _montar_lote(buffer, nomes, tipos, data1904)
+
+
+class _LeitorLinhas:
+    """Percorre as linhas (<row>) do XML de uma aba em blocos de bytes."""
+
+    def __init__(self, arquivo):
+        self.arquivo = arquivo
+        self.raiz_abertura = b""
+        self.raiz_fechamento = b""
+        self.prefixo = b""
+        self._posicoes_alvos = None
+
+    def linhas(self) -> Iterator[tuple]:
+        """(número da linha ou None, atributos, conteúdo ou None se <row/>)."""
+        dados = self._ate_sheet_data()
+        if dados is None:
+            return
+
+        abre_linha = b"<" + self.prefixo + b"row"
+        fim_linha = b"</" + self.prefixo + b"row>"
+        fim_dados = b"</" + self.prefixo + b"sheetData>"
+
+        posicao = 0
+        ultimo_bloco = False
+        while True:
+            # Nada depois de </sheetData> interessa (e <rowBreaks> também começa com "<row")
+            if not ultimo_bloco and posicao == 0:
+                final = dados.find(fim_dados)
+                if final != -1:
+                    dados, ultimo_bloco = dados[:final], True
+
+            inicio = dados.find(abre_linha, posicao)
+            linha = _extrair_linha(dados, inicio + len(abre_linha), fim_linha) if inicio != -1 else None
+
+            if linha is not None:
+                atributos, conteudo, posicao = linha
+                numero = _RE_NUMERO_LINHA.search(atributos)
+                yield (numero.group(1) if numero else None), atributos, conteudo
+                continue
+
+            # Linha incompleta: lê o próximo bloco
+            if ultimo_bloco:
+                return
+            dados = dados[posicao:]
+            posicao = 0
+            bloco = self.arquivo.read(_BLOCO_BYTES)
+            if not bloco:
+                ultimo_bloco = True
+            dados += bloco
+
+    def _ate_sheet_data(self) -> Optional[bytes]:
+        """Consome o XML até <sheetData> e devolve o restante já lido."""
+        dados = b""
+        while True:
+            bloco = self.arquivo.read(_BLOCO_BYTES)
+            dados += bloco
+            inicio = _RE_SHEET_DATA.search(dados)
+            if inicio is not None:
+                break
+            if not bloco:
+                return None
+
+        raiz = _RE_RAIZ.search(dados)
+        self.prefixo = raiz.group(1)
+        self.raiz_abertura = raiz.group(0)
+        self.raiz_fechamento = b"</" + self.prefixo + b"worksheet>"
+
+        if inicio.group(1) == b"/":
+            return None
+        return dados[inicio.end():]
+
+    def valores_projetados(self, numero: Optional[bytes], atributos: bytes, conteudo: bytes,
+                           alvos: List[tuple], strings: List[str]) -> Optional[list]:
+        """
+        Valores das colunas escolhidas, procurando cada célula pela referência.
+        None se a linha não tiver nenhum valor.
+        """
+        if numero is None or b' r="' not in conteudo:
+            valores = self.valores_por_elementtree(atributos, conteudo, strings)
+            linha = [valores.get(indice) for indice, _ in alvos]
+            return linha if valores else None
+
+        prefixo = self.prefixo
+        if len(alvos) > _ALVOS_BUSCA_DIRETA:
+            linha = self._valores_por_varredura(conteudo, alvos, strings)
+        else:
+            linha = self._valores_por_referencia(numero, conteudo, alvos, strings)
+
+        if all(valor is None for valor in linha):
+            # Vazia nas colunas escolhidas: só é descartada se vazia por inteiro
+            tem_valor = b"<" + prefixo + b"v>" in conteudo or b"<" + prefixo + b"is>" in conteudo
+            return linha if tem_valor else None
+        return linha
+
+    def _valores_por_referencia(self, numero: bytes, conteudo: bytes, alvos: List[tuple],
+                                strings: List[str]) -> list:
+        prefixo = self.prefixo
+        linha = []
+        for _, letras in alvos:
+            posicao = conteudo.find(b' r="' + letras + numero + b'"')
+            if posicao == -1:
+                linha.append(None)
+                continue
+            inicio = conteudo.rfind(b"<", 0, posicao)
+            fim_tag = conteudo.find(b">", posicao)
+            if conteudo[fim_tag - 1:fim_tag] == b"/":
+                linha.append(None)
+                continue
+            fim = conteudo.find(b"</" + prefixo + b"c>", fim_tag)
+            linha.append(_valor_celula_bytes(
+                conteudo[inicio:fim_tag], conteudo[fim_tag + 1:fim], prefixo, strings
+            ))
+        return linha
+
+    def _valores_por_varredura(self, conteudo: bytes, alvos: List[tuple],
+                               strings: List[str]) -> list:
+        if self._posicoes_alvos is None or self._posicoes_alvos[0] is not alvos:
+            self._posicoes_alvos = (alvos, {letras: posicao for posicao, (_, letras) in enumerate(alvos)})
+        posicoes = self._posicoes_alvos[1]
+
+        prefixo = self.prefixo
+        linha = [None] * len(alvos)
+        for atributos, valor, corpo in _regex_celula(prefixo).findall(conteudo):
+            coluna = _RE_COLUNA_CELULA.search(atributos)
+            posicao = posicoes.get(coluna.group(1)) if coluna else None
+            if posicao is None:
+                continue
+            if corpo:
+                linha[posicao] = _valor_celula_bytes(atributos, corpo, prefixo, strings)
+            elif valor:
+                # Caso comum (<c ...><v>...</v></c>) sem passar pelo corpo
+                tipo = _RE_TIPO_CELULA.search(atributos)
+                tipo = tipo.group(1).decode() if tipo else "n"
+                texto = valor.decode("utf-8")
+                if tipo not in ("s", "n", "b", "e"):
+                    texto = html.unescape(texto)
+                linha[posicao] = _converter_valor(tipo, texto, strings)
+        return linha
+
+    def valores_por_elementtree(self, atributos: bytes, conteudo: Optional[bytes],
+                                strings: List[str]) -> Dict[int, object]:
+        """{índice da coluna: valor} de todas as células da linha (caminho lento)."""
+        if conteudo is None:
+            return {}
+
+        prefixo = self.prefixo
+        xml = (
+            self.raiz_abertura
+            + b"<" + prefixo + b"row" + atributos + b">" + conteudo + b"</" + prefixo + b"row>"
+            + self.raiz_fechamento
+        )
+        raiz = ElementTree.fromstring(xml)
+        ns = raiz.tag[:raiz.tag.index("}") + 1] if raiz.tag.startswith("{") else ""
+
+        valores = {}
+        proxima = 0
+        for celula in raiz.find(ns + "row"):
+            if celula.tag != ns + "c":
+                continue
+            referencia = celula.get("r")
+            indice = proxima if referencia is None else _indice_coluna(referencia.rstrip("0123456789"))
+            proxima = indice + 1
+
+            valor = _valor_celula(celula, strings, ns)
+            if valor is not None:
+                valores[indice] = valor
+        return valores
+
+
+def _extrair_linha(dados: bytes, inicio_atributos: int, fim_linha: bytes) -> Optional[tuple]:
+    """(atributos, conteúdo ou None, posição seguinte), ou None se a linha está incompleta."""
+    fim_tag = dados.find(b">", inicio_atributos)
+    if fim_tag == -1:
+        return None
+
+    atributos = dados[inicio_atributos:fim_tag]
+    if atributos.endswith(b"/"):
+        return atributos[:-1], None, fim_tag + 1
+
+    fim = dados.find(fim_linha, fim_tag)
+    if fim == -1:
+        return None
+    return atributos, dados[fim_tag + 1:fim], fim + len(fim_linha)
+
+
+def _localizar_primeira_aba(pacote: zipfile.ZipFile):
+    """(xml da primeira aba, xml das strings compartilhadas ou None, usa data 1904)."""
+    caminho_workbook = "xl/workbook.xml"
+    for rel in ElementTree.fromstring(pacote.read("_rels/.rels")):
+        if rel.get("Type", "").endswith("/officeDocument"):
+            caminho_workbook = rel.get("Target").lstrip("/")
+
+    workbook = ElementTree.fromstring(pacote.read(caminho_workbook))
+    ns = workbook.tag[:workbook.tag.index("}") + 1] if workbook.tag.startswith("{") else ""
+
+    propriedades = workbook.find(ns + "workbookPr")
+    data1904 = propriedades is not None and propriedades.get("date1904") in ("1", "true")
+
+    primeira = workbook.find(f"{ns}sheets/{ns}sheet")
+    if primeira is None:
+        raise ValueError("Planilha sem abas")
+    rel_id = next(valor for chave, valor in primeira.attrib.items() if chave.endswith(_REL_ID))
+
+    pasta = posixpath.dirname(caminho_workbook)
+    nome_rels = posixpath.join(pasta, "_rels", posixpath.basename(caminho_workbook) + ".rels")
+
+    caminho_aba = caminho_strings = None
+    for rel in ElementTree.fromstring(pacote.read(nome_rels)):
+        alvo = rel.get("Target")
+        alvo = alvo.lstrip("/") if alvo.startswith("/") else posixpath.normpath(posixpath.join(pasta, alvo))
+        if rel.get("Id") == rel_id:
+            caminho_aba = alvo
+        elif rel.get("Type", "").endswith(_TIPO_STRINGS):
+            caminho_strings = alvo
+
+    return caminho_aba, caminho_strings, data1904
+
+
+def _ler_strings_compartilhadas(pacote: zipfile.ZipFile, caminho: Optional[str]) -> List[str]:
+    if not caminho:
+        return []
+
+    strings = []
+    with pacote.open(caminho) as arquivo:
+        for _, elemento in ElementTree.iterparse(arquivo):
+            if not elemento.tag.endswith("}si") and elemento.tag != "si":
+                continue
+            ns = elemento.tag[:-2]
+            texto = elemento.find(ns + "t")
+            if texto is not None:
+                strings.append(texto.text or "")
+            else:
+                # Rich text: concatena os trechos (<r><t>), ignorando a fonética (<rPh>)
+                strings.append("".join(t.text or "" for t in elemento.iterfind(f"{ns}r/{ns}t")))
+            elemento.clear()
+    return strings
+
+
+def _indice_coluna(letras: str) -> int:
+    """'A' → 0, 'Z' → 25, 'AA' → 26."""
+    indice = 0
+    for letra in letras:
+        indice = indice * 26 + (ord(letra) - 64)
+    return indice - 1
+
+
+def _letras_coluna(indice: int) -> str:
+    """0 → 'A', 25 → 'Z', 26 → 'AA'."""
+    letras = ""
+    indice += 1
+    while indice:
+        indice, resto = divmod(indice - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+
+def _converter_valor(tipo: str, texto: str, strings: List[str]):
+    """Valor Python a partir do tipo da célula (atributo t) e do texto de <v>."""
+    if tipo == "s":
+        return strings[int(texto)]
+    if tipo == "n":
+        return float(texto)
+    if tipo == "b":
+        return texto == "1"
+    if tipo == "e":
+        return None
+    # "str" (resultado de fórmula) e "d" (data ISO) ficam como texto
+    return texto
+
+
+def _valor_celula(celula, strings: List[str], ns: str):
+    """Valor de uma célula já interpretada pelo ElementTree."""
+    tipo = celula.get("t", "n")
+
+    if tipo == "inlineStr":
+        inline = celula.find(ns + "is")
+        if inline is None:
+            return None
+        return "".join(t.text or "" for t in inline.iter(ns + "t"))
+
+    valor = celula.find(ns + "v")
+    if valor is None or valor.text is None:
+        return None
+    return _converter_valor(tipo, valor.text, strings)
+
+
+@lru_cache(maxsize=None)
+def _regex_celula(prefixo: bytes):
+    p = re.escape(prefixo)
+    return re.compile(
+        rb"<" + p + rb"c\b([^>]*?)(?:/>|>(?:<" + p + rb"v>([^<]*)</" + p + rb"v>|(.*?))</" + p + rb"c>)",
+        re.S
+    )
+
+
+@lru_cache(maxsize=None)
+def _regex_texto_inline(prefixo: bytes):
+    p = re.escape(prefixo)
+    return re.compile(rb"<" + p + rb"t\b[^>]*>(.*?)</" + p + rb"t>", re.S)
+
+
+def _valor_celula_bytes(abertura: bytes, corpo: bytes, prefixo: bytes, strings: List[str]):
+    """Valor de uma célula a partir dos bytes da tag de abertura e do conteúdo."""
+    tipo = _RE_TIPO_CELULA.search(abertura)
+    tipo = tipo.group(1).decode() if tipo else "n"
+
+    if tipo == "inlineStr":
+        trechos = _regex_texto_inline(prefixo).findall(corpo)
+        return html.unescape(b"".join(trechos).decode("utf-8")) if trechos else None
+
+    abre_valor = b"<" + prefixo + b"v>"
+    inicio = corpo.find(abre_valor)
+    if inicio == -1:
+        return None
+    inicio += len(abre_valor)
+    texto = corpo[inicio:corpo.find(b"</" + prefixo + b"v>", inicio)].decode("utf-8")
+    if tipo not in ("s", "n", "b", "e"):
+        texto = html.unescape(texto)
+    return _converter_valor(tipo, texto, strings)
+
+
+def _montar_lote(buffer: List[list], nomes: List[str], tipos: List[str], data1904: bool) -> pd.DataFrame:
+    colunas = list(zip(*buffer)) if buffer else [()] * len(nomes)
+    return pd.DataFrame({
+        nome: _converter_coluna(list(valores), tipo, data1904)
+        for nome, tipo, valores in zip(nomes, tipos, colunas)
+    })
+
+
+def _converter_coluna(valores: list, tipo: str, data1904: bool):
+    if tipo == "texto":
+        return pd.Series([_como_texto(v) for v in valores], dtype=object)
+
+    if tipo == "numero":
+        return pd.to_numeric(pd.Series(valores, dtype=object), errors="coerce").astype("float64")
+
+    if tipo == "data":
+        serie = pd.Series(valores, dtype=object)
+        numericos = serie.map(lambda v: isinstance(v, (int, float)) and not isinstance(v, bool))
+        datas = pd.to_datetime(serie.where(~numericos), errors="coerce")
+        if numericos.any():
+            origem = "1904-01-01" if data1904 else "1899-12-30"
+            datas[numericos] = pd.to_datetime(
+                serie[numericos].astype("float64"), unit="D", origin=origem
+            ).dt.round("s")
+        return datas
+
+    # bruto: números inteiros viram int, como no pd.read_excel
+    return pd.Series([
+        int(v) if isinstance(v, float) and v.is_integer() else v
+        for v in valores
+    ], dtype=object)
+
+
+def _como_texto(valor):
+    # Vazio vira NaN (não None), como no pd.read_excel
+    if valor is None or (isinstance(valor, float) and np.isnan(valor)):
+        return np.nan
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor)
@@ -2,41 +2,8 @@
 Mappers para converter dados do DataFrame para formato JSON/dict
 Compatível com as colunas retornadas por calcular_diferencas
 """
-
-def map_origem_maior(row):
-    """
-    Mapeia registros onde Origem > Contabilidade
-    Row vem com as colunas:
-    - Código
-    - Cliente
-    - Valor Financeiro
-    - Valor Contabilidade
-    - Diferença
-    - Tipo Diferença
-    """
-    return {
-        "cnpj": str(row.get("Código", "")).strip() if row.get("Código") else None,
-        "nome": str(row.get("Cliente", "")).strip() if row.get("Cliente") else None,
-        "valor_origem": float(row.get("Valor Financeiro", 0)),
-        "valor_contabil": float(row.get("Valor Contabilidade", 0)),
-        "diferenca": float(row.get("Diferença", 0)),
-        "prazo": classificar_prazo(row.get("Código")),  # Classificar por código
-        "tipo_diferenca": "Origem Maior"
-    }
-
-
-def map_contabilidade_maior(df, conta_contabil):
-    return [
-        {
-            "identificador": row["Código"],
-            "data": None,
-            "valor": row["Diferença"],
-            "conta_contabil": conta_contabil,
-            "historico": "Valor maior na Contabilidade"
-        }
-        for _, row in df.iterrows()
-    ]
-
+import numpy as np
+import pandas as pd
 
 
 def classificar_prazo(codigo):
@@ -72,4 +39,152 @@ def map_registro_conciliado(row):
         "valor": float(row.get("Valor Financeiro", 0)),
         "prazo": classificar_prazo(row.get("Código")),
         "tipo_diferenca": "Conciliado"
-    }
\ No newline at end of file
+    }
+
+def classificar_prazo_vetorizado(codigos: pd.Series) -> np.ndarray:
+    """
+    Versão vetorizada de classificar_prazo para uma coluna inteira.
+    """
+    texto = _texto_ou_none(codigos)
+    tamanho = texto.str.len().to_numpy(dtype=np.float64, na_value=np.nan)
+
+    return np.where(
+        texto.isna().to_numpy(),
+        "Não Classificado",
+        np.where(tamanho < 11, "Curto", "Longo")
+    )
+
+
+def montar_diferencas(df_origem_maior: pd.DataFrame, df_contabil_maior: pd.DataFrame,
+                      conta_contabil: str) -> dict:
+    """
+    Monta as duas listas de diferenças a partir das colunas do df_completo,
+    em bloco, sem mapear linha a linha.
+
+    Linhas com valor não numérico/infinito não entram nas listas: são
+    devolvidas em 'erros' para que o chamador decida como reportar.
+
+    Retorna:
+    --------
+    dict contendo:
+        - 'diferencas_origem_maior': lista de {cnpj, nome, valor_origem,
+          valor_contabil, diferenca, prazo, tipo_diferenca="Origem Maior"}
+        - 'diferencas_contabilidade_maior': lista de {identificador, data=None,
+          valor (a diferença), conta_contabil, historico="Valor maior na Contabilidade"}
+        - 'erros': lista de {lista, identificador, erro}
+    """
+    erros = []
+
+    # ==========================
+    # ORIGEM > CONTABILIDADE
+    # ==========================
+    df_origem, erros_origem = _separar_invalidos(
+        df_origem_maior, ["Valor Financeiro", "Valor Contabilidade", "Diferença"], "origem_maior"
+    )
+    erros.extend(erros_origem)
+
+    codigos = _texto_ou_none(df_origem["Código"]).tolist()
+    nomes = _texto_ou_none(df_origem["Cliente"]).tolist()
+    prazos = classificar_prazo_vetorizado(df_origem["Código"]).tolist()
+
+    diferencas_origem_maior = [
+        {
+            "cnpj": cnpj,
+            "nome": nome,
+            "valor_origem": valor_origem,
+            "valor_contabil": valor_contabil,
+            "diferenca": diferenca,
+            "prazo": prazo,
+            "tipo_diferenca": "Origem Maior"
+        }
+        for cnpj, nome, valor_origem, valor_contabil, diferenca, prazo in zip(
+            codigos,
+            nomes,
+            df_origem["Valor Financeiro"].to_numpy(dtype=np.float64).tolist(),
+            df_origem["Valor Contabilidade"].to_numpy(dtype=np.float64).tolist(),
+            df_origem["Diferença"].to_numpy(dtype=np.float64).tolist(),
+            prazos
+        )
+    ]
+
+    # ==========================
+    # CONTABILIDADE > ORIGEM
+    # ==========================
+    df_contabil, erros_contabil = _separar_invalidos(
+        df_contabil_maior, ["Diferença"], "contabilidade_maior"
+    )
+    erros.extend(erros_contabil)
+
+    diferencas_contabilidade_maior = [
+        {
+            "identificador": identificador,
+            "data": None,
+            "valor": valor,
+            "conta_contabil": conta_contabil,
+            "historico": "Valor maior na Contabilidade"
+        }
+        for identificador, valor in zip(
+            _texto_ou_none(df_contabil["Código"]).tolist(),
+            df_contabil["Diferença"].to_numpy(dtype=np.float64).tolist()
+        )
+    ]
+
+    return {
+        "diferencas_origem_maior": diferencas_origem_maior,
+        "diferencas_contabilidade_maior": diferencas_contabilidade_maior,
+        "erros": erros
+    }
+
+
+# Colunas da tabela concilia.diferencas_conciliacao (sem id e conciliacao_id)
+COLUNAS_DIFERENCAS = [
+    "codigo", "cliente", "valor_financeiro", "valor_contabilidade",
+    "diferenca", "diferenca_abs", "origem", "tipo_diferenca",
+]
+
+
+def tabela_diferencas(df_completo: pd.DataFrame) -> pd.DataFrame:
+    """
+    Linhas do df_completo com diferença (tipo diferente de "Sem diferença")
+    nas colunas de COLUNAS_DIFERENCAS, valores arredondados a centavos.
+    Linhas com valor não finito ficam de fora, como em montar_diferencas.
+    Código e cliente são cortados nos tamanhos das colunas (50 e 255).
+    """
+    df = df_completo[df_completo["Tipo Diferença"] != "Sem diferença"]
+    df, _ = _separar_invalidos(df, ["Valor Financeiro", "Valor Contabilidade", "Diferença"], "persistidas")
+
+    def centavos(coluna):
+        return np.round(df[coluna].to_numpy(dtype=np.float64), 2)
+
+    return pd.DataFrame({
+        "codigo": _texto_ou_none(df["Código"]).str.slice(0, 50).to_numpy(dtype=object),
+        "cliente": _texto_ou_none(df["Cliente"]).str.slice(0, 255).to_numpy(dtype=object),
+        "valor_financeiro": centavos("Valor Financeiro"),
+        "valor_contabilidade": centavos("Valor Contabilidade"),
+        "diferenca": centavos("Diferença"),
+        "diferenca_abs": np.abs(centavos("Diferença")),
+        "origem": df["Origem"].astype(str).to_numpy(dtype=object),
+        "tipo_diferenca": df["Tipo Diferença"].astype(str).to_numpy(dtype=object),
+    }, columns=COLUNAS_DIFERENCAS)
+
+
+def _separar_invalidos(df: pd.DataFrame, colunas_valor: list, lista: str):
+    """Remove linhas com valores não finitos, devolvendo (df_validos, erros)."""
+    valores = df[colunas_valor].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+    invalidos = ~np.isfinite(valores).all(axis=1)
+
+    if not invalidos.any():
+        return df, []
+
+    erros = [
+        {"lista": lista, "identificador": identificador, "erro": "Valor não numérico"}
+        for identificador in _texto_ou_none(df["Código"][invalidos]).tolist()
+    ]
+    return df[~invalidos], erros
+
+
+def _texto_ou_none(serie: pd.Series) -> pd.Series:
+    """Converte a coluna em str sem espaços, com None para vazio/NaN (object)."""
+    bruto = serie.astype(object)
+    preenchido = serie.notna() & (bruto != "")
+    return bruto.astype(str).str.strip().astype(object).where(preenchido, None)
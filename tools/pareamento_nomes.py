@@ -0,0 +1,180 @@
+"""
+Pareamento por nome dos registros exclusivos de uma conciliação.
+
+calcular_diferencas junta as bases só pelo codigo. Quando o balancete usa
+outro formato de código, o mesmo cliente aparece duas vezes: uma em
+"Só Financeiro" e outra em "Só Contabilidade". propor_pares_por_nome compara
+os nomes desses dois grupos e sugere pares de códigos com uma similaridade
+entre 0 e 1.
+
+Para não comparar todos contra todos:
+
+1. Bloqueio: os nomes são normalizados e quebrados em tokens; só viram
+   candidatos os pares que compartilham algum token. Tokens muito comuns
+   (que gerariam mais de max_pares_por_token pares) não bloqueiam.
+2. Similaridade: Dice ponderado por IDF sobre os tokens, calculado com
+   merges (hash join) entre a tabela de candidatos e as tabelas
+   linha→token, sem laço por par.
+3. Atribuição: gulosa pela maior similaridade, um para um.
+"""
+import logging
+from typing import Set
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+LIMIAR_SIMILARIDADE = 0.6
+MAX_PARES_POR_TOKEN = 10_000
+
+# Formas jurídicas e conectivos que não distinguem um cliente de outro
+TOKENS_IGNORADOS: Set[str] = {
+    "LTDA", "ME", "EPP", "SA", "EIRELI", "MEI", "CIA", "COM", "IND",
+    "DE", "DA", "DO", "DAS", "DOS", "E",
+}
+
+COLUNAS_PARES = [
+    "codigo_financeiro", "cliente_financeiro", "valor_financeiro",
+    "codigo_contabilidade", "cliente_contabilidade", "valor_contabilidade",
+    "similaridade",
+]
+
+
+def normalizar_nomes(nomes: pd.Series) -> pd.Series:
+    """Maiúsculas, sem acentos, pontuação nem espaços repetidos."""
+    return (
+        nomes.astype(object).fillna("").astype(str)
+        .str.normalize("NFKD")
+        .str.encode("ascii", errors="ignore").str.decode("ascii")
+        .str.upper()
+        .str.replace(r"[^A-Z0-9 ]+", " ", regex=True)
+        .str.replace(r"\s+", " ", regex=True)
+        .str.strip()
+    )
+
+
+def tokens_por_linha(nomes: pd.Series) -> pd.DataFrame:
+    """Tabela (linha, token) sem repetição, já sem os tokens ignorados."""
+    tokens = normalizar_nomes(nomes).str.split(" ").explode()
+    tabela = pd.DataFrame({"linha": tokens.index.to_numpy(), "token": tokens.to_numpy(dtype=object)})
+    tabela = tabela[(tabela["token"].str.len() > 1) & ~tabela["token"].isin(TOKENS_IGNORADOS)]
+    return tabela.drop_duplicates(ignore_index=True)
+
+
+def propor_pares_por_nome(df_completo: pd.DataFrame, limiar: float = LIMIAR_SIMILARIDADE,
+                          max_pares_por_token: int = MAX_PARES_POR_TOKEN) -> pd.DataFrame:
+    """
+    Sugere pares (Só Financeiro, Só Contabilidade) com nomes parecidos.
+
+    Parâmetros:
+    -----------
+    df_completo : pd.DataFrame
+        Saída de calcular_diferencas (colunas Código, Cliente, Valor Financeiro,
+        Valor Contabilidade, Origem)
+    limiar : float
+        Similaridade mínima (0 a 1) para sugerir um par
+    max_pares_por_token : int
+        Tokens que gerariam mais candidatos que isso não são usados no bloqueio
+
+    Retorna:
+    --------
+    DataFrame com COLUNAS_PARES, um par por código, da maior para a menor similaridade
+    """
+    origem = df_completo["Origem"]
+    fin = df_completo[origem == "Só Financeiro"].reset_index(drop=True)
+    cont = df_completo[origem == "Só Contabilidade"].reset_index(drop=True)
+
+    if fin.empty or cont.empty:
+        return pd.DataFrame(columns=COLUNAS_PARES)
+
+    tokens_fin = tokens_por_linha(fin["Cliente"])
+    tokens_cont = tokens_por_linha(cont["Cliente"])
+
+    # ==========================
+    # 1️⃣ PESOS (IDF) DOS TOKENS
+    # ==========================
+    frequencia_fin = tokens_fin["token"].value_counts()
+    frequencia_cont = tokens_cont["token"].value_counts()
+    frequencia = frequencia_fin.add(frequencia_cont, fill_value=0)
+    idf = np.log((len(fin) + len(cont)) / frequencia)
+
+    tokens_fin["peso"] = tokens_fin["token"].map(idf).to_numpy()
+    tokens_cont["peso"] = tokens_cont["token"].map(idf).to_numpy()
+    peso_fin = tokens_fin.groupby("linha")["peso"].sum()
+    peso_cont = tokens_cont.groupby("linha")["peso"].sum()
+
+    # ==========================
+    # 2️⃣ BLOQUEIO
+    # ==========================
+    pares_por_token = frequencia_fin.mul(frequencia_cont, fill_value=0)
+    bloqueadores = pares_por_token.index[(pares_por_token > 0) & (pares_por_token <= max_pares_por_token)]
+
+    candidatos = (
+        tokens_fin.loc[tokens_fin["token"].isin(bloqueadores), ["linha", "token"]]
+        .merge(tokens_cont.loc[tokens_cont["token"].isin(bloqueadores), ["linha", "token"]],
+               on="token", suffixes=("_fin", "_cont"))
+        [["linha_fin", "linha_cont"]]
+        .drop_duplicates(ignore_index=True)
+    )
+    if candidatos.empty:
+        return pd.DataFrame(columns=COLUNAS_PARES)
+
+    # ==========================
+    # 3️⃣ SIMILARIDADE (DICE PONDERADO)
+    # ==========================
+    # Todos os tokens em comum de cada candidato, inclusive os comuns demais para bloquear
+    comuns = (
+        candidatos
+        .merge(tokens_fin.rename(columns={"linha": "linha_fin"}), on="linha_fin")
+        .merge(tokens_cont[["linha", "token"]].rename(columns={"linha": "linha_cont"}),
+               on=["linha_cont", "token"])
+        .groupby(["linha_fin", "linha_cont"], sort=False)["peso"].sum()
+        .reset_index()
+    )
+    soma_pesos = (
+        peso_fin.reindex(comuns["linha_fin"]).to_numpy()
+        + peso_cont.reindex(comuns["linha_cont"]).to_numpy()
+    )
+    comuns["similaridade"] = np.divide(
+        2 * comuns["peso"].to_numpy(), soma_pesos,
+        out=np.zeros(len(comuns)), where=soma_pesos > 0
+    )
+    comuns = comuns[comuns["similaridade"] >= limiar]
+
+    # ==========================
+    # 4️⃣ ATRIBUIÇÃO UM PARA UM
+    # ==========================
+    # Gulosa: o par mais parecido fica; os demais pares dos dois lados saem
+    comuns = comuns.sort_values("similaridade", ascending=False, kind="stable")
+    escolhidos = []
+    usados_fin, usados_cont = set(), set()
+    for linha_fin, linha_cont in zip(comuns["linha_fin"].tolist(), comuns["linha_cont"].tolist()):
+        if linha_fin in usados_fin or linha_cont in usados_cont:
+            continue
+        usados_fin.add(linha_fin)
+        usados_cont.add(linha_cont)
+        escolhidos.append((linha_fin, linha_cont))
+
+    if not escolhidos:
+        return pd.DataFrame(columns=COLUNAS_PARES)
+
+    escolhidos = np.array(escolhidos, dtype=np.int64)
+    similaridade = comuns.set_index(["linha_fin", "linha_cont"])["similaridade"]
+    pares = pd.DataFrame({
+        "codigo_financeiro": fin["Código"].to_numpy(dtype=object)[escolhidos[:, 0]],
+        "cliente_financeiro": fin["Cliente"].to_numpy(dtype=object)[escolhidos[:, 0]],
+        "valor_financeiro": fin["Valor Financeiro"].to_numpy()[escolhidos[:, 0]],
+        "codigo_contabilidade": cont["Código"].to_numpy(dtype=object)[escolhidos[:, 1]],
+        "cliente_contabilidade": cont["Cliente"].to_numpy(dtype=object)[escolhidos[:, 1]],
+        "valor_contabilidade": cont["Valor Contabilidade"].to_numpy()[escolhidos[:, 1]],
+        "similaridade": np.round(
+            similaridade.reindex(pd.MultiIndex.from_arrays(escolhidos.T)).to_numpy(), 4
+        ),
+    })
+
+    logger.info(
+        f"🔗 Pareamento por nome: {len(candidatos)} candidatos para "
+        f"{len(fin)} x {len(cont)} exclusivos, {len(pares)} pares sugeridos"
+    )
+    return pares
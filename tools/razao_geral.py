@@ -0,0 +1,273 @@
+"""
+Busca no razão geral (base_contabil_geral) das diferenças "Financeiro > Contabilidade".
+
+Quando o financeiro tem mais do que a conta conciliada, o valor que falta
+muitas vezes foi lançado em outra conta. IndiceRazaoGeral monta, uma vez por
+razão, três índices hash sobre os lançamentos (a conta conciliada é
+ignorada na busca):
+
+- (código do cliente, valor)  → criterio "codigo_valor", confiança alta
+- código do cliente           → criterio "codigo", confiança média
+- valor                       → criterio "valor", confiança média se o valor
+                                é único no razão, baixa se há vários
+
+Conta e código são fatorados para inteiros e cada índice guarda só o
+primeiro lançamento e a quantidade por chave, então a montagem é O(n) no
+razão e a busca é um get_indexer (hash) por critério sobre todas as
+diferenças de uma vez. Valores são comparados em centavos absolutos
+(débito/crédito podem vir com sinais diferentes entre as bases).
+"""
+import logging
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from tools.valores import converter_valores_br
+
+logger = logging.getLogger(__name__)
+
+ALTA = "alta"
+MEDIA = "media"
+BAIXA = "baixa"
+
+
+def mapear_colunas_razao(colunas: Iterable[str]) -> Dict[str, Optional[str]]:
+    """
+    Colunas do razão geral: conta e valor obrigatórias; código do cliente,
+    histórico e data opcionais.
+    """
+    colunas = list(colunas)
+    mapa = {"conta": None, "codigo": None, "valor": None, "historico": None, "data": None}
+
+    for col in colunas:
+        nome = str(col).strip().lower()
+        if nome.startswith("conta") and not mapa["conta"]:
+            mapa["conta"] = col
+        elif nome.startswith("codigo") and not mapa["codigo"]:
+            mapa["codigo"] = col
+        elif (nome.startswith("valor") or nome == "saldo atual") and not mapa["valor"]:
+            mapa["valor"] = col
+        elif (nome.startswith("historico") or nome.startswith("descricao")) and not mapa["historico"]:
+            mapa["historico"] = col
+        elif nome.startswith("data") and not mapa["data"]:
+            mapa["data"] = col
+
+    if not mapa["conta"] or not mapa["valor"]:
+        raise ValueError(
+            f"Layout do razão geral inválido. Colunas encontradas: {colunas}"
+        )
+
+    return mapa
+
+
+class IndiceRazaoGeral:
+    """
+    Índices hash do razão geral.
+
+    A conta conciliada é excluída na busca (e não na montagem), então um
+    mesmo índice atende várias contas de uma empresa: cada chave guarda o
+    primeiro lançamento e o primeiro de uma conta diferente da dele.
+    """
+
+    def __init__(self, df: pd.DataFrame, conta_esperada: Optional[str] = None):
+        self.conta_esperada = str(conta_esperada).strip() if conta_esperada is not None else ""
+        mapa = mapear_colunas_razao(df.columns)
+
+        valores, falhas = converter_valores_br(df[mapa["valor"]])
+        if falhas.any():
+            logger.warning(
+                f"{int(falhas.sum())} valores do razão geral não puderam ser convertidos e foram ignorados"
+            )
+
+        # Conta e código viram inteiros (factorize); o texto só é limpo nos valores distintos
+        contas, self._contas = _fatorar_texto(df[mapa["conta"]])
+        centavos = np.abs(np.round(valores.to_numpy() * 100))
+
+        linhas = np.flatnonzero((contas >= 0) & (centavos > 0))
+        self._conta = contas[linhas]
+        self._historico = df[mapa["historico"]].take(linhas).to_numpy(dtype=object) if mapa["historico"] else None
+        self._data = df[mapa["data"]].take(linhas).to_numpy(dtype=object) if mapa["data"] else None
+
+        if mapa["codigo"]:
+            codigos, self._codigos = _fatorar_texto(df[mapa["codigo"]])
+            self._codigo_linha = codigos[linhas]
+        else:
+            self._codigo_linha = np.full(len(linhas), -1, dtype=np.int64)
+            self._codigos = pd.Index([], dtype=object)
+
+        self._valor_linha, valores_distintos = pd.factorize(centavos[linhas].astype(np.int64))
+        self._valores = pd.Index(valores_distintos)
+
+        self._por_codigo_valor = _indexar(self._chave_par(self._codigo_linha, self._valor_linha), self._conta)
+        self._por_codigo = _indexar(self._codigo_linha, self._conta)
+        self._por_valor = _indexar(self._valor_linha, self._conta)
+
+        logger.info(f"🔎 Razão geral indexado: {len(linhas)} lançamentos em {len(self._contas)} contas")
+
+    @classmethod
+    def de_registros(cls, registros: List[Dict], conta_esperada: Optional[str] = None) -> Optional["IndiceRazaoGeral"]:
+        """Índice a partir de base_contabil_geral.registros (None se vazio)."""
+        if not registros:
+            return None
+        return cls(pd.DataFrame(registros), conta_esperada)
+
+    def __len__(self) -> int:
+        return len(self._conta)
+
+    def _chave_par(self, codigos: np.ndarray, valores_codigo: np.ndarray) -> np.ndarray:
+        return np.where(
+            (codigos >= 0) & (valores_codigo >= 0),
+            codigos * len(self._valores) + valores_codigo,
+            -1
+        )
+
+    # ============================================================
+    # BUSCA
+    # ============================================================
+
+    def buscar(self, codigos: List[Optional[str]], valores: np.ndarray,
+               conta_excluida: Optional[str] = None) -> pd.DataFrame:
+        """
+        Procura cada (código, valor) nos três índices, em ordem de confiança,
+        ignorando os lançamentos da conta excluída (padrão: conta_esperada).
+
+        Retorna um DataFrame alinhado às entradas com as colunas
+        posicao (-1 se não encontrado) | criterio | confianca
+        """
+        n = len(codigos)
+        codigos = self._codigos.get_indexer(_texto(pd.Series(codigos, dtype=object)))
+        centavos = np.abs(np.round(np.asarray(valores, dtype=np.float64) * 100)).astype(np.int64)
+        valores_codigo = self._valores.get_indexer(centavos)
+        par = self._chave_par(codigos, valores_codigo)
+
+        conta_excluida = self.conta_esperada if conta_excluida is None else str(conta_excluida).strip()
+        excluida = self._contas.get_loc(conta_excluida) if conta_excluida in self._contas else -1
+        linhas_excluidas = np.flatnonzero(self._conta == excluida) if excluida >= 0 else None
+
+        posicao = np.full(n, -1, dtype=np.int64)
+        criterio = np.full(n, "", dtype=object)
+        confianca = np.full(n, "", dtype=object)
+
+        def aplicar(indice, chaves, chaves_linha, nome, conf_unico, conf_varios):
+            chaves_unicas, primeiros, segundos, quantidade = indice
+            pendentes = np.flatnonzero((posicao == -1) & (chaves >= 0))
+            if len(pendentes) == 0:
+                return
+            achados = chaves_unicas.get_indexer(chaves[pendentes])
+            pendentes, achados = pendentes[achados >= 0], achados[achados >= 0]
+            encontrados = primeiros[achados]
+            restantes = quantidade[achados]
+
+            if linhas_excluidas is not None:
+                # Primeiro lançamento na conta excluída: vale o primeiro de outra conta
+                na_excluida = self._conta[encontrados] == excluida
+                encontrados[na_excluida] = segundos[achados[na_excluida]]
+                chaves_excluidas = chaves_unicas.get_indexer(chaves_linha[linhas_excluidas])
+                contagem = np.bincount(chaves_excluidas[chaves_excluidas >= 0], minlength=len(chaves_unicas))
+                restantes = restantes - contagem[achados]
+
+            validos = encontrados >= 0
+            alvo = pendentes[validos]
+            posicao[alvo] = encontrados[validos]
+            criterio[alvo] = nome
+            confianca[alvo] = np.where(restantes[validos] == 1, conf_unico, conf_varios)
+
+        aplicar(self._por_codigo_valor, par, self._chave_par(self._codigo_linha, self._valor_linha),
+                "codigo_valor", ALTA, ALTA)
+        aplicar(self._por_codigo, codigos, self._codigo_linha, "codigo", MEDIA, MEDIA)
+        aplicar(self._por_valor, valores_codigo, self._valor_linha, "valor", MEDIA, BAIXA)
+
+        return pd.DataFrame({"posicao": posicao, "criterio": criterio, "confianca": confianca})
+
+    def preencher_diferencas(self, diferencas_origem_maior: List[Dict],
+                             conta_esperada: Optional[str] = None) -> int:
+        """
+        Preenche, em cada item de montar_diferencas (lista origem_maior), os
+        campos de DiferencaOrigemMaior sobre o lançamento encontrado fora da
+        conta esperada (padrão: a do construtor).
+        Retorna quantas diferenças foram encontradas.
+        """
+        if not diferencas_origem_maior:
+            return 0
+
+        conta_esperada = self.conta_esperada if conta_esperada is None else str(conta_esperada).strip()
+        resultado = self.buscar(
+            [item["cnpj"] for item in diferencas_origem_maior],
+            np.array([item["diferenca"] for item in diferencas_origem_maior], dtype=np.float64),
+            conta_esperada
+        )
+        posicao = resultado["posicao"].to_numpy()
+        encontrado = posicao >= 0
+        alvo = np.where(encontrado, posicao, 0)
+
+        def coluna(valores):
+            if valores is None or len(valores) == 0:
+                return [""] * len(posicao)
+            return _texto(pd.Series(valores[alvo])).where(encontrado, None).fillna("").tolist()
+
+        contas = (
+            self._contas.take(self._conta[alvo]).to_numpy(dtype=object)
+            if len(self._conta) else np.full(len(posicao), "", dtype=object)
+        )
+
+        for item, achou, conta, historico, data, criterio, confianca in zip(
+            diferencas_origem_maior,
+            encontrado.tolist(),
+            np.where(encontrado, contas, "").tolist(),
+            coluna(self._historico),
+            coluna(self._data),
+            resultado["criterio"].tolist(),
+            resultado["confianca"].tolist()
+        ):
+            item.update({
+                "encontrado_lancamentos": achou,
+                "conta_contabil_encontrada": conta,
+                "conta_contabil_esperada": conta_esperada,
+                "historico_lancamento": historico,
+                "data_lancamento": data,
+                "criterio_match": criterio,
+                "confianca_match": confianca,
+            })
+
+        return int(encontrado.sum())
+
+
+def _indexar(chaves: np.ndarray, contas: np.ndarray):
+    """
+    Por chave (ignorando as negativas, sem código): (chaves únicas, posição do
+    primeiro lançamento, posição do primeiro de outra conta ou -1, quantidade).
+    """
+    linhas = np.flatnonzero(chaves >= 0)
+    codigos, unicas = pd.factorize(chaves[linhas])
+    # factorize numera na ordem da primeira ocorrência: o código é novo
+    # exatamente onde supera o maior visto até ali
+    novo = np.ones(len(codigos), dtype=bool)
+    novo[1:] = codigos[1:] > np.maximum.accumulate(codigos)[:-1]
+    primeiros = linhas[novo]
+
+    outra_conta = contas[linhas] != contas[primeiros][codigos]
+    segundos = np.full(len(unicas), np.iinfo(np.int64).max, dtype=np.int64)
+    np.minimum.at(segundos, codigos[outra_conta], linhas[outra_conta])
+    segundos[segundos == np.iinfo(np.int64).max] = -1
+
+    return pd.Index(unicas), primeiros, segundos, np.bincount(codigos, minlength=len(unicas))
+
+
+def _fatorar_texto(serie: pd.Series):
+    """
+    (códigos inteiros, valores distintos) de uma coluna de texto, com o texto
+    limpo só nos valores distintos. Vazio/NaN recebe -1.
+    """
+    codigos, unicos = pd.factorize(serie)
+    limpos = _texto(pd.Series(np.asarray(unicos, dtype=object), dtype=object))
+    recodificados, distintos = pd.factorize(limpos.to_numpy(dtype=object))
+    recodificados = np.append(recodificados, -1)
+    return recodificados[codigos], pd.Index(distintos, dtype=object)
+
+
+def _texto(serie: pd.Series) -> pd.Series:
+    """Texto sem espaços, com None para vazio/NaN (object)."""
+    bruto = serie.astype(object)
+    preenchido = serie.notna() & (bruto != "")
+    return bruto.astype(str).str.strip().astype(object).where(preenchido, None)
@@ -0,0 +1,86 @@
+"""
+Conversão vetorizada de valores monetários no formato brasileiro.
+
+Usado pelos normalizadores do financeiro e da contabilidade.
+"""
+import numpy as np
+import pandas as pd
+
+
+def converter_valores_br(serie: pd.Series) -> tuple[pd.Series, pd.Series]:
+    """
+    Converte uma coluna de valores monetários para float, sem passar linha a linha.
+
+    Formatos aceitos:
+    - 1.234,56 / 1234,56 / 1234
+    - R$ 1.234,56
+    - (1.234,56)  → negativo
+    - -1.234,56 e 1.234,56-  → negativo
+    - 1.234,56D / 1.234,56C  → débito positivo, crédito negativo
+    - Células já numéricas (int/float) são usadas diretamente
+
+    Parâmetros:
+    -----------
+    serie : pd.Series
+        Coluna com os valores a converter
+
+    Retorna:
+    --------
+    tuple (valores, falhas):
+        - valores: pd.Series float64 (NaN para vazio ou inválido)
+        - falhas: pd.Series bool, True onde havia conteúdo que não pôde ser convertido
+    """
+    indice = serie.index
+
+    # Coluna inteiramente numérica (inclusive object só com números): nada a converter
+    if serie.dtype == object:
+        serie = serie.infer_objects()
+    if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        return serie.astype(np.float64), pd.Series(False, index=indice)
+
+    valores = pd.Series(np.nan, index=indice, dtype=np.float64)
+
+    # .str.len() devolve NaN para células que não são texto
+    eh_texto = serie.astype(object).str.len().notna().to_numpy()
+    preenchido = serie.notna().to_numpy().copy()
+
+    # Células já numéricas dentro de uma coluna mista
+    numericas = preenchido & ~eh_texto
+    if numericas.any():
+        valores[numericas] = pd.to_numeric(serie[numericas], errors="coerce").to_numpy(dtype=np.float64)
+
+    if eh_texto.any():
+        texto = (
+            serie[eh_texto]
+            .astype(str)
+            .str.upper()
+            .str.replace(r"\s+|R\$", "", regex=True)
+        )
+
+        # Indicador de débito/crédito no final
+        credito = texto.str.endswith("C")
+        texto = texto.str.replace(r"[DC]$", "", regex=True)
+
+        # Negativos: (1.234,56) | -1.234,56 | 1.234,56-
+        entre_parenteses = texto.str.startswith("(") & texto.str.endswith(")")
+        menos_final = texto.str.endswith("-")
+        # Depois da limpeza: em "R$ -10,00" o sinal só fica no início sem o R$
+        menos_inicial = texto.str.startswith("-")
+        texto = texto.str.strip("()-")
+
+        numero = pd.to_numeric(
+            texto
+            .str.replace(".", "", regex=False)
+            .str.replace(",", ".", regex=False),
+            errors="coerce"
+        )
+
+        negativo = (entre_parenteses | menos_final | menos_inicial) ^ credito
+        valores[eh_texto] = np.where(negativo.to_numpy(), -numero, numero)
+
+        # Texto vazio é tratado como ausente, não como falha
+        vazio = texto.str.len().to_numpy() == 0
+        preenchido[np.flatnonzero(eh_texto)[vazio]] = False
+
+    falhas = pd.Series(preenchido & valores.isna().to_numpy(), index=indice)
+    return valores, falhas